@@ -3,20 +3,22 @@ RuralBrain FastAPI 服务器
 提供图像检测对话接口和规划咨询接口
 """
 import sys
+import asyncio
+import hmac
 import json
 import os
 import uuid
 import logging
 from pathlib import Path
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Optional
 
 import httpx
 from dotenv import load_dotenv
-from fastapi import FastAPI, File, UploadFile, HTTPException, status
+from fastapi import FastAPI, File, Header, UploadFile, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
@@ -30,8 +32,16 @@ from service.settings import (
     ALLOWED_EXTENSIONS,
     AGENT_VERSION,
     AGENT_AUTO_FALLBACK,
+    STORAGE_MAX_BYTES,
+    STORAGE_MAX_AGE_HOURS,
+    STORAGE_SWEEP_INTERVAL,
+    STORAGE_ADMIN_TOKEN,
+    DETECTION_FAST_PATH,
+    DETECTION_FAST_PATH_MAX_LENGTH,
 )
 from service.schemas import ChatRequest, UploadResponse
+from service.storage import FileStorage
+from service.upload import UnsupportedImageError, UploadTooLargeError, save_image_uploads
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -42,11 +52,18 @@ SSE_HEADERS = {
     "X-Accel-Buffering": "no",
 }
 
-# 检测结果目录配置
+# 检测结果目录配置：名称 -> (结果目录, 静态文件访问路径)
 DETECTION_RESULT_DIRS = {
-    "pest": ("pest_detection_results", "pest_detection_*.jpg", "/pest_results"),
-    "cow": ("cow_detection_results", "cow_result_*.jpg", "/cow_results"),
-    "rice": ("rice_detection_results", "rice_detection_*.jpg", "/rice_results"),
+    "pest": ("pest_detection_results", "/pest_results"),
+    "cow": ("cow_detection_results", "/cow_results"),
+    "rice": ("rice_detection_results", "/rice_results"),
+}
+
+# 检测工具名称 -> 结果目录配置名称
+DETECTION_TOOLS = {
+    "pest_detection_tool": "pest",
+    "cow_detection_tool": "cow",
+    "rice_detection_tool": "rice",
 }
 
 app = FastAPI(
@@ -64,16 +81,58 @@ app.add_middleware(
 )
 
 
+# 上传图片和检测结果图片的存储（内容寻址、按保留策略后台清理、按对话线程分组）
+storage = FileStorage(
+    {"uploads": UPLOAD_DIR, **{name: Path(dir_path) for name, (dir_path, _) in DETECTION_RESULT_DIRS.items()}},
+    max_bytes=STORAGE_MAX_BYTES,
+    max_age_seconds=STORAGE_MAX_AGE_HOURS * 3600,
+)
+
+
 def mount_static_dirs():
     """挂载所有静态文件目录"""
-    app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
-    for name, (dir_path, _, mount_name) in DETECTION_RESULT_DIRS.items():
-        Path(dir_path).mkdir(parents=True, exist_ok=True)
-        app.mount(f"/{mount_name.strip('/')}", StaticFiles(directory=dir_path), name=name)
+    app.mount("/uploads", StaticFiles(directory=str(storage.directory("uploads"))), name="uploads")
+    for name, (_, mount_name) in DETECTION_RESULT_DIRS.items():
+        app.mount(f"/{mount_name.strip('/')}", StaticFiles(directory=str(storage.directory(name))), name=name)
 
 
 mount_static_dirs()
 
+
+def get_result_image_path(tool_name: str, tool_output: Any) -> Optional[str]:
+    """
+    从检测工具的 artifact 中读取本次调用保存的结果图片路径
+
+    Args:
+        tool_name: 工具名称
+        tool_output: on_tool_end 事件的输出（ToolMessage，artifact 中包含 result_image_path）
+
+    Returns:
+        结果图片路径，非检测工具或没有结果图片时为 None
+    """
+    artifact = getattr(tool_output, "artifact", None)
+    if tool_name not in DETECTION_TOOLS or not isinstance(artifact, dict):
+        return None
+    return artifact.get("result_image_path") or None
+
+
+def get_result_image_url(tool_name: str, result_image_path: Optional[str]) -> Optional[str]:
+    """
+    把检测工具保存的结果图片路径转换为静态文件访问路径
+
+    Args:
+        tool_name: 工具名称
+        result_image_path: 结果图片路径
+
+    Returns:
+        结果图片访问路径，非检测工具或没有结果图片时为 None
+    """
+    kind = DETECTION_TOOLS.get(tool_name)
+    if kind is None or not result_image_path:
+        return None
+    _, mount_name = DETECTION_RESULT_DIRS[kind]
+    return f"{mount_name}/{Path(result_image_path).name}"
+
 # --------延迟加载机制--------
 # 延迟导入 agent，避免启动时加载模型，缩短启动时间
 _agent = None
@@ -148,9 +207,26 @@ async def startup_event():
 
     get_agent()  # 预加载 Orchestrator Agent
 
+    # 后台定期清理过期的上传图片和检测结果图片
+    app.state.storage_sweeper = asyncio.create_task(storage.run_sweeper(STORAGE_SWEEP_INTERVAL))
+
     logger.info("RuralBrain 服务启动完成")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """停止后台存储清理任务，关闭检测服务的 HTTP 连接池"""
+    sweeper = getattr(app.state, "storage_sweeper", None)
+    if sweeper is not None:
+        sweeper.cancel()
+
+    # 延迟导入：导入检测工具包会加载所有检测工具
+    from src.agents.tools.detection_client import aclose_clients, close_clients
+
+    close_clients()
+    await aclose_clients()
+
+
 # -------- Planning Service 配置 --------
 PLANNING_SERVICE_URL = os.getenv(
     "PLANNING_SERVICE_URL",
@@ -160,6 +236,34 @@ PLANNING_SERVICE_TIMEOUT = int(os.getenv("PLANNING_SERVICE_TIMEOUT", "120"))
 
 
 # -------- 意图识别函数 --------
+# 规划相关关键词
+PLANNING_KEYWORDS = [
+    "规划", "发展", "策略", "旅游", "产业", "博罗", "罗浮山", "长宁镇",
+    "古城", "政策", "方案", "乡村", "振兴", "农业", "民宿", "文化",
+    "设计", "建设", "布局", "目标", "措施", "项目", "投资", "招商"
+]
+
+# 检测相关关键词
+DETECTION_KEYWORDS = [
+    "识别", "检测", "害虫", "病害", "大米", "品种", "牛", "奶牛",
+    "图片", "照片", "看", "什么", "分析", "诊断", "分类"
+]
+
+# 检测快速通道：检测类型 -> (关键词, 排除词, 检测工具名称, 图片路径参数名)
+# 关键词按完整词语匹配，不用"米""稻"这类单字：玉米、水稻叶片等提问不属于大米识别。
+# 匹配前先去掉排除词，如"玉米粒"不会因为包含"米粒"而走大米识别
+DETECTION_ROUTES = {
+    "pest": (["虫", "病害"], [], "pest_detection_tool", "image_path"),
+    "rice": (
+        ["大米", "米粒", "稻米", "稻谷", "糯米", "粳米", "籼米", "香米", "丝苗米", "什么米", "袋米", "米的品种"],
+        ["玉米", "小米", "虾米", "米饭"],
+        "rice_detection_tool",
+        "image_path",
+    ),
+    "cow": (["牛"], ["蜗牛", "天牛", "牛蛙", "牛筋草"], "cow_detection_tool", "file_path"),
+}
+
+
 def classify_intent(message: str, has_images: bool = False) -> str:
     """
     分类用户意图
@@ -175,24 +279,9 @@ def classify_intent(message: str, has_images: bool = False) -> str:
     if has_images:
         return "detection"
 
-    # 规则2: 规划相关关键词
-    planning_keywords = [
-        "规划", "发展", "策略", "旅游", "产业", "博罗", "罗浮山", "长宁镇",
-        "古城", "政策", "方案", "乡村", "振兴", "农业", "民宿", "文化",
-        "设计", "建设", "布局", "目标", "措施", "项目", "投资", "招商"
-    ]
-
-    # 规则3: 检测相关关键词
-    detection_keywords = [
-        "识别", "检测", "害虫", "病害", "大米", "品种", "牛", "奶牛",
-        "图片", "照片", "看", "什么", "分析", "诊断", "分类"
-    ]
-
-    message_lower = message.lower()
-
-    # 统计关键词匹配
-    planning_matches = sum(1 for kw in planning_keywords if kw in message)
-    detection_matches = sum(1 for kw in detection_keywords if kw in message)
+    # 规则2/3: 统计规划和检测关键词匹配
+    planning_matches = sum(1 for kw in PLANNING_KEYWORDS if kw in message)
+    detection_matches = sum(1 for kw in DETECTION_KEYWORDS if kw in message)
 
     # 根据匹配数量判断
     if planning_matches > detection_matches:
@@ -206,6 +295,85 @@ def classify_intent(message: str, has_images: bool = False) -> str:
         return "planning"
 
 
+def route_detection(message: str, image_paths: list[str], mode: str = "auto") -> Optional[str]:
+    """
+    判断是否走检测快速通道（高置信度的纯检测请求）
+
+    条件：带图片、提问简短、不含规划关键词，且只匹配一种检测类型的关键词。
+
+    Args:
+        message: 用户消息
+        image_paths: 图片路径列表
+        mode: 聊天模式（planning 模式不走快速通道）
+
+    Returns:
+        检测类型（pest/rice/cow），不满足条件时为 None
+    """
+    if not DETECTION_FAST_PATH or not image_paths or mode == "planning":
+        return None
+    message = message.strip()
+    if len(message) > DETECTION_FAST_PATH_MAX_LENGTH or any(kw in message for kw in PLANNING_KEYWORDS):
+        return None
+
+    matched = [
+        kind for kind, (keywords, exclusions, _, _) in DETECTION_ROUTES.items()
+        if _matches_keywords(message, keywords, exclusions)
+    ]
+    return matched[0] if len(matched) == 1 else None
+
+
+def _matches_keywords(message: str, keywords: list[str], exclusions: list[str]) -> bool:
+    """去掉排除词后，消息中是否包含任一关键词"""
+    for word in exclusions:
+        message = message.replace(word, " ")
+    return any(kw in message for kw in keywords)
+
+
+def _get_detection_tool(tool_name: str):
+    """按名称获取检测工具（延迟导入，与 Agent 共用同一工具对象）"""
+    from src.agents import tools
+
+    return getattr(tools, tool_name)
+
+
+async def run_detection_fast_path(kind: str, image_paths: list[str]) -> list[tuple[dict, ToolMessage]]:
+    """
+    直接调用检测工具（多张图片并发检测），不经过模型选择工具
+
+    Args:
+        kind: 检测类型
+        image_paths: 图片路径列表
+
+    Returns:
+        与图片顺序一致的 (工具调用, 工具结果消息) 列表，可直接注入对话历史
+    """
+    _, _, tool_name, arg_name = DETECTION_ROUTES[kind]
+    tool = _get_detection_tool(tool_name)
+    tool_calls = [
+        {"name": tool_name, "args": {arg_name: path}, "id": f"call_{uuid.uuid4().hex}", "type": "tool_call"}
+        for path in image_paths
+    ]
+    # 与 Agent 执行工具调用相同，走工具的异步实现（没有异步实现的工具由 langchain 放到线程池执行）
+    results = await asyncio.gather(*(tool.ainvoke(call) for call in tool_calls))
+    return list(zip(tool_calls, results))
+
+
+def detection_succeeded(tool_message: ToolMessage) -> bool:
+    """
+    判断检测工具是否检测成功
+
+    检测工具出错时不抛出异常，而是返回错误文字，并在 artifact 中标记 success=False
+
+    Args:
+        tool_message: 检测工具返回的消息
+
+    Returns:
+        artifact 中标记检测成功时为 True
+    """
+    artifact = getattr(tool_message, "artifact", None)
+    return isinstance(artifact, dict) and bool(artifact.get("success"))
+
+
 async def forward_to_planning_service(
     message: str,
     thread_id: str = None,
@@ -284,6 +452,35 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/storage/stats")
+async def storage_stats():
+    """存储指标：各目录的文件数和字节数、保留策略和最近一次清理的结果"""
+    return storage.stats()
+
+
+@app.delete("/threads/{thread_id}/files")
+async def purge_thread_files(thread_id: str, x_admin_token: Optional[str] = Header(None)):
+    """
+    删除对话引用的上传图片和检测结果图片（仍被其他对话引用的文件保留）
+
+    需要 X-Admin-Token 请求头与 STORAGE_ADMIN_TOKEN 一致；未配置 STORAGE_ADMIN_TOKEN 时接口禁用。
+
+    Args:
+        thread_id: 对话线程ID
+        x_admin_token: 管理令牌
+
+    Returns:
+        删除的文件数和释放的字节数
+    """
+    if not STORAGE_ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="未配置 STORAGE_ADMIN_TOKEN，对话文件清理接口已禁用")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, STORAGE_ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="无效的管理令牌")
+    deleted, freed = await asyncio.to_thread(storage.purge_thread, thread_id)
+    logger.info(f"对话文件已清理 [thread_id={thread_id}]: {deleted} 个文件")
+    return {"success": True, "deleted_files": deleted, "freed_bytes": freed}
+
+
 @app.post("/upload", response_model=UploadResponse)
 async def upload_image(files: list[UploadFile] = File(...)):
     """
@@ -304,35 +501,10 @@ async def upload_image(files: list[UploadFile] = File(...)):
         )
     
     try:
-        file_paths = []
-        
-        for file in files:
-            # 检查文件大小
-            contents = await file.read()
-            if len(contents) > MAX_UPLOAD_SIZE:
-                raise HTTPException(
-                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                    detail=f"文件 {file.filename} 大小超过限制 ({MAX_UPLOAD_SIZE / 1024 / 1024}MB)",
-                )
-            
-            # 检查文件扩展名
-            file_ext = Path(file.filename).suffix.lower()
-            if file_ext not in ALLOWED_EXTENSIONS:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"文件 {file.filename} 格式不支持，仅支持: {', '.join(ALLOWED_EXTENSIONS)}",
-                )
-            
-            # 生成唯一文件名
-            filename = f"{uuid.uuid4()}{file_ext}"
-            file_path = UPLOAD_DIR / filename
-            
-            # 保存文件
-            with open(file_path, "wb") as f:
-                f.write(contents)
-            
-            file_paths.append(str(file_path))
-            logger.info(f"文件上传成功: {filename}")
+        # 各文件并发流式写入存储目录，按内容哈希命名（相同图片只保存一份）
+        file_paths = await save_image_uploads(storage, files, MAX_UPLOAD_SIZE)
+        for file_path in file_paths:
+            logger.info(f"文件上传成功: {Path(file_path).name}")
         
         # 兼容旧版本：如果只有一张图片，同时返回 file_path
         return UploadResponse(
@@ -342,8 +514,16 @@ async def upload_image(files: list[UploadFile] = File(...)):
             message=f"成功上传 {len(file_paths)} 张图片",
         )
         
-    except HTTPException:
-        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e),
+        )
+    except UnsupportedImageError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{e}，仅支持: {', '.join(sorted(ALLOWED_EXTENSIONS))}",
+        )
     except Exception as e:
         logger.error(f"文件上传失败: {str(e)}")
         raise HTTPException(
@@ -418,6 +598,9 @@ async def chat_stream(request: ChatRequest):
 
         # 支持多图片路径（新版本）或单图片路径（兼容旧版本）
         image_paths = request.image_paths or ([request.image_path] if request.image_path else [])
+        # 上传的图片登记到当前对话，对话清理时一并删除
+        if image_paths:
+            await asyncio.to_thread(storage.attach, thread_id, image_paths)
 
         # 获取 Orchestrator Agent
         agent = get_agent()
@@ -433,16 +616,58 @@ async def chat_stream(request: ChatRequest):
 
         logger.info(f"调用 Orchestrator Agent [thread_id={thread_id}]: {request.message[:50]}..., 图片数量: {len(image_paths)}")
 
+        # 检测快速通道：高置信度的纯检测请求立即开始检测，与响应流的建立并行
+        detection_kind = route_detection(request.message, image_paths, request.mode or "auto")
+        detection_task = (
+            asyncio.create_task(run_detection_fast_path(detection_kind, image_paths))
+            if detection_kind else None
+        )
+
+        async def tool_call_event(tool_name: str, tool_output: Any) -> str:
+            """构造工具调用完成事件（检测工具的结果图片登记到当前对话）"""
+            # 结果图片路径由检测工具通过 artifact 返回（仅检测工具）
+            result_image_path = get_result_image_path(tool_name, tool_output)
+            if result_image_path:
+                await asyncio.to_thread(storage.attach, thread_id, [result_image_path])
+            tool_event = {
+                "type": "tool_call",
+                "tool_name": tool_name,
+                "status": "已完成",
+                "result_image": get_result_image_url(tool_name, result_image_path),
+            }
+            return f"data: {json.dumps(tool_event, ensure_ascii=False)}\n\n"
+
         async def event_generator() -> AsyncGenerator[str, None]:
             """SSE 事件生成器"""
             try:
                 # 发送开始事件
                 yield f"data: {json.dumps({'type': 'start', 'thread_id': thread_id}, ensure_ascii=False)}\n\n"
 
+                messages = [HumanMessage(content=message_content)]
+                if detection_task is not None:
+                    try:
+                        detections = await detection_task
+                    except Exception as e:
+                        # 快速通道失败时交给 Agent 按常规流程处理
+                        logger.warning(f"检测快速通道失败，回退到 Agent: {str(e)}")
+                        detections = []
+                    failed = [result.content for _, result in detections if not detection_succeeded(result)]
+                    if failed:
+                        # 检测工具返回的是错误信息：不注入对话，交给 Agent 按常规流程处理
+                        logger.warning(f"检测快速通道失败，回退到 Agent: {failed[0]}")
+                        detections = []
+                    if detections:
+                        logger.info(f"检测快速通道 [thread_id={thread_id}]: {detection_kind}")
+                        # 检测结果先推送给前端，再以工具调用的形式注入对话，模型只需解释结果
+                        messages.append(AIMessage(content="", tool_calls=[call for call, _ in detections]))
+                        for call, tool_message in detections:
+                            messages.append(tool_message)
+                            yield await tool_call_event(call["name"], tool_message)
+
                 # 流式处理 agent 响应
                 full_content = ""
                 async for event in agent.astream_events(
-                    {"messages": [HumanMessage(content=message_content)]},
+                    {"messages": messages},
                     config,
                     version="v2",
                 ):
@@ -461,45 +686,8 @@ async def chat_stream(request: ChatRequest):
 
                     # 处理工具调用结束事件
                     elif kind == "on_tool_end":
-                        tool_name = event["name"]
-
-                        # 查找对应的结果图片路径（仅检测工具）
-                        result_image = None
-                        if tool_name == "pest_detection_tool":
-                            # 查找最新的害虫检测结果图片
-                            result_dir = Path("pest_detection_results")
-                            if result_dir.exists():
-                                images = sorted(result_dir.glob("pest_detection_*.jpg"),
-                                              key=lambda p: p.stat().st_mtime, reverse=True)
-                                if images:
-                                    result_image = f"/pest_results/{images[0].name}"
-
-                        elif tool_name == "rice_detection_tool":
-                            # 查找最新的大米检测结果图片
-                            result_dir = Path("rice_detection_results")
-                            if result_dir.exists():
-                                images = sorted(result_dir.glob("rice_detection_*.jpg"),
-                                              key=lambda p: p.stat().st_mtime, reverse=True)
-                                if images:
-                                    result_image = f"/rice_results/{images[0].name}"
-
-                        elif tool_name == "cow_detection_tool":
-                            # 查找最新的牛只检测结果图片
-                            result_dir = Path("cow_detection_results")
-                            if result_dir.exists():
-                                images = sorted(result_dir.glob("cow_result_*.jpg"),
-                                              key=lambda p: p.stat().st_mtime, reverse=True)
-                                if images:
-                                    result_image = f"/cow_results/{images[0].name}"
-
                         # 发送工具调用完成事件
-                        tool_event = {
-                            "type": "tool_call",
-                            "tool_name": tool_name,
-                            "status": "已完成",
-                            "result_image": result_image,
-                        }
-                        yield f"data: {json.dumps(tool_event, ensure_ascii=False)}\n\n"
+                        yield await tool_call_event(event["name"], event["data"].get("output"))
 
                 # 发送完成事件
                 yield f"data: {json.dumps({'type': 'end', 'full_content': full_content}, ensure_ascii=False)}\n\n"
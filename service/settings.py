@@ -28,6 +28,16 @@ MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB
 # 支持的图片格式
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
 
+# 存储保留策略（上传图片和检测结果图片）
+# 所有目录合计的最大字节数，超过时从最久未使用的文件开始删除
+STORAGE_MAX_BYTES = int(os.getenv("STORAGE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))  # 2GB
+# 文件自最近一次使用起的保留时长（小时）
+STORAGE_MAX_AGE_HOURS = float(os.getenv("STORAGE_MAX_AGE_HOURS", "72"))
+# 后台清理间隔（秒）
+STORAGE_SWEEP_INTERVAL = int(os.getenv("STORAGE_SWEEP_INTERVAL", "600"))
+# 按对话清理文件接口（DELETE /threads/{thread_id}/files）的 X-Admin-Token，为空时接口禁用
+STORAGE_ADMIN_TOKEN = os.getenv("STORAGE_ADMIN_TOKEN", "")
+
 # ============================================
 # Agent 配置
 # ============================================
@@ -35,3 +45,8 @@ ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
 AGENT_VERSION = os.getenv("AGENT_VERSION", "v1").lower()
 # V2 Agent 失败时是否自动回退到 V1
 AGENT_AUTO_FALLBACK = os.getenv("AGENT_AUTO_FALLBACK", "true").lower() == "true"
+# 检测快速通道：只上传图片并附简短提问（如"这是什么虫？"）时直接调用检测工具，
+# 把结果注入对话后由模型解释，省去一次模型选择工具的往返
+DETECTION_FAST_PATH = os.getenv("DETECTION_FAST_PATH", "true").lower() == "true"
+# 走快速通道的提问最大字数（更长的提问交给模型判断）
+DETECTION_FAST_PATH_MAX_LENGTH = int(os.getenv("DETECTION_FAST_PATH_MAX_LENGTH", "30"))
@@ -0,0 +1,365 @@
+"""
+上传文件与检测结果图片的存储管理
+
+- 内容寻址文件名：按文件内容的 SHA-256 命名，重复上传同一张图片只保存一份
+- 保留策略：后台定期清理超过保留时长的文件；总大小超过上限时从最久未使用的文件开始删除
+- 按对话线程分组：记录每个对话引用的文件，可以一并清理（仍被其他对话引用的文件保留）
+- 上传引用：相同内容的上传共用一个文件，/upload 返回的文件在登记到对话之前计一次引用，
+  按对话清理和超出容量的清理都不会删除它（引用超过保留时长后失效）
+- 删除与去重的并发：刷新修改时间和删除文件在同一把锁内进行，删除前重新检查修改时间，
+  清理扫描之后又被重复上传刷新的文件不会被删除
+- 存储指标：各目录的文件数和字节数、最近一次清理的结果
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 文件名中保留的内容哈希长度（十六进制字符）
+HASH_LENGTH = 32
+
+
+def content_filename(data: bytes, suffix: str, prefix: str = "") -> str:
+    """按内容哈希生成文件名（相同内容得到相同文件名）"""
+    return f"{prefix}{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{suffix}"
+
+
+class ContentWriter:
+    """
+    边写入边计算内容哈希的临时文件，提交时按内容哈希命名（用于流式写入的大文件）
+
+    write / commit / abort 都是阻塞操作，在线程池中调用；请求被取消时 abort 会等待进行中的写入结束。
+    """
+
+    def __init__(self, storage: "FileStorage", name: str):
+        self._storage = storage
+        self._directory = storage.directory(name)
+        fd, self._temp_path = tempfile.mkstemp(dir=self._directory, prefix=".", suffix=".tmp")
+        self._file = os.fdopen(fd, "wb")
+        self._hash = hashlib.sha256()
+        self._lock = threading.Lock()
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        """追加一块数据"""
+        with self._lock:
+            self._file.write(chunk)
+            self._hash.update(chunk)
+            self.size += len(chunk)
+
+    def commit(self, suffix: str, prefix: str = "", hold: bool = False) -> Path:
+        """
+        完成写入并按内容哈希命名，相同内容的文件已存在时丢弃临时文件
+
+        Args:
+            suffix: 文件扩展名
+            prefix: 文件名前缀
+            hold: 是否计一次上传引用（文件登记到对话时释放）
+
+        Returns:
+            Path: 保存的文件路径
+        """
+        self._file.close()
+        path = self._directory / f"{prefix}{self._hash.hexdigest()[:HASH_LENGTH]}{suffix}"
+        self._storage.store(self._temp_path, path, self.size, hold)
+        return path
+
+    def abort(self) -> None:
+        """放弃写入并删除临时文件"""
+        with self._lock:
+            self._file.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+
+class FileStorage:
+    """
+    线程安全的文件存储
+
+    管理若干命名目录（如 uploads、pest），文件大小索引在写入和登记时增量更新，
+    后台清理时重新扫描目录校正；请求处理过程中不列目录。
+    """
+
+    def __init__(self, directories: Dict[str, Path], max_bytes: int, max_age_seconds: float):
+        """
+        Args:
+            directories: 目录名称 -> 目录路径
+            max_bytes: 所有目录合计的最大字节数
+            max_age_seconds: 文件自最近一次使用起的保留时长（秒）
+        """
+        self._dirs = {name: Path(directory).resolve() for name, directory in directories.items()}
+        for directory in self._dirs.values():
+            directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        # 文件路径 -> 字节数
+        self._files: Dict[Path, int] = {}
+        # 对话线程 ID -> 该对话引用的文件
+        self._threads: Dict[str, Set[Path]] = {}
+        # 文件路径 -> 尚未登记到对话的上传引用（每次上传的时间）
+        self._holds: Dict[Path, List[float]] = {}
+        self._last_sweep: Optional[Dict[str, Any]] = None
+
+    def directory(self, name: str) -> Path:
+        """返回命名目录的路径"""
+        return self._dirs[name]
+
+    def put(self, name: str, data: bytes, suffix: str, prefix: str = "") -> Path:
+        """
+        按内容哈希保存文件，相同内容只写入一次
+
+        Args:
+            name: 目录名称
+            data: 文件内容
+            suffix: 文件扩展名（如 .jpg）
+            prefix: 文件名前缀
+
+        Returns:
+            Path: 保存的文件路径
+        """
+        path = self._dirs[name] / content_filename(data, suffix, prefix)
+        with self._lock:
+            if self._touch(path):
+                self._files[path] = len(data)
+                return path
+        self._write_atomic(path, data)
+        with self._lock:
+            self._files[path] = len(data)
+        return path
+
+    def writer(self, name: str) -> ContentWriter:
+        """创建流式写入命名目录的临时文件，提交时按内容哈希命名"""
+        return ContentWriter(self, name)
+
+    def register(self, path: Path, size: int) -> None:
+        """登记已写入受管目录的文件（更新大小索引）"""
+        with self._lock:
+            self._files[path] = size
+
+    def store(self, temp_path: str, path: Path, size: int, hold: bool = False) -> None:
+        """
+        把同目录下写好的临时文件提交为 path，相同内容的文件已存在时丢弃临时文件
+
+        Args:
+            temp_path: 临时文件路径
+            path: 目标文件路径
+            size: 文件字节数
+            hold: 是否计一次上传引用（文件登记到对话时释放）
+        """
+        with self._lock:
+            if self._touch(path):
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, path)
+            self._files[path] = size
+            if hold:
+                self._holds.setdefault(path, []).append(time.time())
+
+    @staticmethod
+    def _touch(path: Path) -> bool:
+        """
+        刷新已存在文件的修改时间（保留期限从最近一次使用开始计算），调用方持有锁
+
+        Returns:
+            bool: 文件是否存在
+        """
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        """先写临时文件再原子替换，避免并发请求读到半写入的文件"""
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _managed_path(self, path: str) -> Optional[Path]:
+        """解析路径，不在受管目录下或不是文件时返回 None"""
+        resolved = Path(path).resolve()
+        if resolved.parent not in self._dirs.values() or not resolved.is_file():
+            return None
+        return resolved
+
+    def attach(self, thread_id: str, paths: Iterable[str]) -> int:
+        """
+        把文件登记到对话线程（忽略不在受管目录下的路径）
+
+        Returns:
+            int: 登记的文件数
+        """
+        attached = []
+        for path in paths:
+            resolved = self._managed_path(path)
+            if resolved is not None:
+                attached.append((resolved, resolved.stat().st_size))
+        if attached:
+            with self._lock:
+                files = self._threads.setdefault(thread_id, set())
+                for resolved, size in attached:
+                    files.add(resolved)
+                    self._files[resolved] = size
+                    # 上传的文件已由对话引用，释放一次上传引用
+                    holds = self._holds.get(resolved)
+                    if holds:
+                        holds.pop(0)
+                        if not holds:
+                            del self._holds[resolved]
+        return len(attached)
+
+    def purge_thread(self, thread_id: str) -> Tuple[int, int]:
+        """
+        删除对话线程引用的文件（仍被其他对话引用或有未登记的上传引用的文件保留）
+
+        Returns:
+            (删除的文件数, 释放的字节数)
+        """
+        with self._lock:
+            files = self._threads.pop(thread_id, set())
+        deleted, freed = self._delete([(path, None) for path in files], keep_referenced=True)
+        return len(deleted), freed
+
+    def _delete(self, paths: List[Tuple[Path, Optional[float]]],
+                keep_referenced: bool = False) -> Tuple[List[Path], int]:
+        """
+        删除文件并更新索引，每个文件的检查和删除在锁内进行（与刷新修改时间互斥）
+
+        Args:
+            paths: (文件路径, 扫描时的修改时间) 列表；修改时间不为 None 时，
+                文件在扫描后被重复上传刷新过（修改时间已变化）则保留
+            keep_referenced: 是否保留仍被对话引用的文件
+
+        Returns:
+            (删除的文件, 释放的字节数)
+        """
+        deleted, freed = [], 0
+        for path, scanned_mtime in paths:
+            with self._lock:
+                if path in self._holds:
+                    continue
+                if keep_referenced and any(path in files for files in self._threads.values()):
+                    continue
+                try:
+                    stat = path.stat()
+                    if scanned_mtime is not None and stat.st_mtime != scanned_mtime:
+                        continue
+                    path.unlink()
+                    freed += stat.st_size
+                except FileNotFoundError:
+                    pass
+                deleted.append(path)
+                self._files.pop(path, None)
+                for name in list(self._threads):
+                    self._threads[name].discard(path)
+                    if not self._threads[name]:
+                        del self._threads[name]
+        return deleted, freed
+
+    def _scan(self) -> List[Tuple[Path, int, float]]:
+        """扫描所有受管目录，返回 (路径, 字节数, 修改时间) 列表（不含未完成的临时文件）"""
+        entries = []
+        for directory in self._dirs.values():
+            with os.scandir(directory) as iterator:
+                for entry in iterator:
+                    if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False):
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                    entries.append((Path(entry.path), stat.st_size, stat.st_mtime))
+        return entries
+
+    def sweep(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        执行一次清理：删除超过保留时长的文件，总大小仍超过上限时从最久未使用的文件开始删除
+
+        Returns:
+            本次清理的统计信息
+        """
+        started = time.perf_counter()
+        now = time.time() if now is None else now
+        with self._lock:
+            # 超过保留时长仍未登记到对话的上传引用失效
+            for path in list(self._holds):
+                self._holds[path] = [held for held in self._holds[path] if now - held <= self.max_age_seconds]
+                if not self._holds[path]:
+                    del self._holds[path]
+            held = set(self._holds)
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+
+        expired = [entry for entry in entries if now - entry[2] > self.max_age_seconds]
+        remaining = entries[len(expired):]
+        # 有上传引用的文件不参与容量淘汰
+        total = sum(size for _, size, _ in remaining)
+        evictable = [entry for entry in remaining if entry[0] not in held]
+        evicted = 0
+        while evicted < len(evictable) and total > self.max_bytes:
+            total -= evictable[evicted][1]
+            evicted += 1
+        victims = expired + evictable[:evicted]
+
+        deleted_paths, freed = self._delete([(path, mtime) for path, _, mtime in victims])
+        deleted = len(deleted_paths)
+        removed = set(deleted_paths)
+        kept = {path: size for path, size, _ in entries if path not in removed}
+        scanned = {path for path, _, _ in entries}
+        with self._lock:
+            # 扫描期间新写入的文件保留在索引中
+            self._files = {
+                **{path: size for path, size in self._files.items() if path not in scanned},
+                **kept,
+            }
+            self._last_sweep = {
+                "finished_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)),
+                "scanned_files": len(entries),
+                "deleted_files": deleted,
+                "freed_bytes": freed,
+                "seconds": round(time.perf_counter() - started, 3),
+            }
+            result = dict(self._last_sweep)
+        if deleted:
+            logger.info(f"存储清理完成: 删除 {deleted} 个文件，释放 {freed / 1024 / 1024:.1f}MB")
+        return result
+
+    async def run_sweeper(self, interval: float) -> None:
+        """后台定期清理（在线程池中执行，不阻塞事件循环），启动时先执行一次"""
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.error(f"存储清理失败: {str(e)}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回各目录的文件数和字节数、对话数和最近一次清理的结果"""
+        with self._lock:
+            files = dict(self._files)
+            threads = len(self._threads)
+            last_sweep = dict(self._last_sweep) if self._last_sweep else None
+        directories = {}
+        for name, directory in self._dirs.items():
+            sizes = [size for path, size in files.items() if path.parent == directory]
+            directories[name] = {"files": len(sizes), "bytes": sum(sizes)}
+        return {
+            "total_files": len(files),
+            "total_bytes": sum(files.values()),
+            "max_bytes": self.max_bytes,
+            "max_age_hours": round(self.max_age_seconds / 3600, 2),
+            "directories": directories,
+            "threads": threads,
+            "last_sweep": last_sweep,
+        }
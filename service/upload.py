@@ -0,0 +1,119 @@
+"""
+图片上传的流式保存
+
+上传文件按块读取并在线程池中写入存储目录：边写入边检查大小（超过限制立即中止），
+按第一块数据的文件头（magic bytes）识别图片格式，不信任文件扩展名。
+"""
+import asyncio
+from typing import List, Optional
+
+from fastapi import UploadFile
+
+from service.storage import FileStorage
+
+# 每次读取和写入的块大小
+CHUNK_SIZE = 256 * 1024
+
+# 图片文件头 -> 扩展名（WebP 为 RIFF 容器，需要额外检查第 8-12 字节）
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"BM", ".bmp"),
+)
+
+
+class UploadTooLargeError(ValueError):
+    """上传的文件超过大小限制"""
+
+
+class UnsupportedImageError(ValueError):
+    """上传的文件不是支持的图片格式"""
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """
+    按文件头识别图片格式
+
+    Args:
+        head: 文件开头的字节（至少 12 字节才能识别 WebP）
+
+    Returns:
+        图片扩展名（如 .jpg），不是支持的图片格式时为 None
+    """
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+async def save_image_upload(storage: FileStorage, upload: UploadFile, max_size: int,
+                            directory: str = "uploads") -> str:
+    """
+    流式保存一张上传图片，按内容哈希命名（相同图片只保存一份）
+
+    Args:
+        storage: 文件存储
+        upload: 上传文件
+        max_size: 允许的最大字节数
+        directory: 存储目录名称
+
+    Returns:
+        str: 保存的文件路径
+
+    Raises:
+        UploadTooLargeError: 文件超过大小限制
+        UnsupportedImageError: 文件为空或不是支持的图片格式
+    """
+    too_large = UploadTooLargeError(
+        f"文件 {upload.filename} 大小超过限制 ({max_size / 1024 / 1024}MB)"
+    )
+    # 表单解析时已知大小的文件直接拒绝，不再读取
+    if upload.size is not None and upload.size > max_size:
+        raise too_large
+
+    chunk = await upload.read(CHUNK_SIZE)
+    extension = sniff_image_type(chunk)
+    if extension is None:
+        raise UnsupportedImageError(f"文件 {upload.filename} 不是支持的图片格式")
+
+    writer = await asyncio.to_thread(storage.writer, directory)
+    try:
+        while chunk:
+            if writer.size + len(chunk) > max_size:
+                raise too_large
+            await asyncio.to_thread(writer.write, chunk)
+            chunk = await upload.read(CHUNK_SIZE)
+        # 计一次上传引用：相同内容的文件被其他对话清理时，登记到对话之前的这次上传不受影响
+        path = await asyncio.to_thread(writer.commit, extension, hold=True)
+    except BaseException:
+        # 在线程池中删除临时文件，不阻塞事件循环；请求被取消时也要等删除完成
+        abort = asyncio.ensure_future(asyncio.to_thread(writer.abort))
+        try:
+            await asyncio.shield(abort)
+        except asyncio.CancelledError:
+            await abort
+        raise
+    return str(path)
+
+
+async def save_image_uploads(storage: FileStorage, uploads: List[UploadFile], max_size: int,
+                             directory: str = "uploads") -> List[str]:
+    """
+    并发流式保存多张上传图片，任一图片失败时取消其余图片并抛出该异常
+
+    Returns:
+        List[str]: 与上传顺序一致的文件路径
+    """
+    tasks = [
+        asyncio.create_task(save_image_upload(storage, upload, max_size, directory))
+        for upload in uploads
+    ]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -24,7 +24,7 @@ from langchain.agents import create_agent
 from langgraph.checkpoint.memory import InMemorySaver
 
 from ..utils import ModelManager
-from ..config import DEFAULT_PROVIDER
+from ..config import DEFAULT_PROVIDER, TOOL_MAX_CONCURRENCY
 
 # 直接导入工具（避免通过子 Agent 调用）
 from .tools import pest_detection_tool, rice_detection_tool, cow_detection_tool
@@ -113,12 +113,14 @@ ORCHESTRATOR_SYSTEM_PROMPT = """<role>
 """
 
 # 创建 Orchestrator Agent
+# 同一轮模型回复中的多个工具调用并发执行（最多 TOOL_MAX_CONCURRENCY 个），
+# 工具结果仍按工具调用的顺序写回消息列表
 agent = create_agent(
     model=model,
     tools=orchestrator_tools,
     system_prompt=ORCHESTRATOR_SYSTEM_PROMPT,
     checkpointer=InMemorySaver(),
-)
+).with_config({"max_concurrency": TOOL_MAX_CONCURRENCY})
 
 logger.info("✓ 统一编排 Agent (Orchestrator) 创建成功")
 
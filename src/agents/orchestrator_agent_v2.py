@@ -23,6 +23,7 @@ from langchain.agents import create_agent
 from langgraph.checkpoint.memory import InMemorySaver
 
 from ..utils import ModelManager
+from ..config import TOOL_MAX_CONCURRENCY
 from .tools import pest_detection_tool, rice_detection_tool, cow_detection_tool, pricing_tool, farm_inspection_tool
 from src.rag.core.tools import PLANNING_TOOLS
 from .skills.detection_skills import create_all_detection_skills
@@ -162,13 +163,15 @@ middleware = [skill_middleware]
 
 # ========== 创建 Agent ==========
 
+# 同一轮模型回复中的多个工具调用并发执行（最多 TOOL_MAX_CONCURRENCY 个），
+# 工具结果仍按工具调用的顺序写回消息列表
 agent = create_agent(
     model=model,
     tools=orchestrator_tools,
     system_prompt=ORCHESTRATOR_V2_SYSTEM_PROMPT,
     checkpointer=InMemorySaver(),
     middleware=middleware,
-)
+).with_config({"max_concurrency": TOOL_MAX_CONCURRENCY})
 
 logger.info(
     f"✓ 统一编排 Agent V2 (Orchestrator V2) 创建成功 - "
@@ -4,20 +4,37 @@
 """
 import json
 import os
+import threading
 import cv2
-import uuid
-from datetime import datetime
 from pathlib import Path
 from typing import Any
 
 from ultralytics import YOLO
 from langchain_core.tools import tool
 
+from src.algorithms.detector_common.tracking import IoUTracker
+
+from .detection_utils import result_image_artifact, save_result_image
+
 
 MODEL_DIR = Path("src/algorithms/cow_detection/detector/models")
 MODEL_FILE = "yolov8n.pt"
 RESULTS_DIR = Path("cow_detection_results")
 
+# 视频采样间隔（秒）：每隔该时长检测一帧，与视频帧率无关
+VIDEO_SAMPLE_INTERVAL = float(os.getenv("COW_VIDEO_SAMPLE_INTERVAL", "0.4"))
+# 无法读取帧率时的采样帧间隔
+DEFAULT_FRAME_STEP = 10
+# 采样帧攒够多少张执行一次前向推理
+VIDEO_BATCH_SIZE = int(os.getenv("COW_VIDEO_BATCH_SIZE", "8"))
+# 是否跨帧跟踪奶牛，统计唯一个体数量和停留时长（逐帧数量的最大值/平均值会重复统计同一头牛）
+VIDEO_TRACKING = os.getenv("COW_VIDEO_TRACKING", "true").lower() in {"1", "true", "yes"}
+
+_model: YOLO | None = None
+_model_lock = threading.Lock()
+# YOLO 模型推理不是线程安全的，同一进程内的调用需要串行化
+_inference_lock = threading.Lock()
+
 
 def get_model_path() -> Path:
     """获取模型文件的绝对路径。
@@ -25,7 +42,7 @@ def get_model_path() -> Path:
     Returns:
         模型文件的 Path 对象
     """
-    project_root = Path(__file__).parent.parent.parent.parent.parent.absolute()
+    project_root = Path(__file__).absolute().parent.parent.parent.parent
     return project_root / MODEL_DIR / MODEL_FILE
 
 
@@ -43,6 +60,40 @@ def load_model() -> YOLO | None:
     return YOLO(str(model_path))
 
 
+def get_model() -> YOLO | None:
+    """获取进程级共享的 YOLO 模型（首次调用时加载，线程安全）。
+
+    Returns:
+        加载的 YOLO 模型，模型文件不存在时返回 None（不缓存，文件就绪后可再次加载）
+    """
+    global _model
+
+    if _model is not None:
+        return _model
+
+    with _model_lock:
+        if _model is None:
+            _model = load_model()
+    return _model
+
+
+def _predict(model: YOLO, images: list) -> list:
+    """串行执行一次（批量）推理。"""
+    with _inference_lock:
+        return model(images, verbose=False)
+
+
+def _cow_boxes(result, names: dict) -> tuple[list, list]:
+    """取出单帧推理结果中奶牛的检测框（xyxy）和置信度。"""
+    if result.boxes is None or len(result.boxes) == 0:
+        return [], []
+    class_ids = result.boxes.cls.int().tolist()
+    keep = [i for i, class_id in enumerate(class_ids) if names[class_id].lower() == "cow"]
+    boxes = result.boxes.xyxy.tolist()
+    confidences = result.boxes.conf.tolist()
+    return [boxes[i] for i in keep], [confidences[i] for i in keep]
+
+
 def detect_cows(image_path: str, model: YOLO) -> dict[str, Any]:
     """检测图片中的奶牛。
 
@@ -58,7 +109,7 @@ def detect_cows(image_path: str, model: YOLO) -> dict[str, Any]:
         return {"success": False, "error": "无法读取图片文件"}
 
     height, width = image.shape[:2]
-    results = model(image, verbose=False)
+    results = _predict(model, [image])
 
     cow_boxes = []
     for result in results:
@@ -78,13 +129,6 @@ def detect_cows(image_path: str, model: YOLO) -> dict[str, Any]:
                         "center": [(x1 + x2) / 2, (y1 + y2) / 2]
                     })
 
-    RESULTS_DIR.mkdir(exist_ok=True)
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_id = uuid.uuid4().hex[:8]
-    result_image_name = f"cow_result_{timestamp}_{unique_id}.jpg"
-    result_image_path = RESULTS_DIR / result_image_name
-
     result_image = image.copy()
     for cow in cow_boxes:
         x1, y1, x2, y2 = map(int, cow["bbox"])
@@ -111,7 +155,10 @@ def detect_cows(image_path: str, model: YOLO) -> dict[str, Any]:
             2
         )
 
-    cv2.imwrite(str(result_image_path), result_image)
+    ok, encoded = cv2.imencode(".jpg", result_image)
+    if not ok:
+        return {"success": False, "error": "结果图片编码失败"}
+    result_image_path = Path(save_result_image(encoded.tobytes(), str(RESULTS_DIR), "cow"))
 
     return {
         "success": True,
@@ -119,16 +166,28 @@ def detect_cows(image_path: str, model: YOLO) -> dict[str, Any]:
         "cow_boxes": cow_boxes,
         "image_size": {"width": width, "height": height},
         "result_image_path": str(result_image_path),
-        "result_image_name": result_image_name
+        "result_image_name": result_image_path.name
     }
 
 
-def process_video(video_path: str, model: YOLO) -> dict[str, Any]:
+def process_video(
+    video_path: str,
+    model: YOLO,
+    sample_interval: float = VIDEO_SAMPLE_INTERVAL,
+    batch_size: int = VIDEO_BATCH_SIZE,
+    track: bool = VIDEO_TRACKING,
+) -> dict[str, Any]:
     """处理视频文件中的奶牛检测。
 
+    按时间间隔采样：非采样帧只 grab() 跳过、不解码，采样帧攒批后一次前向推理。
+    跟踪模式下跨帧关联检测框，统计唯一奶牛数量和每头奶牛的停留时长。
+
     Args:
         video_path: 视频文件路径
         model: YOLO 模型实例
+        sample_interval: 采样间隔（秒）
+        batch_size: 单次前向推理的帧数
+        track: 是否启用多目标跟踪
 
     Returns:
         检测结果字典，包含奶牛统计信息
@@ -137,38 +196,47 @@ def process_video(video_path: str, model: YOLO) -> dict[str, Any]:
     if not cap.isOpened():
         return {"success": False, "error": "无法打开视频文件"}
 
-    fps = cap.get(cv2.CAP_PROP_FPS)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frame_step = max(1, round(fps * sample_interval)) if fps > 0 else DEFAULT_FRAME_STEP
+    batch_size = max(1, batch_size)
 
     frame_results = []
-    frame_count = 0
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        if frame_count % 10 == 0:
-            results = model(frame, verbose=False)
-            cow_count = 0
-            for result in results:
-                boxes = result.boxes
-                if boxes:
-                    for box in boxes:
-                        class_id = int(box.cls[0])
-                        class_name = model.names[class_id]
-                        if class_name.lower() == "cow":
-                            cow_count += 1
-
+    frames, frame_indices = [], []
+    tracker = IoUTracker() if track else None
+
+    def flush() -> None:
+        for frame_index, result in zip(frame_indices, _predict(model, frames)):
+            boxes, confidences = _cow_boxes(result, model.names)
+            if tracker is not None:
+                tracker.update(frame_index, boxes, confidences)
             frame_results.append({
-                "frame": frame_count,
-                "time": frame_count / fps,
-                "cow_count": cow_count
+                "frame": frame_index,
+                "time": frame_index / fps if fps > 0 else None,
+                "cow_count": len(boxes)
             })
+        frames.clear()
+        frame_indices.clear()
 
-        frame_count += 1
-
-    cap.release()
+    try:
+        frame_count = 0
+        while True:
+            if frame_count % frame_step == 0:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frames.append(frame)
+                frame_indices.append(frame_count)
+                if len(frames) >= batch_size:
+                    flush()
+            elif not cap.grab():
+                break
+            frame_count += 1
+
+        if frames:
+            flush()
+    finally:
+        cap.release()
 
     if frame_results:
         max_cows = max(r["cow_count"] for r in frame_results)
@@ -177,28 +245,36 @@ def process_video(video_path: str, model: YOLO) -> dict[str, Any]:
         max_cows = 0
         avg_cows = 0
 
+    detection_results = {
+        "max_cows": max_cows,
+        "avg_cows": avg_cows,
+        "frame_results": frame_results
+    }
+    if tracker is not None:
+        tracking = tracker.summary(fps, include_trajectories=False)
+        detection_results["unique_cows"] = tracking["unique_count"]
+        detection_results["tracks"] = tracking["tracks"]
+
     return {
         "success": True,
         "video_info": {
-            "duration": total_frames / fps,
+            "duration": total_frames / fps if fps > 0 else None,
             "fps": fps,
-            "total_frames": total_frames
+            "total_frames": total_frames,
+            "sample_interval": frame_step / fps if fps > 0 else None,
+            "frame_step": frame_step
         },
-        "detection_results": {
-            "max_cows": max_cows,
-            "avg_cows": avg_cows,
-            "frame_results": frame_results
-        }
+        "detection_results": detection_results
     }
 
 
-@tool
-def cow_detection_tool(file_path: str) -> str:
+@tool(response_format="content_and_artifact")
+def cow_detection_tool(file_path: str) -> tuple[str, dict[str, Any]]:
     """检测图像或视频中的奶牛。
 
     该工具使用本地 YOLO 模型检测奶牛，支持：
     1. 图像检测：检测奶牛数量、位置，并保存带标注的结果图像
-    2. 视频检测：统计视频中的奶牛数量变化
+    2. 视频检测：跨帧跟踪奶牛，统计唯一奶牛数量、停留时长和数量变化
 
     Args:
         file_path: 本地文件路径，支持格式：
@@ -213,27 +289,31 @@ def cow_detection_tool(file_path: str) -> str:
         - result_image_path: 结果图像保存路径（图像）
         - max_cows: 最大奶牛数量（视频）
         - avg_cows: 平均奶牛数量（视频）
+        - unique_cows: 跟踪得到的唯一奶牛数量（视频）
+        - tracks: 每头奶牛的出现时间、离开时间和停留时长（视频）
         - error: 错误信息（失败时）
 
+        图像的结果图片路径同时通过工具 artifact（result_image_path）返回给调用方。
+
     Examples:
         >>> cow_detection_tool("cows.jpg")
         '{"success": true, "cow_count": 3, ...}'
 
         >>> cow_detection_tool("farm.mp4")
-        '{"success": true, "max_cows": 5, ...}'
+        '{"success": true, "unique_cows": 7, "max_cows": 5, ...}'
     """
     if not file_path or not os.path.exists(file_path):
         return json.dumps(
             {"success": False, "error": f"文件路径不存在: {file_path}"},
             ensure_ascii=False
-        )
+        ), result_image_artifact(None, success=False)
 
-    model = load_model()
+    model = get_model()
     if model is None:
         return json.dumps(
             {"success": False, "error": f"模型文件不存在: {get_model_path()}"},
             ensure_ascii=False
-        )
+        ), result_image_artifact(None, success=False)
 
     file_ext = os.path.splitext(file_path)[1].lower()
 
@@ -246,15 +326,17 @@ def cow_detection_tool(file_path: str) -> str:
             return json.dumps(
                 {"success": False, "error": f"不支持的文件格式: {file_ext}"},
                 ensure_ascii=False
-            )
+            ), result_image_artifact(None, success=False)
 
-        return json.dumps(result, ensure_ascii=False)
+        return json.dumps(result, ensure_ascii=False), result_image_artifact(
+            result.get("result_image_path"), success=bool(result.get("success"))
+        )
 
     except Exception as e:
         return json.dumps(
             {"success": False, "error": f"检测处理失败: {str(e)}"},
             ensure_ascii=False
-        )
+        ), result_image_artifact(None, success=False)
 
 
 __all__ = ["cow_detection_tool"]
@@ -0,0 +1,302 @@
+"""检测服务 HTTP 客户端模块。
+
+为所有检测工具提供进程级共享的连接池客户端：
+- 同步客户端基于 requests.Session，复用 TCP 长连接
+- 异步客户端基于 httpx.AsyncClient，可在 astream_events 等异步流程中使用
+- 按主机限制连接数，并对连接失败和 502/503/504 响应进行带退避的重试
+- 服务关闭时调用 close_clients() 和 aclose_clients() 释放连接池
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import Any
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# 每个检测服务主机的最大连接数
+POOL_MAXSIZE = int(os.getenv("DETECTION_HTTP_POOL_MAXSIZE", "10"))
+# 连接池缓存的主机数量（害虫、大米、牛只服务）
+POOL_CONNECTIONS = int(os.getenv("DETECTION_HTTP_POOL_CONNECTIONS", "4"))
+# 最大重试次数及退避系数（第 n 次重试前等待 backoff * 2^(n-1) 秒）
+MAX_RETRIES = int(os.getenv("DETECTION_HTTP_MAX_RETRIES", "2"))
+BACKOFF_FACTOR = float(os.getenv("DETECTION_HTTP_BACKOFF", "0.3"))
+# 默认请求超时（秒）
+DEFAULT_TIMEOUT = float(os.getenv("DETECTION_HTTP_TIMEOUT", "60"))
+# 长连接空闲保持时间（秒），仅异步客户端使用
+KEEPALIVE_EXPIRY = float(os.getenv("DETECTION_HTTP_KEEPALIVE", "30"))
+
+RETRY_STATUS_CODES = frozenset({502, 503, 504})
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+_async_client: httpx.AsyncClient | None = None
+_async_client_loop: asyncio.AbstractEventLoop | None = None
+# 正在关闭的旧异步客户端（持有任务引用，避免关闭完成前被回收）
+_closing_tasks: set[asyncio.Task] = set()
+
+logger = logging.getLogger(__name__)
+
+
+def _build_retry() -> Retry:
+    """构建同步客户端的重试策略。
+
+    检测接口是无状态的，POST 请求可以安全重试；读超时不重试，
+    避免对已在执行的耗时推理重复提交。
+    """
+    return Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=0,
+        status=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def get_session() -> requests.Session:
+    """获取进程级共享的同步 HTTP 会话（线程安全）。
+
+    Returns:
+        配置好连接池和重试策略的 requests.Session
+    """
+    global _session
+
+    if _session is not None:
+        return _session
+
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS,
+                pool_maxsize=POOL_MAXSIZE,
+                max_retries=_build_retry(),
+                pool_block=True,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+
+    return _session
+
+
+def post_json(
+    url: str,
+    payload: dict[str, Any],
+    timeout: float | None = None,
+) -> requests.Response:
+    """通过共享会话发送 JSON POST 请求。
+
+    Args:
+        url: 检测服务接口地址
+        payload: 请求体
+        timeout: 请求超时（秒），默认使用 DEFAULT_TIMEOUT
+
+    Returns:
+        服务响应
+    """
+    return get_session().post(url, json=payload, timeout=timeout or DEFAULT_TIMEOUT)
+
+
+def post_bytes(
+    url: str,
+    data: bytes,
+    params: dict[str, Any] | None = None,
+    timeout: float | None = None,
+) -> requests.Response:
+    """通过共享会话以 application/octet-stream 发送原始字节。
+
+    Args:
+        url: 检测服务原始字节上传接口地址
+        data: 图片文件原始字节
+        params: 查询参数
+        timeout: 请求超时（秒），默认使用 DEFAULT_TIMEOUT
+
+    Returns:
+        服务响应
+    """
+    return get_session().post(
+        url,
+        data=data,
+        params=params,
+        headers={"Content-Type": "application/octet-stream"},
+        timeout=timeout or DEFAULT_TIMEOUT,
+    )
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """获取当前事件循环共享的异步 HTTP 客户端。
+
+    httpx 的连接池绑定在创建它的事件循环上，事件循环变化时会重新创建客户端，
+    并关闭被替换的旧客户端，释放其连接池。
+
+    Returns:
+        配置好连接上限和长连接保持的 httpx.AsyncClient
+    """
+    global _async_client, _async_client_loop
+
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.is_closed or _async_client_loop is not loop:
+        if _async_client is not None and not _async_client.is_closed:
+            _close_replaced_client(_async_client, _async_client_loop)
+        _async_client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=POOL_MAXSIZE * POOL_CONNECTIONS,
+                max_keepalive_connections=POOL_MAXSIZE,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+        _async_client_loop = loop
+
+    return _async_client
+
+
+def _close_replaced_client(client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop | None) -> None:
+    """关闭被替换的异步客户端，不等待关闭完成。
+
+    旧事件循环仍在运行（如其他线程中的事件循环）时在该循环上关闭；
+    已结束时在当前事件循环上尽力关闭，连接所属的事件循环已关闭导致的错误忽略。
+    """
+    if loop is not None and loop.is_running() and not loop.is_closed():
+        asyncio.run_coroutine_threadsafe(_aclose_quietly(client), loop)
+        return
+    task = asyncio.get_running_loop().create_task(_aclose_quietly(client))
+    _closing_tasks.add(task)
+    task.add_done_callback(_closing_tasks.discard)
+
+
+async def _aclose_quietly(client: httpx.AsyncClient) -> None:
+    """关闭异步客户端，失败时只记录日志。"""
+    try:
+        await client.aclose()
+    except Exception as e:
+        logger.debug(f"关闭旧的检测服务异步客户端失败: {e}")
+
+
+async def apost_json(
+    url: str,
+    payload: dict[str, Any],
+    timeout: float | None = None,
+) -> httpx.Response:
+    """通过共享异步客户端发送 JSON POST 请求，失败时按退避策略重试。
+
+    Args:
+        url: 检测服务接口地址
+        payload: 请求体
+        timeout: 请求超时（秒），默认使用 DEFAULT_TIMEOUT
+
+    Returns:
+        服务响应
+
+    Raises:
+        httpx.TransportError: 重试次数用尽后仍无法完成请求
+    """
+    return await _apost_with_retry(url, timeout, json=payload)
+
+
+async def apost_bytes(
+    url: str,
+    data: bytes,
+    params: dict[str, Any] | None = None,
+    timeout: float | None = None,
+) -> httpx.Response:
+    """通过共享异步客户端以 application/octet-stream 发送原始字节，失败时按退避策略重试。
+
+    Args:
+        url: 检测服务原始字节上传接口地址
+        data: 图片文件原始字节
+        params: 查询参数
+        timeout: 请求超时（秒），默认使用 DEFAULT_TIMEOUT
+
+    Returns:
+        服务响应
+
+    Raises:
+        httpx.TransportError: 重试次数用尽后仍无法完成请求
+    """
+    return await _apost_with_retry(
+        url,
+        timeout,
+        content=data,
+        params=params,
+        headers={"Content-Type": "application/octet-stream"},
+    )
+
+
+async def _apost_with_retry(url: str, timeout: float | None, **kwargs: Any) -> httpx.Response:
+    """发送异步 POST 请求，连接失败和 502/503/504 响应按退避策略重试（读超时不重试）。"""
+    client = get_async_client()
+    attempt = 0
+
+    while True:
+        response = None
+        try:
+            response = await client.post(url, timeout=timeout or DEFAULT_TIMEOUT, **kwargs)
+        except httpx.ReadTimeout:
+            raise
+        except httpx.TransportError:
+            if attempt >= MAX_RETRIES:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= MAX_RETRIES:
+                return response
+
+        await asyncio.sleep(_retry_delay(attempt, response))
+        attempt += 1
+
+
+def _retry_delay(attempt: int, response: httpx.Response | None) -> float:
+    """计算下一次重试前的等待时间，优先使用服务端返回的 Retry-After。"""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+    return BACKOFF_FACTOR * (2 ** attempt)
+
+
+def close_clients() -> None:
+    """关闭共享的同步会话（异步客户端由 aclose_clients() 关闭）。"""
+    global _session
+
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+async def aclose_clients() -> None:
+    """关闭共享的异步客户端，在服务关闭时于服务的事件循环上调用。"""
+    global _async_client, _async_client_loop
+
+    client, loop = _async_client, _async_client_loop
+    _async_client = None
+    _async_client_loop = None
+    if client is not None and not client.is_closed:
+        if loop is asyncio.get_running_loop():
+            await client.aclose()
+        else:
+            _close_replaced_client(client, loop)
+    if _closing_tasks:
+        await asyncio.gather(*_closing_tasks, return_exceptions=True)
+
+
+__all__ = [
+    "get_session",
+    "post_json",
+    "post_bytes",
+    "get_async_client",
+    "apost_json",
+    "apost_bytes",
+    "close_clients",
+    "aclose_clients",
+]
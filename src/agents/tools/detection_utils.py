@@ -1,13 +1,25 @@
 """检测工具共享模块。
 
-提供图像检测工具的通用辅助函数，包括结果保存、编码和格式化。
+提供图像检测工具的通用辅助函数，包括检测服务调用、结果保存、编码和格式化。
 """
+import asyncio
 import base64
+import hashlib
 import json
-from datetime import datetime
+import os
+import tempfile
 from pathlib import Path
-from typing import Any
-import uuid
+from typing import Any, Callable, Mapping
+
+from .detection_client import apost_bytes, post_bytes
+
+
+# 检测服务以二进制返回结果图片时，检测结果所在的响应头
+DETECTIONS_HEADER = "X-Detections"
+# 检测工具 artifact 中结果图片路径的键名
+RESULT_IMAGE_ARTIFACT_KEY = "result_image_path"
+# 检测工具 artifact 中检测是否成功的键名（工具出错时返回错误文字而不抛出异常）
+SUCCESS_ARTIFACT_KEY = "success"
 
 
 def save_result_image(
@@ -15,7 +27,7 @@ def save_result_image(
     directory_name: str,
     file_prefix: str,
 ) -> str:
-    """保存检测结果图片到指定目录。
+    """按内容哈希保存检测结果图片到指定目录，相同内容只写入一次。
 
     Args:
         image_content: 图片二进制内容
@@ -28,15 +40,44 @@ def save_result_image(
     results_dir = Path(directory_name)
     results_dir.mkdir(exist_ok=True)
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_id = uuid.uuid4().hex[:8]
-    filename = f"{file_prefix}_result_{timestamp}_{unique_id}.jpg"
-    file_path = results_dir / filename
+    digest = hashlib.sha256(image_content).hexdigest()[:32]
+    file_path = results_dir / f"{file_prefix}_result_{digest}.jpg"
+
+    if file_path.exists():
+        # 重复内容：刷新修改时间，保留期限从最近一次使用开始计算
+        file_path.touch()
+    else:
+        # 先写临时文件再原子替换，避免并发调用读到半写入的文件
+        fd, temp_path = tempfile.mkstemp(dir=results_dir, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(image_content)
+            os.replace(temp_path, file_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
 
-    file_path.write_bytes(image_content)
     return str(file_path.absolute())
 
 
+def result_image_artifact(result_image_path: str | None, success: bool = True) -> dict[str, Any]:
+    """构造检测工具返回的 artifact。
+
+    检测工具使用 response_format="content_and_artifact"：文字摘要发送给模型，
+    artifact 只随 ToolMessage 返回给调用方（如 SSE 接口从 on_tool_end 事件中读取结果图片），
+    不占用模型上下文，并发请求之间也不会取到彼此的结果图片。
+
+    Args:
+        result_image_path: 本次调用保存的结果图片路径，没有结果图片时为 None
+        success: 检测是否成功（调用方据此判断文字摘要是检测结果还是错误信息）
+
+    Returns:
+        artifact 字典
+    """
+    return {RESULT_IMAGE_ARTIFACT_KEY: result_image_path, SUCCESS_ARTIFACT_KEY: success}
+
+
 def encode_image_to_base64(image_path: str) -> str:
     """将图片文件编码为 base64 字符串。
 
@@ -50,6 +91,69 @@ def encode_image_to_base64(image_path: str) -> str:
     return base64.b64encode(image_bytes).decode("utf-8")
 
 
+def request_detection(
+    url: str,
+    image_path: str,
+    params: dict[str, Any] | None = None,
+) -> tuple[dict[str, Any], bytes | None]:
+    """以原始字节方式调用检测服务的上传接口。
+
+    直接发送图片文件字节并请求二进制结果图片，避免 base64 编解码和 JSON 内嵌大字段。
+
+    Args:
+        url: 检测服务原始字节上传接口地址（如 /detect/upload）
+        image_path: 图片文件路径
+        params: 额外的查询参数
+
+    Returns:
+        (检测接口结果字典, 结果图片字节)，服务未返回结果图片时后者为 None
+
+    Raises:
+        requests.HTTPError: 检测服务返回非 2xx 状态码
+    """
+    image_bytes = Path(image_path).read_bytes()
+    query = {"result_format": "binary", **(params or {})}
+
+    response = post_bytes(url, image_bytes, params=query)
+    response.raise_for_status()
+    return _parse_detection_response(response.headers, response.content, response.json)
+
+
+async def arequest_detection(
+    url: str,
+    image_path: str,
+    params: dict[str, Any] | None = None,
+) -> tuple[dict[str, Any], bytes | None]:
+    """request_detection 的异步版本，通过共享异步客户端调用检测服务。
+
+    Agent 并发执行多个检测工具调用时，等待检测服务期间不占用线程。
+
+    Raises:
+        httpx.HTTPStatusError: 检测服务返回非 2xx 状态码
+    """
+    image_bytes = await asyncio.to_thread(Path(image_path).read_bytes)
+    query = {"result_format": "binary", **(params or {})}
+
+    response = await apost_bytes(url, image_bytes, params=query)
+    response.raise_for_status()
+    return _parse_detection_response(response.headers, response.content, response.json)
+
+
+def _parse_detection_response(
+    headers: Mapping[str, str],
+    content: bytes,
+    parse_json: Callable[[], dict[str, Any]],
+) -> tuple[dict[str, Any], bytes | None]:
+    """解析检测服务响应：二进制结果图片（检测结果在响应头中）或 JSON（base64 结果图片）。"""
+    if headers.get("Content-Type", "").startswith("image/"):
+        detections = json.loads(headers.get(DETECTIONS_HEADER, "[]"))
+        return {"success": True, "detections": detections}, content
+
+    api_response = parse_json()
+    result_image = api_response.get("result_image")
+    return api_response, base64.b64decode(result_image) if result_image else None
+
+
 def format_detection_result(
     success: bool,
     data: dict[str, Any] | None = None,
@@ -2,16 +2,18 @@
 
 调用检测服务分析图片中的害虫种类和数量。
 """
+import asyncio
 from pathlib import Path
 from typing import Any
 
+import httpx
 import requests
 from langchain_core.tools import tool
 
-from .detection_utils import encode_image_to_base64, save_result_image
+from .detection_utils import arequest_detection, request_detection, result_image_artifact, save_result_image
 
 
-DETECTION_API_URL = "http://127.0.0.1:8001/detect"
+DETECTION_API_URL = "http://127.0.0.1:8001/detect/upload"
 SUPPORTED_FORMATS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
 
 
@@ -40,34 +42,6 @@ def validate_image_path(image_path: str) -> None:
         )
 
 
-def encode_image_to_base64_with_validation(image_path: str) -> str:
-    """编码图片为 base64 并进行验证。
-
-    Args:
-        image_path: 图片文件路径
-
-    Returns:
-        base64 编码的图片字符串
-    """
-    validate_image_path(image_path)
-    return encode_image_to_base64(image_path)
-
-
-def save_result_image_base64(image_base64: str) -> str:
-    """保存检测结果图像到本地。
-
-    Args:
-        image_base64: base64 编码的结果图像
-
-    Returns:
-        保存的图像文件绝对路径
-    """
-    import base64
-
-    image_data = base64.b64decode(image_base64)
-    return save_result_image(image_data, "pest_detection_results", "pest_detection")
-
-
 def format_detection_result(api_response: dict[str, Any]) -> str:
     """将检测接口返回的结果格式化为简洁的数据摘要。
 
@@ -95,8 +69,37 @@ def format_detection_result(api_response: dict[str, Any]) -> str:
     return "检测结果: " + "、".join(result_parts)
 
 
-@tool
-def pest_detection_tool(image_path: str) -> str:
+def build_tool_output(api_response: dict[str, Any], result_image: bytes | None) -> tuple[str, dict[str, Any]]:
+    """保存结果图片并构造工具输出（文字摘要, artifact）。"""
+    result_image_path = None
+    if api_response.get("success") and result_image:
+        try:
+            result_image_path = save_result_image(result_image, "pest_detection_results", "pest_detection")
+        except Exception:
+            pass
+
+    return format_detection_result(api_response), result_image_artifact(
+        result_image_path, success=bool(api_response.get("success"))
+    )
+
+
+def format_error(error: Exception) -> str:
+    """将检测过程中的异常转换为错误提示（同步 requests 和异步 httpx 调用共用）。"""
+    if isinstance(error, FileNotFoundError):
+        return f"文件错误: {str(error)}"
+    if isinstance(error, ValueError):
+        return f"参数错误: {str(error)}"
+    if isinstance(error, (requests.HTTPError, httpx.HTTPStatusError)):
+        return f"检测服务请求失败 (HTTP {error.response.status_code})"
+    if isinstance(error, (requests.Timeout, httpx.TimeoutException)):
+        return "检测服务请求超时，请检查服务是否正常运行"
+    if isinstance(error, (requests.ConnectionError, httpx.TransportError)):
+        return "无法连接到检测服务，请确认服务已启动"
+    return f"检测过程发生未知错误: {type(error).__name__}: {str(error)}"
+
+
+@tool(response_format="content_and_artifact")
+def pest_detection_tool(image_path: str) -> tuple[str, dict[str, Any]]:
     """调用害虫检测服务分析图片中的害虫种类和数量。
 
     该工具会：
@@ -105,8 +108,8 @@ def pest_detection_tool(image_path: str) -> str:
     3. 自动保存带标注框的检测结果图像到本地（pest_detection_results 目录）
     4. 返回害虫检测的文字摘要结果
 
-    注意：检测结果图像会自动保存，但不会在返回结果中包含图像路径，
-    以避免占用过多 token。
+    注意：检测结果图像会自动保存，图像路径通过工具 artifact（result_image_path）
+    返回给调用方，不包含在发送给模型的文字摘要中，以避免占用过多 token。
 
     Args:
         image_path: 图片文件的本地路径，支持格式：jpg、jpeg、png、bmp、webp
@@ -122,42 +125,25 @@ def pest_detection_tool(image_path: str) -> str:
         "检测结果: 瓜实蝇(3只)、斜纹夜蛾(1只)"
     """
     try:
-        image_base64 = encode_image_to_base64_with_validation(image_path)
-
-        payload = {"image_base64": image_base64}
-
-        response = requests.post(
-            DETECTION_API_URL,
-            json=payload,
-            timeout=60
-        )
-
-        if response.status_code != 200:
-            return f"检测服务请求失败 (HTTP {response.status_code})"
-
-        api_response = response.json()
-
-        if api_response.get("success") and api_response.get("result_image"):
-            try:
-                save_result_image_base64(api_response["result_image"])
-            except Exception:
-                pass
+        validate_image_path(image_path)
+        api_response, result_image = request_detection(DETECTION_API_URL, image_path)
+        return build_tool_output(api_response, result_image)
+    except Exception as e:
+        return format_error(e), result_image_artifact(None, success=False)
 
-        return format_detection_result(api_response)
 
-    except FileNotFoundError as e:
-        return f"文件错误: {str(e)}"
-    except ValueError as e:
-        return f"参数错误: {str(e)}"
-    except requests.Timeout:
-        return "检测服务请求超时，请检查服务是否正常运行"
-    except requests.ConnectionError:
-        return "无法连接到检测服务，请确认服务已启动"
-    except requests.exceptions.JSONDecodeError as e:
-        return f"检测服务返回数据格式错误: {str(e)}"
+async def _apest_detection_tool(image_path: str) -> tuple[str, dict[str, Any]]:
+    """pest_detection_tool 的异步实现（Agent 并发执行工具调用时使用共享异步客户端）。"""
+    try:
+        validate_image_path(image_path)
+        api_response, result_image = await arequest_detection(DETECTION_API_URL, image_path)
+        return await asyncio.to_thread(build_tool_output, api_response, result_image)
     except Exception as e:
-        return f"检测过程发生未知错误: {type(e).__name__}: {str(e)}"
+        return format_error(e), result_image_artifact(None, success=False)
+
 
+# 异步调用（ainvoke / astream_events）使用异步实现，不再占用线程池线程
+pest_detection_tool.coroutine = _apest_detection_tool
 
 __all__ = ["pest_detection_tool"]
 pest_detection_tool.tags = ["detection", "pest"]
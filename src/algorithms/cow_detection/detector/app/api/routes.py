@@ -1,27 +1,122 @@
-from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import JSONResponse
-from typing import List, Dict, Any, Union
+from fastapi import APIRouter, Header, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import List, Dict, Any, Literal, Optional, Tuple, Union
 
 # 兼容 Docker 和本地环境的导入
 try:
     # Docker 环境：使用相对导入
-    from app.schemas.detection import DetectRequest, DetectResponse, Detection, ErrorResponse, DetailedDetectResponse
-    from app.services.model_service import model_service
+    from app.schemas.detection import DetectRequest, DetectResponse, Detection, ErrorResponse, DetailedDetectResponse, BatchDetectRequest, BatchDetectResponse, BatchDetectItem, ModelLoadRequest, ModelTrafficRequest
+    from app.services.model_service import model_service, inference_batcher, worker_pool, result_cache, video_pool
     from app.core.config import settings
+    from detector_common.result_image import deliver_result_jpeg, encode_result_image, jpeg_to_base64, RESULT_FORMAT_BINARY, RESULT_FORMAT_URL, RETURN_IMAGE_FULL, RETURN_IMAGE_NONE, DETECTIONS_HEADER
+    from detector_common.image_decode import read_image_size
+    from detector_common.model_registry import check_model_admin, ModelVersionNotFoundError, MODEL_VERSION_HEADER, resolve_weights_path
+    from detector_common.upload import read_image_upload, save_upload_to_file, ImageTooLargeError, UploadTooLargeError
+    from detector_common.worker_pool import ServiceBusyError, busy_response
 except ImportError:
     # 本地环境：使用绝对导入
-    from src.algorithms.cow_detection.detector.app.schemas.detection import DetectRequest, DetectResponse, Detection, ErrorResponse, DetailedDetectResponse
-    from src.algorithms.cow_detection.detector.app.services.model_service import model_service
+    from src.algorithms.cow_detection.detector.app.schemas.detection import DetectRequest, DetectResponse, Detection, ErrorResponse, DetailedDetectResponse, BatchDetectRequest, BatchDetectResponse, BatchDetectItem, ModelLoadRequest, ModelTrafficRequest
+    from src.algorithms.cow_detection.detector.app.services.model_service import model_service, inference_batcher, worker_pool, result_cache, video_pool
     from src.algorithms.cow_detection.detector.app.core.config import settings
+    from src.algorithms.detector_common.result_image import deliver_result_jpeg, encode_result_image, jpeg_to_base64, RESULT_FORMAT_BINARY, RESULT_FORMAT_URL, RETURN_IMAGE_FULL, RETURN_IMAGE_NONE, DETECTIONS_HEADER
+    from src.algorithms.detector_common.image_decode import read_image_size
+    from src.algorithms.detector_common.model_registry import check_model_admin, ModelVersionNotFoundError, MODEL_VERSION_HEADER, resolve_weights_path
+    from src.algorithms.detector_common.upload import read_image_upload, save_upload_to_file, ImageTooLargeError, UploadTooLargeError
+    from src.algorithms.detector_common.worker_pool import ServiceBusyError, busy_response
 
+import base64
+import json
 import logging
 import traceback
+from contextlib import AsyncExitStack
 from datetime import datetime
 import os
 
 router = APIRouter()
 
 
+def _build_detect_response(detections: List[Dict], jpeg_bytes: Optional[bytes], result_format: str,
+                           model_version: Optional[str] = None) -> Union[DetectResponse, Response]:
+    """
+    按返回格式构造检测响应（jpeg_bytes 为JPEG编码后的标注图片）
+    
+    - base64: JSON响应，result_image 为base64编码的标注图片
+    - binary: 直接返回JPEG图片，检测结果放在 X-Detections 响应头中
+    - url: JSON响应，result_image_url 为结果图片的访问路径
+    
+    没有标注图片（return_image=none）时任何格式都只返回JSON检测结果；所用模型版本放在 model_version
+    字段（binary 格式为 X-Model-Version 响应头）中
+    """
+    jpeg_bytes, image_ref = deliver_result_jpeg(
+        jpeg_bytes, result_format, settings.RESULTS_DIR, settings.RESULTS_URL_PREFIX
+    )
+    
+    if jpeg_bytes is None:
+        return DetectResponse(success=True, detections=detections, model_version=model_version)
+    if result_format == RESULT_FORMAT_BINARY:
+        return Response(
+            content=jpeg_bytes,
+            media_type="image/jpeg",
+            headers={DETECTIONS_HEADER: json.dumps(detections), MODEL_VERSION_HEADER: model_version or ""}
+        )
+    if result_format == RESULT_FORMAT_URL:
+        return DetectResponse(success=True, detections=detections, result_image_url=image_ref, model_version=model_version)
+    return DetectResponse(success=True, detections=detections, result_image=image_ref, model_version=model_version)
+
+
+def _model_not_found_response(error: ModelVersionNotFoundError) -> JSONResponse:
+    """请求的模型版本不存在时返回 404"""
+    logging.warning(str(error))
+    return JSONResponse(
+        status_code=status.HTTP_404_NOT_FOUND,
+        content={
+            "success": False,
+            "message": str(error)
+        }
+    )
+
+
+async def _detect_image_data(
+    image_data: bytes, confidence_threshold: Optional[float], return_image: str = RETURN_IMAGE_FULL,
+    model_version: Optional[str] = None
+) -> Tuple[List[Dict], Optional[bytes], List[Dict], Dict, str]:
+    """
+    单图检测（带结果缓存），返回 (检测统计, JPEG编码后的标注图片, 详细检测结果, 图像信息, 模型版本名称)
+    
+    模型版本按流量分配选择（或由 model_version 指定），相同图片字节、模型版本、置信度阈值和渲染方式的
+    重复请求直接返回缓存结果，不再解码、推理和编码；/detect、/detect/upload 和 /detect-detailed
+    共用缓存条目。需在 worker_pool.slot() 内调用。
+    
+    return_image=none 时不绘制、不编码标注图片（返回 None）。
+    """
+    entry = await worker_pool.run(model_service.select_model, model_version)
+    key = await worker_pool.run(
+        result_cache.make_key, image_data, entry.version, confidence_threshold, return_image
+    )
+    cached = result_cache.get(key)
+    if cached is not None:
+        return (*cached, entry.name)
+    
+    image = await worker_pool.run(model_service.decode_image, image_data)
+    detections, result_image, detailed_detections, image_info = await inference_batcher.submit(
+        image, confidence_threshold=confidence_threshold, annotate=return_image != RETURN_IMAGE_NONE,
+        version=entry.name
+    )
+    # 图像按模型输入尺寸缩小解码，详细检测结果换算回原图坐标
+    detailed_detections, image_info = model_service.restore_original_scale(
+        detailed_detections, image_info, read_image_size(image_data)
+    )
+    jpeg_bytes = await worker_pool.run(
+        encode_result_image, result_image, return_image,
+        settings.THUMBNAIL_MAX_SIDE, settings.THUMBNAIL_JPEG_QUALITY
+    )
+    
+    result = (detections or [], jpeg_bytes, detailed_detections or [], image_info)
+    # 不含标注图片的条目按 1KB 估算大小
+    result_cache.put(key, result, len(jpeg_bytes) if jpeg_bytes is not None else 1024)
+    return (*result, entry.name)
+
+
 @router.post(
     "/detect",
     response_model=DetectResponse,
@@ -138,7 +233,7 @@ async def detect_cows(request: DetectRequest) -> Union[DetectResponse, JSONRespo
     ## 返回结果
     成功时返回包含以下信息：
     - **detections**: 检测到的牛只列表，包括类型、数量
-    - **result_image**: 标注了检测框的图像（base64格式）
+    - **result_image**: 标注了检测框的图像（base64格式；`return_image=thumbnail` 时为缩略图，`return_image=none` 时不返回）
     - **message**: 检测结果描述
     
     ## 使用示例
@@ -210,16 +305,25 @@ async def detect_cows(request: DetectRequest) -> Union[DetectResponse, JSONRespo
         logging.info(f"开始牛只检测，图像大小: {len(request.image_base64)} 字符")
         
         # 调用模型服务进行检测
-        detections, result_image_b64, _, _ = model_service.process_image_from_base64(request.image_base64)
+        async with worker_pool.slot():
+            image_data = await worker_pool.run(base64.b64decode, request.image_base64)
+            detections, jpeg_bytes, _, _, version_name = await _detect_image_data(
+                image_data, settings.DEFAULT_CONFIDENCE_THRESHOLD, request.return_image, request.model_version
+            )
+            
+            # 构造成功响应
+            logging.info(f"检测成功，发现 {len(detections)} 种牛只")
+            
+            return await worker_pool.run(
+                _build_detect_response, detections, jpeg_bytes, request.result_format, version_name
+            )
         
-        # 构造成功响应
-        logging.info(f"检测成功，发现 {len(detections)} 种牛只")
+    except ServiceBusyError as e:
+        logging.warning(f"服务繁忙，拒绝请求: {worker_pool.stats()}")
+        return busy_response(e)
         
-        return DetectResponse(
-            success=True,
-            detections=detections or [],
-            result_image=result_image_b64
-        )
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e)
         
     except ValueError as ve:
         # 参数验证错误
@@ -291,6 +395,354 @@ async def detect_cows(request: DetectRequest) -> Union[DetectResponse, JSONRespo
         )
 
 
+@router.post(
+    "/detect/upload",
+    response_model=DetectResponse,
+    status_code=status.HTTP_200_OK,
+    summary="🐄 牛只检测（原始字节上传）",
+    description="以 multipart/form-data（字段 file）或 application/octet-stream 直接上传图片进行牛只检测",
+    responses={
+        200: {
+            "description": "检测成功；result_format=binary 时返回 image/jpeg，检测结果位于 X-Detections 响应头",
+            "content": {"image/jpeg": {}}
+        },
+        400: {"description": "图片数据无效"},
+        413: {"description": "图片过大"}
+    },
+    tags=["牛只检测"]
+)
+async def detect_cows_upload(
+    request: Request,
+    result_format: Literal["base64", "binary", "url"] = Query(
+        "base64", description="结果图片返回方式：base64、binary 或 url"
+    ),
+    confidence_threshold: float = Query(
+        settings.DEFAULT_CONFIDENCE_THRESHOLD, ge=0.0, le=1.0, description="置信度阈值"
+    ),
+    return_image: Literal["full", "thumbnail", "none"] = Query(
+        "full", description="结果图片渲染方式：full、thumbnail（缩略图）或 none（只返回检测结果）"
+    ),
+    model_version: Optional[str] = Query(
+        None, description="指定模型版本名称，不提供时按流量分配选择"
+    )
+) -> Union[DetectResponse, Response, JSONResponse]:
+    """
+    # 🐄 牛只检测（原始字节上传）
+    
+    与 `/detect` 功能相同，但直接接收图片文件字节，避免base64膨胀（约33%）和JSON编解码开销。
+    
+    ## 请求格式
+    - `multipart/form-data`：图片放在 `file` 字段
+    - `application/octet-stream`：请求体即图片文件内容
+    
+    ## 结果图片渲染
+    只需要检测结果时传 `return_image=none`，跳过标注图片的绘制和JPEG编码；
+    `return_image=thumbnail` 返回缩小尺寸、较低质量的标注图片（`THUMBNAIL_MAX_SIDE`、`THUMBNAIL_JPEG_QUALITY`）。
+    
+    ### curl请求示例
+    ```bash
+    curl -X POST "http://localhost:8002/detect/upload?result_format=binary" \\
+         -H "Content-Type: application/octet-stream" \\
+         --data-binary @cow.jpg -D - -o result.jpg
+    ```
+    """
+    try:
+        image_data = await read_image_upload(request, settings.MAX_IMAGE_SIZE)
+        logging.info(f"开始牛只检测（原始字节上传），图像大小: {len(image_data)} 字节")
+        
+        async with worker_pool.slot():
+            detections, jpeg_bytes, _, _, version_name = await _detect_image_data(
+                image_data, confidence_threshold, return_image, model_version
+            )
+            
+            logging.info(f"检测成功，发现 {len(detections)} 种牛只")
+            
+            return await worker_pool.run(_build_detect_response, detections, jpeg_bytes, result_format, version_name)
+        
+    except ServiceBusyError as e:
+        logging.warning(f"服务繁忙，拒绝请求: {worker_pool.stats()}")
+        return busy_response(e)
+        
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e)
+        
+    except ImageTooLargeError as e:
+        logging.warning(f"图片过大: {str(e)}")
+        return JSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={
+                "success": False,
+                "message": str(e)
+            }
+        )
+        
+    except ValueError as ve:
+        logging.warning(f"参数验证错误: {str(ve)}")
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "success": False,
+                "message": f"输入参数错误: {str(ve)}"
+            }
+        )
+        
+    except Exception as e:
+        logging.error(f"未预期错误: {str(e)}\n{traceback.format_exc()}")
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "success": False,
+                "message": "服务器内部错误，请稍后重试"
+            }
+        )
+
+
+def _detect_batch(images_base64: List[str], result_format: str, confidence_threshold: float,
+                  return_image: str = RETURN_IMAGE_FULL, model_version: Optional[str] = None) -> BatchDetectResponse:
+    """
+    批量检测：逐张解码后一次前向推理并编码结果（阻塞操作，在工作线程池中执行），所有图像使用同一模型版本
+    """
+    entry = model_service.select_model(model_version)
+    # 逐张解码，解码失败的图像单独记录错误
+    results: List[BatchDetectItem] = [None] * len(images_base64)
+    images = []
+    positions = []
+    for index, image_base64 in enumerate(images_base64):
+        try:
+            images.append(model_service.decode_image(base64.b64decode(image_base64, validate=True)))
+            positions.append(index)
+        except (ValueError, TypeError) as e:
+            results[index] = BatchDetectItem(success=False, message=f"图像解码失败: {str(e)}")
+
+    # 所有可解码的图像在一次前向推理中完成检测
+    batch_results = model_service.predict_batch(
+        images, confidence_threshold, return_image != RETURN_IMAGE_NONE, entry.name
+    )
+    for index, (detections, result_image, _, _) in zip(positions, batch_results):
+        jpeg_bytes = encode_result_image(
+            result_image, return_image, settings.THUMBNAIL_MAX_SIDE, settings.THUMBNAIL_JPEG_QUALITY
+        )
+        _, image_ref = deliver_result_jpeg(
+            jpeg_bytes, result_format, settings.RESULTS_DIR, settings.RESULTS_URL_PREFIX
+        )
+        if result_format == RESULT_FORMAT_URL:
+            results[index] = BatchDetectItem(success=True, detections=detections, result_image_url=image_ref)
+        else:
+            results[index] = BatchDetectItem(success=True, detections=detections, result_image=image_ref)
+
+    logging.info(f"批量检测完成，成功 {len(positions)}/{len(results)} 张")
+
+    return BatchDetectResponse(success=True, results=results, model_version=entry.name)
+
+
+@router.post(
+    "/detect/batch",
+    response_model=BatchDetectResponse,
+    status_code=status.HTTP_200_OK,
+    summary="🐄 批量牛只检测",
+    description="一次提交多张图像，在一次前向推理中完成检测，按输入顺序返回逐图结果",
+    responses={
+        400: {"model": ErrorResponse, "description": "图片数量超过限制"}
+    },
+    tags=["牛只检测"]
+)
+async def detect_cows_batch(request: BatchDetectRequest) -> Union[BatchDetectResponse, JSONResponse]:
+    """
+    # 🐄 批量牛只检测
+    
+    N张图像会被letterbox到统一尺寸后组成一个batch张量，只执行一次前向推理，
+    适合同一牛棚多个摄像头的快照。
+    
+    - `results` 与 `images_base64` 顺序一一对应
+    - 单张图像解码失败不会影响其他图像，对应条目 `success=false` 并给出 `message`
+    """
+    if len(request.images_base64) > settings.MAX_BATCH_SIZE:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "success": False,
+                "message": f"单次最多检测 {settings.MAX_BATCH_SIZE} 张图片"
+            }
+        )
+    
+    try:
+        logging.info(f"开始批量牛只检测，图片数量: {len(request.images_base64)}")
+        
+        confidence_threshold = request.confidence_threshold
+        if confidence_threshold is None:
+            confidence_threshold = settings.DEFAULT_CONFIDENCE_THRESHOLD
+        
+        async with worker_pool.slot():
+            return await worker_pool.run(
+                _detect_batch, request.images_base64, request.result_format, confidence_threshold, request.return_image,
+                request.model_version
+            )
+        
+    except ServiceBusyError as e:
+        logging.warning(f"服务繁忙，拒绝请求: {worker_pool.stats()}")
+        return busy_response(e)
+        
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e)
+        
+    except Exception as e:
+        logging.error(f"未预期错误: {str(e)}\n{traceback.format_exc()}")
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "success": False,
+                "message": "服务器内部错误，请稍后重试"
+            }
+        )
+
+
+def _resolve_video_path(video_path: str) -> str:
+    """校验按路径提交的视频：必须是允许目录下的已有文件"""
+    real_path = os.path.realpath(video_path)
+    for allowed_dir in settings.VIDEO_ALLOWED_DIRS:
+        allowed_root = os.path.realpath(allowed_dir)
+        if os.path.commonpath([real_path, allowed_root]) == allowed_root:
+            if not os.path.isfile(real_path):
+                raise ValueError(f"视频文件不存在: {video_path}")
+            return real_path
+    raise ValueError("视频路径不在允许访问的目录中")
+
+
+def _format_video_event(event: Dict[str, Any], stream_format: str) -> bytes:
+    """把视频检测事件编码为 NDJSON 行或 SSE 消息"""
+    data = json.dumps(event, ensure_ascii=False)
+    if stream_format == "sse":
+        return f"event: {event['type']}\ndata: {data}\n\n".encode("utf-8")
+    return f"{data}\n".encode("utf-8")
+
+
+def _remove_file(path: Optional[str]) -> None:
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+@router.post(
+    "/detect/video/stream",
+    status_code=status.HTTP_200_OK,
+    summary="🐄 流式视频牛只检测",
+    description="分块上传视频（或提交服务器上的视频路径），逐帧以 NDJSON / SSE 流式返回采样帧的检测结果",
+    responses={
+        200: {
+            "description": "检测事件流：meta（视频信息）、frame（逐帧结果）、summary（汇总）",
+            "content": {"application/x-ndjson": {}, "text/event-stream": {}}
+        },
+        400: {"description": "视频无效或路径不允许访问"},
+        413: {"description": "视频过大"},
+        503: {"description": "同时处理的视频数已达上限"}
+    },
+    tags=["牛只检测"]
+)
+async def detect_cows_video_stream(
+    request: Request,
+    video_path: Optional[str] = Query(None, description="服务器上的视频路径（不提供时从请求体读取上传的视频）"),
+    confidence_threshold: float = Query(
+        settings.DEFAULT_CONFIDENCE_THRESHOLD, ge=0.0, le=1.0, description="置信度阈值"
+    ),
+    sample_rate: int = Query(settings.DEFAULT_VIDEO_SAMPLE_RATE, ge=1, description="每隔多少帧检测一帧"),
+    stream_format: Literal["ndjson", "sse"] = Query("ndjson", description="结果流格式：ndjson 或 sse"),
+    track: bool = Query(False, description="是否启用多目标跟踪（统计唯一个体数量、停留时长和轨迹）"),
+    model_version: Optional[str] = Query(None, description="指定模型版本名称，不提供时按流量分配选择")
+):
+    """
+    # 🐄 流式视频牛只检测
+    
+    适合牛舍摄像头的长视频：视频边接收边写入独立的临时文件，非采样帧只跳过不解码，
+    采样帧攒批后一次前向推理，检测结果按帧流式返回，内存占用与视频长度无关。
+    
+    ## 请求格式
+    - `application/octet-stream`（支持分块传输编码）或 `multipart/form-data`（字段 `file`）上传视频
+    - 或通过 `video_path` 指定服务器上允许目录中的视频文件
+    
+    ## 返回格式
+    每个事件为一个 JSON 对象，`type` 依次为 `meta`、`frame`（每个采样帧一个）和 `summary`；
+    处理中途出错时以 `error` 事件结束。
+    
+    `track=true` 时跨帧跟踪每头牛：检测框带有 `track_id`，`summary` 中增加唯一个体数量
+    `unique_count`（按类别为 `unique_count_by_class`）和 `tracks`（每条轨迹的起止时间、
+    停留时长 `dwell_time` 和中心点轨迹 `trajectory`）。跟踪模式下可以使用更大的 `sample_rate`。
+    
+    整段视频使用同一个模型版本，版本名称在 `meta` 事件的 `model_version` 中返回。
+    
+    ### curl请求示例
+    ```bash
+    curl -N -X POST "http://localhost:8002/detect/video/stream?sample_rate=15" \\
+         -H "Content-Type: application/octet-stream" \\
+         -H "Transfer-Encoding: chunked" \\
+         --data-binary @barn.mp4
+    ```
+    """
+    stack = AsyncExitStack()
+    temp_path = None
+    try:
+        # 在整个流式响应期间占用一个视频处理槽位
+        await stack.enter_async_context(video_pool.slot())
+        
+        if video_path:
+            path = _resolve_video_path(video_path)
+        else:
+            temp_path = path = await save_upload_to_file(
+                request, settings.MAX_FILE_SIZE, settings.UPLOAD_DIR, suffix=".mp4"
+            )
+        logging.info(f"开始流式视频检测: {video_path or '上传视频'}，采样间隔 {sample_rate} 帧")
+        
+        events = model_service.iter_video_detections(
+            path, confidence_threshold, sample_rate, settings.VIDEO_BATCH_SIZE, track, model_version
+        )
+        # 先取出视频信息事件，视频无法打开时直接返回 400 而不是空的事件流
+        first_event = await video_pool.run(next, events, None)
+    except Exception as e:
+        await stack.aclose()
+        _remove_file(temp_path)
+        if isinstance(e, ServiceBusyError):
+            logging.warning(f"视频处理繁忙，拒绝请求: {video_pool.stats()}")
+            return busy_response(e)
+        if isinstance(e, UploadTooLargeError):
+            status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        elif isinstance(e, ModelVersionNotFoundError):
+            status_code = status.HTTP_404_NOT_FOUND
+        elif isinstance(e, ValueError):
+            status_code = status.HTTP_400_BAD_REQUEST
+        else:
+            logging.error(f"未预期错误: {str(e)}\n{traceback.format_exc()}")
+            return JSONResponse(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                content={"success": False, "message": "服务器内部错误，请稍后重试"}
+            )
+        logging.warning(f"视频检测请求无效: {str(e)}")
+        return JSONResponse(status_code=status_code, content={"success": False, "message": str(e)})
+    
+    async def event_stream():
+        try:
+            event = first_event
+            while event is not None:
+                yield _format_video_event(event, stream_format)
+                event = await video_pool.run(next, events, None)
+        except Exception as e:
+            logging.error(f"流式视频检测失败: {str(e)}\n{traceback.format_exc()}")
+            yield _format_video_event({"type": "error", "message": "视频处理失败"}, stream_format)
+        finally:
+            try:
+                await video_pool.run(events.close)
+            except ValueError:
+                # 客户端断开时推理线程可能仍在执行，生成器随后被回收时释放视频句柄
+                pass
+            await stack.aclose()
+            _remove_file(temp_path)
+    
+    if stream_format == "sse":
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
 @router.post(
     "/detect-detailed",
     response_model=DetailedDetectResponse,
@@ -395,26 +847,39 @@ async def detect_cows_detailed(request: DetectRequest) -> Union[DetailedDetectRe
     - **detections**: 检测到的牛只列表，包括类型、数量
     - **detailed_detections**: 详细的检测信息列表，包括每个牛只的边界框、中心点、大小等
     - **image_info**: 图像信息，包括尺寸和检测到的牛只总数
-    - **result_image**: 标注了检测框的图像（base64格式）
+    - **result_image**: 标注了检测框的图像（base64格式；`return_image=thumbnail` 时为缩略图，`return_image=none` 时不返回）
     """
     
     try:
         logging.info(f"开始详细牛只检测，图像大小: {len(request.image_base64)} 字符")
         
-        # 调用模型服务进行详细检测
-        detailed_result = model_service.detect_cows_detailed(request.image_base64)
+        # 调用模型服务进行详细检测（经微批处理调度器合并推理）
+        async with worker_pool.slot():
+            image_data = await worker_pool.run(base64.b64decode, request.image_base64)
+            detections, jpeg_bytes, detailed_detections, image_info, version_name = await _detect_image_data(
+                image_data, settings.DEFAULT_CONFIDENCE_THRESHOLD, request.return_image, request.model_version
+            )
+            result_image_b64 = await worker_pool.run(jpeg_to_base64, jpeg_bytes) if jpeg_bytes is not None else None
         
         # 构造成功响应
-        logging.info(f"检测成功，发现 {len(detailed_result['detailed_detections'])} 个牛只")
+        logging.info(f"检测成功，发现 {len(detailed_detections)} 个牛只")
         
         return DetailedDetectResponse(
             success=True,
-            detections=detailed_result['detections'] or [],
-            detailed_detections=detailed_result['detailed_detections'] or [],
-            image_info=detailed_result['image_info'],
-            result_image=detailed_result['result_image']
+            detections=detections or [],
+            detailed_detections=detailed_detections or [],
+            image_info=image_info,
+            result_image=result_image_b64,
+            model_version=version_name
         )
         
+    except ServiceBusyError as e:
+        logging.warning(f"服务繁忙，拒绝请求: {worker_pool.stats()}")
+        return busy_response(e)
+        
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e)
+        
     except ValueError as ve:
         # 参数验证错误
         error_msg = str(ve)
@@ -596,7 +1061,9 @@ async def detailed_health_check():
             model_available = hasattr(model_service, 'model') and model_service.model is not None
             health_status["checks"]["model"] = {
                 "status": "healthy" if model_available else "warning",
-                "message": "模型已加载" if model_available else "模型未加载，首次调用时会自动加载"
+                "message": "模型已加载" if model_available else "模型未加载，首次调用时会自动加载",
+                "backend": settings.INFERENCE_BACKEND,
+                "precision": settings.MODEL_PRECISION
             }
         except Exception as e:
             health_status["checks"]["model"] = {
@@ -605,6 +1072,24 @@ async def detailed_health_check():
             }
             health_status["status"] = "unhealthy"
         
+        # 微批处理调度器状态
+        health_status["checks"]["inference_batcher"] = {
+            "status": "healthy",
+            **inference_batcher.stats()
+        }
+        health_status["checks"]["worker_pool"] = {
+            "status": "warning" if worker_pool.waiting >= worker_pool.max_queue else "healthy",
+            **worker_pool.stats()
+        }
+        health_status["checks"]["result_cache"] = {
+            "status": "healthy",
+            **result_cache.stats()
+        }
+        health_status["checks"]["video_pool"] = {
+            "status": "healthy",
+            **video_pool.stats()
+        }
+        
         # 检查依赖库
         dependencies = []
         try:
@@ -656,4 +1141,116 @@ async def detailed_health_check():
             }
         )
 
+def _check_admin_token(token: Optional[str], modify: bool = False) -> None:
+    """校验模型管理接口的 X-Admin-Token 请求头（未配置 MODEL_ADMIN_TOKEN 时接口禁用）"""
+    check_model_admin(token, settings.MODEL_ADMIN_TOKEN, modify)
+
+
+@router.get(
+    "/models",
+    summary="模型版本状态",
+    description="返回已加载的模型版本、流量分配、加载中的版本和加载失败原因",
+    tags=["模型管理"]
+)
+async def get_model_versions(x_admin_token: Optional[str] = Header(None)):
+    """
+    # 🗂️ 模型版本状态
+    
+    - **versions**: 已加载的版本（名称、权重文件、版本标识、类别数、加载时间、流量占比）
+    - **traffic**: 当前流量分配
+    - **loading / errors**: 后台加载中的版本和加载失败原因
+    """
+    _check_admin_token(x_admin_token)
+    return {"success": True, **model_service.registry.status()}
+
+
+@router.post(
+    "/models",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="加载模型版本",
+    description="在后台加载并预热新的模型版本，期间当前版本继续服务",
+    tags=["模型管理"]
+)
+async def load_model_version(request: ModelLoadRequest, x_admin_token: Optional[str] = Header(None)):
+    """
+    # ⏳ 加载模型版本
+    
+    权重文件必须位于模型目录（MODEL_REGISTRY_DIR）下，类别名称使用权重文件自带的类别。
+    加载在后台完成，通过 `GET /models` 查看进度；`activate=true` 时预热完成后全部流量切换到该版本。
+    """
+    _check_admin_token(x_admin_token, modify=True)
+    try:
+        path = resolve_weights_path(request.path, settings.MODEL_REGISTRY_DIR)
+        model_service.registry.load_in_background(request.name, path, request.activate)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"success": False, "message": str(e)}
+        )
+    
+    logging.info(f"开始加载模型版本 {request.name}: {path}")
+    return {"success": True, "message": f"模型版本 {request.name} 正在后台加载"}
+
+
+@router.post(
+    "/models/{name}/activate",
+    summary="切换模型版本",
+    description="把全部流量原子地切换到指定版本",
+    tags=["模型管理"]
+)
+async def activate_model_version(name: str, x_admin_token: Optional[str] = Header(None)):
+    """切换后新请求立即使用该版本，进行中的请求继续使用原版本完成"""
+    _check_admin_token(x_admin_token, modify=True)
+    try:
+        model_service.registry.activate(name)
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e)
+    
+    logging.info(f"全部流量已切换到模型版本 {name}")
+    return {"success": True, **model_service.registry.status()}
+
+
+@router.put(
+    "/models/traffic",
+    summary="模型版本分流",
+    description="按权重在多个模型版本之间分配流量（A/B 对比）",
+    tags=["模型管理"]
+)
+async def set_model_traffic(request: ModelTrafficRequest, x_admin_token: Optional[str] = Header(None)):
+    """权重按比例归一化，例如 {"default": 9, "2025-spring": 1} 把 10% 的请求分给新版本"""
+    _check_admin_token(x_admin_token, modify=True)
+    try:
+        model_service.registry.set_traffic(request.weights)
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"success": False, "message": str(e)}
+        )
+    
+    logging.info(f"模型流量分配已更新: {request.weights}")
+    return {"success": True, **model_service.registry.status()}
+
 
+@router.delete(
+    "/models/{name}",
+    summary="卸载模型版本",
+    description="卸载不再接收流量的模型版本，释放内存",
+    tags=["模型管理"]
+)
+async def unload_model_version(name: str, x_admin_token: Optional[str] = Header(None)):
+    """仍在接收流量的版本需要先切换流量才能卸载"""
+    _check_admin_token(x_admin_token, modify=True)
+    try:
+        model_service.registry.unload(name)
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"success": False, "message": str(e)}
+        )
+    
+    logging.info(f"模型版本 {name} 已卸载")
+    return {"success": True, **model_service.registry.status()}
@@ -1,16 +1,32 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
+from fastapi.staticfiles import StaticFiles
 
 # 兼容 Docker 和本地环境的导入
 try:
     # Docker 环境：使用相对导入
     from app.core.config import settings
     from app.api.routes import router as api_router
+    from app.services.model_service import model_service, readiness
+    from detector_common.readiness import readiness_response
 except ImportError:
     # 本地环境：使用绝对导入
     from src.algorithms.cow_detection.detector.app.core.config import settings
     from src.algorithms.cow_detection.detector.app.api.routes import router as api_router
+    from src.algorithms.cow_detection.detector.app.services.model_service import model_service, readiness
+    from src.algorithms.detector_common.readiness import readiness_response
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动后在后台线程中加载并预热模型，不阻塞服务启动（预热完成前 /ready 返回 503）
+    readiness.start(lambda: model_service.warm_up_model(settings.WARMUP_RUNS))
+    yield
+    # 服务关闭时停止预热失败后的重试
+    readiness.stop()
+
 
 # 创建FastAPI应用实例
 app = FastAPI(
@@ -63,6 +79,7 @@ app = FastAPI(
         "url": "https://opensource.org/licenses/MIT"
     },
     terms_of_service="使用本API即表示同意相关服务条款",
+    lifespan=lifespan,
 )
 
 # 配置CORS中间件
@@ -103,6 +120,10 @@ app.openapi = custom_openapi
 # 注册路由
 app.include_router(api_router)
 
+# 结果图片静态访问（result_format=url 时返回的路径）
+app.mount(settings.RESULTS_URL_PREFIX, StaticFiles(directory=settings.RESULTS_DIR), name="results")
+
+
 # 根路径
 @app.get("/", 
          summary="🏠 API服务首页",
@@ -147,6 +168,7 @@ def root():
             "detection": "/detect",
             "cow_list": "/supported-cows", 
             "health": "/health",
+            "ready": "/ready",
             "detailed_health": "/health/detailed"
         },
         "documentation": {
@@ -169,7 +191,8 @@ def health_check():
     """
     # ⚡ 快速健康检查
     
-    提供API服务的基本健康状态检查，用于负载均衡器和监控系统。
+    提供API服务的基本健康状态检查（进程存活），模型加载和预热期间同样返回 `healthy`；
+    负载均衡和容器健康检查请使用 `/ready`。
     
     ## 返回状态
     - `healthy`: 服务正常运行
@@ -189,10 +212,29 @@ def health_check():
         "checks": {
             "api": "✅ 正常",
             "database": "✅ 正常", 
-            "model": "✅ 已加载"
+            "model": "✅ 已加载" if readiness.ready else "⏳ 加载预热中"
         }
     }
 
+# 就绪检查接口
+@app.get("/ready",
+         summary="🚦 就绪检查",
+         description="模型加载并预热完成后返回200，之前返回503",
+         tags=["系统信息"])
+def readiness_check():
+    """
+    # 🚦 就绪检查
+    
+    服务启动后在后台加载模型并按生产输入尺寸执行几次空白图像推理（`WARMUP_RUNS`），
+    完成前返回 503，完成后返回 200，避免重启后的第一个用户请求承担冷启动延迟。
+    
+    ## 返回状态
+    - `warming`: 正在加载和预热（503）
+    - `ready`: 可以接收流量（200）
+    - `failed`: 预热失败，`error` 中给出原因（503）
+    """
+    return readiness_response(readiness, service="🐄 智能牛只检测API")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Union
+from typing import Dict, List, Literal, Optional, Union
 import base64
 import re
 
@@ -42,6 +42,8 @@ class VideoDetectionResult(BaseModel):
     total_frames: int = Field(default=0, description="视频总帧数")
     detections: List[dict] = Field(default=[], description="检测到的对象列表(按帧)")
     detection_count: int = Field(default=0, description="检测到的对象总数")
+    unique_count: Optional[int] = Field(default=None, description="跟踪得到的唯一个体数量(仅跟踪模式)")
+    tracks: List[dict] = Field(default=[], description="每条轨迹的起止时间、停留时长和中心点轨迹(仅跟踪模式)")
     processing_time: float = Field(..., description="处理时间(秒)")
     model_name: str = Field(..., description="使用的模型名称")
 
@@ -85,6 +87,18 @@ class DetectRequest(BaseModel):
         example="/9j/4AAQSkZJRgABAQEAYGBgY...",
         min_length=1000
     )
+    result_format: Literal["base64", "binary", "url"] = Field(
+        default="base64",
+        description="结果图片返回方式：base64（JSON内嵌）、binary（直接返回JPEG，检测结果放在X-Detections响应头）、url（返回结果图片访问路径）"
+    )
+    return_image: Literal["full", "thumbnail", "none"] = Field(
+        default="full",
+        description="结果图片渲染方式：full（原尺寸标注图）、thumbnail（缩小尺寸的标注图）、none（不绘制标注图，只返回检测结果，binary 格式时返回JSON）"
+    )
+    model_version: Optional[str] = Field(
+        default=None,
+        description="指定模型版本名称（如对比新旧模型），不提供时按服务的流量分配选择版本"
+    )
     
     @validator('image_base64')
     def validate_base64(cls, v):
@@ -132,10 +146,18 @@ class DetectResponse(BaseModel):
         default=[], 
         description="检测到的牛只列表"
     )
-    result_image: str = Field(
-        ..., 
+    result_image: Optional[str] = Field(
+        None, 
         description="标注了检测框的图像（base64编码）"
     )
+    result_image_url: Optional[str] = Field(
+        None,
+        description="标注图像的访问路径（仅 result_format=url 时返回）"
+    )
+    model_version: Optional[str] = Field(
+        None,
+        description="本次检测使用的模型版本名称"
+    )
     
     class Config:
         schema_extra = {
@@ -219,9 +241,13 @@ class DetailedDetectResponse(BaseModel):
         ..., 
         description="图像信息"
     )
-    result_image: str = Field(
-        ..., 
-        description="标注了检测框的图像（base64编码）"
+    result_image: Optional[str] = Field(
+        None, 
+        description="标注了检测框的图像（base64编码，return_image=none 时不返回）"
+    )
+    model_version: Optional[str] = Field(
+        None,
+        description="本次检测使用的模型版本名称"
     )
     
     class Config:
@@ -261,6 +287,55 @@ class DetailedDetectResponse(BaseModel):
         }
 
 
+class BatchDetectRequest(BaseModel):
+    """批量牛只检测请求模型
+    
+    一次提交多张图像，服务端在一次前向推理中完成全部检测
+    """
+    images_base64: List[str] = Field(
+        ...,
+        description="图像的base64编码字符串列表（不包含data:image前缀），数量不超过服务配置的 MAX_BATCH_SIZE",
+        min_items=1
+    )
+    confidence_threshold: Optional[float] = Field(
+        default=None,
+        description="置信度阈值，不传时使用服务默认值",
+        ge=0.0,
+        le=1.0
+    )
+    result_format: Literal["base64", "url"] = Field(
+        default="base64",
+        description="结果图片返回方式：base64（JSON内嵌）或 url（返回结果图片访问路径）"
+    )
+    return_image: Literal["full", "thumbnail", "none"] = Field(
+        default="full",
+        description="结果图片渲染方式：full（原尺寸标注图）、thumbnail（缩小尺寸的标注图）、none（不绘制标注图，只返回检测结果）"
+    )
+    model_version: Optional[str] = Field(
+        default=None,
+        description="指定模型版本名称（如对比新旧模型），不提供时按服务的流量分配选择版本"
+    )
+
+
+class BatchDetectItem(BaseModel):
+    """批量检测中单张图像的结果"""
+    success: bool = Field(..., description="该图像是否检测成功", example=True)
+    detections: List[Detection] = Field(default_factory=list, description="检测到的牛只列表")
+    result_image: Optional[str] = Field(None, description="检测结果图片的Base64编码字符串")
+    result_image_url: Optional[str] = Field(None, description="检测结果图片的访问路径（仅 result_format=url 时返回）")
+    message: Optional[str] = Field(None, description="检测失败时的错误原因", example=None)
+
+
+class BatchDetectResponse(BaseModel):
+    """批量检测结果响应模型
+    
+    results 与请求中 images_base64 的顺序一一对应
+    """
+    success: bool = Field(..., description="请求是否处理成功", example=True)
+    results: List[BatchDetectItem] = Field(..., description="与输入顺序一致的逐图检测结果")
+    model_version: Optional[str] = Field(None, description="本次检测使用的模型版本名称", example="default")
+
+
 class ErrorResponse(BaseModel):
     """错误响应模型
     
@@ -282,4 +357,16 @@ class ErrorResponse(BaseModel):
                 "success": False,
                 "message": "无效的base64编码格式"
             }
-        }
\ No newline at end of file
+        }
+
+
+class ModelLoadRequest(BaseModel):
+    """模型版本加载请求（在后台加载并预热，期间现有版本继续服务）"""
+    name: str = Field(..., description="版本名称，与已有版本同名时加载完成后整体替换", example="2025-spring", min_length=1, max_length=64)
+    path: str = Field(..., description="权重文件路径（相对于 MODEL_REGISTRY_DIR，必须位于该目录下）", example="2025-spring/best.pt")
+    activate: bool = Field(default=False, description="加载完成后是否把全部流量切换到该版本")
+
+
+class ModelTrafficRequest(BaseModel):
+    """模型版本流量分配请求（按权重比例分流，用于 A/B 对比或灰度切换）"""
+    weights: Dict[str, float] = Field(..., description="版本名称到流量权重的映射，权重按比例归一化", example={"default": 0.9, "2025-spring": 0.1})
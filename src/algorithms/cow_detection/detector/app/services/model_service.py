@@ -2,18 +2,38 @@ import cv2
 import numpy as np
 import base64
 import os
+import tempfile
 import threading
-from typing import Dict, List, Tuple, Optional
+import time
+from typing import Any, Dict, Iterator, List, Tuple, Optional
 from ultralytics import YOLO
 
 # 兼容 Docker 和本地环境的导入
 try:
     # Docker 环境：使用相对导入
     from app.core.config import settings
+    from detector_common.image_decode import decode_image, read_image_size
+    from detector_common.inference_backend import load_yolo, model_version
+    from detector_common.micro_batch import MicroBatcher
+    from detector_common.model_registry import ModelRegistry, ModelVersion
+    from detector_common.readiness import Readiness
+    from detector_common.postprocess import result_arrays, count_by_name, box_geometry
+    from detector_common.result_cache import ResultCache
+    from detector_common.tracking import IoUTracker
+    from detector_common.worker_pool import WorkerPool
     from app.schemas.detection import DetectionResult, VideoDetectionResult, BoundingBox
 except ImportError:
     # 本地环境：使用绝对导入
     from src.algorithms.cow_detection.detector.app.core.config import settings
+    from src.algorithms.detector_common.image_decode import decode_image, read_image_size
+    from src.algorithms.detector_common.inference_backend import load_yolo, model_version
+    from src.algorithms.detector_common.micro_batch import MicroBatcher
+    from src.algorithms.detector_common.model_registry import ModelRegistry, ModelVersion
+    from src.algorithms.detector_common.readiness import Readiness
+    from src.algorithms.detector_common.postprocess import result_arrays, count_by_name, box_geometry
+    from src.algorithms.detector_common.result_cache import ResultCache
+    from src.algorithms.detector_common.tracking import IoUTracker
+    from src.algorithms.detector_common.worker_pool import WorkerPool
     from src.algorithms.cow_detection.detector.app.schemas.detection import DetectionResult, VideoDetectionResult, BoundingBox
 
 
@@ -26,12 +46,13 @@ class ModelService:
     2. 推理过程使用线程锁保护，防止并发结果串线
     3. 类别名称为只读数据，初始化后不再修改
     4. 每次推理完全独立，不依赖任何跨请求状态
+    5. 模型版本由注册表管理，每个请求（视频为整段视频）在开始时选定版本，切换版本不影响进行中的请求
     """
     
     def __init__(self):
         """初始化模型服务，但不立即加载模型"""
-        self._model: Optional[YOLO] = None
-        self._class_names: List[str] = []
+        # 模型版本注册表：新版本在后台加载预热，预热完成后切换流量
+        self.registry = ModelRegistry(self._load_weights, warmup=self._warmup, name="cow-model")
         self._initialized: bool = False
         # 线程锁：保护初始化过程
         self._init_lock = threading.Lock()
@@ -40,7 +61,7 @@ class ModelService:
     
     def _initialize(self):
         """
-        线程安全的惰性初始化模型
+        线程安全的惰性初始化模型（加载 MODEL_PATH 作为默认版本并接收全部流量）
         使用双重检查锁定模式确保只初始化一次
         """
         if self._initialized:
@@ -52,52 +73,93 @@ class ModelService:
                 return
             
             try:
-                # 使用配置中的模型路径
-                model_path = settings.MODEL_PATH
-                
-                # 验证文件是否存在
-                if not os.path.exists(model_path):
-                    raise FileNotFoundError(f"模型文件不存在: {model_path}")
-                
-                # 加载模型，使用本地模型，禁用自动下载
-                self._model = YOLO(model_path, local=True)
-                
-                # 获取模型自带的类别名称
-                if hasattr(self._model, 'names') and self._model.names:
-                    self._class_names = list(self._model.names.values())
-                else:
-                    # 如果没有类别名称，使用默认类别
-                    self._class_names = [f"class_{i}" for i in range(10)]  # 假设有10个类别
-                
-                # 将类别名称转为元组，变成不可变对象
-                self._class_names = tuple(self._class_names)
-                
-                print(f"已加载 {len(self._class_names)} 个类别")
+                # 运行时已加载并切换了其他版本时不再加载默认版本
+                # 这里只加载不推理：多进程部署在 fork 前加载权重，预热推理由各工作进程的 warm_up_model() 执行
+                if not self.registry.has_traffic:
+                    self.registry.load(settings.MODEL_VERSION_NAME, settings.MODEL_PATH, activate=True, warmup=False)
                 self._initialized = True
             except Exception as e:
                 raise RuntimeError(f"模型初始化失败: {str(e)}")
     
+    @staticmethod
+    def _load_weights(model_path: str) -> Tuple[YOLO, Tuple[str, ...], str]:
+        """
+        加载一个模型版本（模型注册表的加载函数）
+        
+        Args:
+            model_path: 权重文件路径
+            
+        Returns:
+            Tuple: 模型、类别名称（模型自带）和版本标识
+        """
+        # 验证文件是否存在
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"模型文件不存在: {model_path}")
+        
+        # 加载模型（按配置的推理后端，非 torch 后端使用本地导出的模型）
+        model = load_yolo(
+            model_path, settings.INFERENCE_BACKEND, settings.EXPORT_IMGSZ, settings.EXPORT_CACHE_DIR,
+            settings.MODEL_PRECISION
+        )
+        
+        # 获取模型自带的类别名称
+        if hasattr(model, 'names') and model.names:
+            class_names = list(model.names.values())
+        else:
+            # 如果没有类别名称，使用默认类别
+            class_names = [f"class_{i}" for i in range(10)]  # 假设有10个类别
+        
+        print(f"已加载 {len(class_names)} 个类别")
+        # 类别名称转为元组，变成不可变对象
+        return model, tuple(class_names), model_version(model_path, settings.INFERENCE_BACKEND, settings.MODEL_PRECISION)
+    
+    @staticmethod
+    def _warmup(model: YOLO) -> None:
+        """新版本接收流量前用空白图像推理一次，完成权重融合、显存分配等首次推理开销"""
+        model(np.zeros((settings.EXPORT_IMGSZ, settings.EXPORT_IMGSZ, 3), dtype=np.uint8), verbose=False)
+    
+    def warm_up_model(self, runs: int = 1) -> None:
+        """
+        加载模型并按生产输入尺寸（EXPORT_IMGSZ）执行 runs 次空白图像的完整检测（含后处理和标注绘制），
+        把首次推理的冷启动开销放在接收流量之前
+        """
+        self._initialize()
+        image = np.zeros((settings.EXPORT_IMGSZ, settings.EXPORT_IMGSZ, 3), dtype=np.uint8)
+        for _ in range(runs):
+            self.predict_batch([image])
+    
+    def select_model(self, name: Optional[str] = None) -> ModelVersion:
+        """
+        为单个请求选择模型版本（按流量权重，或按名称指定版本）
+        
+        Raises:
+            ModelVersionNotFoundError: 指定的版本不存在
+        """
+        self._initialize()
+        return self.registry.resolve(name)
+    
     @property
     def model(self) -> YOLO:
-        """获取模型实例（只读属性）"""
+        """获取模型实例（只读属性，流量权重最大的版本）"""
         self._initialize()
-        return self._model
+        return self.registry.primary().model
+    
+    @property
+    def model_version(self) -> str:
+        """模型版本标识（流量权重最大的版本；尚未加载时按配置计算，不触发模型加载）"""
+        if self._initialized:
+            return self.registry.primary().version
+        return model_version(settings.MODEL_PATH, settings.INFERENCE_BACKEND, settings.MODEL_PRECISION)
     
     @property
     def class_names(self) -> Tuple[str, ...]:
         """获取类别名称列表（只读属性，返回元组确保不可变）"""
         self._initialize()
-        return self._class_names
+        return self.registry.primary().class_names
     
     def _base64_to_image(self, base64_str: str) -> np.ndarray:
         """将base64字符串转换为OpenCV图像"""
-        # 解码base64字符串
-        img_data = base64.b64decode(base64_str)
-        # 将字节数据转换为numpy数组
-        np_arr = np.frombuffer(img_data, np.uint8)
-        # 解码为图像
-        img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
-        return img
+        return self.decode_image(base64.b64decode(base64_str))
     
     def _image_to_base64(self, image: np.ndarray) -> str:
         """将OpenCV图像转换为base64字符串"""
@@ -142,226 +204,235 @@ class ModelService:
         }
     
     def detect_cows_in_video(self, video_base64: str, confidence_threshold: float = 0.5,
-                            sample_rate: int = 10, model_name: Optional[str] = None) -> VideoDetectionResult:
-        """检测视频中的牛"""
-        import time
+                            sample_rate: int = 10, model_name: Optional[str] = None,
+                            track: bool = False) -> VideoDetectionResult:
+        """检测视频中的牛（一次性返回全部结果；长视频请使用流式接口 /detect/video/stream）"""
         start_time = time.time()
         
-        # 惰性初始化（线程安全）
-        self._initialize()
-        
-        # 保存临时视频文件
-        temp_video_path = os.path.join(settings.UPLOAD_DIR, "temp_video.mp4")
+        # 每个请求使用独立的临时文件，避免并发请求互相覆盖
         os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+        fd, temp_video_path = tempfile.mkstemp(dir=settings.UPLOAD_DIR, suffix=".mp4")
         
         try:
-            with open(temp_video_path, "wb") as f:
+            with os.fdopen(fd, "wb") as f:
                 f.write(base64.b64decode(video_base64))
             
-            # 读取视频
-            cap = cv2.VideoCapture(temp_video_path)
-            if not cap.isOpened():
-                raise ValueError("无法打开视频文件")
-                
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            processed_frames = 0
-            total_detections = 0
+            meta: Dict = {}
+            summary: Dict = {}
             frame_detections = []
-            
-            frame_idx = 0
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                    
-                # 按采样率处理帧
-                if frame_idx % sample_rate == 0:
-                    # 使用线程锁保护推理过程
-                    with self._inference_lock:
-                        results = self._model(frame, conf=confidence_threshold, verbose=False)
-                        
-                        frame_detection = {
-                            "frame_index": frame_idx,
-                            "detections": []
-                        }
-                        
-                        for result in results:
-                            if result.boxes is not None:
-                                for box in result.boxes:
-                                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                                    conf = float(box.conf[0])
-                                    cls = int(box.cls[0])
-                                    
-                                    # 获取类别名称
-                                    class_names = self._class_names
-                                    if cls < len(class_names):
-                                        class_name = class_names[cls]
-                                    else:
-                                        class_name = f"未知类别_{cls}"
-                                    
-                                    bbox = {
-                                        "x1": float(x1),
-                                        "y1": float(y1),
-                                        "x2": float(x2),
-                                        "y2": float(y2),
-                                        "confidence": conf,
-                                        "class_name": class_name,
-                                        "class_id": cls
-                                    }
-                                    frame_detection["detections"].append(bbox)
-                                    total_detections += 1
-                    
-                    frame_detections.append(frame_detection)
-                    processed_frames += 1
-                
-                frame_idx += 1
-            
-            cap.release()
-            
-            processing_time = time.time() - start_time
+            for event in self.iter_video_detections(temp_video_path, confidence_threshold, sample_rate,
+                                                    settings.VIDEO_BATCH_SIZE, track, model_name):
+                if event["type"] == "frame":
+                    frame_detections.append(event)
+                elif event["type"] == "meta":
+                    meta = event
+                else:
+                    summary = event
             
             return VideoDetectionResult(
                 video_path="base64_video",
-                frame_count=frame_count,
-                processed_frames=processed_frames,
+                video_size=meta.get("video_size", []),
+                fps=meta.get("fps", 0),
+                total_frames=summary.get("total_frames", 0),
                 detections=frame_detections,
-                total_detections=total_detections,
-                processing_time=processing_time,
-                model_name=model_name or "yolov8n"
+                detection_count=summary.get("total_detections", 0),
+                unique_count=summary.get("unique_count"),
+                tracks=summary.get("tracks", []),
+                processing_time=time.time() - start_time,
+                model_name=meta.get("model_version") or model_name or settings.MODEL_VERSION_NAME
             )
         except Exception as e:
             print(f"视频处理过程中出错: {str(e)}")
             # 返回默认值以避免服务崩溃
             return VideoDetectionResult(
                 video_path="base64_video",
-                frame_count=0,
-                processed_frames=0,
-                detections=[],
-                total_detections=0,
                 processing_time=time.time() - start_time,
-                model_name=model_name or "yolov8n"
+                model_name=model_name or settings.MODEL_VERSION_NAME
             )
         finally:
             # 删除临时文件
             if os.path.exists(temp_video_path):
                 os.remove(temp_video_path)
     
-    def process_image_from_base64(self, image_base64: str, confidence_threshold: float = 0.5) -> Tuple[List[Dict], str]:
+    def iter_video_detections(self, video_path: str, confidence_threshold: float = 0.5,
+                              sample_rate: int = 10, batch_size: int = 8,
+                              track: bool = False, version: Optional[str] = None) -> Iterator[Dict[str, Any]]:
         """
-        处理base64编码的图像并返回检测结果和处理后的图像
+        逐批检测视频中的采样帧，按帧产出检测结果（生成器）
+        
+        - 只解码采样帧：非采样帧用 grab() 跳过，不做解码
+        - 采样帧攒够 batch_size 张后在一次前向推理中完成检测
+        - 内存占用只与批大小有关，与视频长度无关
+        
+        整段视频使用开始时选定的同一个模型版本，处理期间切换版本不影响该视频
+        
+        依次产出的事件：
+        - {"type": "meta"}: 帧率、总帧数、视频尺寸和模型版本名称
+        - {"type": "frame"}: 每个采样帧的帧号、时间戳和检测框
+        - {"type": "summary"}: 实际帧数、处理帧数、检测总数和耗时
+        
+        跟踪模式下跨帧关联检测框：每个检测框带有 track_id，summary 中增加唯一个体数量
+        （unique_count）和每条轨迹的起止时间、停留时长与中心点轨迹（tracks）。
+        逐帧数量的最大值/平均值会重复统计同一头牛，唯一个体数量不会，
+        且跟踪对采样间隔不敏感，可以用更大的 sample_rate 处理长视频。
         
         Args:
-            image_base64: base64编码的图像字符串
+            video_path: 视频文件路径
             confidence_threshold: 置信度阈值
+            sample_rate: 每隔多少帧检测一帧
+            batch_size: 单次前向推理的帧数
+            track: 是否启用多目标跟踪
+            version: 指定模型版本名称，None 时按流量分配选择
             
-        Returns:
-            Tuple[List[Dict], str]: 检测结果列表(符合API期望的格式)和处理后的base64图像
+        Raises:
+            ValueError: 视频无法打开
+            ModelVersionNotFoundError: 指定的版本不存在
         """
-        # 惰性初始化（线程安全）
-        self._initialize()
-        
-        # 转换base64图像
-        image = self._base64_to_image(image_base64)
-        if image is None:
-            raise ValueError("无法解码图像数据")
+        entry = self.select_model(version)
+        sample_rate = max(1, sample_rate)
+        batch_size = max(1, batch_size)
+        start_time = time.time()
         
-        # 获取图像尺寸
-        height, width = image.shape[:2]
+        # 跟踪时按较低的置信度推理（ByteTrack），低分框只用于延续已有轨迹，不会开始新轨迹
+        tracker = None
+        inference_threshold = confidence_threshold
+        if track:
+            tracker = IoUTracker(
+                iou_threshold=settings.TRACK_IOU_THRESHOLD,
+                max_center_distance=settings.TRACK_MAX_CENTER_DISTANCE,
+                high_confidence=confidence_threshold,
+                max_missed=settings.TRACK_MAX_MISSED,
+                min_hits=settings.TRACK_MIN_HITS,
+            )
+            inference_threshold = min(confidence_threshold, settings.TRACK_LOW_CONFIDENCE)
         
-        # 创建图像副本用于绘制
-        result_image = image.copy()
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            cap.release()
+            raise ValueError("无法打开视频文件")
         
-        # 使用线程锁保护推理过程
-        with self._inference_lock:
-            # 进行预测
-            results = self._model(result_image, conf=confidence_threshold, verbose=False)
-            
-            # 解析检测结果并绘制边界框
-            detections = []
-            class_counts = {}  # 用于统计每个类别的数量
-            detailed_detections = []  # 存储详细的检测信息，类似cow_detection_tool
+        try:
+            fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0)
+            yield {
+                "type": "meta",
+                "fps": fps,
+                "total_frames": int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0),
+                "video_size": [int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))],
+                "sample_rate": sample_rate,
+                "track": track,
+                "model_version": entry.name,
+            }
             
-            for result in results:
-                if result.boxes is not None:
-                    for box in result.boxes:
-                        # 获取置信度
-                        confidence = float(box.conf[0])
-                        
-                        # 获取类别ID
-                        class_id = int(box.cls[0])
-                        
-                        # 获取边界框坐标
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        
-                        # 计算牛只大小和中心点
-                        cow_width = float(x2 - x1)
-                        cow_height = float(y2 - y1)
-                        center_x = float((x1 + x2) / 2)
-                        center_y = float((y1 + y2) / 2)
-                        
-                        # 获取类别名称
-                        class_names = self._class_names
-                        if class_id < len(class_names):
-                            class_name = class_names[class_id]
-                        else:
-                            class_name = f"未知类别_{class_id}"
-                        
-                        # 绘制边界框和标签
-                        cv2.rectangle(result_image, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
-                        label = f"{class_name}: {confidence:.2f}"
-                        cv2.putText(result_image, label, (int(x1), int(y1) - 10), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-                        
-                        # 统计每个类别的数量
-                        if class_name not in class_counts:
-                            class_counts[class_name] = 0
-                        class_counts[class_name] += 1
-                        
-                        # 添加到详细检测结果(类似cow_detection_tool)
-                        detailed_detection = {
-                            "class_name": class_name,
-                            "confidence": confidence,
-                            "bbox": [float(x1), float(y1), float(x2), float(y2)],
-                            "center": [center_x, center_y],
-                            "size": {
-                                "width": cow_width,
-                                "height": cow_height,
-                                "area": cow_width * cow_height
-                            },
-                            "relative_position": {
-                                "x": center_x / width,  # 相对x位置 (0-1)
-                                "y": center_y / height  # 相对y位置 (0-1)
-                            }
-                        }
-                        detailed_detections.append(detailed_detection)
-                        
-                        # 添加到检测结果(用于内部处理)
-                        detections.append({
-                            "class_name": class_name,
-                            "confidence": confidence,
-                            "bbox": {
-                                "x1": float(x1),
-                                "y1": float(y1),
-                                "x2": float(x2),
-                                "y2": float(y2)
-                            },
-                            "class_id": class_id
-                        })
+            processed_frames = 0
+            total_detections = 0
+            frames: List[np.ndarray] = []
+            frame_indices: List[int] = []
+            frame_idx = 0
             
-            # 转换为API期望的格式: 包含name和count的字典列表
-            api_detections = []
-            for class_name, count in class_counts.items():
-                api_detections.append({
-                    "name": class_name,
-                    "count": count
-                })
+            while True:
+                end_of_video = False
+                if frame_idx % sample_rate == 0:
+                    ret, frame = cap.read()
+                    if ret:
+                        frames.append(frame)
+                        frame_indices.append(frame_idx)
+                    end_of_video = not ret
+                elif not cap.grab():
+                    end_of_video = True
+                
+                if frames and (len(frames) >= batch_size or end_of_video):
+                    for record in self._detect_video_frames(entry, frames, frame_indices, fps, inference_threshold):
+                        if tracker is not None:
+                            self._assign_track_ids(tracker, record, confidence_threshold)
+                        processed_frames += 1
+                        total_detections += record["count"]
+                        yield record
+                    frames, frame_indices = [], []
+                
+                if end_of_video:
+                    break
+                frame_idx += 1
             
-            # 添加图像尺寸信息到响应中
-            image_info = {
-                "width": width,
-                "height": height,
-                "total_cows": sum(class_counts.values())
+            summary = {
+                "type": "summary",
+                "total_frames": frame_idx,
+                "processed_frames": processed_frames,
+                "total_detections": total_detections,
             }
+            if tracker is not None:
+                summary.update(tracker.summary(fps, entry.class_names))
+            summary["processing_time"] = round(time.time() - start_time, 3)
+            yield summary
+        finally:
+            cap.release()
+    
+    @staticmethod
+    def _assign_track_ids(tracker: IoUTracker, record: Dict[str, Any], confidence_threshold: float) -> None:
+        """把一帧的检测框交给跟踪器关联，写入 track_id 并丢弃未延续任何轨迹的低分框"""
+        detections = record["detections"]
+        track_ids = tracker.update(
+            record["frame_index"],
+            [[d["x1"], d["y1"], d["x2"], d["y2"]] for d in detections],
+            [d["confidence"] for d in detections],
+            [d["class_id"] for d in detections],
+        )
+        kept = []
+        for detection, track_id in zip(detections, track_ids):
+            if track_id is None and detection["confidence"] < confidence_threshold:
+                continue
+            detection["track_id"] = track_id
+            kept.append(detection)
+        record["detections"] = kept
+        record["count"] = len(kept)
+    
+    def _detect_video_frames(self, entry: ModelVersion, frames: List[np.ndarray], frame_indices: List[int],
+                             fps: float, confidence_threshold: float) -> List[Dict[str, Any]]:
+        """对一批视频帧执行一次前向推理，返回逐帧的检测结果"""
+        # YOLO模型的推理可能不是线程安全的，需要串行化
+        with self._inference_lock:
+            results = entry.model(frames, conf=confidence_threshold, verbose=False)
+        
+        records = []
+        for frame_index, result in zip(frame_indices, results):
+            xyxy, confidences, class_ids = result_arrays(result)
+            detections = [
+                {
+                    "x1": x1,
+                    "y1": y1,
+                    "x2": x2,
+                    "y2": y2,
+                    "confidence": confidence,
+                    "class_name": self._class_name(class_id, entry.class_names),
+                    "class_id": class_id
+                }
+                for (x1, y1, x2, y2), confidence, class_id in zip(
+                    xyxy.tolist(), confidences.tolist(), class_ids.tolist()
+                )
+            ]
+            records.append({
+                "type": "frame",
+                "frame_index": frame_index,
+                "timestamp": round(frame_index / fps, 3) if fps else None,
+                "detections": detections,
+                "count": len(detections)
+            })
+        return records
+    
+    def process_image_from_base64(self, image_base64: str, confidence_threshold: float = 0.5) -> Tuple[List[Dict], str]:
+        """
+        处理base64编码的图像并返回检测结果和处理后的图像
+        
+        Args:
+            image_base64: base64编码的图像字符串
+            confidence_threshold: 置信度阈值
+            
+        Returns:
+            Tuple[List[Dict], str]: 检测结果列表(符合API期望的格式)和处理后的base64图像
+        """
+        # 解码base64字符串后按原始字节处理
+        api_detections, result_image, detailed_detections, image_info = self.process_image_from_bytes(
+            base64.b64decode(image_base64), confidence_threshold
+        )
         
         # 将处理后的图像转换为base64
         result_image_b64 = self._image_to_base64(result_image)
@@ -371,22 +442,205 @@ class ModelService:
         # 详细信息可以通过新的API端点获取
         return api_detections, result_image_b64, detailed_detections, image_info
     
-    def get_available_models(self) -> List[Dict[str, any]]:
-        """获取可用模型列表"""
-        models = []
+    def process_image_from_bytes(self, image_data: bytes,
+                                 confidence_threshold: float = 0.5) -> Tuple[List[Dict], np.ndarray, List[Dict], Dict]:
+        """
+        处理原始字节形式的图像（multipart / application/octet-stream 上传）
         
-        # 添加默认模型
-        if self._initialized:
-            models.append({
-                "name": "yolov8n",
-                "path": settings.MODEL_PATH,
-                "description": "YOLOv8 牛检测模型",
-                "is_default": True,
-                "size": "6MB",  # YOLOv8n模型大小
-                "accuracy": "95%"  # 示例精度值
+        Args:
+            image_data: 图像文件的原始字节
+            confidence_threshold: 置信度阈值
+            
+        Returns:
+            Tuple: 检测结果列表、标注后的图像、详细检测信息和图像信息
+        """
+        api_detections, result_image, detailed_detections, image_info = self.process_image(
+            self.decode_image(image_data), confidence_threshold
+        )
+        detailed_detections, image_info = self.restore_original_scale(
+            detailed_detections, image_info, read_image_size(image_data)
+        )
+        return api_detections, result_image, detailed_detections, image_info
+    
+    @staticmethod
+    def decode_image(image_data: bytes) -> np.ndarray:
+        """
+        将图像文件的原始字节解码为BGR图像
+        
+        JPEG 按模型输入尺寸缩小解码（DECODE_TARGET_SIZE），并拒绝像素数超过 MAX_IMAGE_PIXELS 的图片；
+        需要原图坐标时用 restore_original_scale() 换算检测结果
+        
+        Args:
+            image_data: 图像文件的原始字节
+            
+        Returns:
+            np.ndarray: BGR格式的图像（已按 EXIF 方向旋转）
+            
+        Raises:
+            ValueError: 无法解码图像数据或图像尺寸过大
+        """
+        return decode_image(image_data, settings.DECODE_TARGET_SIZE, settings.MAX_IMAGE_PIXELS)
+    
+    @staticmethod
+    def restore_original_scale(detailed_detections: List[Dict], image_info: Dict,
+                               original_size: Optional[Tuple[int, int]]) -> Tuple[List[Dict], Dict]:
+        """
+        将缩小解码图像上的详细检测结果和图像信息换算为原图坐标
+        
+        Args:
+            detailed_detections: 缩小解码图像上的详细检测结果
+            image_info: 缩小解码图像的图像信息
+            original_size: 原图的 (宽, 高)，None 表示未知（不换算）
+            
+        Returns:
+            Tuple[List[Dict], Dict]: 原图坐标的详细检测结果和图像信息（返回新对象，不修改输入）
+        """
+        if original_size is None or (original_size[0], original_size[1]) == (image_info["width"], image_info["height"]):
+            return detailed_detections, image_info
+        
+        scale_x = original_size[0] / image_info["width"]
+        scale_y = original_size[1] / image_info["height"]
+        scaled = []
+        for detection in detailed_detections:
+            x1, y1, x2, y2 = detection["bbox"]
+            width, height = (x2 - x1) * scale_x, (y2 - y1) * scale_y
+            scaled.append({
+                **detection,
+                "bbox": [x1 * scale_x, y1 * scale_y, x2 * scale_x, y2 * scale_y],
+                "center": [detection["center"][0] * scale_x, detection["center"][1] * scale_y],
+                "size": {"width": width, "height": height, "area": width * height},
             })
+        return scaled, {**image_info, "width": original_size[0], "height": original_size[1]}
+    
+    def process_image(self, image: np.ndarray, confidence_threshold: float = 0.5, annotate: bool = True,
+                      version: Optional[str] = None) -> Tuple[List[Dict], Optional[np.ndarray], List[Dict], Dict]:
+        """
+        对已解码的图像进行检测并绘制标注
+        
+        Args:
+            image: BGR格式的图像
+            confidence_threshold: 置信度阈值
+            annotate: 是否绘制标注图像（只需要检测结果时传 False，省去绘制开销）
+            version: 模型版本名称，None 时按流量分配选择
+            
+        Returns:
+            Tuple: 检测结果列表、标注后的图像（annotate=False 时为 None）、详细检测信息和图像信息
+        """
+        return self.predict_batch([image], confidence_threshold, annotate, version)[0]
+    
+    def predict_batch(self, images: List[np.ndarray], confidence_threshold: float = 0.5, annotate: bool = True,
+                      version: Optional[str] = None) -> List[Tuple[List[Dict], Optional[np.ndarray], List[Dict], Dict]]:
+        """
+        批量检测多张图像，所有图像在一次前向推理中完成
+        
+        ultralytics 会将N张图像分别letterbox到统一输入尺寸后堆叠成一个batch张量，
+        只执行一次前向推理。
+        
+        Args:
+            images: BGR格式的图像列表
+            confidence_threshold: 置信度阈值
+            annotate: 是否绘制标注图像（只需要检测结果时传 False，省去绘制开销）
+            version: 模型版本名称，None 时按流量分配选择（同一批次的图像使用同一版本）
+            
+        Returns:
+            List[Tuple]: 与输入顺序一致的（检测结果列表、标注后的图像、详细检测信息、图像信息）
+        """
+        if not images:
+            return []
+        
+        # 惰性初始化（线程安全）并选定模型版本
+        entry = self.select_model(version)
+        
+        # 使用线程锁保护推理过程
+        with self._inference_lock:
+            results = entry.model(list(images), conf=confidence_threshold, verbose=False)
+        
+        return [
+            self._annotate_result(result, image, entry.class_names, annotate)
+            for result, image in zip(results, images)
+        ]
+    
+    @staticmethod
+    def _class_name(class_id: int, class_names: Tuple[str, ...]) -> str:
+        """获取类别名称（所用模型版本的只读类别名称）"""
+        return class_names[class_id] if class_id < len(class_names) else f"未知类别_{class_id}"
+    
+    def _annotate_result(self, result, image: np.ndarray, class_names: Tuple[str, ...],
+                         annotate: bool = True) -> Tuple[List[Dict], Optional[np.ndarray], List[Dict], Dict]:
+        """
+        解析单张图像的推理结果并绘制边界框
+        
+        Args:
+            result: ultralytics 单张图像的推理结果
+            image: 对应的原始BGR图像（不会被修改）
+            class_names: 所用模型版本的类别名称
+            annotate: 是否绘制标注图像
+            
+        Returns:
+            Tuple: 检测结果列表、标注后的图像（annotate=False 时为 None）、详细检测信息和图像信息
+        """
+        # 获取图像尺寸
+        height, width = image.shape[:2]
+        
+        # 检测框整体转换为数组，几何信息批量计算
+        xyxy, confidences, class_ids = result_arrays(result)
+        geometry = box_geometry(xyxy, width, height)
+        box_names = [self._class_name(class_id, class_names) for class_id in class_ids.tolist()]
+        
+        # 详细的检测信息，类似cow_detection_tool（数组一次性转换为Python列表）
+        detailed_detections = [
+            {
+                "class_name": class_name,
+                "confidence": confidence,
+                "bbox": bbox,
+                "center": center,
+                "size": {"width": box_width, "height": box_height, "area": area},
+                "relative_position": {"x": relative[0], "y": relative[1]}  # 相对位置 (0-1)
+            }
+            for class_name, confidence, bbox, center, box_width, box_height, area, relative in zip(
+                box_names, confidences.tolist(), xyxy.tolist(), geometry["center"].tolist(),
+                geometry["width"].tolist(), geometry["height"].tolist(), geometry["area"].tolist(),
+                geometry["relative_center"].tolist()
+            )
+        ]
+        
+        result_image = None
+        if annotate:
+            # 创建图像副本用于绘制边界框和标签
+            result_image = image.copy()
+            for detection in detailed_detections:
+                x1, y1, x2, y2 = (int(value) for value in detection["bbox"])
+                cv2.rectangle(result_image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                label = f"{detection['class_name']}: {detection['confidence']:.2f}"
+                cv2.putText(result_image, label, (x1, y1 - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+        
+        # 转换为API期望的格式: 包含name和count的字典列表
+        api_detections = count_by_name(class_ids, lambda class_id: self._class_name(class_id, class_names))
         
-        return models
+        # 添加图像尺寸信息到响应中
+        image_info = {
+            "width": width,
+            "height": height,
+            "total_cows": len(detailed_detections)
+        }
+        
+        return api_detections, result_image, detailed_detections, image_info
+    
+    def get_available_models(self) -> List[Dict[str, Any]]:
+        """获取已加载的模型版本列表（来自模型注册表，is_default 表示流量权重最大的版本）"""
+        status = self.registry.status()
+        primary = max(status["traffic"], key=status["traffic"].get) if status["traffic"] else None
+        return [
+            {
+                **version,
+                "description": "YOLOv8 牛检测模型",
+                "is_default": version["name"] == primary,
+                "size": f"{os.path.getsize(version['path']) / 1024 / 1024:.1f}MB"
+                if os.path.exists(version["path"]) else None,
+            }
+            for version in status["versions"]
+        ]
 
 
 # 创建全局模型服务实例
@@ -395,4 +649,37 @@ class ModelService:
 # 2. 推理过程使用线程锁保护
 # 3. 类别名称使用不可变元组
 # 4. 所有方法内部只使用局部变量
-model_service = ModelService()
\ No newline at end of file
+model_service = ModelService()
+
+# 模型就绪状态：服务启动时在后台加载并预热模型，完成后 /ready 返回 200
+readiness = Readiness(name="cow-model")
+
+# 单图检测请求的微批处理调度器：并发请求合并为一次批量推理，并在独立线程中执行
+inference_batcher = MicroBatcher(
+    model_service.predict_batch,
+    max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+    window_ms=settings.MICRO_BATCH_WINDOW_MS,
+    name="cow-inference",
+)
+
+# 请求处理线程池：解码和结果编码在线程池中执行，并限制处理中和排队的请求数
+worker_pool = WorkerPool(
+    max_concurrency=settings.WORKER_MAX_CONCURRENCY,
+    max_queue=settings.WORKER_MAX_QUEUE,
+    retry_after=settings.BUSY_RETRY_AFTER,
+    name="cow-worker",
+)
+
+# 流式视频检测的并发限制：长视频单独占用线程，不占用图片请求的处理槽位，满载时直接返回503
+video_pool = WorkerPool(
+    max_concurrency=settings.VIDEO_MAX_CONCURRENCY,
+    max_queue=0,
+    retry_after=settings.BUSY_RETRY_AFTER,
+    name="cow-video",
+)
+
+# 检测结果缓存：相同图片字节、模型版本和检测参数的重复请求直接返回缓存结果
+result_cache = ResultCache(
+    max_mb=settings.RESULT_CACHE_MAX_MB,
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+)
@@ -13,6 +13,8 @@ os.chdir(script_dir)
 if not os.path.exists('/app'):  # 本地环境
     project_root = Path(__file__).parent.parent.parent.parent.parent
     sys.path.insert(0, str(project_root))
+    # 共享工具包 detector_common 位于 src/algorithms 下（Docker 环境中位于 /app 下）
+    sys.path.insert(0, str(project_root / "src" / "algorithms"))
 
 import uvicorn
 
@@ -28,6 +28,8 @@ def start_server(host=None, port=None, reload=None, workers=None):
     port = port or settings.PORT
     reload = reload if reload is not None else True  # 默认开启热重载
     workers = workers or 1  # 默认使用单进程
+    # 多进程时工作进程拒绝在线修改模型注册表（注册表不在进程间共享）
+    os.environ["DETECTOR_WORKER_COUNT"] = str(workers if not reload else 1)
     
     print(f"启动牛检测API服务...")
     print(f"服务地址: http://{host}:{port}")
@@ -0,0 +1,9 @@
+"""
+检测服务共用工具包
+
+害虫、牛只、大米三个检测服务共用的工具模块（上传、解码、推理后端、微批处理、线程池、
+模型注册表、就绪状态、结果缓存、结果图片、后处理、切片推理、多目标跟踪）。
+
+检测服务以顶层 app 包运行时（Docker / 监督器），本包以顶层 detector_common 导入；
+按 src.algorithms.* 完整路径运行时（统一主机、测试），本包以 src.algorithms.detector_common 导入。
+"""
@@ -0,0 +1,239 @@
+"""
+YOLO 推理后端
+
+支持 PyTorch（默认）、ONNX Runtime 和 OpenVINO 三种 CPU 推理后端：
+- 非 PyTorch 后端首次加载时把 .pt 权重导出为对应格式，并缓存在权重文件旁边
+- 权重所在目录只读（如以 :ro 挂载的模型卷）时，导出到 cache_dir
+- 权重文件更新后（修改时间晚于导出文件）自动重新导出
+- 导出后仍通过 ultralytics.YOLO 加载，检测结果对象与 PyTorch 后端一致，解析代码无需改动
+- 可离线把 ONNX 模型静态量化为 INT8（需要校准图片目录），服务按配置选择 FP32 或 INT8 模型
+"""
+import glob
+import os
+import shutil
+import threading
+from typing import Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+
+BACKEND_TORCH = "torch"
+BACKEND_ONNX = "onnx"
+BACKEND_OPENVINO = "openvino"
+BACKENDS = (BACKEND_TORCH, BACKEND_ONNX, BACKEND_OPENVINO)
+
+PRECISION_FP32 = "fp32"
+PRECISION_INT8 = "int8"
+PRECISIONS = (PRECISION_FP32, PRECISION_INT8)
+
+# INT8 量化模型相对于权重文件的后缀
+_INT8_SUFFIX = "_int8.onnx"
+_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+# 导出产物相对于权重文件的后缀（ONNX 为单个文件，OpenVINO 为目录）
+_EXPORT_SUFFIXES = {
+    BACKEND_ONNX: ".onnx",
+    BACKEND_OPENVINO: "_openvino_model",
+}
+
+# 同一进程内同一权重只导出一次
+_export_lock = threading.Lock()
+
+
+def exported_model_path(weights_path: str, backend: str) -> str:
+    """返回权重文件旁边的导出产物路径"""
+    stem, _ = os.path.splitext(weights_path)
+    return stem + _EXPORT_SUFFIXES[backend]
+
+
+def _is_fresh(exported_path: str, weights_path: str) -> bool:
+    """导出产物存在且不早于权重文件"""
+    return os.path.exists(exported_path) and os.path.getmtime(exported_path) >= os.path.getmtime(weights_path)
+
+
+def export_model(weights_path: str, backend: str, imgsz: int = 640,
+                 cache_dir: Optional[str] = None) -> str:
+    """
+    把 .pt 权重导出为指定后端的格式（已有最新的导出产物时直接复用）
+
+    Args:
+        weights_path: .pt 权重文件路径
+        backend: onnx 或 openvino
+        imgsz: 导出的输入尺寸（批大小和图像尺寸为动态维度）
+        cache_dir: 权重目录不可写时的导出目录
+
+    Returns:
+        str: 导出产物路径
+    """
+    if backend not in _EXPORT_SUFFIXES:
+        raise ValueError(f"不支持的推理后端: {backend}，可选: {', '.join(BACKENDS)}")
+
+    with _export_lock:
+        source_path = weights_path
+        exported_path = exported_model_path(weights_path, backend)
+        if _is_fresh(exported_path, weights_path):
+            return exported_path
+
+        # 权重目录只读时，把权重复制到缓存目录后在那里导出
+        if not os.access(os.path.dirname(os.path.abspath(weights_path)), os.W_OK):
+            if not cache_dir:
+                raise PermissionError(f"权重目录不可写且未配置导出缓存目录: {weights_path}")
+            os.makedirs(cache_dir, exist_ok=True)
+            source_path = os.path.join(cache_dir, os.path.basename(weights_path))
+            exported_path = exported_model_path(source_path, backend)
+            if _is_fresh(exported_path, weights_path):
+                return exported_path
+            shutil.copy2(weights_path, source_path)
+
+        from ultralytics import YOLO
+
+        print(f"导出 {backend} 模型: {source_path} -> {exported_path}")
+        exported = YOLO(source_path).export(format=backend, imgsz=imgsz, dynamic=True, verbose=False)
+        return str(exported)
+
+
+def model_version(weights_path: str, backend: str = BACKEND_TORCH, precision: str = PRECISION_FP32) -> str:
+    """模型版本标识（权重文件名、修改时间、推理后端和精度），权重更新后随之变化"""
+    try:
+        mtime = os.stat(weights_path).st_mtime_ns
+    except OSError:
+        mtime = 0
+    return f"{os.path.basename(weights_path)}:{mtime}:{backend}:{precision}"
+
+
+def quantized_model_path(weights_path: str) -> str:
+    """返回权重文件旁边的 INT8 量化模型路径"""
+    stem, _ = os.path.splitext(weights_path)
+    return stem + _INT8_SUFFIX
+
+
+def find_quantized_model(weights_path: str, cache_dir: Optional[str] = None) -> Optional[str]:
+    """查找不早于权重文件的 INT8 量化模型（权重旁边或导出缓存目录），不存在时返回 None"""
+    candidates = [quantized_model_path(weights_path)]
+    if cache_dir:
+        candidates.append(quantized_model_path(os.path.join(cache_dir, os.path.basename(weights_path))))
+    for candidate in candidates:
+        if _is_fresh(candidate, weights_path):
+            return candidate
+    return None
+
+
+def list_images(image_dir: str, limit: Optional[int] = None) -> List[str]:
+    """按文件名排序列出目录下的图片"""
+    paths = sorted(
+        path for path in glob.glob(os.path.join(image_dir, "*"))
+        if path.lower().endswith(_IMAGE_EXTENSIONS)
+    )
+    return paths[:limit] if limit else paths
+
+
+def letterbox(image: np.ndarray, imgsz: int) -> np.ndarray:
+    """
+    与 ultralytics 一致的等比缩放加灰边填充，返回 1x3xHxW 的 float32 输入张量
+
+    Args:
+        image: BGR 图像
+        imgsz: 输入尺寸（正方形）
+    """
+    height, width = image.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    new_height, new_width = round(height * scale), round(width * scale)
+    resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - new_height) // 2, (imgsz - new_width) // 2
+    canvas[top:top + new_height, left:left + new_width] = resized
+
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1)[None]  # BGR -> RGB, HWC -> NCHW
+    return np.ascontiguousarray(tensor, dtype=np.float32) / 255.0
+
+
+def _calibration_inputs(image_paths: List[str], input_name: str, imgsz: int) -> Iterator[dict]:
+    for path in image_paths:
+        image = cv2.imread(path)
+        if image is not None:
+            yield {input_name: letterbox(image, imgsz)}
+
+
+def quantize_model(weights_path: str, calib_dir: str, imgsz: int = 640,
+                   cache_dir: Optional[str] = None, max_images: int = 200) -> str:
+    """
+    把 .pt 权重导出为 ONNX 后静态量化为 INT8（离线执行，耗时较长）
+
+    只量化卷积层，检测头的框解码（Sigmoid/Concat 等）保持 FP32，以减小精度损失。
+
+    Args:
+        weights_path: .pt 权重文件路径
+        calib_dir: 校准图片目录（应与线上图片同分布）
+        imgsz: 导出和校准的输入尺寸
+        cache_dir: 权重目录不可写时的导出目录
+        max_images: 最多使用的校准图片数量
+
+    Returns:
+        str: INT8 量化模型路径（与 FP32 ONNX 模型放在同一目录）
+    """
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    image_paths = list_images(calib_dir, max_images)
+    if not image_paths:
+        raise ValueError(f"校准图片目录中没有图片: {calib_dir}")
+
+    fp32_path = export_model(weights_path, BACKEND_ONNX, imgsz, cache_dir)
+    int8_path = quantized_model_path(fp32_path)
+    input_name = onnx.load(fp32_path, load_external_data=False).graph.input[0].name
+
+    class _Reader(CalibrationDataReader):
+        def __init__(self):
+            self._inputs = _calibration_inputs(image_paths, input_name, imgsz)
+
+        def get_next(self):
+            return next(self._inputs, None)
+
+    print(f"量化 INT8 模型: {fp32_path} -> {int8_path}（校准图片 {len(image_paths)} 张）")
+    quantize_static(
+        fp32_path,
+        int8_path,
+        _Reader(),
+        quant_format=QuantFormat.QDQ,
+        op_types_to_quantize=["Conv"],
+        per_channel=True,
+        weight_type=QuantType.QInt8,
+        activation_type=QuantType.QUInt8,
+    )
+    return int8_path
+
+
+def load_yolo(weights_path: str, backend: str = BACKEND_TORCH, imgsz: int = 640,
+              cache_dir: Optional[str] = None, precision: str = PRECISION_FP32):
+    """
+    按推理后端和精度加载 YOLO 模型
+
+    Args:
+        weights_path: .pt 权重文件路径
+        backend: torch、onnx 或 openvino
+        imgsz: 非 PyTorch 后端的导出输入尺寸
+        cache_dir: 权重目录不可写时的导出目录
+        precision: fp32 或 int8（int8 使用离线量化好的 ONNX 模型，忽略 backend）
+
+    Returns:
+        YOLO: 可直接调用推理的模型对象
+    """
+    from ultralytics import YOLO
+
+    if precision not in PRECISIONS:
+        raise ValueError(f"不支持的模型精度: {precision}，可选: {', '.join(PRECISIONS)}")
+
+    if precision == PRECISION_INT8:
+        int8_path = find_quantized_model(weights_path, cache_dir)
+        if int8_path is None:
+            raise FileNotFoundError(
+                f"未找到与权重匹配的 INT8 量化模型: {quantized_model_path(weights_path)}，"
+                f"请先运行 quantize.py 生成"
+            )
+        return YOLO(int8_path, task="detect")
+
+    if backend == BACKEND_TORCH:
+        return YOLO(weights_path)
+    return YOLO(export_model(weights_path, backend, imgsz, cache_dir), task="detect")
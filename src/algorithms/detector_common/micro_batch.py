@@ -0,0 +1,148 @@
+"""
+动态微批处理调度器
+
+在极短的时间窗口内收集并发到达的推理请求，合并为一次批量推理，
+并在独立线程中执行，避免阻塞事件循环；每个调用方通过 future 获取自己的结果。
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class MicroBatcher:
+    """
+    动态微批处理调度器
+
+    - 第一个请求到达后最多等待 window_ms 毫秒，期间到达的请求合并为一个批次
+    - 批次达到 max_batch_size 时立即执行，不再等待
+    - 提交时携带的关键字参数（如置信度阈值）不同的请求分到不同批次
+    - 批量推理函数在专用线程中执行，推理期间到达的请求自然积累成下一个批次
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[..., List[Any]],
+        max_batch_size: int = 8,
+        window_ms: float = 10.0,
+        name: str = "micro-batch",
+    ):
+        """
+        Args:
+            batch_fn: 批量推理函数，接收输入列表及提交时的关键字参数，返回与输入等长、顺序一致的结果列表
+            max_batch_size: 单个批次的最大请求数
+            window_ms: 收集请求的时间窗口（毫秒）
+            name: 推理线程名前缀
+        """
+        self._batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = max(0.0, window_ms) / 1000.0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+
+        # 队列和调度任务绑定在创建它们的事件循环上
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # 统计信息
+        self.total_requests = 0
+        self.total_batches = 0
+        self.max_observed_batch = 0
+
+    async def submit(self, item: Any, **options) -> Any:
+        """
+        提交单个推理请求并等待结果
+
+        Args:
+            item: 单个输入（如解码后的图像）
+            **options: 传给批量推理函数的关键字参数，取值相同的请求才会合并
+
+        Returns:
+            该输入对应的推理结果
+        """
+        queue = self._ensure_started()
+        future = self._loop.create_future()
+        key = tuple(sorted(options.items()))
+        await queue.put((key, options, item, future))
+        self.total_requests += 1
+        return await future
+
+    def use_executor(self, executor: ThreadPoolExecutor) -> None:
+        """改用外部提供的推理线程（如多个检测服务在同一进程中共享推理线程）"""
+        self._executor = executor
+
+    def stats(self) -> Dict[str, Any]:
+        """返回调度器统计信息"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "window_ms": self.window * 1000.0,
+            "total_requests": self.total_requests,
+            "total_batches": self.total_batches,
+            "avg_batch_size": round(self.total_requests / self.total_batches, 2) if self.total_batches else 0.0,
+            "max_observed_batch": self.max_observed_batch,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+    def _ensure_started(self) -> asyncio.Queue:
+        """在当前事件循环上启动调度任务（事件循环变化时重新创建）"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run(self._queue))
+        return self._queue
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        """调度循环：收集一个批次，按参数分组后执行"""
+        while True:
+            batch = [await queue.get()]
+            deadline = time.monotonic() + self.window
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    # 窗口已结束，只取走已在队列中的请求
+                    if queue.empty():
+                        break
+                    batch.append(queue.get_nowait())
+                    continue
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            groups: Dict[Tuple, List[Tuple]] = {}
+            for request in batch:
+                groups.setdefault(request[0], []).append(request)
+
+            for requests in groups.values():
+                await self._execute(requests)
+
+    async def _execute(self, requests: List[Tuple]) -> None:
+        """在推理线程中执行一个批次，并把结果分发给各调用方"""
+        # 调用方已取消（如客户端断开）的请求不再参与推理
+        requests = [request for request in requests if not request[3].done()]
+        if not requests:
+            return
+
+        options = requests[0][1]
+        items = [request[2] for request in requests]
+        self.total_batches += 1
+        self.max_observed_batch = max(self.max_observed_batch, len(items))
+
+        try:
+            results = await self._loop.run_in_executor(
+                self._executor, partial(self._batch_fn, items, **options)
+            )
+            if len(results) != len(items):
+                raise RuntimeError(f"批量推理返回 {len(results)} 个结果，期望 {len(items)} 个")
+        except Exception as e:
+            for request in requests:
+                if not request[3].done():
+                    request[3].set_exception(e)
+            return
+
+        for request, result in zip(requests, results):
+            if not request[3].done():
+                request[3].set_result(result)
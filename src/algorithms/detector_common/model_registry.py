@@ -0,0 +1,315 @@
+"""
+版本化模型注册表
+
+检测服务同时持有多个命名的模型版本：新版本在后台线程中加载并预热，期间旧版本继续服务；
+预热完成后原子地切换流量（或按权重在多个版本之间分流做 A/B 对比），不再接收流量的旧版本
+可以卸载。季节性更换模型无需重启服务。
+
+注册表只存在于单个进程内。监督器以多个工作进程（prefork）运行服务时，管理请求只会到达
+接收连接的那一个工作进程，因此多进程部署下拒绝修改注册表：更换模型需要修改 MODEL_PATH 后重启，
+或以单个工作进程（DETECTOR_WORKERS=1）运行需要在线切换模型的服务。
+模型管理接口必须配置管理令牌（MODEL_ADMIN_TOKEN）才会启用。
+"""
+import hmac
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+
+# 检测响应中标识所用模型版本的响应头（binary 返回格式时使用）
+MODEL_VERSION_HEADER = "X-Model-Version"
+
+# 服务的工作进程数，由监督器（supervisor.py）在 fork 前写入环境变量
+WORKER_COUNT_ENV = "DETECTOR_WORKER_COUNT"
+
+
+class ModelVersionNotFoundError(LookupError):
+    """请求的模型版本不存在"""
+
+
+def resolve_weights_path(path: str, registry_dir: str) -> str:
+    """
+    解析运行时加载的权重文件路径（相对路径基于 registry_dir），只允许 registry_dir 下的已有文件
+
+    Raises:
+        ValueError: 路径不在 registry_dir 下或文件不存在
+    """
+    root = os.path.realpath(registry_dir)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"权重文件必须位于模型目录 {registry_dir} 下")
+    if not os.path.isfile(resolved):
+        raise ValueError(f"权重文件不存在: {path}")
+    return resolved
+
+
+def worker_count() -> int:
+    """当前服务的工作进程数（不是由监督器以多进程启动时为 1）"""
+    try:
+        return max(1, int(os.getenv(WORKER_COUNT_ENV, "1")))
+    except ValueError:
+        return 1
+
+
+def check_model_admin(token: Optional[str], admin_token: str, modify: bool = False) -> None:
+    """
+    模型管理接口的访问控制
+
+    Args:
+        token: 请求头 X-Admin-Token 的值
+        admin_token: 配置的管理令牌（MODEL_ADMIN_TOKEN）
+        modify: 是否修改注册表（加载、切换、分流、卸载）
+
+    Raises:
+        HTTPException: 未配置管理令牌（403）、令牌无效（401）、多进程部署下修改注册表（409）
+    """
+    if not admin_token:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="未配置 MODEL_ADMIN_TOKEN，模型管理接口已禁用")
+    if not hmac.compare_digest(token or "", admin_token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="无效的管理令牌")
+    workers = worker_count()
+    if modify and workers > 1:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"服务以 {workers} 个工作进程运行，模型注册表不在进程间共享，不支持在线修改；"
+                   f"请修改 MODEL_PATH 后重启，或以单个工作进程运行"
+        )
+
+
+class ModelVersion:
+    """已加载的模型版本（只读）"""
+
+    def __init__(self, name: str, path: str, model: Any, class_names: Tuple[str, ...], version: str):
+        """
+        Args:
+            name: 版本名称（如 default、2025-spring）
+            path: 权重文件路径
+            model: 可直接调用推理的模型对象
+            class_names: 类别名称
+            version: 版本标识（权重文件、修改时间、推理后端和精度），用作结果缓存键的一部分
+        """
+        self.name = name
+        self.path = path
+        self.model = model
+        self.class_names = tuple(class_names)
+        self.version = version
+        self.loaded_at = time.time()
+
+    def info(self) -> Dict[str, Any]:
+        """版本信息（用于状态查询）"""
+        return {
+            "name": self.name,
+            "path": self.path,
+            "version": self.version,
+            "num_classes": len(self.class_names),
+            "loaded_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.loaded_at)),
+        }
+
+
+class ModelRegistry:
+    """
+    线程安全的模型版本注册表
+
+    - load() 同步加载并预热一个版本，load_in_background() 在后台线程中完成
+    - activate() 把全部流量原子地切换到一个版本，set_traffic() 按权重在多个版本之间分流
+    - select() 为单个请求选择版本；同一请求的推理和结果缓存键都使用选出的版本
+    - unload() 卸载不再接收流量的版本
+    - 同名版本重新加载时整体替换，流量立即转到新加载的权重
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Tuple[Any, Tuple[str, ...], str]],
+        warmup: Optional[Callable[[Any], None]] = None,
+        name: str = "model",
+    ):
+        """
+        Args:
+            loader: 按权重路径加载模型，返回 (模型, 类别名称, 版本标识)
+            warmup: 模型加载后、接收流量前执行的预热函数（如一次空白图像推理）
+            name: 后台加载线程名前缀
+        """
+        self._loader = loader
+        self._warmup = warmup
+        self._name = name
+        self._lock = threading.Lock()
+        self._versions: Dict[str, ModelVersion] = {}
+        # 流量权重（版本名 -> 归一化权重），切换时整体替换
+        self._traffic: Dict[str, float] = {}
+        self._loading: Dict[str, str] = {}
+        self._errors: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    @property
+    def has_traffic(self) -> bool:
+        """是否有接收流量的版本"""
+        return bool(self._traffic)
+
+    def add(self, name: str, path: str, model: Any, class_names: Tuple[str, ...], version: str,
+            activate: bool = False) -> ModelVersion:
+        """
+        注册已加载的模型
+
+        Args:
+            name: 版本名称，已存在时整体替换
+            path: 权重文件路径
+            model: 模型对象
+            class_names: 类别名称
+            version: 版本标识
+            activate: 是否把全部流量切换到该版本
+        """
+        entry = ModelVersion(name, path, model, class_names, version)
+        with self._lock:
+            self._versions = {**self._versions, name: entry}
+            self._errors.pop(name, None)
+            if activate:
+                self._traffic = {name: 1.0}
+        return entry
+
+    def load(self, name: str, path: str, activate: bool = False, warmup: bool = True) -> ModelVersion:
+        """
+        同步加载并预热一个版本，预热完成前不接收流量
+
+        Args:
+            warmup: 是否执行预热函数（多进程部署在 fork 前加载权重时传 False，由工作进程各自预热）
+
+        Raises:
+            加载或预热失败时抛出 loader / warmup 的异常
+        """
+        model, class_names, version = self._loader(path)
+        if warmup and self._warmup is not None:
+            self._warmup(model)
+        return self.add(name, path, model, class_names, version, activate)
+
+    def load_in_background(self, name: str, path: str, activate: bool = False) -> threading.Thread:
+        """
+        在后台线程中加载并预热一个版本，期间现有版本继续服务；失败原因记录在 status() 的 errors 中
+
+        Returns:
+            threading.Thread: 加载线程
+
+        Raises:
+            ValueError: 同名版本正在加载
+        """
+        with self._lock:
+            if name in self._loading:
+                raise ValueError(f"模型版本 {name} 正在加载")
+            self._loading[name] = path
+            self._errors.pop(name, None)
+
+        def run():
+            try:
+                self.load(name, path, activate)
+                print(f"模型版本 {name} 加载完成: {path}")
+            except Exception as e:
+                print(f"模型版本 {name} 加载失败: {str(e)}")
+                with self._lock:
+                    self._errors[name] = str(e)
+            finally:
+                with self._lock:
+                    self._loading.pop(name, None)
+
+        thread = threading.Thread(target=run, name=f"{self._name}-load-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def activate(self, name: str) -> None:
+        """把全部流量原子地切换到指定版本"""
+        self.set_traffic({name: 1.0})
+
+    def set_traffic(self, weights: Dict[str, float]) -> None:
+        """
+        按权重在多个版本之间分流（A/B 对比），权重按比例归一化
+
+        Raises:
+            ModelVersionNotFoundError: 版本不存在
+            ValueError: 权重为负或全部为 0
+        """
+        if any(weight < 0 for weight in weights.values()):
+            raise ValueError("流量权重不能为负数")
+        total = sum(weights.values())
+        if total <= 0:
+            raise ValueError("至少需要一个权重大于 0 的版本")
+        with self._lock:
+            missing = [name for name in weights if name not in self._versions]
+            if missing:
+                raise ModelVersionNotFoundError(f"模型版本不存在: {', '.join(missing)}")
+            self._traffic = {name: weight / total for name, weight in weights.items() if weight > 0}
+
+    def select(self) -> ModelVersion:
+        """
+        按流量权重为单个请求选择版本
+
+        Raises:
+            ModelVersionNotFoundError: 没有接收流量的版本
+        """
+        with self._lock:
+            traffic, versions = self._traffic, self._versions
+        if not traffic:
+            raise ModelVersionNotFoundError("没有可用的模型版本")
+        if len(traffic) > 1:
+            point = random.random()
+            for name, weight in traffic.items():
+                point -= weight
+                if point < 0:
+                    return versions[name]
+        return versions[next(reversed(traffic))]
+
+    def get(self, name: str) -> ModelVersion:
+        """按名称获取版本（不受流量分配影响，如指定版本做对比测试）"""
+        entry = self._versions.get(name)
+        if entry is None:
+            raise ModelVersionNotFoundError(f"模型版本不存在: {name}")
+        return entry
+
+    def resolve(self, name: Optional[str] = None) -> ModelVersion:
+        """指定名称时返回该版本，否则按流量权重选择"""
+        return self.select() if name is None else self.get(name)
+
+    def primary(self) -> ModelVersion:
+        """流量权重最大的版本"""
+        with self._lock:
+            traffic, versions = self._traffic, self._versions
+        if not traffic:
+            raise ModelVersionNotFoundError("没有可用的模型版本")
+        return versions[max(traffic, key=traffic.get)]
+
+    def unload(self, name: str) -> None:
+        """
+        卸载不再接收流量的版本
+
+        Raises:
+            ModelVersionNotFoundError: 版本不存在
+            ValueError: 版本仍在接收流量
+        """
+        with self._lock:
+            if name not in self._versions:
+                raise ModelVersionNotFoundError(f"模型版本不存在: {name}")
+            if name in self._traffic:
+                raise ValueError(f"模型版本 {name} 仍在接收流量，请先切换流量")
+            self._versions = {key: value for key, value in self._versions.items() if key != name}
+
+    def status(self) -> Dict[str, Any]:
+        """返回各版本信息、流量分配、加载中的版本和加载失败原因"""
+        with self._lock:
+            versions, traffic = self._versions, self._traffic
+            loading, errors = dict(self._loading), dict(self._errors)
+        items: List[Dict[str, Any]] = [
+            {**entry.info(), "traffic": round(traffic.get(name, 0.0), 4)}
+            for name, entry in versions.items()
+        ]
+        return {
+            "versions": items,
+            "traffic": {name: round(weight, 4) for name, weight in traffic.items()},
+            "loading": loading,
+            "errors": errors,
+            # 注册表按进程保存：标明返回的是哪个工作进程的状态
+            "worker_pid": os.getpid(),
+            "workers": worker_count(),
+        }
@@ -0,0 +1,85 @@
+"""
+YOLO 检测结果后处理（向量化）
+
+逐框访问 result.boxes（box.conf[0]、box.cls[0]、box.xyxy[0].cpu().numpy()）时每个框都有
+多次张量到 Python 对象的转换，诱虫板这类有数百个框的图片耗时明显。这里每张图片只把
+xyxy/conf/cls 整体转换一次为 NumPy 数组，之后的过滤、按类别计数和几何计算都在数组上完成。
+"""
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+
+def _to_numpy(values) -> np.ndarray:
+    """张量（可能在 GPU 上）或数组转换为 NumPy 数组"""
+    if hasattr(values, "cpu"):
+        values = values.cpu()
+    if hasattr(values, "numpy"):
+        return values.numpy()
+    return np.asarray(values)
+
+
+def result_arrays(result) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    取出单张图片推理结果的检测框数组
+
+    Args:
+        result: ultralytics 单张图片的推理结果
+
+    Returns:
+        Tuple: xyxy 检测框 (N, 4)、置信度 (N,) 和类别ID (N,)；没有检测框时为空数组
+    """
+    boxes = getattr(result, "boxes", None)
+    if boxes is None or len(boxes) == 0:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=int)
+    xyxy = _to_numpy(boxes.xyxy).reshape(-1, 4)
+    confidences = _to_numpy(boxes.conf).reshape(-1)
+    class_ids = _to_numpy(boxes.cls).reshape(-1).astype(int)
+    return xyxy, confidences, class_ids
+
+
+def filter_by_confidence(xyxy: np.ndarray, confidences: np.ndarray, class_ids: np.ndarray,
+                         threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """保留置信度不低于阈值的检测框"""
+    mask = confidences >= threshold
+    return xyxy[mask], confidences[mask], class_ids[mask]
+
+
+def count_by_name(class_ids: np.ndarray, name_of: Callable[[int], str]) -> List[Dict]:
+    """
+    按类别名称统计数量
+
+    Args:
+        class_ids: 类别ID数组
+        name_of: 类别ID到显示名称的映射（多个类别映射到同一名称时数量合并）
+
+    Returns:
+        List[Dict]: 按类别ID顺序排列的 {"name", "count"} 列表
+    """
+    if len(class_ids) == 0:
+        return []
+    counts = np.bincount(class_ids)
+    name_counts: Dict[str, int] = {}
+    for class_id in np.flatnonzero(counts).tolist():
+        name = name_of(class_id)
+        name_counts[name] = name_counts.get(name, 0) + int(counts[class_id])
+    return [{"name": name, "count": count} for name, count in name_counts.items()]
+
+
+def box_geometry(xyxy: np.ndarray, image_width: int, image_height: int) -> Dict[str, np.ndarray]:
+    """
+    批量计算检测框的几何信息
+
+    Returns:
+        Dict: width、height、area (N,)，center (N, 2) 和相对图像尺寸的中心位置 relative_center (N, 2)
+    """
+    widths = xyxy[:, 2] - xyxy[:, 0]
+    heights = xyxy[:, 3] - xyxy[:, 1]
+    centers = (xyxy[:, :2] + xyxy[:, 2:]) / 2
+    return {
+        "width": widths,
+        "height": heights,
+        "area": widths * heights,
+        "center": centers,
+        "relative_center": centers / np.array([image_width, image_height], dtype=np.float64),
+    }
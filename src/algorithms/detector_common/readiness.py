@@ -0,0 +1,118 @@
+"""
+模型就绪状态（readiness）
+
+检测服务启动后在后台线程中加载模型权重，并按生产输入尺寸执行几次空白图像推理，
+把权重加载、首次推理的算子选择和内存分配等冷启动开销放在接收流量之前。
+
+- /health 只表示进程存活（liveness），服务启动后立即返回 200
+- /ready 在预热完成前返回 503、完成后返回 200，容器健康检查和负载均衡据此放行流量
+- 预热失败（例如权重文件暂时不可读）时按指数退避重试，恢复后 /ready 自动变为 200；
+  持续失败时 /ready 一直返回 503，由编排器（容器健康检查）重启容器
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+
+class Readiness:
+    """线程安全的模型预热与就绪状态"""
+
+    PENDING = "pending"
+    WARMING = "warming"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, name: str = "model", retry_delay: float = 5.0, max_retry_delay: float = 300.0,
+                 max_attempts: Optional[int] = None):
+        """
+        Args:
+            name: 预热线程名前缀
+            retry_delay: 预热失败后首次重试的等待秒数，之后每次翻倍
+            max_retry_delay: 重试等待秒数的上限
+            max_attempts: 最多尝试次数，None 表示一直重试直到成功或服务关闭
+        """
+        self._name = name
+        self._retry_delay = retry_delay
+        self._max_retry_delay = max_retry_delay
+        self._max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._state = self.PENDING
+        self._error: Optional[str] = None
+        self._seconds: Optional[float] = None
+        self._attempts = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        """预热是否已完成"""
+        return self._state == self.READY
+
+    def start(self, warmup: Callable[[], None]) -> threading.Thread:
+        """
+        在后台线程中执行预热，不阻塞服务启动；重复调用时返回已启动的线程
+
+        Args:
+            warmup: 预热函数（加载模型并执行若干次推理），抛出异常时状态为 failed 并在退避后重试
+        """
+        with self._lock:
+            if self._thread is None:
+                self._state = self.WARMING
+                self._thread = threading.Thread(
+                    target=self._run, args=(warmup,), name=f"{self._name}-warmup", daemon=True
+                )
+                self._thread.start()
+            return self._thread
+
+    def stop(self) -> None:
+        """停止失败后的重试（服务关闭时调用）"""
+        self._stopped.set()
+
+    def _run(self, warmup: Callable[[], None]) -> None:
+        delay = self._retry_delay
+        while True:
+            started = time.perf_counter()
+            with self._lock:
+                self._state = self.WARMING
+                self._attempts += 1
+                attempts = self._attempts
+            try:
+                warmup()
+                state, error = self.READY, None
+                print(f"模型预热完成，耗时 {time.perf_counter() - started:.2f} 秒")
+            except Exception as e:
+                state, error = self.FAILED, str(e)
+                print(f"模型预热失败（第 {attempts} 次）: {error}")
+            with self._lock:
+                self._state = state
+                self._error = error
+                self._seconds = round(time.perf_counter() - started, 2)
+
+            if state == self.READY or attempts == self._max_attempts:
+                return
+            # 等待期间服务关闭则不再重试
+            if self._stopped.wait(delay):
+                return
+            delay = min(delay * 2, self._max_retry_delay)
+
+    def status(self) -> Dict[str, Any]:
+        """返回就绪状态、预热耗时和失败原因"""
+        with self._lock:
+            return {
+                "status": self._state,
+                "ready": self._state == self.READY,
+                "warmup_seconds": self._seconds,
+                "attempts": self._attempts,
+                "error": self._error,
+            }
+
+
+def readiness_response(readiness: Readiness, **extra) -> JSONResponse:
+    """就绪时返回 200，否则返回 503（附带当前状态）"""
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if readiness.ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={**readiness.status(), **extra},
+    )
@@ -0,0 +1,124 @@
+"""
+检测结果缓存
+
+按图片内容哈希（加模型版本和检测参数）缓存检测结果，相同图片的重复请求
+（对话中重复提问、前端重试、多个智能体检测同一张上传图片）直接返回缓存结果，
+不再解码和推理。缓存按最近最少使用淘汰，条目超过有效期后失效，总大小不超过上限。
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class ResultCache:
+    """
+    线程安全的 LRU + TTL 结果缓存
+
+    - 键为图片字节与附加参数的哈希，值为任意结果对象
+    - 写入时由调用方给出条目大小（字节），总大小超过 max_mb 时淘汰最久未使用的条目
+    - 条目写入超过 ttl_seconds 后视为过期
+    - max_mb 小于等于 0 时禁用缓存
+    """
+
+    def __init__(self, max_mb: float = 64.0, ttl_seconds: float = 300.0):
+        """
+        Args:
+            max_mb: 缓存总大小上限（MB）
+            ttl_seconds: 条目有效期（秒）
+        """
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(data: bytes, *parts: Any) -> str:
+        """
+        计算缓存键
+
+        Args:
+            data: 图片文件字节
+            *parts: 影响结果的其他因素（模型版本、置信度阈值等）
+        """
+        digest = hashlib.blake2b(data, digest_size=16)
+        for part in parts:
+            digest.update(b"\x00")
+            digest.update(repr(part).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存结果，未命中或已过期时返回 None（返回的结果对象只读，不要修改）"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key, size)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any, size: int) -> None:
+        """
+        写入缓存结果
+
+        Args:
+            key: 缓存键
+            value: 结果对象
+            size: 结果占用的字节数（估算即可，如标注图片的JPEG大小）
+        """
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size_bytes -= old[1]
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                oldest_key, (_, oldest_size, _) = next(iter(self._entries.items()))
+                self._remove(oldest_key, oldest_size)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """清空缓存（如模型更换后）"""
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "size_mb": round(self.size_bytes / 1024 / 1024, 2),
+            "max_mb": round(self.max_bytes / 1024 / 1024, 2),
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, key: str, size: int) -> None:
+        del self._entries[key]
+        self.size_bytes -= size
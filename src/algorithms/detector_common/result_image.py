@@ -0,0 +1,176 @@
+"""
+检测结果图片工具
+
+负责标注图片的渲染方式（原图 / 缩略图 / 不渲染）、编码以及按不同格式（base64 / 二进制 / URL）交付结果图片
+"""
+import base64
+import hashlib
+import os
+import tempfile
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+# 结果图片的返回格式
+RESULT_FORMAT_BASE64 = "base64"
+RESULT_FORMAT_BINARY = "binary"
+RESULT_FORMAT_URL = "url"
+RESULT_FORMATS = (RESULT_FORMAT_BASE64, RESULT_FORMAT_BINARY, RESULT_FORMAT_URL)
+
+# 结果图片的渲染方式：full 原尺寸标注图，thumbnail 缩小尺寸并降低JPEG质量，
+# none 不绘制、不编码标注图（只需要检测结果的调用方，如智能体和批处理任务）
+RETURN_IMAGE_FULL = "full"
+RETURN_IMAGE_THUMBNAIL = "thumbnail"
+RETURN_IMAGE_NONE = "none"
+RETURN_IMAGE_MODES = (RETURN_IMAGE_FULL, RETURN_IMAGE_THUMBNAIL, RETURN_IMAGE_NONE)
+
+# 二进制返回时，检测结果通过该响应头传递（JSON，ASCII 编码）
+DETECTIONS_HEADER = "X-Detections"
+
+
+def encode_jpeg(image: np.ndarray, quality: int = 95) -> bytes:
+    """
+    将BGR图像编码为JPEG字节
+
+    Args:
+        image: BGR格式的图像
+        quality: JPEG质量（1-100）
+
+    Returns:
+        bytes: JPEG编码后的字节
+    """
+    success, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not success:
+        raise RuntimeError("结果图片编码失败")
+    return buffer.tobytes()
+
+
+def make_thumbnail(image: np.ndarray, max_side: int) -> np.ndarray:
+    """
+    按长边缩小图像（长边不超过 max_side 时原样返回）
+
+    Args:
+        image: BGR格式的图像
+        max_side: 缩略图长边的像素数
+
+    Returns:
+        np.ndarray: 缩小后的图像
+    """
+    height, width = image.shape[:2]
+    scale = max_side / max(height, width)
+    if max_side <= 0 or scale >= 1:
+        return image
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def encode_result_image(
+    image: Optional[np.ndarray],
+    return_image: str = RETURN_IMAGE_FULL,
+    thumbnail_size: int = 320,
+    thumbnail_quality: int = 70,
+) -> Optional[bytes]:
+    """
+    按渲染方式编码标注图片
+
+    Args:
+        image: 标注后的BGR图像（未绘制时为 None）
+        return_image: 渲染方式（full / thumbnail / none）
+        thumbnail_size: thumbnail 模式下缩略图长边的像素数
+        thumbnail_quality: thumbnail 模式下的JPEG质量
+
+    Returns:
+        Optional[bytes]: JPEG字节，none 模式或没有标注图片时为 None
+    """
+    if return_image not in RETURN_IMAGE_MODES:
+        raise ValueError(f"不支持的结果图片渲染方式: {return_image}")
+
+    if return_image == RETURN_IMAGE_NONE or image is None:
+        return None
+    if return_image == RETURN_IMAGE_THUMBNAIL:
+        return encode_jpeg(make_thumbnail(image, thumbnail_size), thumbnail_quality)
+    return encode_jpeg(image)
+
+
+def jpeg_to_base64(jpeg_bytes: bytes) -> str:
+    """将JPEG字节转换为base64字符串"""
+    return base64.b64encode(jpeg_bytes).decode('utf-8')
+
+
+def save_result_image(jpeg_bytes: bytes, results_dir: str) -> str:
+    """
+    按内容哈希保存结果图片，相同内容只写入一次
+
+    Args:
+        jpeg_bytes: JPEG编码后的字节
+        results_dir: 结果图片保存目录
+
+    Returns:
+        str: 保存的文件名（不含目录）
+    """
+    filename = f"{hashlib.sha256(jpeg_bytes).hexdigest()[:32]}.jpg"
+    file_path = os.path.join(results_dir, filename)
+
+    if not os.path.exists(file_path):
+        os.makedirs(results_dir, exist_ok=True)
+        # 先写临时文件再原子替换，避免并发请求读到半写入的文件
+        fd, temp_path = tempfile.mkstemp(dir=results_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(jpeg_bytes)
+            os.replace(temp_path, file_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    return filename
+
+
+def render_result_image(
+    image: np.ndarray,
+    result_format: str,
+    results_dir: str,
+    url_prefix: str,
+) -> Tuple[bytes, str]:
+    """
+    按返回格式交付标注图片
+
+    Args:
+        image: 标注后的BGR图像
+        result_format: 返回格式（base64 / binary / url）
+        results_dir: url 模式下结果图片保存目录
+        url_prefix: url 模式下结果图片的访问路径前缀
+
+    Returns:
+        Tuple[bytes, str]: JPEG字节，以及 base64 字符串或图片 URL（binary 模式为空字符串）
+    """
+    if result_format not in RESULT_FORMATS:
+        raise ValueError(f"不支持的结果图片格式: {result_format}")
+
+    return deliver_result_jpeg(encode_jpeg(image), result_format, results_dir, url_prefix)
+
+
+def deliver_result_jpeg(
+    jpeg_bytes: Optional[bytes],
+    result_format: str,
+    results_dir: str,
+    url_prefix: str,
+) -> Tuple[Optional[bytes], Optional[str]]:
+    """
+    按返回格式交付已编码的标注图片（如来自结果缓存的JPEG字节），参数和返回值同 render_result_image；
+    没有标注图片（return_image=none）时返回 (None, None)
+    """
+    if result_format not in RESULT_FORMATS:
+        raise ValueError(f"不支持的结果图片格式: {result_format}")
+
+    if jpeg_bytes is None:
+        return None, None
+    if result_format == RESULT_FORMAT_BASE64:
+        return jpeg_bytes, jpeg_to_base64(jpeg_bytes)
+    if result_format == RESULT_FORMAT_URL:
+        filename = save_result_image(jpeg_bytes, results_dir)
+        return jpeg_bytes, f"{url_prefix.rstrip('/')}/{filename}"
+    return jpeg_bytes, ""
@@ -0,0 +1,112 @@
+"""
+切片推理（SAHI 风格）
+
+高分辨率的诱虫板和叶片照片（如 4000x3000）整体缩放到模型输入尺寸后，蚜虫、蓟马等
+小目标只剩几个像素而漏检。切片推理把原图切成相互重叠的切片，所有切片（可选再加一张
+整图，用于检出大目标）在一次前向推理中完成检测，切片坐标平移回原图后跨切片合并
+重复框。
+
+切片数量有上限：超过上限时增大切片尺寸，保证单张图片的推理耗时可预期。
+"""
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+# 切片区域 (x1, y1, x2, y2)
+Tile = Tuple[int, int, int, int]
+
+
+def _axis_count(length: int, tile: int, overlap: float) -> int:
+    """单个方向上覆盖 length 需要的切片数"""
+    if tile >= length:
+        return 1
+    step = max(1.0, tile * (1 - overlap))
+    return math.ceil((length - tile) / step) + 1
+
+
+def _axis_starts(length: int, tile: int, count: int) -> List[int]:
+    """单个方向上均匀分布的切片起点（首尾切片贴齐图像边缘）"""
+    if count == 1:
+        return [0]
+    return [round(index * (length - tile) / (count - 1)) for index in range(count)]
+
+
+def tile_grid(width: int, height: int, tile_size: int = 640, overlap: float = 0.2,
+              max_tiles: int = 16) -> List[Tile]:
+    """
+    计算覆盖整张图像的重叠切片
+
+    Args:
+        width: 图像宽度
+        height: 图像高度
+        tile_size: 切片边长（像素），建议与模型输入尺寸一致
+        overlap: 相邻切片的最小重叠比例（0-1）
+        max_tiles: 切片数量上限，超出时按比例增大切片边长
+
+    Returns:
+        List[Tile]: 按行优先排列的切片区域
+    """
+    overlap = min(max(overlap, 0.0), 0.9)
+    max_tiles = max(1, max_tiles)
+    tile = max(1, tile_size)
+
+    while True:
+        tile_w, tile_h = min(tile, width), min(tile, height)
+        count_x = _axis_count(width, tile_w, overlap)
+        count_y = _axis_count(height, tile_h, overlap)
+        if count_x * count_y <= max_tiles or (tile_w == width and tile_h == height):
+            break
+        tile = math.ceil(tile * 1.25)
+
+    xs = _axis_starts(width, tile_w, count_x)
+    ys = _axis_starts(height, tile_h, count_y)
+    return [(x, y, x + tile_w, y + tile_h) for y in ys for x in xs]
+
+
+def merge_detections(boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray,
+                     threshold: float = 0.5) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    跨切片合并重复检测框（按类别的贪心非极大值合并，NMM）
+
+    重叠度使用交集占较小框面积的比例（IoS）：切片边缘被截断的目标框只是完整框的一部分，
+    与完整框的 IoU 很低，但 IoS 接近 1。与 NMS 只保留最高分框不同，这里保留的框会扩展为
+    与其重复的各框的外接框，直到不再有重复框，因此同一目标在多个切片中的截断部分会拼回完整框。
+
+    Args:
+        boxes: 原图坐标系下的 xyxy 检测框，形状 (N, 4)
+        scores: 置信度，形状 (N,)
+        class_ids: 类别ID，形状 (N,)
+        threshold: IoS 超过该值的同类框视为重复
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: 合并后的检测框、置信度和类别ID
+    """
+    if len(boxes) == 0:
+        return boxes.reshape(0, 4), scores, class_ids
+
+    areas = np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+    # 置信度相同时优先保留较大（较完整）的框
+    order = np.lexsort((-areas, -scores))
+    merged_boxes, merged_scores, merged_classes = [], [], []
+    while len(order):
+        best, order = order[0], order[1:]
+        box = boxes[best].copy()
+        while len(order):
+            same_class = order[class_ids[order] == class_ids[best]]
+            if not len(same_class):
+                break
+            inter_w = np.clip(np.minimum(box[2], boxes[same_class, 2]) - np.maximum(box[0], boxes[same_class, 0]), 0, None)
+            inter_h = np.clip(np.minimum(box[3], boxes[same_class, 3]) - np.maximum(box[1], boxes[same_class, 1]), 0, None)
+            box_area = (box[2] - box[0]) * (box[3] - box[1])
+            ios = inter_w * inter_h / np.maximum(np.minimum(box_area, areas[same_class]), 1e-9)
+            duplicates = same_class[ios > threshold]
+            if not len(duplicates):
+                break
+            box[:2] = np.minimum(box[:2], boxes[duplicates, :2].min(axis=0))
+            box[2:] = np.maximum(box[2:], boxes[duplicates, 2:].max(axis=0))
+            order = order[~np.isin(order, duplicates)]
+        merged_boxes.append(box)
+        merged_scores.append(scores[best])
+        merged_classes.append(class_ids[best])
+    return np.array(merged_boxes), np.array(merged_scores), np.array(merged_classes)
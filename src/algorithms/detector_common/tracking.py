@@ -0,0 +1,248 @@
+"""
+多目标跟踪
+
+在逐帧检测结果之上做 ByteTrack/SORT 风格的轨迹关联，为每头牲畜分配稳定的 ID：
+- 运动预测：按轨迹最近的中心点速度（匀速模型）外推检测框
+- 两阶段关联：先用高置信度检测框匹配，再用低置信度检测框补充匹配未匹配的轨迹
+- 稀疏采样时相邻采样帧的检测框可能不重叠，IoU 不足时按中心点距离（以框对角线为单位）兜底匹配
+- 只在同类别之间关联；连续多次未匹配的轨迹结束
+
+统计的是唯一个体数量、停留时长和轨迹，而不是逐帧数量的最大值/平均值，
+因此可以用更稀疏的采样得到可靠的数量。
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def box_iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """两组 xyxy 检测框两两之间的 IoU，形状为 (len(a), len(b))"""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)))
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+class Track:
+    """单条轨迹"""
+
+    def __init__(self, track_id: int, box: np.ndarray, class_id: int, confidence: float, frame_index: int):
+        self.track_id = track_id
+        self.box = box
+        self.class_id = class_id
+        self.velocity = np.zeros(2)  # 中心点每帧位移
+        self.first_frame = frame_index
+        self.last_frame = frame_index
+        self.hits = 1
+        self.missed = 0
+        self.confidence_sum = confidence
+        self.trajectory: List[List[float]] = [[frame_index, *self.center]]
+
+    @property
+    def center(self) -> List[float]:
+        return [float((self.box[0] + self.box[2]) / 2), float((self.box[1] + self.box[3]) / 2)]
+
+    def predict(self, frame_index: int) -> np.ndarray:
+        """按匀速模型外推到指定帧的检测框"""
+        shift = self.velocity * (frame_index - self.last_frame)
+        return self.box + np.array([shift[0], shift[1], shift[0], shift[1]])
+
+    def update(self, box: np.ndarray, confidence: float, frame_index: int) -> None:
+        old_center = np.array(self.center)
+        self.box = box
+        new_center = np.array(self.center)
+        frames = max(1, frame_index - self.last_frame)
+        self.velocity = (new_center - old_center) / frames
+        self.last_frame = frame_index
+        self.hits += 1
+        self.missed = 0
+        self.confidence_sum += confidence
+        self.trajectory.append([frame_index, *self.center])
+
+
+class IoUTracker:
+    """
+    IoU + 运动预测的多目标跟踪器
+
+    每个采样帧调用一次 update()，最后用 summary() 取得唯一个体数量和轨迹信息。
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_center_distance: float = 1.0,
+        high_confidence: float = 0.5,
+        max_missed: int = 3,
+        min_hits: int = 2,
+    ):
+        """
+        Args:
+            iou_threshold: 按 IoU 匹配的最低 IoU
+            max_center_distance: IoU 不足时按中心点距离匹配的最大距离（以轨迹框对角线长度为单位）
+            high_confidence: 第一阶段关联使用的置信度下限，低于它的检测框只用于补充匹配已有轨迹
+            max_missed: 轨迹连续未匹配的采样帧数超过该值后结束
+            min_hits: 至少匹配到多少个采样帧的轨迹才计为一个个体（过滤偶发误检）
+        """
+        self.iou_threshold = iou_threshold
+        self.max_center_distance = max_center_distance
+        self.high_confidence = high_confidence
+        self.max_missed = max_missed
+        self.min_hits = max(1, min_hits)
+        self._active: List[Track] = []
+        self._finished: List[Track] = []
+        self._next_id = 1
+
+    def update(
+        self,
+        frame_index: int,
+        boxes: Sequence[Sequence[float]],
+        confidences: Sequence[float],
+        class_ids: Optional[Sequence[int]] = None,
+    ) -> List[Optional[int]]:
+        """
+        关联一帧的检测结果
+
+        Args:
+            frame_index: 帧号
+            boxes: xyxy 检测框
+            confidences: 置信度
+            class_ids: 类别ID（不提供时视为同一类别）
+
+        Returns:
+            与 boxes 一一对应的轨迹ID；未被采用的低置信度检测框为 None
+        """
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        confidences = np.asarray(confidences, dtype=float).reshape(-1)
+        class_ids = np.zeros(len(boxes), dtype=int) if class_ids is None else np.asarray(class_ids, dtype=int)
+        assigned: List[Optional[int]] = [None] * len(boxes)
+
+        high = [i for i in range(len(boxes)) if confidences[i] >= self.high_confidence]
+        low = [i for i in range(len(boxes)) if confidences[i] < self.high_confidence]
+
+        # 第一阶段：高置信度检测框匹配全部活跃轨迹；第二阶段：低置信度检测框匹配剩余轨迹
+        unmatched_tracks = list(range(len(self._active)))
+        for candidates in (high, low):
+            matches = self._associate(unmatched_tracks, candidates, boxes, class_ids, frame_index)
+            for track_index, det_index in matches:
+                track = self._active[track_index]
+                track.update(boxes[det_index], float(confidences[det_index]), frame_index)
+                assigned[det_index] = track.track_id
+            matched_tracks = {track_index for track_index, _ in matches}
+            unmatched_tracks = [index for index in unmatched_tracks if index not in matched_tracks]
+
+        # 未匹配的高置信度检测框开始新轨迹
+        for det_index in high:
+            if assigned[det_index] is None:
+                track = Track(self._next_id, boxes[det_index], int(class_ids[det_index]),
+                              float(confidences[det_index]), frame_index)
+                self._next_id += 1
+                self._active.append(track)
+                assigned[det_index] = track.track_id
+
+        # 未匹配的轨迹累计丢失次数，超过上限后结束
+        still_active = []
+        for index, track in enumerate(self._active):
+            if index in unmatched_tracks:
+                track.missed += 1
+            if track.missed > self.max_missed:
+                self._finished.append(track)
+            else:
+                still_active.append(track)
+        self._active = still_active
+
+        return assigned
+
+    def _associate(self, track_indices: List[int], det_indices: List[int], boxes: np.ndarray,
+                   class_ids: np.ndarray, frame_index: int) -> List[tuple]:
+        """按相似度从高到低贪心匹配轨迹和检测框"""
+        if not track_indices or not det_indices:
+            return []
+
+        tracks = [self._active[index] for index in track_indices]
+        predicted = np.array([track.predict(frame_index) for track in tracks])
+        candidates = boxes[det_indices]
+
+        iou = box_iou_matrix(predicted, candidates)
+        track_centers = (predicted[:, :2] + predicted[:, 2:]) / 2
+        det_centers = (candidates[:, :2] + candidates[:, 2:]) / 2
+        diagonals = np.hypot(predicted[:, 2] - predicted[:, 0], predicted[:, 3] - predicted[:, 1])
+        distance = np.linalg.norm(track_centers[:, None, :] - det_centers[None, :, :], axis=2)
+        distance = distance / np.maximum(diagonals[:, None], 1e-9)
+
+        # IoU 达标时相似度为 IoU；否则按距离给出一个始终低于 IoU 匹配的相似度
+        similarity = np.where(
+            iou >= self.iou_threshold,
+            iou,
+            np.where(
+                distance <= self.max_center_distance,
+                self.iou_threshold * (1 - distance / max(self.max_center_distance, 1e-9)) * 0.999,
+                -1.0,
+            ),
+        )
+        same_class = np.array([[track.class_id == class_ids[d] for d in det_indices] for track in tracks])
+        similarity = np.where(same_class, similarity, -1.0)
+
+        matches = []
+        while True:
+            row, col = np.unravel_index(np.argmax(similarity), similarity.shape)
+            if similarity[row, col] < 0:
+                break
+            matches.append((track_indices[row], det_indices[col]))
+            similarity[row, :] = -1.0
+            similarity[:, col] = -1.0
+        return matches
+
+    def summary(self, fps: float = 0.0, class_names: Optional[Sequence[str]] = None,
+                include_trajectories: bool = True) -> Dict[str, Any]:
+        """
+        汇总跟踪结果
+
+        Args:
+            fps: 视频帧率，用于把帧号换算为秒（为 0 时不输出时间）
+            class_names: 类别名称列表
+            include_trajectories: 是否输出每条轨迹的中心点序列 [帧号, x, y]
+
+        Returns:
+            dict: 唯一个体数量（总数和按类别）及各轨迹的起止时间、停留时长
+        """
+        tracks = [track for track in self._finished + self._active if track.hits >= self.min_hits]
+        tracks.sort(key=lambda track: track.track_id)
+
+        def to_seconds(frame: int) -> Optional[float]:
+            return round(frame / fps, 3) if fps else None
+
+        counts_by_class: Dict[str, int] = {}
+        track_infos = []
+        for track in tracks:
+            class_name = (
+                class_names[track.class_id]
+                if class_names is not None and track.class_id < len(class_names)
+                else str(track.class_id)
+            )
+            counts_by_class[class_name] = counts_by_class.get(class_name, 0) + 1
+            info = {
+                "track_id": track.track_id,
+                "class_name": class_name,
+                "first_frame": track.first_frame,
+                "last_frame": track.last_frame,
+                "first_time": to_seconds(track.first_frame),
+                "last_time": to_seconds(track.last_frame),
+                "dwell_time": to_seconds(track.last_frame - track.first_frame),
+                "hits": track.hits,
+                "mean_confidence": round(track.confidence_sum / track.hits, 4),
+            }
+            if include_trajectories:
+                info["trajectory"] = [[int(f), round(x, 1), round(y, 1)] for f, x, y in track.trajectory]
+            track_infos.append(info)
+
+        return {
+            "unique_count": len(tracks),
+            "unique_count_by_class": counts_by_class,
+            "tracks": track_infos,
+        }
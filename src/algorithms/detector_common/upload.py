@@ -0,0 +1,146 @@
+"""
+原始字节图片上传工具
+
+支持 multipart/form-data（文件字段名为 file）和 application/octet-stream 两种上传方式，
+直接读取图片字节，省去 base64 编解码和 JSON 解析；
+视频等大文件可边接收边写入唯一的临时文件，不在内存中保留完整内容
+"""
+import asyncio
+import os
+import tempfile
+from typing import BinaryIO
+
+from fastapi import Request
+
+# 复制 multipart 临时文件时每次读写的块大小
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """上传的文件超过大小限制"""
+
+
+class ImageTooLargeError(UploadTooLargeError):
+    """上传的图片超过大小限制"""
+
+
+async def read_image_upload(request: Request, max_size: int, field_name: str = "file") -> bytes:
+    """
+    读取请求中的原始图片字节
+
+    Args:
+        request: FastAPI请求对象
+        max_size: 允许的最大字节数
+        field_name: multipart 上传时的文件字段名
+
+    Returns:
+        bytes: 图片文件的原始字节
+
+    Raises:
+        ImageTooLargeError: 图片超过大小限制
+        ValueError: 请求中没有图片数据
+    """
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get(field_name)
+        if upload is None or isinstance(upload, str):
+            raise ValueError(f"缺少图片文件字段: {field_name}")
+        if upload.size is not None and upload.size > max_size:
+            raise ImageTooLargeError(f"图片大小超过限制（最大{max_size // 1024 // 1024}MB）")
+        image_data = await upload.read()
+    else:
+        # 根据 Content-Length 提前拒绝过大的请求，再边读边检查
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_size:
+            raise ImageTooLargeError(f"图片大小超过限制（最大{max_size // 1024 // 1024}MB）")
+
+        chunks = []
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_size:
+                raise ImageTooLargeError(f"图片大小超过限制（最大{max_size // 1024 // 1024}MB）")
+            chunks.append(chunk)
+        image_data = b"".join(chunks)
+
+    if not image_data:
+        raise ValueError("图片数据为空")
+
+    return image_data
+
+
+def copy_limited(source: BinaryIO, target: BinaryIO, max_size: int) -> int:
+    """
+    按块复制文件内容，超过大小限制时停止（阻塞操作，在线程池中调用）
+
+    Returns:
+        int: 已复制的字节数，超过 max_size 表示文件过大
+    """
+    copied = 0
+    while copied <= max_size:
+        chunk = source.read(COPY_CHUNK_SIZE)
+        if not chunk:
+            break
+        target.write(chunk)
+        copied += len(chunk)
+    return copied
+
+
+async def save_upload_to_file(request: Request, max_size: int, directory: str,
+                              suffix: str = "", field_name: str = "file") -> str:
+    """
+    边接收边把上传文件写入唯一的临时文件（支持分块传输编码）
+
+    Args:
+        request: FastAPI请求对象
+        max_size: 允许的最大字节数
+        directory: 临时文件目录
+        suffix: 临时文件后缀（如 .mp4）
+        field_name: multipart 上传时的文件字段名
+
+    Returns:
+        str: 临时文件路径，由调用方负责删除
+
+    Raises:
+        UploadTooLargeError: 文件超过大小限制
+        ValueError: 请求中没有文件数据
+    """
+    too_large = UploadTooLargeError(f"文件大小超过限制（最大{max_size // 1024 // 1024}MB）")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_size:
+        raise too_large
+
+    os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=directory, suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if request.headers.get("content-type", "").startswith("multipart/form-data"):
+                # multipart 表单由框架先写入临时文件，这里按块复制
+                form = await request.form()
+                upload = form.get(field_name)
+                if upload is None or isinstance(upload, str):
+                    raise ValueError(f"缺少文件字段: {field_name}")
+                if upload.size is not None and upload.size > max_size:
+                    raise too_large
+                await upload.seek(0)
+                # 视频文件较大，复制在线程池中执行，不阻塞事件循环
+                received = await asyncio.to_thread(copy_limited, upload.file, f, max_size)
+            else:
+                received = 0
+                async for chunk in request.stream():
+                    received += len(chunk)
+                    if received > max_size:
+                        raise too_large
+                    # 与 multipart 分支一致，写盘在线程池中执行，不阻塞事件循环
+                    await asyncio.to_thread(f.write, chunk)
+
+        if received == 0:
+            raise ValueError("文件数据为空")
+        if received > max_size:
+            raise too_large
+        return path
+    except BaseException:
+        os.remove(path)
+        raise
@@ -0,0 +1,120 @@
+"""
+有界工作线程池
+
+将图片解码、推理和结果编码等阻塞操作移出事件循环，
+并限制同时处理和排队等待的请求数量，超出时快速返回 503 而不是无限堆积。
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+
+class ServiceBusyError(RuntimeError):
+    """处理中和排队中的请求都已达到上限"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("服务繁忙，请稍后重试")
+        self.retry_after = retry_after
+
+
+class WorkerPool:
+    """
+    有界工作线程池
+
+    - 最多 max_concurrency 个请求同时在线程池中执行
+    - 最多 max_queue 个请求排队等待执行槽位
+    - 两者都已占满时 slot() 立即抛出 ServiceBusyError
+    """
+
+    def __init__(self, max_concurrency: int = 4, max_queue: int = 16,
+                 retry_after: int = 1, name: str = "worker"):
+        """
+        Args:
+            max_concurrency: 同时执行的请求数（同时也是线程数）
+            max_queue: 允许排队等待的请求数
+            retry_after: 繁忙时建议客户端重试的等待秒数
+            name: 线程名前缀
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=name)
+
+        # 信号量绑定在创建它的事件循环上，事件循环变化时重新创建
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        # 计数器只在事件循环线程中修改，无需加锁
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        占用一个执行槽位，期间可通过 run() 在线程池中执行阻塞操作
+
+        Raises:
+            ServiceBusyError: 执行槽位和等待队列都已占满
+        """
+        semaphore = self._get_semaphore()
+        if self.active >= self.max_concurrency and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise ServiceBusyError(self.retry_after)
+
+        self.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        try:
+            yield self
+        finally:
+            self.active -= 1
+            semaphore.release()
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """在线程池中执行阻塞函数并等待结果"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    def use_executor(self, executor: ThreadPoolExecutor) -> None:
+        """改用外部提供的线程池（如多个检测服务在同一进程中共享线程）"""
+        self._executor = executor
+
+    def stats(self) -> Dict[str, int]:
+        """返回线程池统计信息"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._semaphore is None:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+
+def busy_response(error: ServiceBusyError, **extra) -> JSONResponse:
+    """构造 503 繁忙响应，附带 Retry-After 响应头"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "success": False,
+            **extra,
+            "message": str(error)
+        },
+        headers={"Retry-After": str(error.retry_after)}
+    )
@@ -1,18 +1,28 @@
-from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import JSONResponse
-from typing import List, Dict, Any, Union
+from fastapi import APIRouter, Header, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, Response
+from typing import List, Dict, Any, Literal, Optional, Tuple, Union
 
 # 兼容 Docker 和本地环境的导入
 try:
     # Docker 环境：使用相对导入
-    from app.schemas.detection import DetectRequest, DetectResponse, Detection, ErrorResponse
-    from app.services.model_service import model_service
+    from app.schemas.detection import DetectRequest, DetectResponse, Detection, ErrorResponse, BatchDetectRequest, BatchDetectResponse, BatchDetectItem, ModelLoadRequest, ModelTrafficRequest
+    from app.services.model_service import model_service, inference_batcher, worker_pool, result_cache
     from app.core.config import settings
+    from detector_common.result_image import deliver_result_jpeg, encode_result_image, RESULT_FORMAT_BINARY, RESULT_FORMAT_URL, RETURN_IMAGE_FULL, RETURN_IMAGE_NONE, DETECTIONS_HEADER
+    from detector_common.model_registry import check_model_admin, ModelVersionNotFoundError, MODEL_VERSION_HEADER, resolve_weights_path
+    from detector_common.upload import read_image_upload, ImageTooLargeError
+    from detector_common.worker_pool import ServiceBusyError, busy_response
 except ImportError:
     # 本地环境：使用绝对导入
-    from src.algorithms.pest_detection.detector.app.schemas.detection import DetectRequest, DetectResponse, Detection, ErrorResponse
-    from src.algorithms.pest_detection.detector.app.services.model_service import model_service
+    from src.algorithms.pest_detection.detector.app.schemas.detection import DetectRequest, DetectResponse, Detection, ErrorResponse, BatchDetectRequest, BatchDetectResponse, BatchDetectItem, ModelLoadRequest, ModelTrafficRequest
+    from src.algorithms.pest_detection.detector.app.services.model_service import model_service, inference_batcher, worker_pool, result_cache
     from src.algorithms.pest_detection.detector.app.core.config import settings
+    from src.algorithms.detector_common.result_image import deliver_result_jpeg, encode_result_image, RESULT_FORMAT_BINARY, RESULT_FORMAT_URL, RETURN_IMAGE_FULL, RETURN_IMAGE_NONE, DETECTIONS_HEADER
+    from src.algorithms.detector_common.model_registry import check_model_admin, ModelVersionNotFoundError, MODEL_VERSION_HEADER, resolve_weights_path
+    from src.algorithms.detector_common.upload import read_image_upload, ImageTooLargeError
+    from src.algorithms.detector_common.worker_pool import ServiceBusyError, busy_response
+import base64
+import json
 import logging
 import traceback
 from datetime import datetime
@@ -21,6 +31,81 @@ import os
 router = APIRouter()
 
 
+def _build_detect_response(detections: List[Dict], jpeg_bytes: Optional[bytes], result_format: str,
+                           model_version: Optional[str] = None) -> Union[DetectResponse, Response]:
+    """
+    按返回格式构造检测响应（jpeg_bytes 为JPEG编码后的标注图片）
+    
+    - base64: JSON响应，result_image 为base64编码的标注图片
+    - binary: 直接返回JPEG图片，检测结果放在 X-Detections 响应头中
+    - url: JSON响应，result_image_url 为结果图片的访问路径
+    
+    没有标注图片（return_image=none）时任何格式都只返回JSON检测结果；所用模型版本放在 model_version
+    字段（binary 格式为 X-Model-Version 响应头）中
+    """
+    jpeg_bytes, image_ref = deliver_result_jpeg(
+        jpeg_bytes, result_format, settings.RESULTS_DIR, settings.RESULTS_URL_PREFIX
+    )
+    
+    if jpeg_bytes is None:
+        return DetectResponse(success=True, detections=detections, model_version=model_version)
+    if result_format == RESULT_FORMAT_BINARY:
+        return Response(
+            content=jpeg_bytes,
+            media_type="image/jpeg",
+            headers={DETECTIONS_HEADER: json.dumps(detections), MODEL_VERSION_HEADER: model_version or ""}
+        )
+    if result_format == RESULT_FORMAT_URL:
+        return DetectResponse(success=True, detections=detections, result_image_url=image_ref, model_version=model_version)
+    return DetectResponse(success=True, detections=detections, result_image=image_ref, model_version=model_version)
+
+
+def _model_not_found_response(error: ModelVersionNotFoundError) -> JSONResponse:
+    """请求的模型版本不存在时返回 404"""
+    logging.warning(str(error))
+    return JSONResponse(
+        status_code=status.HTTP_404_NOT_FOUND,
+        content={
+            "success": False,
+            "message": str(error)
+        }
+    )
+
+
+async def _detect_image_data(image_data: bytes, tiled: Optional[bool] = None, return_image: str = RETURN_IMAGE_FULL,
+                             model_version: Optional[str] = None) -> Tuple[List[Dict], Optional[bytes], str]:
+    """
+    单图检测（带结果缓存），返回检测结果、JPEG编码后的标注图片（return_image=none 时为 None）和所用模型版本名称
+    
+    模型版本按流量分配选择（或由 model_version 指定），相同图片字节、模型版本、切片模式和渲染方式的
+    重复请求直接返回缓存结果，不再解码、推理和编码；需在 worker_pool.slot() 内调用。
+    
+    切片推理的图片自成一个批次，不进入微批处理调度器；return_image=none 时不绘制、不编码标注图片。
+    推理失败时抛出异常（由接口返回 500），失败结果不会写入缓存。
+    """
+    entry = await worker_pool.run(model_service.select_model, model_version)
+    key = await worker_pool.run(result_cache.make_key, image_data, entry.version, tiled, return_image)
+    cached = result_cache.get(key)
+    if cached is not None:
+        return (*cached, entry.name)
+    
+    annotate = return_image != RETURN_IMAGE_NONE
+    image, use_tiles = await worker_pool.run(model_service.decode_for_detection, image_data, tiled)
+    if use_tiles:
+        detections, annotated_image = await worker_pool.run(model_service.predict_tiled, image, annotate, entry.name)
+    else:
+        detections, annotated_image = await inference_batcher.submit(image, annotate=annotate, version=entry.name)
+    jpeg_bytes = await worker_pool.run(
+        encode_result_image, annotated_image, return_image,
+        settings.THUMBNAIL_MAX_SIDE, settings.THUMBNAIL_JPEG_QUALITY
+    )
+    
+    result = (detections or [], jpeg_bytes)
+    # 不含标注图片的条目按 1KB 估算大小
+    result_cache.put(key, result, len(jpeg_bytes) if jpeg_bytes is not None else 1024)
+    return (*result, entry.name)
+
+
 @router.post(
     "/detect",
     response_model=DetectResponse,
@@ -175,7 +260,7 @@ async def detect_pests(request: DetectRequest) -> Union[DetectResponse, JSONResp
     ## 返回结果
     成功时返回包含以下信息：
     - **detections**: 检测到的害虫列表，包括类型、置信度、位置
-    - **result_image**: 标注了检测框的图像（base64格式）
+    - **result_image**: 标注了检测框的图像（base64格式；`return_image=thumbnail` 时为缩略图，`return_image=none` 时不返回）
     - **message**: 检测结果描述
     
     ## 错误处理
@@ -258,16 +343,25 @@ async def detect_pests(request: DetectRequest) -> Union[DetectResponse, JSONResp
         logging.info(f"开始害虫检测，图像大小: {len(request.image_base64)} 字符")
         
         # 调用模型服务进行检测
-        detections, result_image_b64 = model_service.process_image_from_base64(request.image_base64)
+        async with worker_pool.slot():
+            image_data = await worker_pool.run(base64.b64decode, request.image_base64)
+            detections, jpeg_bytes, version_name = await _detect_image_data(
+                image_data, request.tiled, request.return_image, request.model_version
+            )
+            
+            # 构造成功响应
+            logging.info(f"检测成功，发现 {len(detections)} 种害虫")
+            
+            return await worker_pool.run(
+                _build_detect_response, detections, jpeg_bytes, request.result_format, version_name
+            )
         
-        # 构造成功响应
-        logging.info(f"检测成功，发现 {len(detections)} 种害虫")
+    except ServiceBusyError as e:
+        logging.warning(f"服务繁忙，拒绝请求: {worker_pool.stats()}")
+        return busy_response(e)
         
-        return DetectResponse(
-            success=True,
-            detections=detections or [],
-            result_image=result_image_b64
-        )
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e)
         
     except ValueError as ve:
         # 参数验证错误
@@ -339,6 +433,207 @@ async def detect_pests(request: DetectRequest) -> Union[DetectResponse, JSONResp
         )
 
 
+@router.post(
+    "/detect/upload",
+    response_model=DetectResponse,
+    status_code=status.HTTP_200_OK,
+    summary="🐛 害虫检测（原始字节上传）",
+    description="以 multipart/form-data（字段 file）或 application/octet-stream 直接上传图片进行害虫检测",
+    responses={
+        200: {
+            "description": "检测成功；result_format=binary 时返回 image/jpeg，检测结果位于 X-Detections 响应头",
+            "content": {"image/jpeg": {}}
+        },
+        400: {"description": "图片数据无效"},
+        413: {"description": "图片过大"}
+    },
+    tags=["害虫检测"]
+)
+async def detect_pests_upload(
+    request: Request,
+    result_format: Literal["base64", "binary", "url"] = Query(
+        "base64", description="结果图片返回方式：base64、binary 或 url"
+    ),
+    tiled: Optional[bool] = Query(
+        None, description="是否使用切片推理，不提供时按图片分辨率自动选择"
+    ),
+    return_image: Literal["full", "thumbnail", "none"] = Query(
+        "full", description="结果图片渲染方式：full、thumbnail（缩略图）或 none（只返回检测结果）"
+    ),
+    model_version: Optional[str] = Query(
+        None, description="指定模型版本名称，不提供时按流量分配选择"
+    )
+) -> Union[DetectResponse, Response, JSONResponse]:
+    """
+    # 🐛 害虫检测（原始字节上传）
+    
+    与 `/detect` 功能相同，但直接接收图片文件字节，避免base64膨胀（约33%）和JSON编解码开销，
+    适合大尺寸的田间照片。
+    
+    ## 请求格式
+    - `multipart/form-data`：图片放在 `file` 字段
+    - `application/octet-stream`：请求体即图片文件内容
+    
+    ## 切片推理
+    诱虫板等高分辨率图片（长边达到 `TILED_AUTO_MIN_SIDE`，默认 2000 像素）自动切成重叠切片检测，
+    提高蚜虫、蓟马等小目标的检出率；可用 `tiled=true/false` 强制开启或关闭。返回格式不变。
+    
+    ## 结果图片渲染
+    只需要检测结果时传 `return_image=none`，跳过标注图片的绘制和JPEG编码；
+    `return_image=thumbnail` 返回缩小尺寸、较低质量的标注图片（`THUMBNAIL_MAX_SIDE`、`THUMBNAIL_JPEG_QUALITY`）。
+    
+    ### curl请求示例
+    ```bash
+    curl -X POST "http://localhost:8001/detect/upload?result_format=binary" \\
+         -H "Content-Type: application/octet-stream" \\
+         --data-binary @pest.jpg -D - -o result.jpg
+    ```
+    """
+    try:
+        image_data = await read_image_upload(request, settings.MAX_IMAGE_SIZE)
+        logging.info(f"开始害虫检测（原始字节上传），图像大小: {len(image_data)} 字节")
+        
+        async with worker_pool.slot():
+            detections, jpeg_bytes, version_name = await _detect_image_data(
+                image_data, tiled, return_image, model_version
+            )
+            
+            logging.info(f"检测成功，发现 {len(detections)} 种害虫")
+            
+            return await worker_pool.run(_build_detect_response, detections, jpeg_bytes, result_format, version_name)
+        
+    except ServiceBusyError as e:
+        logging.warning(f"服务繁忙，拒绝请求: {worker_pool.stats()}")
+        return busy_response(e)
+        
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e)
+        
+    except ImageTooLargeError as e:
+        logging.warning(f"图片过大: {str(e)}")
+        return JSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={
+                "success": False,
+                "message": str(e)
+            }
+        )
+        
+    except ValueError as ve:
+        logging.warning(f"参数验证错误: {str(ve)}")
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "success": False,
+                "message": f"输入参数错误: {str(ve)}"
+            }
+        )
+        
+    except Exception as e:
+        logging.error(f"未预期错误: {str(e)}\n{traceback.format_exc()}")
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "success": False,
+                "message": "服务器内部错误，请稍后重试"
+            }
+        )
+
+
+def _detect_batch(images_base64: List[str], result_format: str, return_image: str = RETURN_IMAGE_FULL,
+                  model_version: Optional[str] = None) -> BatchDetectResponse:
+    """
+    批量检测：逐张解码后一次前向推理并编码结果（阻塞操作，在工作线程池中执行），所有图像使用同一模型版本
+    """
+    entry = model_service.select_model(model_version)
+
+    # 逐张解码，解码失败的图像单独记录错误
+    results: List[BatchDetectItem] = [None] * len(images_base64)
+    images = []
+    positions = []
+    for index, image_base64 in enumerate(images_base64):
+        try:
+            images.append(model_service.decode_image(base64.b64decode(image_base64, validate=True)))
+            positions.append(index)
+        except (ValueError, TypeError) as e:
+            results[index] = BatchDetectItem(success=False, message=f"图像解码失败: {str(e)}")
+
+    # 所有可解码的图像在一次前向推理中完成检测
+    batch_results = model_service.predict_batch(images, return_image != RETURN_IMAGE_NONE, entry.name)
+    for index, (detections, annotated_image) in zip(positions, batch_results):
+        jpeg_bytes = encode_result_image(
+            annotated_image, return_image, settings.THUMBNAIL_MAX_SIDE, settings.THUMBNAIL_JPEG_QUALITY
+        )
+        _, image_ref = deliver_result_jpeg(
+            jpeg_bytes, result_format, settings.RESULTS_DIR, settings.RESULTS_URL_PREFIX
+        )
+        if result_format == RESULT_FORMAT_URL:
+            results[index] = BatchDetectItem(success=True, detections=detections, result_image_url=image_ref)
+        else:
+            results[index] = BatchDetectItem(success=True, detections=detections, result_image=image_ref)
+
+    logging.info(f"批量检测完成，成功 {len(positions)}/{len(results)} 张")
+
+    return BatchDetectResponse(success=True, results=results, model_version=entry.name)
+
+
+@router.post(
+    "/detect/batch",
+    response_model=BatchDetectResponse,
+    status_code=status.HTTP_200_OK,
+    summary="🐛 批量害虫检测",
+    description="一次提交多张图像，在一次前向推理中完成检测，按输入顺序返回逐图结果",
+    responses={
+        400: {"model": ErrorResponse, "description": "图片数量超过限制"}
+    },
+    tags=["害虫检测"]
+)
+async def detect_pests_batch(request: BatchDetectRequest) -> Union[BatchDetectResponse, JSONResponse]:
+    """
+    # 🐛 批量害虫检测
+    
+    N张图像会被letterbox到统一尺寸后组成一个batch张量，只执行一次前向推理，
+    适合同一地块连拍的多张照片。
+    
+    - `results` 与 `images_base64` 顺序一一对应
+    - 单张图像解码失败不会影响其他图像，对应条目 `success=false` 并给出 `message`
+    """
+    if len(request.images_base64) > settings.MAX_BATCH_SIZE:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "success": False,
+                "message": f"单次最多检测 {settings.MAX_BATCH_SIZE} 张图片"
+            }
+        )
+    
+    try:
+        logging.info(f"开始批量害虫检测，图片数量: {len(request.images_base64)}")
+        
+        async with worker_pool.slot():
+            return await worker_pool.run(
+                _detect_batch, request.images_base64, request.result_format, request.return_image,
+                request.model_version
+            )
+        
+    except ServiceBusyError as e:
+        logging.warning(f"服务繁忙，拒绝请求: {worker_pool.stats()}")
+        return busy_response(e)
+        
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e)
+        
+    except Exception as e:
+        logging.error(f"未预期错误: {str(e)}\n{traceback.format_exc()}")
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "success": False,
+                "message": "服务器内部错误，请稍后重试"
+            }
+        )
+
+
 @router.get(
     "/supported-pests",
     summary="获取支持的害虫类型列表", 
@@ -450,7 +745,9 @@ async def detailed_health_check():
             model_available = hasattr(model_service, 'model') and model_service.model is not None
             health_status["checks"]["model"] = {
                 "status": "healthy" if model_available else "warning",
-                "message": "模型已加载" if model_available else "模型未加载，首次调用时会自动加载"
+                "message": "模型已加载" if model_available else "模型未加载，首次调用时会自动加载",
+                "backend": settings.INFERENCE_BACKEND,
+                "precision": settings.MODEL_PRECISION
             }
         except Exception as e:
             health_status["checks"]["model"] = {
@@ -459,6 +756,20 @@ async def detailed_health_check():
             }
             health_status["status"] = "unhealthy"
         
+        # 微批处理调度器状态
+        health_status["checks"]["inference_batcher"] = {
+            "status": "healthy",
+            **inference_batcher.stats()
+        }
+        health_status["checks"]["worker_pool"] = {
+            "status": "warning" if worker_pool.waiting >= worker_pool.max_queue else "healthy",
+            **worker_pool.stats()
+        }
+        health_status["checks"]["result_cache"] = {
+            "status": "healthy",
+            **result_cache.stats()
+        }
+        
         # 检查依赖库
         dependencies = []
         try:
@@ -508,4 +819,119 @@ async def detailed_health_check():
                 "timestamp": datetime.now().isoformat(),
                 "error": str(e)
             }
-        )
\ No newline at end of file
+        )
+
+
+def _check_admin_token(token: Optional[str], modify: bool = False) -> None:
+    """校验模型管理接口的 X-Admin-Token 请求头（未配置 MODEL_ADMIN_TOKEN 时接口禁用）"""
+    check_model_admin(token, settings.MODEL_ADMIN_TOKEN, modify)
+
+
+@router.get(
+    "/models",
+    summary="模型版本状态",
+    description="返回已加载的模型版本、流量分配、加载中的版本和加载失败原因",
+    tags=["模型管理"]
+)
+async def get_model_versions(x_admin_token: Optional[str] = Header(None)):
+    """
+    # 🗂️ 模型版本状态
+    
+    - **versions**: 已加载的版本（名称、权重文件、版本标识、类别数、加载时间、流量占比）
+    - **traffic**: 当前流量分配
+    - **loading / errors**: 后台加载中的版本和加载失败原因
+    """
+    _check_admin_token(x_admin_token)
+    return {"success": True, **model_service.registry.status()}
+
+
+@router.post(
+    "/models",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="加载模型版本",
+    description="在后台加载并预热新的模型版本，期间当前版本继续服务",
+    tags=["模型管理"]
+)
+async def load_model_version(request: ModelLoadRequest, x_admin_token: Optional[str] = Header(None)):
+    """
+    # ⏳ 加载模型版本
+    
+    权重文件必须位于模型目录（MODEL_REGISTRY_DIR）下，同目录的 classes.txt 作为该版本的类别文件。
+    加载在后台完成，通过 `GET /models` 查看进度；`activate=true` 时预热完成后全部流量切换到该版本。
+    """
+    _check_admin_token(x_admin_token, modify=True)
+    try:
+        path = resolve_weights_path(request.path, settings.MODEL_REGISTRY_DIR)
+        model_service.registry.load_in_background(request.name, path, request.activate)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"success": False, "message": str(e)}
+        )
+    
+    logging.info(f"开始加载模型版本 {request.name}: {path}")
+    return {"success": True, "message": f"模型版本 {request.name} 正在后台加载"}
+
+
+@router.post(
+    "/models/{name}/activate",
+    summary="切换模型版本",
+    description="把全部流量原子地切换到指定版本",
+    tags=["模型管理"]
+)
+async def activate_model_version(name: str, x_admin_token: Optional[str] = Header(None)):
+    """切换后新请求立即使用该版本，进行中的请求继续使用原版本完成"""
+    _check_admin_token(x_admin_token, modify=True)
+    try:
+        model_service.registry.activate(name)
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e)
+    
+    logging.info(f"全部流量已切换到模型版本 {name}")
+    return {"success": True, **model_service.registry.status()}
+
+
+@router.put(
+    "/models/traffic",
+    summary="模型版本分流",
+    description="按权重在多个模型版本之间分配流量（A/B 对比）",
+    tags=["模型管理"]
+)
+async def set_model_traffic(request: ModelTrafficRequest, x_admin_token: Optional[str] = Header(None)):
+    """权重按比例归一化，例如 {"default": 9, "2025-spring": 1} 把 10% 的请求分给新版本"""
+    _check_admin_token(x_admin_token, modify=True)
+    try:
+        model_service.registry.set_traffic(request.weights)
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"success": False, "message": str(e)}
+        )
+    
+    logging.info(f"模型流量分配已更新: {request.weights}")
+    return {"success": True, **model_service.registry.status()}
+
+
+@router.delete(
+    "/models/{name}",
+    summary="卸载模型版本",
+    description="卸载不再接收流量的模型版本，释放内存",
+    tags=["模型管理"]
+)
+async def unload_model_version(name: str, x_admin_token: Optional[str] = Header(None)):
+    """仍在接收流量的版本需要先切换流量才能卸载"""
+    _check_admin_token(x_admin_token, modify=True)
+    try:
+        model_service.registry.unload(name)
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"success": False, "message": str(e)}
+        )
+    
+    logging.info(f"模型版本 {name} 已卸载")
+    return {"success": True, **model_service.registry.status()}
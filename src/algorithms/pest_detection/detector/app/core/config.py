@@ -17,6 +17,61 @@ class Settings(BaseSettings):
     MODEL_PATH: str = str(DETECTOR_DIR / "models" / "best.pt")
     CLASSES_PATH: str = str(DETECTOR_DIR / "models" / "classes.txt")
     
+    # 模型版本注册表配置：MODEL_PATH 作为默认版本加载，运行时可通过 /models 接口加载新版本并切换流量
+    MODEL_VERSION_NAME: str = "default"  # 默认版本名称
+    MODEL_REGISTRY_DIR: str = str(DETECTOR_DIR / "models")  # 运行时加载的权重文件必须位于该目录下
+    MODEL_ADMIN_TOKEN: str = ""  # 模型管理接口的令牌（X-Admin-Token 请求头），为空时模型管理接口禁用
+    
+    # 推理后端配置：torch（默认）、onnx（ONNX Runtime）或 openvino
+    # 非 torch 后端首次加载时导出模型并缓存在权重文件旁边（权重目录只读时缓存到 EXPORT_CACHE_DIR）
+    INFERENCE_BACKEND: str = "torch"
+    EXPORT_IMGSZ: int = 640
+    EXPORT_CACHE_DIR: str = str(DETECTOR_DIR / "export_cache")
+    # 模型精度：fp32（默认）或 int8（使用 quantize.py 离线生成的 INT8 ONNX 模型，经 ONNX Runtime 推理）
+    MODEL_PRECISION: str = "fp32"
+    
+    # 启动预热配置：服务启动后在后台加载模型并按 EXPORT_IMGSZ 执行 WARMUP_RUNS 次空白图像推理，完成后 /ready 返回 200
+    WARMUP_RUNS: int = 3  # 0 表示只加载权重
+    
+    # 原始字节上传配置
+    MAX_IMAGE_SIZE: int = 50 * 1024 * 1024  # 50MB
+    
+    # 图片解码配置：JPEG 按 1/2、1/4、1/8 缩小解码（长边不小于 DECODE_TARGET_SIZE，0 表示按原始分辨率解码）；
+    # 按文件头声明的尺寸拒绝像素数超过 MAX_IMAGE_PIXELS 的图片（解压炸弹）
+    DECODE_TARGET_SIZE: int = 640
+    MAX_IMAGE_PIXELS: int = 64_000_000
+    
+    # 批量检测配置（单次请求最多的图片数量，所有图片在一次前向推理中完成）
+    MAX_BATCH_SIZE: int = 16
+    
+    # 切片推理配置（高分辨率图片切成重叠切片后一次前向推理，提高小目标检出率）
+    TILED_AUTO_MIN_SIDE: int = 2000  # 图片长边达到该像素数时自动启用切片推理，0 表示不自动启用
+    TILE_SIZE: int = 640  # 切片边长，与模型输入尺寸一致
+    TILE_OVERLAP: float = 0.2  # 相邻切片的重叠比例
+    TILE_MAX_COUNT: int = 16  # 切片数量上限，超出时增大切片边长，保证推理耗时可预期
+    TILE_MERGE_THRESHOLD: float = 0.5  # 跨切片合并重复框的重叠度阈值（交集/较小框面积）
+    TILE_INCLUDE_FULL_IMAGE: bool = True  # 是否同时检测整图（检出跨越多个切片的大目标）
+    
+    # 动态微批处理配置（并发到达的单图请求在时间窗口内合并为一次批量推理）
+    MICRO_BATCH_WINDOW_MS: float = 10.0  # 收集窗口（毫秒），建议 5-20
+    MICRO_BATCH_MAX_SIZE: int = 8  # 单个批次最大请求数
+    
+    # 工作线程池配置（解码、推理、编码等阻塞操作在线程池中执行，不阻塞事件循环）
+    WORKER_MAX_CONCURRENCY: int = 8  # 同时处理的请求数（不小于 MICRO_BATCH_MAX_SIZE，否则批次凑不满）
+    WORKER_MAX_QUEUE: int = 16  # 允许排队等待的请求数，超出时返回503
+    BUSY_RETRY_AFTER: int = 1  # 503响应中 Retry-After 的秒数
+    
+    # 检测结果缓存配置（相同图片、模型版本和参数的重复请求直接返回缓存结果）
+    RESULT_CACHE_MAX_MB: float = 64.0  # 缓存总大小上限（MB），0 表示禁用
+    RESULT_CACHE_TTL_SECONDS: float = 300.0  # 缓存条目有效期（秒）
+    
+    # 结果图片配置（url 返回模式下保存标注图片并通过静态路径访问）
+    RESULTS_DIR: str = str(DETECTOR_DIR / "results")
+    RESULTS_URL_PREFIX: str = "/results"
+    # return_image=thumbnail 时缩略图长边的像素数和JPEG质量
+    THUMBNAIL_MAX_SIDE: int = 320
+    THUMBNAIL_JPEG_QUALITY: int = 70
+    
     # 服务器配置
     HOST: str = "0.0.0.0"
     PORT: int = 8000  # 病虫害检测服务
@@ -34,4 +89,5 @@ class Settings(BaseSettings):
 settings = Settings()
 
 # 确保必要的目录存在
-os.makedirs(settings.DETECTOR_DIR / "models", exist_ok=True)
\ No newline at end of file
+os.makedirs(settings.DETECTOR_DIR / "models", exist_ok=True)
+os.makedirs(settings.RESULTS_DIR, exist_ok=True)
\ No newline at end of file
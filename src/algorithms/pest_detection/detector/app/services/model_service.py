@@ -4,15 +4,39 @@ import base64
 import os
 import threading
 from typing import Dict, List, Tuple, Optional
+import torch
 from ultralytics import YOLO
+from ultralytics.engine.results import Results
 
 # 兼容 Docker 和本地环境的导入
 try:
     # Docker 环境：使用相对导入
     from app.core.config import settings
+    from detector_common.image_decode import decode_image, read_image_size
+    from detector_common.inference_backend import load_yolo, model_version
+    from detector_common.micro_batch import MicroBatcher
+    from detector_common.model_registry import ModelRegistry, ModelVersion
+    from detector_common.readiness import Readiness
+    from detector_common.postprocess import result_arrays, filter_by_confidence, count_by_name
+    from detector_common.result_cache import ResultCache
+    from detector_common.tiling import tile_grid, merge_detections
+    from detector_common.worker_pool import WorkerPool
 except ImportError:
     # 本地环境：使用绝对导入
     from src.algorithms.pest_detection.detector.app.core.config import settings
+    from src.algorithms.detector_common.image_decode import decode_image, read_image_size
+    from src.algorithms.detector_common.inference_backend import load_yolo, model_version
+    from src.algorithms.detector_common.micro_batch import MicroBatcher
+    from src.algorithms.detector_common.model_registry import ModelRegistry, ModelVersion
+    from src.algorithms.detector_common.readiness import Readiness
+    from src.algorithms.detector_common.postprocess import result_arrays, filter_by_confidence, count_by_name
+    from src.algorithms.detector_common.result_cache import ResultCache
+    from src.algorithms.detector_common.tiling import tile_grid, merge_detections
+    from src.algorithms.detector_common.worker_pool import WorkerPool
+
+
+# 低于该置信度的检测框不计入结果
+CONFIDENCE_THRESHOLD = 0.3
 
 
 class ModelService:
@@ -28,8 +52,8 @@ class ModelService:
     
     def __init__(self):
         """初始化模型服务，但不立即加载模型"""
-        self._model: Optional[YOLO] = None
-        self._class_names: List[str] = []
+        # 版本化模型注册表：默认版本惰性加载，新版本可在运行时后台加载并切换流量
+        self.registry = ModelRegistry(self._load_weights, warmup=self._warmup, name="pest-model")
         self._initialized: bool = False
         # 线程锁：保护初始化过程
         self._init_lock = threading.Lock()
@@ -38,7 +62,7 @@ class ModelService:
     
     def _initialize(self):
         """
-        线程安全的惰性初始化模型
+        线程安全的惰性初始化模型（加载 MODEL_PATH 作为默认版本并接收全部流量）
         使用双重检查锁定模式确保只初始化一次
         """
         if self._initialized:
@@ -50,179 +74,326 @@ class ModelService:
                 return
             
             try:
-                # 使用配置中的相对路径
-                # 注意：相对路径基于工作目录（运行 run.py 的目录）
-                model_path = settings.MODEL_PATH
-                classes_path = settings.CLASSES_PATH
-                
-                # 验证文件是否存在
-                if not os.path.exists(model_path):
-                    raise FileNotFoundError(f"模型文件不存在: {model_path}")
-                if not os.path.exists(classes_path):
-                    raise FileNotFoundError(f"类别文件不存在: {classes_path}")
-                
-                # 加载模型
-                self._model = YOLO(model_path)
-                
-                # 加载类别，尝试不同编码
-                class_names: List[str] = []
-                if os.path.exists(classes_path):
-                    encodings = ['utf-8', 'gbk', 'ansi']
-                    for encoding in encodings:
-                        try:
-                            class_names = []  # 重置类别列表
-                            with open(classes_path, 'r', encoding=encoding) as f:
-                                for line in f.readlines():
-                                    line = line.strip()
-                                    if line:
-                                        # 解析格式：英文名称 中文名称（可能有多个空格分隔）
-                                        # 找到最后一个空格的位置，以此分隔中英文
-                                        parts = line.split()
-                                        if len(parts) >= 2:
-                                            # 假设中文部分在最后，前面的都是英文部分
-                                            # 查找最后一个中文字符的位置
-                                            last_chinese_pos = -1
-                                            for i, char in enumerate(line):
-                                                if '\u4e00' <= char <= '\u9fff':  # 中文字符范围
-                                                    last_chinese_pos = i
-                                                    # 一旦找到中文字符，从这里开始就是中文部分
-                                                    break
-                                            
-                                            if last_chinese_pos >= 0:
-                                                # 提取中文名称
-                                                chinese_name = line[last_chinese_pos:].strip()
-                                                class_names.append(chinese_name)
-                                            else:
-                                                # 如果没有找到中文字符，使用整个行作为名称
-                                                class_names.append(line)
-                            
-                            # 验证是否正确加载
-                            if any(class_names):
-                                print(f"使用编码 {encoding} 成功加载类别文件")
-                                break
-                        except UnicodeDecodeError:
-                            continue
-                    else:
-                        # 如果所有编码都失败，使用默认类别名称
-                        print(f"警告: 无法正确解码类别文件，使用默认类别")
-                        class_names = [f"class_{i}" for i in range(5)]  # 假设有5个类别
-                else:
-                    # 如果没有类别文件，使用默认类别
-                    class_names = [f"class_{i}" for i in range(5)]  # 假设有5个类别
-                
-                # 将类别名称转为元组，变成不可变对象
-                self._class_names = tuple(class_names)
-                
-                print(f"已加载 {len(self._class_names)} 个类别")
+                # 运行时已加载并切换了其他版本时不再加载默认版本
+                # 这里只加载不推理：多进程部署在 fork 前加载权重，预热推理由各工作进程的 warm_up_model() 执行
+                if not self.registry.has_traffic:
+                    self.registry.load(settings.MODEL_VERSION_NAME, settings.MODEL_PATH, activate=True, warmup=False)
                 self._initialized = True
             except Exception as e:
                 raise RuntimeError(f"模型初始化失败: {str(e)}")
     
+    @staticmethod
+    def _load_weights(model_path: str) -> Tuple[YOLO, Tuple[str, ...], str]:
+        """
+        加载一个模型版本（模型注册表的加载函数）
+        
+        类别文件优先使用权重文件同目录下的 classes.txt（新版本模型可能增减类别），否则使用 CLASSES_PATH
+        
+        Args:
+            model_path: 权重文件路径
+            
+        Returns:
+            Tuple: 模型、类别名称和版本标识
+        """
+        sibling_classes = os.path.join(os.path.dirname(model_path), "classes.txt")
+        classes_path = sibling_classes if os.path.exists(sibling_classes) else settings.CLASSES_PATH
+        
+        # 验证文件是否存在
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"模型文件不存在: {model_path}")
+        if not os.path.exists(classes_path):
+            raise FileNotFoundError(f"类别文件不存在: {classes_path}")
+        
+        # 加载模型
+        model = load_yolo(
+            model_path, settings.INFERENCE_BACKEND, settings.EXPORT_IMGSZ, settings.EXPORT_CACHE_DIR,
+            settings.MODEL_PRECISION
+        )
+        
+        # 加载类别，尝试不同编码
+        class_names: List[str] = []
+        if os.path.exists(classes_path):
+            encodings = ['utf-8', 'gbk', 'ansi']
+            for encoding in encodings:
+                try:
+                    class_names = []  # 重置类别列表
+                    with open(classes_path, 'r', encoding=encoding) as f:
+                        for line in f.readlines():
+                            line = line.strip()
+                            if line:
+                                # 解析格式：英文名称 中文名称（可能有多个空格分隔）
+                                # 找到最后一个空格的位置，以此分隔中英文
+                                parts = line.split()
+                                if len(parts) >= 2:
+                                    # 假设中文部分在最后，前面的都是英文部分
+                                    # 查找最后一个中文字符的位置
+                                    last_chinese_pos = -1
+                                    for i, char in enumerate(line):
+                                        if '\u4e00' <= char <= '\u9fff':  # 中文字符范围
+                                            last_chinese_pos = i
+                                            # 一旦找到中文字符，从这里开始就是中文部分
+                                            break
+                                    
+                                    if last_chinese_pos >= 0:
+                                        # 提取中文名称
+                                        chinese_name = line[last_chinese_pos:].strip()
+                                        class_names.append(chinese_name)
+                                    else:
+                                        # 如果没有找到中文字符，使用整个行作为名称
+                                        class_names.append(line)
+                    
+                    # 验证是否正确加载
+                    if any(class_names):
+                        print(f"使用编码 {encoding} 成功加载类别文件")
+                        break
+                except UnicodeDecodeError:
+                    continue
+            else:
+                # 如果所有编码都失败，使用默认类别名称
+                print(f"警告: 无法正确解码类别文件，使用默认类别")
+                class_names = [f"class_{i}" for i in range(5)]  # 假设有5个类别
+        else:
+            # 如果没有类别文件，使用默认类别
+            class_names = [f"class_{i}" for i in range(5)]  # 假设有5个类别
+        
+        print(f"已加载 {len(class_names)} 个类别")
+        # 类别名称转为元组，变成不可变对象
+        return model, tuple(class_names), model_version(model_path, settings.INFERENCE_BACKEND, settings.MODEL_PRECISION)
+    
+    @staticmethod
+    def _warmup(model: YOLO) -> None:
+        """新版本接收流量前用空白图像推理一次，完成权重融合、显存分配等首次推理开销"""
+        model(np.zeros((settings.EXPORT_IMGSZ, settings.EXPORT_IMGSZ, 3), dtype=np.uint8), verbose=False)
+    
+    def warm_up_model(self, runs: int = 1) -> None:
+        """
+        加载模型并按生产输入尺寸（EXPORT_IMGSZ）执行 runs 次空白图像的完整检测（含后处理和标注绘制），
+        把首次推理的冷启动开销放在接收流量之前
+        """
+        self._initialize()
+        image = np.zeros((settings.EXPORT_IMGSZ, settings.EXPORT_IMGSZ, 3), dtype=np.uint8)
+        for _ in range(runs):
+            self.predict_batch([image])
+    
+    def select_model(self, name: Optional[str] = None) -> ModelVersion:
+        """
+        为单个请求选择模型版本（按流量权重，或按名称指定版本）
+        
+        Raises:
+            ModelVersionNotFoundError: 指定的版本不存在
+        """
+        self._initialize()
+        return self.registry.resolve(name)
+    
     @property
     def model(self) -> YOLO:
-        """获取模型实例（只读属性）"""
+        """获取模型实例（只读属性，流量权重最大的版本）"""
         self._initialize()
-        return self._model
+        return self.registry.primary().model
+    
+    @property
+    def model_version(self) -> str:
+        """模型版本标识（流量权重最大的版本；尚未加载时按配置计算，不触发模型加载）"""
+        if self._initialized:
+            return self.registry.primary().version
+        return model_version(settings.MODEL_PATH, settings.INFERENCE_BACKEND, settings.MODEL_PRECISION)
     
     @property
     def class_names(self) -> Tuple[str, ...]:
         """获取类别名称列表（只读属性，返回元组确保不可变）"""
         self._initialize()
-        return self._class_names
+        return self.registry.primary().class_names
     
-    def predict(self, image: np.ndarray) -> Tuple[List[Dict], np.ndarray]:
+    def predict(self, image: np.ndarray, annotate: bool = True,
+                version: Optional[str] = None) -> Tuple[List[Dict], Optional[np.ndarray]]:
         """
         使用YOLO模型进行预测（线程安全）
         
         该方法是完全无状态的：
         - 所有中间变量都是局部变量
         - 使用线程锁保护模型推理过程
-        - 输入图像不会被修改（使用副本进行标注）
+        - 输入图像不会被修改（ultralytics 在预处理时生成新的输入张量，标注图像也是新图像）
         - 返回的结果是全新创建的对象
         
         Args:
             image: 输入图像（BGR格式）
+            annotate: 是否绘制标注图像（只需要检测结果时传 False，省去绘制开销）
+            version: 模型版本名称，None 表示按流量权重选择
             
         Returns:
-            Tuple[List[Dict], np.ndarray]: 检测结果（按名称统计数量）和标注后的图像
+            Tuple[List[Dict], Optional[np.ndarray]]: 检测结果（按名称统计数量）和标注后的图像（annotate=False 时为 None）
         """
-        # 惰性初始化（线程安全）
-        self._initialize()
+        return self.predict_batch([image], annotate, version)[0]
+    
+    def predict_batch(self, images: List[np.ndarray], annotate: bool = True,
+                      version: Optional[str] = None) -> List[Tuple[List[Dict], Optional[np.ndarray]]]:
+        """
+        批量预测多张图像（线程安全，单次前向推理）
         
-        # 创建图像副本，确保不修改原始输入
-        image_copy = image.copy()
+        ultralytics 会将N张图像分别letterbox到统一输入尺寸后堆叠成一个batch张量，
+        只执行一次前向推理，相比逐张推理显著减少多图请求的总耗时。
+        
+        Args:
+            images: 输入图像列表（BGR格式）
+            annotate: 是否绘制标注图像（只需要检测结果时传 False，省去绘制开销）
+            version: 模型版本名称，None 表示按流量权重选择（整个批次使用同一版本）
+            
+        Returns:
+            List[Tuple[List[Dict], Optional[np.ndarray]]]: 与输入顺序一致的检测结果和标注后的图像（annotate=False 时为 None）
+            
+        Raises:
+            RuntimeError: 推理失败（不返回空结果，避免被当作"未检测到害虫"缓存）
+        """
+        if not images:
+            return []
+        
+        # 惰性初始化（线程安全）并选择模型版本
+        entry = self.select_model(version)
         
         try:
             # 使用线程锁保护推理过程
             # YOLO模型的推理可能不是线程安全的，需要串行化
             with self._inference_lock:
-                # 进行预测
-                results = self._model(image_copy, verbose=False)  # 关闭详细输出
+                # 进行预测（列表输入为一个batch）
+                results = entry.model(list(images), verbose=False)  # 关闭详细输出
                 
-                # 在锁内获取标注后的图像（results[0].plot()可能修改内部状态）
-                annotated_image = results[0].plot()
+                # 在锁内获取标注后的图像（result.plot()可能修改内部状态）
+                annotated_images = [result.plot() if annotate else None for result in results]
                 
                 # 在锁内解析所有检测结果，使用局部变量
-                local_detections = []
-                for result in results:
-                    if result.boxes is not None:
-                        for box in result.boxes:
-                            # 获取置信度
-                            confidence = float(box.conf[0])
-                            if confidence < 0.3:  # 过滤低置信度结果
-                                continue
-                            
-                            # 获取类别ID
-                            class_id = int(box.cls[0])
-                            
-                            # 获取类别名称（使用只读属性）
-                            class_names = self._class_names
-                            if class_id < len(class_names):
-                                class_name = class_names[class_id]
-                                # 确保名称有效
-                                if not isinstance(class_name, str) or len(class_name.strip()) == 0:
-                                    class_name = f"未知类别_{class_id}"
-                            else:
-                                class_name = f"未知类别_{class_id}"
-                            
-                            local_detections.append({
-                                "class_id": class_id,
-                                "class_name": class_name,
-                                "confidence": confidence
-                            })
+                batch_class_ids = [self._parse_result(result) for result in results]
             
             # 以下操作在锁外进行，使用纯局部变量
-            # 统计每种害虫的数量（使用局部字典）
-            pest_counts: Dict[str, int] = {}
-            for det in local_detections:
-                class_name = det["class_name"]
-                if class_name in pest_counts:
-                    pest_counts[class_name] += 1
-                else:
-                    pest_counts[class_name] = 1
-            
-            # 转换为列表格式（创建全新的列表对象）
-            detections = [
-                {
-                    "name": name,
-                    "count": count
-                }
-                for name, count in pest_counts.items()
+            return [
+                (self._count_detections(class_ids, entry.class_names), annotated_image)
+                for class_ids, annotated_image in zip(batch_class_ids, annotated_images)
             ]
+        except Exception as e:
+            print(f"预测过程中出错: {str(e)}")
+            # 抛出异常由接口返回 500：推理失败不能当作"未检测到害虫"返回和缓存
+            raise RuntimeError(f"模型推理失败: {str(e)}") from e
+    
+    @staticmethod
+    def _parse_result(result) -> np.ndarray:
+        """
+        解析单张图像的YOLO推理结果（整体转换为数组，不逐框访问张量）
+        
+        Args:
+            result: ultralytics 单张图像的推理结果
             
-            total_count = sum(pest_counts.values())
-            print(f"检测到 {len(detections)} 种害虫，共 {total_count} 个目标")
-            if detections:
-                for det in detections:
-                    print(f"  {det['name']}: {det['count']}个")
-            else:
-                print("未检测到任何目标")
+        Returns:
+            np.ndarray: 过滤低置信度后的检测框类别ID
+        """
+        _, _, class_ids = filter_by_confidence(*result_arrays(result), CONFIDENCE_THRESHOLD)
+        return class_ids
+    
+    @staticmethod
+    def _class_name(class_id: int, class_names: Tuple[str, ...]) -> str:
+        """获取类别名称（模型版本的只读类别名称），无效时返回“未知类别_ID”"""
+        if class_id < len(class_names):
+            class_name = class_names[class_id]
+            # 确保名称有效
+            if isinstance(class_name, str) and len(class_name.strip()) > 0:
+                return class_name
+        return f"未知类别_{class_id}"
+    
+    @staticmethod
+    def should_tile(width: int, height: int, tiled: Optional[bool] = None) -> bool:
+        """
+        是否对图像使用切片推理
+        
+        Args:
+            width: 图像原始宽度
+            height: 图像原始高度
+            tiled: 请求指定的模式；None 表示按分辨率自动选择（长边达到 TILED_AUTO_MIN_SIDE）
+        """
+        if tiled is not None:
+            return tiled
+        return 0 < settings.TILED_AUTO_MIN_SIDE <= max(width, height)
+    
+    def predict_tiled(self, image: np.ndarray, annotate: bool = True,
+                      version: Optional[str] = None) -> Tuple[List[Dict], Optional[np.ndarray]]:
+        """
+        切片推理（线程安全），返回与 predict() 相同格式的检测结果和标注后的图像
+        
+        图像切成相互重叠的切片（数量不超过 TILE_MAX_COUNT），所有切片和整图在一次
+        前向推理中完成检测；切片中的检测框平移回原图坐标后，跨切片合并重复框。
+        
+        Args:
+            image: 输入图像（BGR格式）
+            annotate: 是否绘制标注图像（只需要检测结果时传 False，省去绘制开销）
+            version: 模型版本名称，None 表示按流量权重选择
+            
+        Returns:
+            Tuple[List[Dict], Optional[np.ndarray]]: 检测结果（按名称统计数量）和标注后的图像（annotate=False 时为 None）
+            
+        Raises:
+            RuntimeError: 推理失败（不返回空结果，避免被当作"未检测到害虫"缓存）
+        """
+        entry = self.select_model(version)
+        
+        height, width = image.shape[:2]
+        tiles = tile_grid(width, height, settings.TILE_SIZE, settings.TILE_OVERLAP, settings.TILE_MAX_COUNT)
+        # 切片为原图的视图，不复制像素
+        crops = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+        offsets = [(x1, y1) for x1, y1, _, _ in tiles]
+        if settings.TILE_INCLUDE_FULL_IMAGE and len(tiles) > 1:
+            crops.append(image)
+            offsets.append((0, 0))
+        
+        try:
+            # YOLO模型的推理可能不是线程安全的，需要串行化
+            with self._inference_lock:
+                results = entry.model(crops, verbose=False)
+            
+            boxes, scores, class_ids = [], [], []
+            for (offset_x, offset_y), result in zip(offsets, results):
+                xyxy, confidences, ids = filter_by_confidence(*result_arrays(result), CONFIDENCE_THRESHOLD)
+                boxes.append(xyxy + np.array([offset_x, offset_y, offset_x, offset_y], dtype=xyxy.dtype))
+                scores.append(confidences)
+                class_ids.append(ids)
+            boxes, scores, class_ids = merge_detections(
+                np.concatenate(boxes), np.concatenate(scores), np.concatenate(class_ids), settings.TILE_MERGE_THRESHOLD
+            )
             
-            return detections, annotated_image
+            # 用合并后的检测框构造整图结果，标注样式与整图推理一致
+            annotated_image = None
+            if annotate:
+                merged = Results(
+                    image, path="", names=results[0].names,
+                    boxes=torch.from_numpy(np.column_stack([boxes, scores, class_ids]).astype(np.float32))
+                )
+                annotated_image = merged.plot()
+            
+            print(f"切片推理: {len(tiles)} 个切片，合并后 {len(class_ids)} 个目标")
+            return self._count_detections(class_ids, entry.class_names), annotated_image
         except Exception as e:
-            print(f"预测过程中出错: {str(e)}")
-            # 返回默认值以避免服务崩溃
-            return [], image.copy()
+            print(f"切片推理过程中出错: {str(e)}")
+            # 抛出异常由接口返回 500：推理失败不能当作"未检测到害虫"返回和缓存
+            raise RuntimeError(f"切片推理失败: {str(e)}") from e
+    
+    def _count_detections(self, class_ids: np.ndarray, class_names: Tuple[str, ...]) -> List[Dict]:
+        """
+        按害虫名称统计数量（无状态，np.bincount 计数）
+        
+        Args:
+            class_ids: 单张图像的检测框类别ID
+            class_names: 推理所用模型版本的类别名称
+            
+        Returns:
+            List[Dict]: 包含name和count的检测结果列表（按类别ID顺序）
+        """
+        detections = count_by_name(class_ids, lambda class_id: self._class_name(class_id, class_names))
+        
+        total_count = len(class_ids)
+        print(f"检测到 {len(detections)} 种害虫，共 {total_count} 个目标")
+        if detections:
+            for det in detections:
+                print(f"  {det['name']}: {det['count']}个")
+        else:
+            print("未检测到任何目标")
+        
+        return detections
     
     def process_image_from_base64(self, base64_str: str) -> Tuple[List[Dict], str]:
         """
@@ -242,14 +413,9 @@ class ModelService:
         try:
             # 解码base64图像（局部变量）
             image_data = base64.b64decode(base64_str)
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if image is None:
-                raise ValueError("无法解码图像数据")
             
             # 进行预测（线程安全）
-            detections, annotated_image = self.predict(image)
+            detections, annotated_image = self.process_image_from_bytes(image_data)
             
             # 将标注后的图像转换为base64（局部变量）
             base64_image = self._image_to_base64(annotated_image)
@@ -258,6 +424,65 @@ class ModelService:
         except Exception as e:
             raise RuntimeError(f"图像处理失败: {str(e)}")
     
+    def process_image_from_bytes(self, image_data: bytes,
+                                 tiled: Optional[bool] = None) -> Tuple[List[Dict], np.ndarray]:
+        """
+        处理原始字节形式的图像（线程安全、无状态）
+        
+        用于 multipart / application/octet-stream 上传，省去base64编解码
+        
+        Args:
+            image_data: 图像文件的原始字节
+            tiled: 是否使用切片推理，None 表示按分辨率自动选择
+            
+        Returns:
+            Tuple[List[Dict], np.ndarray]: 检测结果和标注后的图像
+        """
+        image, use_tiles = self.decode_for_detection(image_data, tiled)
+        if use_tiles:
+            return self.predict_tiled(image)
+        return self.predict(image)
+    
+    def decode_for_detection(self, image_data: bytes, tiled: Optional[bool] = None) -> Tuple[np.ndarray, bool]:
+        """
+        按检测模式解码图像：是否切片推理由文件头中的原始尺寸决定，
+        切片推理需要原始分辨率，整图推理按模型输入尺寸缩小解码
+        
+        Args:
+            image_data: 图像文件的原始字节
+            tiled: 是否使用切片推理，None 表示按分辨率自动选择
+            
+        Returns:
+            Tuple[np.ndarray, bool]: BGR格式的图像和是否使用切片推理
+        """
+        size = read_image_size(image_data)
+        use_tiles = tiled if size is None else self.should_tile(size[0], size[1], tiled)
+        image = self.decode_image(image_data, full_resolution=bool(use_tiles))
+        if use_tiles is None:
+            # 无法从文件头读取尺寸时按解码后的尺寸判断（此时按原始分辨率解码）
+            use_tiles = self.should_tile(image.shape[1], image.shape[0])
+        return image, use_tiles
+    
+    @staticmethod
+    def decode_image(image_data: bytes, full_resolution: bool = False) -> np.ndarray:
+        """
+        将图像文件的原始字节解码为BGR图像（静态方法，无状态）
+        
+        JPEG 按模型输入尺寸缩小解码（DECODE_TARGET_SIZE），并拒绝像素数超过 MAX_IMAGE_PIXELS 的图片
+        
+        Args:
+            image_data: 图像文件的原始字节
+            full_resolution: 是否按原始分辨率解码（切片推理）
+            
+        Returns:
+            np.ndarray: BGR格式的图像（已按 EXIF 方向旋转）
+            
+        Raises:
+            ValueError: 无法解码图像数据或图像尺寸过大
+        """
+        target_size = 0 if full_resolution else settings.DECODE_TARGET_SIZE
+        return decode_image(image_data, target_size, settings.MAX_IMAGE_PIXELS)
+    
     @staticmethod
     def _image_to_base64(image: np.ndarray) -> str:
         """
@@ -286,4 +511,29 @@ class ModelService:
 # 2. 推理过程使用线程锁保护
 # 3. 类别名称使用不可变元组
 # 4. 所有方法内部只使用局部变量
-model_service = ModelService()
\ No newline at end of file
+model_service = ModelService()
+
+# 模型就绪状态：服务启动时在后台加载并预热模型，完成后 /ready 返回 200
+readiness = Readiness(name="pest-model")
+
+# 单图检测请求的微批处理调度器：并发请求合并为一次批量推理，并在独立线程中执行
+inference_batcher = MicroBatcher(
+    model_service.predict_batch,
+    max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+    window_ms=settings.MICRO_BATCH_WINDOW_MS,
+    name="pest-inference",
+)
+
+# 请求处理线程池：解码和结果编码在线程池中执行，并限制处理中和排队的请求数
+worker_pool = WorkerPool(
+    max_concurrency=settings.WORKER_MAX_CONCURRENCY,
+    max_queue=settings.WORKER_MAX_QUEUE,
+    retry_after=settings.BUSY_RETRY_AFTER,
+    name="pest-worker",
+)
+
+# 检测结果缓存：相同图片字节、模型版本和检测参数的重复请求直接返回缓存结果
+result_cache = ResultCache(
+    max_mb=settings.RESULT_CACHE_MAX_MB,
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+)
@@ -14,6 +14,8 @@ from pathlib import Path
 # 添加项目根目录到 Python 路径
 project_root = Path(__file__).parent.parent.parent.parent.parent
 sys.path.insert(0, str(project_root))
+# 共享工具包 detector_common 位于 src/algorithms 下
+sys.path.insert(0, str(project_root / "src" / "algorithms"))
 
 # 设置工作目录为 detector 目录，以便正确加载模型文件
 detector_dir = Path(__file__).parent
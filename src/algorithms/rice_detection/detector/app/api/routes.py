@@ -1,30 +1,135 @@
-from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import JSONResponse
-from typing import List, Dict, Any, Union
+from fastapi import APIRouter, Header, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, Response
+from typing import List, Dict, Any, Literal, Optional, Tuple, Union
 
 # 兼容 Docker 和本地环境的导入
 try:
     # Docker 环境：使用相对导入
-    from app.schemas.detection import RicePredictionRequest, RicePredictionResponse
-    from app.services.model_service import get_rice_service
+    from app.schemas.detection import RicePredictionRequest, RicePredictionResponse, RiceBatchPredictionRequest, RiceBatchPredictionResponse, ModelLoadRequest, ModelTrafficRequest
+    from app.services.model_service import RiceService, get_rice_service, inference_batcher, readiness, worker_pool, result_cache
+    from app.core.config import settings
+    from detector_common.result_image import deliver_result_jpeg, encode_result_image, RESULT_FORMAT_BINARY, RESULT_FORMAT_URL, RETURN_IMAGE_FULL, RETURN_IMAGE_NONE, DETECTIONS_HEADER
+    from detector_common.model_registry import check_model_admin, ModelVersionNotFoundError, MODEL_VERSION_HEADER, resolve_weights_path
+    from detector_common.upload import read_image_upload, ImageTooLargeError
+    from detector_common.worker_pool import ServiceBusyError, busy_response
 except ImportError:
     # 本地环境：使用绝对导入
-    from src.algorithms.rice_detection.detector.app.schemas.detection import RicePredictionRequest, RicePredictionResponse
-    from src.algorithms.rice_detection.detector.app.services.model_service import get_rice_service
+    from src.algorithms.rice_detection.detector.app.schemas.detection import RicePredictionRequest, RicePredictionResponse, RiceBatchPredictionRequest, RiceBatchPredictionResponse, ModelLoadRequest, ModelTrafficRequest
+    from src.algorithms.rice_detection.detector.app.services.model_service import RiceService, get_rice_service, inference_batcher, readiness, worker_pool, result_cache
+    from src.algorithms.rice_detection.detector.app.core.config import settings
+    from src.algorithms.detector_common.result_image import deliver_result_jpeg, encode_result_image, RESULT_FORMAT_BINARY, RESULT_FORMAT_URL, RETURN_IMAGE_FULL, RETURN_IMAGE_NONE, DETECTIONS_HEADER
+    from src.algorithms.detector_common.model_registry import check_model_admin, ModelVersionNotFoundError, MODEL_VERSION_HEADER, resolve_weights_path
+    from src.algorithms.detector_common.upload import read_image_upload, ImageTooLargeError
+    from src.algorithms.detector_common.worker_pool import ServiceBusyError, busy_response
 
+import base64
+import json
 import logging
 import traceback
 from datetime import datetime
 
+import numpy as np
+
 router = APIRouter()
 
-# 创建服务实例
-rice_service = None
 
-@router.on_event("startup")
-async def startup_event():
-    global rice_service
-    rice_service = get_rice_service()
+def _build_prediction_response(result: Dict[str, Any], jpeg_bytes: Optional[bytes], result_format: str,
+                               model_version: Optional[str] = None) -> Union[RicePredictionResponse, Response]:
+    """
+    按返回格式构造识别响应（base64 / binary / url），识别失败或没有标注图片（return_image=none）时只返回JSON识别结果；
+    所用模型版本放在 model_version 字段（binary 格式为 X-Model-Version 响应头）中
+    """
+    if not result.get('success') or jpeg_bytes is None:
+        return RicePredictionResponse(
+            success=result.get('success', False),
+            detections=result.get('detections', []),
+            model_version=model_version,
+            message=result.get('message')
+        )
+
+    jpeg_bytes, image_ref = deliver_result_jpeg(
+        jpeg_bytes, result_format, settings.RESULTS_DIR, settings.RESULTS_URL_PREFIX
+    )
+
+    if result_format == RESULT_FORMAT_BINARY:
+        return Response(
+            content=jpeg_bytes,
+            media_type="image/jpeg",
+            headers={DETECTIONS_HEADER: json.dumps(result.get('detections', [])), MODEL_VERSION_HEADER: model_version or ""}
+        )
+    if result_format == RESULT_FORMAT_URL:
+        return RicePredictionResponse(
+            success=True,
+            detections=result.get('detections', []),
+            result_image_url=image_ref,
+            model_version=model_version
+        )
+    return RicePredictionResponse(
+        success=True,
+        detections=result.get('detections', []),
+        result_image=image_ref,
+        model_version=model_version
+    )
+
+def _model_not_found_response(error: ModelVersionNotFoundError, **extra) -> JSONResponse:
+    """请求的模型版本不存在时返回 404"""
+    logging.warning(str(error))
+    return JSONResponse(
+        status_code=status.HTTP_404_NOT_FOUND,
+        content={
+            "success": False,
+            **extra,
+            "message": str(error)
+        }
+    )
+
+def _encode_plot(plot_img: Optional[np.ndarray], return_image: str) -> Optional[bytes]:
+    """按渲染方式把标注图片编码为JPEG（没有标注图片或 return_image=none 时为 None）"""
+    return encode_result_image(plot_img, return_image, settings.THUMBNAIL_MAX_SIDE, settings.THUMBNAIL_JPEG_QUALITY)
+
+
+def _select_model(model_version: Optional[str] = None):
+    """获取服务单例并选择模型版本（首次调用时加载模型，阻塞操作，在工作线程池中执行）"""
+    return get_rice_service().select_model(model_version)
+
+
+async def _predict_image_data(image_data: bytes, return_image: str = RETURN_IMAGE_FULL,
+                              model_version: Optional[str] = None) -> Tuple[Dict[str, Any], Optional[bytes], str]:
+    """
+    单图识别（带结果缓存），返回识别结果、JPEG编码后的标注图片和所用模型版本名称
+    
+    模型版本按流量分配选择（或由 model_version 指定），相同图片字节、模型版本和渲染方式的重复请求
+    直接返回缓存结果；只缓存识别成功的结果。需在 worker_pool.slot() 内调用。
+    
+    解码和编码在工作线程池中执行，推理提交给微批处理调度器，与并发请求合并为一次批量推理。
+    """
+    entry = await worker_pool.run(_select_model, model_version)
+    key = await worker_pool.run(result_cache.make_key, image_data, entry.version, return_image)
+    cached = result_cache.get(key)
+    if cached is not None:
+        return (*cached, entry.name)
+    
+    try:
+        image = await worker_pool.run(RiceService.decode_image, image_data)
+    except ValueError as e:
+        return {'success': False, 'message': str(e), 'detections': []}, None, entry.name
+    
+    result, plot_img = await inference_batcher.submit(
+        image, annotate=return_image != RETURN_IMAGE_NONE, version=entry.name
+    )
+    jpeg_bytes = await worker_pool.run(_encode_plot, plot_img, return_image)
+    if result.get('success'):
+        # 不含标注图片的条目按 1KB 估算大小
+        result_cache.put(key, (result, jpeg_bytes), len(jpeg_bytes) if jpeg_bytes is not None else 1024)
+    return result, jpeg_bytes, entry.name
+
+
+def _decode_base64(image_base64: str) -> bytes:
+    """解码 base64 图片数据（阻塞操作，在工作线程池中执行）"""
+    try:
+        return base64.b64decode(image_base64)
+    except Exception as e:
+        raise ValueError(f'图片解码失败: {e}')
 
 @router.post(
     "/predict",
@@ -42,18 +147,26 @@ async def predict_rice(request: RicePredictionRequest) -> Union[RicePredictionRe
     try:
         logging.info(f"开始大米品种识别，图像大小: {len(request.image_base64)} 字符")
         
-        # 调用模型服务进行识别
-        result = rice_service.predict(request.image_base64)
+        # 调用模型服务进行识别（解码、推理、编码均在工作线程池中执行）
+        async with worker_pool.slot():
+            image_data = await worker_pool.run(_decode_base64, request.image_base64)
+            result, jpeg_bytes, version_name = await _predict_image_data(
+                image_data, request.return_image, request.model_version
+            )
+            
+            # 构造成功响应
+            logging.info(f"识别成功，发现 {len(result.get('detections', []))} 种大米品种")
+            
+            return await worker_pool.run(
+                _build_prediction_response, result, jpeg_bytes, request.result_format, version_name
+            )
         
-        # 构造成功响应
-        logging.info(f"识别成功，发现 {len(result.get('detections', []))} 种大米品种")
+    except ServiceBusyError as e:
+        logging.warning(f"服务繁忙，拒绝请求: {worker_pool.stats()}")
+        return busy_response(e, detections=[])
         
-        return RicePredictionResponse(
-            success=result.get('success', False),
-            detections=result.get('detections', []),
-            result_image=result.get('result_image'),
-            message=result.get('message')
-        )
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e, detections=[])
         
     except ValueError as ve:
         # 参数验证错误
@@ -97,6 +210,160 @@ async def predict_rice(request: RicePredictionRequest) -> Union[RicePredictionRe
             }
         )
 
+@router.post(
+    "/predict/upload",
+    response_model=RicePredictionResponse,
+    status_code=status.HTTP_200_OK,
+    summary="🌾 大米品种识别（原始字节上传）",
+    description="以 multipart/form-data（字段 file）或 application/octet-stream 直接上传图片进行识别",
+    tags=["大米识别"]
+)
+async def predict_rice_upload(
+    request: Request,
+    result_format: Literal["base64", "binary", "url"] = Query(
+        "base64", description="结果图片返回方式：base64、binary 或 url"
+    ),
+    task_type: Optional[str] = Query("classification", description="任务类型，可选"),
+    return_image: Literal["full", "thumbnail", "none"] = Query(
+        "full", description="结果图片渲染方式：full、thumbnail（缩略图）或 none（只返回识别结果）"
+    ),
+    model_version: Optional[str] = Query(
+        None, description="指定模型版本名称，不提供时按流量分配选择"
+    )
+) -> Union[RicePredictionResponse, Response, JSONResponse]:
+    """
+    接受原始图片字节，省去 base64 编解码；result_format=binary 时直接返回 JPEG，
+    识别结果位于 X-Detections 响应头。return_image=none 时不绘制、不编码标注图片，只返回JSON识别结果。
+    """
+    try:
+        image_data = await read_image_upload(request, settings.MAX_IMAGE_SIZE)
+        logging.info(f"开始大米品种识别（原始字节上传），图像大小: {len(image_data)} 字节")
+
+        async with worker_pool.slot():
+            result, jpeg_bytes, version_name = await _predict_image_data(image_data, return_image, model_version)
+
+            logging.info(f"识别成功，发现 {len(result.get('detections', []))} 种大米品种")
+
+            return await worker_pool.run(_build_prediction_response, result, jpeg_bytes, result_format, version_name)
+
+    except ServiceBusyError as e:
+        logging.warning(f"服务繁忙，拒绝请求: {worker_pool.stats()}")
+        return busy_response(e, detections=[])
+
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e, detections=[])
+
+    except ImageTooLargeError as e:
+        logging.warning(f"图片过大: {str(e)}")
+        return JSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={
+                "success": False,
+                "detections": [],
+                "message": str(e)
+            }
+        )
+
+    except ValueError as ve:
+        logging.warning(f"参数验证错误: {str(ve)}")
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "success": False,
+                "detections": [],
+                "message": str(ve)
+            }
+        )
+
+    except Exception as e:
+        logging.error(f"未预期错误: {str(e)}\n{traceback.format_exc()}")
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "success": False,
+                "detections": [],
+                "message": "服务器内部错误，请稍后重试"
+            }
+        )
+
+def _predict_batch(images_base64: List[str], result_format: str, return_image: str = RETURN_IMAGE_FULL,
+                   model_version: Optional[str] = None) -> RiceBatchPredictionResponse:
+    """
+    批量识别：逐张解码后一次前向推理并编码结果（阻塞操作，在工作线程池中执行），所有图片使用同一模型版本
+    """
+    rice_service = get_rice_service()
+    entry = rice_service.select_model(model_version)
+    # 逐张解码，解码失败的图片单独记录错误
+    results: List[RicePredictionResponse] = [None] * len(images_base64)
+    images = []
+    positions = []
+    for index, image_base64 in enumerate(images_base64):
+        try:
+            images.append(rice_service.decode_image(base64.b64decode(image_base64, validate=True)))
+            positions.append(index)
+        except (ValueError, TypeError) as e:
+            results[index] = RicePredictionResponse(success=False, detections=[], message=f'图片解码失败: {e}')
+
+    # 所有可解码的图片在一次前向推理中完成识别
+    batch_results = rice_service.predict_batch(images, return_image != RETURN_IMAGE_NONE, entry.name)
+    for index, (result, plot_img) in zip(positions, batch_results):
+        jpeg_bytes = _encode_plot(plot_img, return_image)
+        results[index] = _build_prediction_response(result, jpeg_bytes, result_format)
+
+    logging.info(f"批量识别完成，成功 {len(positions)}/{len(results)} 张")
+
+    return RiceBatchPredictionResponse(success=True, results=results, model_version=entry.name)
+
+@router.post(
+    "/predict/batch",
+    response_model=RiceBatchPredictionResponse,
+    status_code=status.HTTP_200_OK,
+    summary="🌾 批量大米品种识别",
+    description="一次提交多张图片，在一次前向推理中完成识别，按输入顺序返回逐图结果",
+    tags=["大米识别"]
+)
+async def predict_rice_batch(request: RiceBatchPredictionRequest) -> Union[RiceBatchPredictionResponse, JSONResponse]:
+    """
+    接受多张 Base64 图片，N 张图片组成一个 batch 只做一次前向推理；
+    单张图片解码失败只影响对应条目（success=false），results 与输入顺序一致。
+    """
+    if len(request.images_base64) > settings.MAX_BATCH_SIZE:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "success": False,
+                "results": [],
+                "message": f"单次最多识别 {settings.MAX_BATCH_SIZE} 张图片"
+            }
+        )
+
+    try:
+        logging.info(f"开始批量大米品种识别，图片数量: {len(request.images_base64)}")
+
+        async with worker_pool.slot():
+            return await worker_pool.run(
+                _predict_batch, request.images_base64, request.result_format, request.return_image,
+                request.model_version
+            )
+
+    except ServiceBusyError as e:
+        logging.warning(f"服务繁忙，拒绝请求: {worker_pool.stats()}")
+        return busy_response(e, results=[])
+
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e, results=[])
+
+    except Exception as e:
+        logging.error(f"未预期错误: {str(e)}\n{traceback.format_exc()}")
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "success": False,
+                "results": [],
+                "message": "服务器内部错误，请稍后重试"
+            }
+        )
+
 @router.get(
     "/supported-rice-types",
     summary="获取支持的大米品种列表", 
@@ -134,4 +401,166 @@ async def get_supported_rice_types():
                 "success": False,
                 "message": "获取大米品种列表失败"
             }
-        )
\ No newline at end of file
+        )
+
+
+@router.get(
+    "/health/detailed",
+    summary="详细健康检查",
+    description="返回模型、微批处理调度器、工作线程池和结果缓存的状态",
+    tags=["系统信息"]
+)
+async def detailed_health_check():
+    """
+    详细健康检查：模型加载与预热状态、微批处理调度器、工作线程池和结果缓存统计。
+    """
+    model_ready = readiness.ready
+    return {
+        "status": "healthy" if model_ready else "unhealthy",
+        "timestamp": datetime.now().isoformat(),
+        "checks": {
+            "model": {
+                "status": "healthy" if model_ready else "unhealthy",
+                "message": "模型已加载并完成预热" if model_ready else "模型未就绪",
+                "backend": settings.INFERENCE_BACKEND,
+                "precision": settings.MODEL_PRECISION,
+                "readiness": readiness.status()
+            },
+            "inference_batcher": {
+                "status": "healthy",
+                **inference_batcher.stats()
+            },
+            "worker_pool": {
+                "status": "warning" if worker_pool.waiting >= worker_pool.max_queue else "healthy",
+                **worker_pool.stats()
+            },
+            "result_cache": {
+                "status": "healthy",
+                **result_cache.stats()
+            }
+        }
+    }
+
+async def _get_registry():
+    """获取模型注册表（服务尚未创建时在工作线程池中加载模型，不阻塞事件循环）"""
+    return (await worker_pool.run(get_rice_service)).registry
+
+
+def _check_admin_token(token: Optional[str], modify: bool = False) -> None:
+    """校验模型管理接口的 X-Admin-Token 请求头（未配置 MODEL_ADMIN_TOKEN 时接口禁用）"""
+    check_model_admin(token, settings.MODEL_ADMIN_TOKEN, modify)
+
+
+@router.get(
+    "/models",
+    summary="模型版本状态",
+    description="返回已加载的模型版本、流量分配、加载中的版本和加载失败原因",
+    tags=["模型管理"]
+)
+async def get_model_versions(x_admin_token: Optional[str] = Header(None)):
+    """
+    # 🗂️ 模型版本状态
+    
+    - **versions**: 已加载的版本（名称、权重文件、版本标识、类别数、加载时间、流量占比）
+    - **traffic**: 当前流量分配
+    - **loading / errors**: 后台加载中的版本和加载失败原因
+    """
+    _check_admin_token(x_admin_token)
+    registry = await _get_registry()
+    return {"success": True, **registry.status()}
+
+
+@router.post(
+    "/models",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="加载模型版本",
+    description="在后台加载并预热新的模型版本，期间当前版本继续服务",
+    tags=["模型管理"]
+)
+async def load_model_version(request: ModelLoadRequest, x_admin_token: Optional[str] = Header(None)):
+    """
+    # ⏳ 加载模型版本
+    
+    权重文件必须位于模型目录（MODEL_REGISTRY_DIR）下，类别名称使用权重文件自带的类别（经 name_map 映射为品种名称）。
+    加载在后台完成，通过 `GET /models` 查看进度；`activate=true` 时预热完成后全部流量切换到该版本。
+    """
+    _check_admin_token(x_admin_token, modify=True)
+    registry = await _get_registry()
+    try:
+        path = resolve_weights_path(request.path, settings.MODEL_REGISTRY_DIR)
+        registry.load_in_background(request.name, path, request.activate)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"success": False, "message": str(e)}
+        )
+    
+    logging.info(f"开始加载模型版本 {request.name}: {path}")
+    return {"success": True, "message": f"模型版本 {request.name} 正在后台加载"}
+
+
+@router.post(
+    "/models/{name}/activate",
+    summary="切换模型版本",
+    description="把全部流量原子地切换到指定版本",
+    tags=["模型管理"]
+)
+async def activate_model_version(name: str, x_admin_token: Optional[str] = Header(None)):
+    """切换后新请求立即使用该版本，进行中的请求继续使用原版本完成"""
+    _check_admin_token(x_admin_token, modify=True)
+    registry = await _get_registry()
+    try:
+        registry.activate(name)
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e)
+    
+    logging.info(f"全部流量已切换到模型版本 {name}")
+    return {"success": True, **registry.status()}
+
+
+@router.put(
+    "/models/traffic",
+    summary="模型版本分流",
+    description="按权重在多个模型版本之间分配流量（A/B 对比）",
+    tags=["模型管理"]
+)
+async def set_model_traffic(request: ModelTrafficRequest, x_admin_token: Optional[str] = Header(None)):
+    """权重按比例归一化，例如 {"default": 9, "2025-spring": 1} 把 10% 的请求分给新版本"""
+    _check_admin_token(x_admin_token, modify=True)
+    registry = await _get_registry()
+    try:
+        registry.set_traffic(request.weights)
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"success": False, "message": str(e)}
+        )
+    
+    logging.info(f"模型流量分配已更新: {request.weights}")
+    return {"success": True, **registry.status()}
+
+
+@router.delete(
+    "/models/{name}",
+    summary="卸载模型版本",
+    description="卸载不再接收流量的模型版本，释放内存",
+    tags=["模型管理"]
+)
+async def unload_model_version(name: str, x_admin_token: Optional[str] = Header(None)):
+    """仍在接收流量的版本需要先切换流量才能卸载"""
+    _check_admin_token(x_admin_token, modify=True)
+    registry = await _get_registry()
+    try:
+        registry.unload(name)
+    except ModelVersionNotFoundError as e:
+        return _model_not_found_response(e)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"success": False, "message": str(e)}
+        )
+    
+    logging.info(f"模型版本 {name} 已卸载")
+    return {"success": True, **registry.status()}
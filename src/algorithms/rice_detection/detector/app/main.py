@@ -1,19 +1,37 @@
 import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
+from fastapi.staticfiles import StaticFiles
 
 # 兼容 Docker 和本地环境的导入
 try:
     # Docker 环境：使用相对导入
+    from app.core.config import settings
     from app.api.routes import router as api_router
+    from app.services.model_service import get_rice_service, readiness
+    from detector_common.readiness import readiness_response
 except ImportError:
     # 本地环境：使用绝对导入
+    from src.algorithms.rice_detection.detector.app.core.config import settings
     from src.algorithms.rice_detection.detector.app.api.routes import router as api_router
+    from src.algorithms.rice_detection.detector.app.services.model_service import get_rice_service, readiness
+    from src.algorithms.detector_common.readiness import readiness_response
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动后在后台线程中加载并预热模型，不阻塞服务启动（预热完成前 /ready 返回 503）
+    readiness.start(lambda: get_rice_service().warm_up_model(settings.WARMUP_RUNS))
+    yield
+    # 服务关闭时停止预热失败后的重试
+    readiness.stop()
+
 
 # 创建FastAPI应用实例
-app = FastAPI(title='乡村振兴大脑 - 大米识别服务')
+app = FastAPI(title='乡村振兴大脑 - 大米识别服务', lifespan=lifespan)
 
 # 配置CORS中间件
 app.add_middleware(
@@ -27,6 +45,10 @@ app.add_middleware(
 # 注册路由
 app.include_router(api_router)
 
+# 结果图片静态访问（result_format=url 时返回的路径）
+app.mount(settings.RESULTS_URL_PREFIX, StaticFiles(directory=settings.RESULTS_DIR), name="results")
+
+
 # 根路径
 @app.get("/")
 def root():
@@ -43,7 +65,7 @@ def root():
 @app.get("/health")
 def health_check():
     """
-    ⚡ 快速健康检查
+    ⚡ 快速健康检查（进程存活），负载均衡和容器健康检查请使用 /ready
     """
     return {
         "status": "healthy",
@@ -51,6 +73,14 @@ def health_check():
         "version": "1.0.0"
     }
 
+# 就绪检查接口
+@app.get("/ready")
+def readiness_check():
+    """
+    🚦 就绪检查：模型加载并预热完成后返回 200，之前返回 503
+    """
+    return readiness_response(readiness, service="大米品种识别服务")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,9 +1,18 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 
 class RicePredictionRequest(BaseModel):
     image_base64: str = Field(..., description="Base64 编码的图片字符串")
     task_type: Optional[str] = Field(default="classification", description="任务类型，可选")
+    result_format: Literal["base64", "binary", "url"] = Field(
+        default="base64", description="结果图片返回方式：base64、binary（直接返回JPEG）或 url"
+    )
+    return_image: Literal["full", "thumbnail", "none"] = Field(
+        default="full", description="结果图片渲染方式：full、thumbnail（缩略图）或 none（不生成标注图片）"
+    )
+    model_version: Optional[str] = Field(
+        default=None, description="指定模型版本名称（如对比新旧模型），不提供时按服务的流量分配选择版本"
+    )
 
 class DetectionResult(BaseModel):
     name: str
@@ -13,4 +22,33 @@ class RicePredictionResponse(BaseModel):
     success: bool
     detections: List[DetectionResult]
     result_image: Optional[str] = Field(None, description="标注好的结果图片(Base64)")
-    message: Optional[str] = None
\ No newline at end of file
+    result_image_url: Optional[str] = Field(None, description="结果图片访问路径（result_format=url 时返回）")
+    model_version: Optional[str] = Field(None, description="本次识别使用的模型版本名称")
+    message: Optional[str] = None
+
+class RiceBatchPredictionRequest(BaseModel):
+    images_base64: List[str] = Field(..., min_items=1, description="Base64 编码的图片字符串列表，数量不超过 MAX_BATCH_SIZE")
+    task_type: Optional[str] = Field(default="classification", description="任务类型，可选")
+    result_format: Literal["base64", "url"] = Field(
+        default="base64", description="结果图片返回方式：base64 或 url"
+    )
+    return_image: Literal["full", "thumbnail", "none"] = Field(
+        default="full", description="结果图片渲染方式：full、thumbnail（缩略图）或 none（不生成标注图片）"
+    )
+    model_version: Optional[str] = Field(
+        default=None, description="指定模型版本名称（如对比新旧模型），不提供时按服务的流量分配选择版本"
+    )
+
+class RiceBatchPredictionResponse(BaseModel):
+    success: bool
+    results: List[RicePredictionResponse] = Field(..., description="与输入顺序一致的逐图识别结果")
+    model_version: Optional[str] = Field(None, description="本次识别使用的模型版本名称")
+    message: Optional[str] = None
+
+class ModelLoadRequest(BaseModel):
+    name: str = Field(..., min_length=1, max_length=64, description="版本名称，与已有版本同名时加载完成后整体替换")
+    path: str = Field(..., description="权重文件路径（相对于 MODEL_REGISTRY_DIR，必须位于该目录下）")
+    activate: bool = Field(default=False, description="加载完成后是否把全部流量切换到该版本")
+
+class ModelTrafficRequest(BaseModel):
+    weights: Dict[str, float] = Field(..., description="版本名称到流量权重的映射，权重按比例归一化")
@@ -1,7 +1,8 @@
 import os
 import base64
+import threading
 from collections import Counter
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 import numpy as np
 import cv2
@@ -17,87 +18,114 @@ except Exception:
 try:
     # Docker 环境：使用相对导入
     from app.core.config import settings
+    from detector_common.image_decode import decode_image
+    from detector_common.inference_backend import load_yolo, model_version
+    from detector_common.micro_batch import MicroBatcher
+    from detector_common.model_registry import ModelRegistry, ModelVersion
+    from detector_common.postprocess import result_arrays, count_by_name
+    from detector_common.readiness import Readiness
+    from detector_common.result_cache import ResultCache
+    from detector_common.worker_pool import WorkerPool
 except ImportError:
     # 本地环境：使用绝对导入
     from src.algorithms.rice_detection.detector.app.core.config import settings
+    from src.algorithms.detector_common.image_decode import decode_image
+    from src.algorithms.detector_common.inference_backend import load_yolo, model_version
+    from src.algorithms.detector_common.micro_batch import MicroBatcher
+    from src.algorithms.detector_common.model_registry import ModelRegistry, ModelVersion
+    from src.algorithms.detector_common.postprocess import result_arrays, count_by_name
+    from src.algorithms.detector_common.readiness import Readiness
+    from src.algorithms.detector_common.result_cache import ResultCache
+    from src.algorithms.detector_common.worker_pool import WorkerPool
 
 
 class RiceService:
     """
     单例服务：服务启动时加载模型，predict 使用内存图像，不写磁盘。
+    模型版本由注册表管理：运行时可在后台加载新版本并切换流量，每次识别（批量识别为整批）在开始时选定版本。
     """
 
     def __init__(self, weights_path: str = None, name_map: Dict[str, str] = None):
         self.weights_path = weights_path or settings.WEIGHTS_PATH_FL
-        self.model = None
         self.name_map = name_map or {}
+        # 推理锁：请求在工作线程池中并发执行，YOLO 模型推理需要串行化
+        self._inference_lock = threading.Lock()
+        self.registry = ModelRegistry(self._load_weights, warmup=self._warmup, name="rice-model")
         self._load_model()
 
     def _load_model(self):
+        # 只在服务启动时加载一次，作为默认版本接收全部流量
+        # 这里只加载不推理：多进程部署在 fork 前加载权重，预热推理由各工作进程的 warm_up_model() 执行
+        self.registry.load(settings.MODEL_VERSION_NAME, self.weights_path, activate=True, warmup=False)
+
+    @staticmethod
+    def _load_weights(weights_path: str) -> Tuple[Any, Tuple[str, ...], str]:
+        """加载一个模型版本（模型注册表的加载函数），返回 (模型, 类别名称, 版本标识)"""
         if YOLO is None:
             # 延迟报错，便于单元测试或不使用 ultralytics 的环境
             raise RuntimeError('ultralytics YOLO 未安装或无法导入，请安装 ultralytics')
-        if not os.path.exists(self.weights_path):
-            raise FileNotFoundError(f'Model weights not found at {self.weights_path}')
-        # 只在服务启动时加载一次
-        self.model = YOLO(self.weights_path)
+        if not os.path.exists(weights_path):
+            raise FileNotFoundError(f'Model weights not found at {weights_path}')
+        model = load_yolo(
+            weights_path, settings.INFERENCE_BACKEND, settings.EXPORT_IMGSZ, settings.EXPORT_CACHE_DIR,
+            settings.MODEL_PRECISION
+        )
+        class_names = tuple(str(name) for name in (getattr(model, 'names', None) or {}).values())
+        return model, class_names, model_version(weights_path, settings.INFERENCE_BACKEND, settings.MODEL_PRECISION)
+
+    @staticmethod
+    def _warmup(model) -> None:
+        """新版本接收流量前用空白图像推理一次，完成首次推理的初始化开销"""
+        model(np.zeros((settings.EXPORT_IMGSZ, settings.EXPORT_IMGSZ, 3), dtype=np.uint8), verbose=False)
+
+    def warm_up_model(self, runs: int = 1) -> None:
+        """按生产输入尺寸（EXPORT_IMGSZ）执行 runs 次空白图像的完整识别（含标注绘制），把冷启动开销放在接收流量之前"""
+        image = np.zeros((settings.EXPORT_IMGSZ, settings.EXPORT_IMGSZ, 3), dtype=np.uint8)
+        for _ in range(runs):
+            result, _ = self.predict_batch([image])[0]
+            # predict_batch 把推理异常转换为失败结果，预热时需要抛出
+            if not result['success']:
+                raise RuntimeError(result['message'])
+
+    def select_model(self, name: Optional[str] = None) -> ModelVersion:
+        """为单次识别选择模型版本（按流量权重，或按名称指定版本），版本不存在时抛出 ModelVersionNotFoundError"""
+        return self.registry.resolve(name)
+
+    @property
+    def model(self):
+        """流量权重最大的版本的模型"""
+        return self.registry.primary().model
+
+    @property
+    def model_version(self) -> str:
+        """流量权重最大的版本的版本标识"""
+        return self.registry.primary().version
 
     def _decode_base64_image(self, b64: str):
         try:
             image_data = base64.b64decode(b64)
-            nparr = np.frombuffer(image_data, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            if img is None:
-                raise ValueError('cv2.imdecode 返回 None')
-            return img
         except Exception as e:
             raise ValueError(f'图片解码失败: {e}')
+        return self.decode_image(image_data)
 
-    def _parse_results(self, results) -> List[Dict[str, Any]]:
-        # results: ultralytics Results list-like; 取第一个结果对象
-        if results is None or len(results) == 0:
+    def _parse_result(self, res) -> List[Dict[str, Any]]:
+        # res: ultralytics 单张图片的 Results 对象
+        if res is None:
             return []
-        res = results[0]
         
-        # 如果没有检测框，返回空列表
-        if res.boxes is None or len(res.boxes) == 0:
-            return []
+        # 检测框整体转换为数组（没有检测框时为空数组）
+        _, _, class_ids = result_arrays(res)
             
         # 获取模型类别名称
         model_names = getattr(res, 'names', {})
         
-        # 按类别统计数量
-        class_counts = {}
-        
-        # 遍历每个检测框
-        for box in res.boxes:
-            # 获取类别ID
-            cls_id = int(box.cls[0].cpu().numpy())
-            
-            # 获取类别名称
-            if cls_id in model_names:
-                raw_name = model_names[cls_id]
-            else:
-                raw_name = str(cls_id)
-                
+        def display_name(cls_id: int) -> str:
             # 映射 name_map（例如将 '1' -> '糯米'）
-            display_name = self.name_map.get(str(raw_name), raw_name)
-            
-            # 统计数量
-            if display_name in class_counts:
-                class_counts[display_name] += 1
-            else:
-                class_counts[display_name] = 1
-
-        # 转换为检测结果格式
-        detections = []
-        for name, count in class_counts.items():
-            detections.append({
-                'name': name,
-                'count': count
-            })
-
-        return detections
+            raw_name = model_names[cls_id] if cls_id in model_names else str(cls_id)
+            return self.name_map.get(str(raw_name), raw_name)
+        
+        # 按类别统计数量，转换为检测结果格式
+        return count_by_name(class_ids, display_name)
 
     def predict(self, image_base64: str) -> Dict[str, Any]:
         # 无状态：不读取或写入任何公共磁盘路径（除加载模型文件）
@@ -106,45 +134,102 @@ class RiceService:
         except Exception as e:
             return {'success': False, 'message': str(e), 'detections': []}
 
-        # 推理：直接传 numpy 图像，ultralytics 支持
-        try:
-            results = self.model(img, verbose=False)
-        except Exception as e:
-            return {'success': False, 'message': f'模型推理失败: {e}', 'detections': []}
+        result, plot_img = self.predict_image(img)
 
-        # 解析文字结果 (保持你原有的辅助函数调用)
-        detections = self._parse_results(results)
-
-        # --- [新增] 生成标注图片逻辑 ---
+        # 将标注图片在内存中编码为 jpg，再转为 Base64 字符串
         result_image_b64 = None
-        try:
-            # 1. 获取推理结果对象
-            first_result = results[0]
-            
-            # 2. 调用 ultralytics 的 plot() 方法在图上画框
-            # 返回的是一个 numpy 数组 (BGR格式)
-            plot_img = first_result.plot()
-            
-            # 3. 将 numpy 图片在内存中编码为 jpg 格式
-            # cv2.imencode 返回两个值: (bool_success, buffer)
+        if plot_img is not None:
             success, buffer = cv2.imencode('.jpg', plot_img)
-            
             if success:
-                # 4. 将 buffer 转为 Base64 字符串
                 result_image_b64 = base64.b64encode(buffer).decode('utf-8')
             else:
                 print("Warning: 图片内存编码失败")
-                
+
+        # 返回结果，包含标注好的图片 Base64
+        if result['success']:
+            result['result_image'] = result_image_b64
+        return result
+
+    def predict_bytes(self, image_data: bytes, annotate: bool = True,
+                      version: Optional[str] = None) -> Tuple[Dict[str, Any], Optional[np.ndarray]]:
+        """
+        原始字节上传（multipart / application/octet-stream）的识别入口，省去 base64 编解码。
+        version 指定模型版本名称，None 时按流量分配选择。
+
+        Returns:
+            (识别结果字典, 标注图片)；解码或推理失败、或 annotate=False 时标注图片为 None
+        """
+        try:
+            img = self.decode_image(image_data)
+        except ValueError as e:
+            return {'success': False, 'message': str(e), 'detections': []}, None
+
+        return self.predict_image(img, annotate, version)
+
+    @staticmethod
+    def decode_image(image_data: bytes) -> np.ndarray:
+        """
+        将图片文件的原始字节解码为 BGR 图像，解码失败或像素数超过 MAX_IMAGE_PIXELS 时抛出 ValueError。
+
+        JPEG 按模型输入尺寸（DECODE_TARGET_SIZE）缩小解码，并按 EXIF 方向旋转。
+        """
+        try:
+            return decode_image(image_data, settings.DECODE_TARGET_SIZE, settings.MAX_IMAGE_PIXELS)
+        except ValueError as e:
+            raise ValueError(f'图片解码失败: {e}')
+
+    def predict_image(self, img: np.ndarray, annotate: bool = True,
+                      version: Optional[str] = None) -> Tuple[Dict[str, Any], Optional[np.ndarray]]:
+        """
+        对已解码的图片进行推理，返回识别结果和标注图片（未编码，annotate=False 时不绘制）。
+        """
+        return self.predict_batch([img], annotate, version)[0]
+
+    @staticmethod
+    def _plot(res) -> Optional[np.ndarray]:
+        """调用 ultralytics 的 plot() 方法在图上画框，返回 BGR 格式的 numpy 数组；画图失败时返回 None"""
+        try:
+            return res.plot()
         except Exception as e:
             # 画图失败不应导致整个请求报错，打印日志即可
             print(f"Warning: 生成标注图片时发生错误: {e}")
+            return None
 
-        # 返回结果，包含标注好的图片 Base64
-        return {
-            'success': True, 
-            'detections': detections, 
-            'result_image': result_image_b64
-        }
+    def predict_batch(self, images: List[np.ndarray], annotate: bool = True,
+                      version: Optional[str] = None) -> List[Tuple[Dict[str, Any], Optional[np.ndarray]]]:
+        """
+        批量推理：N 张图片由 ultralytics letterbox 到统一尺寸后组成一个 batch，只做一次前向推理。
+        只需要识别结果时传 annotate=False，省去标注图片的绘制。
+        整批图片使用同一个模型版本（version 指定名称，None 时按流量分配选择）。
+
+        Returns:
+            与输入顺序一致的 (识别结果字典, 标注图片) 列表
+
+        Raises:
+            ModelVersionNotFoundError: 指定的版本不存在
+        """
+        if not images:
+            return []
+
+        entry = self.select_model(version)
+        # 推理：直接传 numpy 图像列表，ultralytics 支持
+        try:
+            with self._inference_lock:
+                results = entry.model(list(images), verbose=False)
+                # 与害虫服务一致，在锁内生成标注图片：plot() 读取模型的类别名等共享状态，
+                # 并发推理时可能与其他线程的预测交错
+                plot_images = [self._plot(res) if annotate else None for res in results]
+        except Exception as e:
+            failure = {'success': False, 'message': f'模型推理失败: {e}', 'detections': []}
+            return [(dict(failure), None) for _ in images]
+
+        outputs = []
+        for res, plot_img in zip(results, plot_images):
+            # 解析文字结果
+            detections = self._parse_result(res)
+            outputs.append(({'success': True, 'detections': detections}, plot_img))
+
+        return outputs
 
 
 # 单例：模块导入时创建（或你可以在 main 中显式创建）
@@ -157,10 +242,48 @@ _default_name_map = {
 }
 
 # 延迟实例化的工厂函数（避免导入时立即抛错）
-_service_instance: RiceService = None
+_service_instance: Optional[RiceService] = None
+# 线程锁：保护单例的创建过程（预热线程、工作线程和推理线程可能同时首次访问）
+_service_lock = threading.Lock()
 
 def get_rice_service() -> RiceService:
+    """
+    线程安全的惰性单例，使用双重检查锁定模式确保模型只加载一次；
+    加载失败时不缓存，下次调用重新尝试
+    """
     global _service_instance
     if _service_instance is None:
-        _service_instance = RiceService(name_map=_default_name_map)
-    return _service_instance
\ No newline at end of file
+        with _service_lock:
+            if _service_instance is None:
+                _service_instance = RiceService(name_map=_default_name_map)
+    return _service_instance
+
+
+def _predict_batch(images: List[np.ndarray], **options) -> List[Tuple[Dict[str, Any], Optional[np.ndarray]]]:
+    """微批处理调度器的批量推理函数（在推理线程中获取单例，首次调用时加载模型）"""
+    return get_rice_service().predict_batch(images, **options)
+
+# 单图识别请求的微批处理调度器：并发请求合并为一次批量推理，并在独立线程中执行
+inference_batcher = MicroBatcher(
+    _predict_batch,
+    max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+    window_ms=settings.MICRO_BATCH_WINDOW_MS,
+    name="rice-inference",
+)
+
+# 模型就绪状态：服务启动时在后台加载并预热模型，完成后 /ready 返回 200
+readiness = Readiness(name="rice-model")
+
+# 请求处理线程池：解码和结果编码在线程池中执行，并限制处理中和排队的请求数
+worker_pool = WorkerPool(
+    max_concurrency=settings.WORKER_MAX_CONCURRENCY,
+    max_queue=settings.WORKER_MAX_QUEUE,
+    retry_after=settings.BUSY_RETRY_AFTER,
+    name="rice-worker",
+)
+
+# 检测结果缓存：相同图片字节、模型版本和检测参数的重复请求直接返回缓存结果
+result_cache = ResultCache(
+    max_mb=settings.RESULT_CACHE_MAX_MB,
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+)
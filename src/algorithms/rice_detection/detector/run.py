@@ -1,4 +1,10 @@
 # 启动脚本
+import sys
+from pathlib import Path
+
+# 共享工具包 detector_common 位于 src/algorithms 下（Docker 环境中位于 /app 下）
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
 import uvicorn
 from app.main import app
 from app.core.config import settings
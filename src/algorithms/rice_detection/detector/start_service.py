@@ -1,4 +1,5 @@
 # 服务启动脚本
+import os
 import subprocess
 import sys
 from pathlib import Path
@@ -7,6 +8,11 @@ from pathlib import Path
 current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
+# 共享工具包 detector_common 位于 src/algorithms 下
+shared_dir = current_dir.resolve().parent.parent
+
 if __name__ == "__main__":
     # 启动服务
-    subprocess.run([sys.executable, "-m", "app.main"])
\ No newline at end of file
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(current_dir), str(shared_dir), env.get("PYTHONPATH")]))
+    subprocess.run([sys.executable, "-m", "app.main"], env=env)
\ No newline at end of file
@@ -15,6 +15,8 @@ import io
 # 计算正确的路径
 detector_path = Path(__file__).parent.parent / "detector"
 sys.path.insert(0, str(detector_path))
+# 共享工具包 detector_common 位于 src/algorithms 下
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
 
 # 切换到工作目录
 os.chdir(str(detector_path))
@@ -0,0 +1,202 @@
+"""
+检测模型 INT8 量化工具（离线执行）
+
+把检测服务的 .pt 权重导出为 ONNX 并用校准图片静态量化为 INT8，
+然后在留出图片集上对比 FP32 与 INT8 模型，生成精度/延迟报告：
+- 各类别检测数量对比（以 FP32 结果为参照的 mAP 近似指标）
+- 检测框一致性：同类别且 IoU 不低于阈值即视为匹配，统计召回率和精确率
+- 单张图片推理延迟的 p50/p95
+
+量化模型保存在 FP32 ONNX 模型旁边（<权重名>_int8.onnx），报告保存为 <权重名>_int8_report.json。
+服务设置 MODEL_PRECISION=int8 后即加载该模型。
+
+用法:
+    python quantize.py --app-dir /app/pest --calib-dir calib/ --eval-dir holdout/
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+# 兼容容器内脚本直接运行和本地按包导入
+try:
+    from supervisor import add_shared_package_path
+except ImportError:
+    from src.algorithms.triple_detector.supervisor import add_shared_package_path
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="检测模型 INT8 量化工具")
+    parser.add_argument("--app-dir", required=True, help="检测服务目录（包含 app 包）")
+    parser.add_argument("--weights", default=None, help=".pt 权重路径（默认读取服务配置）")
+    parser.add_argument("--calib-dir", required=True, help="校准图片目录")
+    parser.add_argument("--eval-dir", default=None, help="留出评估图片目录（不提供则只量化不生成报告）")
+    parser.add_argument("--imgsz", type=int, default=None, help="输入尺寸（默认读取服务配置 EXPORT_IMGSZ）")
+    parser.add_argument("--max-calib", type=int, default=200, help="最多使用的校准图片数量")
+    parser.add_argument("--conf", type=float, default=0.25, help="评估时的置信度阈值")
+    parser.add_argument("--iou", type=float, default=0.5, help="检测框匹配的 IoU 阈值")
+    parser.add_argument("--report", default=None, help="报告输出路径（默认保存在量化模型旁边）")
+    return parser.parse_args()
+
+
+def _box_iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """一个框与一组框的 IoU（xyxy 格式）"""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def match_boxes(ref_xyxy: np.ndarray, ref_cls: np.ndarray,
+                xyxy: np.ndarray, cls: np.ndarray, iou_threshold: float) -> int:
+    """按置信度顺序贪心匹配同类别检测框，返回匹配数量"""
+    used = np.zeros(len(xyxy), dtype=bool)
+    matched = 0
+    for box, class_id in zip(ref_xyxy, ref_cls):
+        candidates = np.where((cls == class_id) & ~used)[0]
+        if len(candidates) == 0:
+            continue
+        ious = _box_iou(box, xyxy[candidates])
+        best = int(np.argmax(ious))
+        if ious[best] >= iou_threshold:
+            used[candidates[best]] = True
+            matched += 1
+    return matched
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    values = np.asarray(samples) * 1000.0
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p95_ms": round(float(np.percentile(values, 95)), 2),
+        "mean_ms": round(float(values.mean()), 2),
+    }
+
+
+def _run(model, image: np.ndarray, imgsz: int, conf: float):
+    started = time.perf_counter()
+    result = model(image, imgsz=imgsz, conf=conf, verbose=False)[0]
+    elapsed = time.perf_counter() - started
+    boxes = result.boxes
+    return boxes.xyxy.cpu().numpy(), boxes.cls.cpu().numpy().astype(int), elapsed
+
+
+def compare_models(fp32_model, int8_model, images: List[np.ndarray], imgsz: int,
+                   conf: float = 0.25, iou_threshold: float = 0.5) -> Dict[str, Any]:
+    """
+    在同一组图片上对比 FP32 和 INT8 模型
+
+    Returns:
+        dict: 各类别数量对比、检测框一致性和延迟统计
+    """
+    names = fp32_model.names
+    counts = {"fp32": np.zeros(len(names), dtype=int), "int8": np.zeros(len(names), dtype=int)}
+    latencies = {"fp32": [], "int8": []}
+    matched = 0
+    identical_images = 0
+
+    if images:
+        # 预热，避免首次推理的初始化开销计入延迟
+        _run(fp32_model, images[0], imgsz, conf)
+        _run(int8_model, images[0], imgsz, conf)
+
+    for image in images:
+        ref_xyxy, ref_cls, ref_elapsed = _run(fp32_model, image, imgsz, conf)
+        xyxy, cls, elapsed = _run(int8_model, image, imgsz, conf)
+        latencies["fp32"].append(ref_elapsed)
+        latencies["int8"].append(elapsed)
+        counts["fp32"] += np.bincount(ref_cls, minlength=len(names))[:len(names)]
+        counts["int8"] += np.bincount(cls, minlength=len(names))[:len(names)]
+        matched += match_boxes(ref_xyxy, ref_cls, xyxy, cls, iou_threshold)
+        if np.array_equal(np.bincount(ref_cls, minlength=len(names)), np.bincount(cls, minlength=len(names))):
+            identical_images += 1
+
+    per_class = {}
+    for class_id, name in names.items():
+        fp32_count, int8_count = int(counts["fp32"][class_id]), int(counts["int8"][class_id])
+        if fp32_count == 0 and int8_count == 0:
+            continue
+        per_class[name] = {
+            "fp32": fp32_count,
+            "int8": int8_count,
+            "agreement": round(min(fp32_count, int8_count) / max(fp32_count, int8_count), 4),
+        }
+
+    total_fp32, total_int8 = int(counts["fp32"].sum()), int(counts["int8"].sum())
+    total_max = int(np.maximum(counts["fp32"], counts["int8"]).sum())
+    report = {
+        "images": len(images),
+        "conf": conf,
+        "iou_threshold": iou_threshold,
+        "count_agreement": round(int(np.minimum(counts["fp32"], counts["int8"]).sum()) / total_max, 4)
+        if total_max else 1.0,
+        "image_count_match_rate": round(identical_images / len(images), 4) if images else 1.0,
+        "box_recall": round(matched / total_fp32, 4) if total_fp32 else 1.0,
+        "box_precision": round(matched / total_int8, 4) if total_int8 else 1.0,
+        "per_class": per_class,
+        "latency": {},
+    }
+    if images:
+        report["latency"] = {key: _percentiles(samples) for key, samples in latencies.items()}
+        report["latency"]["speedup_p50"] = round(
+            report["latency"]["fp32"]["p50_ms"] / max(report["latency"]["int8"]["p50_ms"], 1e-6), 2
+        )
+    return report
+
+
+def load_service(app_dir: str):
+    """导入检测服务的配置和共享的推理后端模块"""
+    add_shared_package_path(app_dir)
+    sys.path.insert(0, app_dir)
+    settings = importlib.import_module("app.core.config").settings
+    backend = importlib.import_module("detector_common.inference_backend")
+    return settings, backend
+
+
+def main() -> None:
+    args = parse_args()
+    settings, backend = load_service(os.path.abspath(args.app_dir))
+    weights = args.weights or getattr(settings, "MODEL_PATH", None) or settings.WEIGHTS_PATH_FL
+    imgsz = args.imgsz or settings.EXPORT_IMGSZ
+
+    int8_path = backend.quantize_model(weights, args.calib_dir, imgsz, settings.EXPORT_CACHE_DIR, args.max_calib)
+    print(f"INT8 模型已生成: {int8_path}")
+    if not args.eval_dir:
+        return
+
+    import cv2
+
+    images = [image for image in (cv2.imread(path) for path in backend.list_images(args.eval_dir)) if image is not None]
+    if not images:
+        raise SystemExit(f"评估图片目录中没有图片: {args.eval_dir}")
+
+    fp32_model = backend.load_yolo(weights, backend.BACKEND_ONNX, imgsz, settings.EXPORT_CACHE_DIR)
+    int8_model = backend.load_yolo(weights, imgsz=imgsz, cache_dir=settings.EXPORT_CACHE_DIR,
+                                   precision=backend.PRECISION_INT8)
+    report = compare_models(fp32_model, int8_model, images, imgsz, args.conf, args.iou)
+    report.update({"weights": weights, "int8_model": int8_path, "imgsz": imgsz})
+
+    report_path = args.report or os.path.splitext(int8_path)[0] + "_report.json"
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    latency = report["latency"]
+    print(f"评估图片: {report['images']} 张")
+    print(f"类别数量一致率: {report['count_agreement']:.2%}，单图数量完全一致: {report['image_count_match_rate']:.2%}")
+    print(f"检测框召回率: {report['box_recall']:.2%}，精确率: {report['box_precision']:.2%}")
+    print(f"FP32 延迟 p50/p95: {latency['fp32']['p50_ms']}/{latency['fp32']['p95_ms']} ms")
+    print(f"INT8 延迟 p50/p95: {latency['int8']['p50_ms']}/{latency['int8']['p95_ms']} ms（加速 {latency['speedup_p50']}x）")
+    print(f"报告已保存: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,25 +4,30 @@ set -e
 
 echo "Starting triple detection services..."
 
+# 每个检测服务的工作进程数（模型在 fork 前加载，工作进程写时复制共享权重）
+PEST_WORKERS=${PEST_WORKERS:-${DETECTOR_WORKERS:-1}}
+RICE_WORKERS=${RICE_WORKERS:-${DETECTOR_WORKERS:-1}}
+COW_WORKERS=${COW_WORKERS:-${DETECTOR_WORKERS:-1}}
+
 # 启动病虫害检测服务 (端口 8001)
-echo "Starting pest detector on port 8001..."
+echo "Starting pest detector on port 8001 ($PEST_WORKERS workers)..."
 cd /app/pest
 PYTHONPATH=/app/pest:$PYTHONPATH \
-    uvicorn app.main:app --host 0.0.0.0 --port 8001 &
+    python /app/supervisor.py --app-dir /app/pest --port 8001 --workers $PEST_WORKERS &
 PID_PEST=$!
 
 # 启动大米检测服务 (端口 8081)
-echo "Starting rice detector on port 8081..."
+echo "Starting rice detector on port 8081 ($RICE_WORKERS workers)..."
 cd /app/rice
 PYTHONPATH=/app/rice:$PYTHONPATH \
-    uvicorn app.main:app --host 0.0.0.0 --port 8081 &
+    python /app/supervisor.py --app-dir /app/rice --port 8081 --workers $RICE_WORKERS &
 PID_RICE=$!
 
 # 启动牛只检测服务 (端口 8002)
-echo "Starting cow detector on port 8002..."
+echo "Starting cow detector on port 8002 ($COW_WORKERS workers)..."
 cd /app/cow
 PYTHONPATH=/app/cow:$PYTHONPATH \
-    uvicorn app.main:app --host 0.0.0.0 --port 8002 &
+    python /app/supervisor.py --app-dir /app/cow --port 8002 --workers $COW_WORKERS &
 PID_COW=$!
 
 echo "All services started!"
@@ -30,5 +35,8 @@ echo "Pest detector:  PID=$PID_PEST,  Port=8001"
 echo "Rice detector:  PID=$PID_RICE,  Port=8081"
 echo "Cow detector:   PID=$PID_COW,  Port=8002"
 
+# 收到停止信号时转发给各监督进程，由其通知工作进程优雅退出
+trap 'kill -TERM $PID_PEST $PID_RICE $PID_COW 2>/dev/null' TERM INT
+
 # 等待所有后台进程
 wait $PID_PEST $PID_RICE $PID_COW
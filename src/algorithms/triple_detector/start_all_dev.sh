@@ -2,27 +2,29 @@
 
 set -e
 
+# 三个服务共用的工具包挂载在 /app/detector_common，/app 需要在导入路径中
+
 echo "🔥 启动开发模式检测服务（热重载已启用）..."
 
 # 启动病虫害检测服务（带热重载）
 echo "🐛 启动病虫害检测 (8001)..."
 cd /app/pest
-PYTHONPATH=/app/pest:$PYTHONPATH \
-    uv run uvicorn app.main:app --host 0.0.0.0 --port 8001 --reload &
+PYTHONPATH=/app/pest:/app:$PYTHONPATH \
+    uv run uvicorn app.main:app --host 0.0.0.0 --port 8001 --reload --reload-dir . --reload-dir /app/detector_common &
 PID_PEST=$!
 
 # 启动大米检测服务（带热重载）
 echo "🍚 启动大米检测 (8081)..."
 cd /app/rice
-PYTHONPATH=/app/rice:$PYTHONPATH \
-    uv run uvicorn app.main:app --host 0.0.0.0 --port 8081 --reload &
+PYTHONPATH=/app/rice:/app:$PYTHONPATH \
+    uv run uvicorn app.main:app --host 0.0.0.0 --port 8081 --reload --reload-dir . --reload-dir /app/detector_common &
 PID_RICE=$!
 
 # 启动牛只检测服务（带热重载）
 echo "🐄 启动牛只检测 (8002)..."
 cd /app/cow
-PYTHONPATH=/app/cow:$PYTHONPATH \
-    uv run uvicorn app.main:app --host 0.0.0.0 --port 8002 --reload &
+PYTHONPATH=/app/cow:/app:$PYTHONPATH \
+    uv run uvicorn app.main:app --host 0.0.0.0 --port 8002 --reload --reload-dir . --reload-dir /app/detector_common &
 PID_COW=$!
 
 echo "✅ 所有检测服务已启动（热重载模式）"
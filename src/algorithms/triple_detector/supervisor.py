@@ -0,0 +1,174 @@
+"""
+检测服务多进程监督器（prefork 模式）
+
+在父进程中导入检测服务并加载模型权重，然后 fork 出 K 个 uvicorn 工作进程：
+- 所有工作进程共享同一个监听套接字，由内核在进程间分配连接
+- 模型权重在 fork 前加载，工作进程以写时复制方式共享，只读的权重页不会被复制
+- 工作进程异常退出时自动重新 fork，父进程收到 SIGTERM/SIGINT 时通知所有工作进程退出
+
+用法:
+    python supervisor.py --app-dir /app/pest --port 8001 --workers 2
+"""
+import argparse
+import gc
+import importlib
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+
+import uvicorn
+
+# 三个检测服务共用的工具包（容器内位于 /app 下，本地位于 src/algorithms 下）
+SHARED_PACKAGE = "detector_common"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="检测服务多进程监督器")
+    parser.add_argument("--app-dir", required=True, help="检测服务目录（包含 app 包）")
+    parser.add_argument("--host", default="0.0.0.0", help="监听地址")
+    parser.add_argument("--port", type=int, required=True, help="监听端口")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("DETECTOR_WORKERS", "1")),
+                        help="工作进程数量（默认读取 DETECTOR_WORKERS）")
+    parser.add_argument("--torch-threads", type=int, default=int(os.getenv("TORCH_THREADS_PER_WORKER", "0")),
+                        help="每个工作进程的 torch 线程数，0 表示按 CPU 核数平均分配")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"), help="uvicorn 日志级别")
+    return parser.parse_args()
+
+
+def add_shared_package_path(app_dir: str) -> None:
+    """
+    把共享工具包所在目录加入导入路径（从检测服务目录逐级向上查找）
+
+    检测服务以顶层 app 包导入时，共享工具包也必须能以顶层 detector_common 导入，
+    否则服务模块会退回 src.algorithms.* 导入路径，同一服务被导入两份。
+    """
+    for directory in Path(app_dir).resolve().parents:
+        if (directory / SHARED_PACKAGE).is_dir():
+            if str(directory) not in sys.path:
+                sys.path.insert(0, str(directory))
+            return
+    raise SystemExit(f"找不到共享工具包 {SHARED_PACKAGE}（在 {app_dir} 的上级目录中查找）")
+
+
+def load_app(app_dir: str):
+    """导入检测服务并预加载模型（在 fork 之前执行）"""
+    os.chdir(app_dir)
+    add_shared_package_path(app_dir)
+    sys.path.insert(0, app_dir)
+
+    app = importlib.import_module("app.main").app
+    services = importlib.import_module("app.services.model_service")
+
+    # 预加载模型权重，工作进程 fork 后直接共享
+    # 注意：这里只加载不推理，避免在 fork 前启动 torch/OpenMP 线程池
+    if hasattr(services, "model_service"):
+        services.model_service.model  # 访问属性触发惰性加载
+    elif hasattr(services, "get_rice_service"):
+        services.get_rice_service()
+
+    return app
+
+
+def create_socket(host: str, port: int) -> socket.socket:
+    """创建所有工作进程共享的监听套接字"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve_worker(app, sock: socket.socket, torch_threads: int, log_level: str) -> None:
+    """工作进程入口：在继承的套接字上运行 uvicorn"""
+    # 恢复默认信号处理，交由 uvicorn 接管
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    if torch_threads > 0:
+        try:
+            import torch
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+
+    config = uvicorn.Config(app, log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn_worker(app, sock: socket.socket, torch_threads: int, log_level: str) -> int:
+    """fork 一个工作进程，返回子进程 PID"""
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            serve_worker(app, sock, torch_threads, log_level)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+    return pid
+
+
+def main() -> None:
+    args = parse_args()
+    workers = max(1, args.workers)
+    torch_threads = args.torch_threads or max(1, (os.cpu_count() or 1) // workers)
+    # 工作进程据此拒绝在线修改模型注册表（注册表不在进程间共享），见 detector_common.model_registry
+    os.environ["DETECTOR_WORKER_COUNT"] = str(workers)
+
+    app = load_app(os.path.abspath(args.app_dir))
+    sock = create_socket(args.host, args.port)
+
+    # 冻结已加载的对象，避免子进程中的垃圾回收触碰这些对象导致写时复制
+    gc.freeze()
+
+    children = {}
+    for _ in range(workers):
+        pid = spawn_worker(app, sock, torch_threads, args.log_level)
+        children[pid] = time.monotonic()
+    print(f"[supervisor] {args.app_dir} 监听 {args.host}:{args.port}，工作进程: {sorted(children)}", flush=True)
+
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+
+        print(f"[supervisor] 工作进程 {pid} 退出（状态 {status}），重新启动", flush=True)
+        # 启动即崩溃时稍作等待，避免疯狂重启
+        if time.monotonic() - started < 1:
+            time.sleep(1)
+        new_pid = spawn_worker(app, sock, torch_threads, args.log_level)
+        children[new_pid] = time.monotonic()
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
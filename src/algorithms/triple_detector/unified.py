@@ -0,0 +1,220 @@
+"""
+统一检测服务主机（单进程承载害虫、牛只、大米三个检测服务）
+
+三个检测服务原本是三个独立的 FastAPI 进程，各自加载一份 torch/ultralytics 运行时。
+这里在同一个进程、同一个事件循环中承载三个服务：
+- 统一入口（默认端口 8000）：/pest、/cow、/rice 前缀分别挂载三个服务，另提供聚合的 /health、/ready 和 /models
+- 兼容入口：原端口 8001（害虫）、8081（大米）、8002（牛只）和原有路径保持不变
+- 共享模型注册表：启动时在后台线程中加载全部模型，并记录各模型的加载状态
+- 共享线程池：三个服务的解码/编码线程池、害虫与牛只的推理线程合并，推理在同一线程上串行执行，
+  避免多个模型同时抢占 CPU 核心
+
+用法（在项目根目录下执行，保证 src.algorithms 包可导入）:
+    python -m src.algorithms.triple_detector.unified
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack, asynccontextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# 检测服务的模块先按顶层 app / detector_common 包导入（独立部署），失败后才按 src.algorithms.* 完整路径导入。
+# 三个服务的顶层包都叫 app：如果导入路径中存在某个服务的 app 包（例如 PYTHONPATH=/app 指向害虫服务），
+# 三个服务都会导入到这一个服务的路由和配置。统一主机屏蔽这两个顶层包，每个服务一律按自己的完整路径导入。
+SERVICE_TOP_LEVEL_PACKAGES = ("app", "detector_common")
+
+
+def isolate_service_imports() -> None:
+    """屏蔽检测服务的顶层包导入（必须在导入任何检测服务之前调用）"""
+    for name in SERVICE_TOP_LEVEL_PACKAGES:
+        loaded = sys.modules.get(name)
+        if loaded is not None:
+            raise RuntimeError(
+                f"顶层 {name} 包已被导入（{getattr(loaded, '__file__', None) or name}），"
+                f"统一检测服务无法保证各服务按完整路径导入"
+            )
+        # sys.modules 中的 None 使 import 直接抛出 ImportError
+        sys.modules[name] = None
+
+
+isolate_service_imports()
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import FileResponse, JSONResponse
+
+from src.algorithms.pest_detection.detector.app.main import app as pest_app
+from src.algorithms.pest_detection.detector.app.core.config import settings as pest_settings
+from src.algorithms.pest_detection.detector.app.services import model_service as pest_services
+from src.algorithms.cow_detection.detector.app.main import app as cow_app
+from src.algorithms.cow_detection.detector.app.core.config import settings as cow_settings
+from src.algorithms.cow_detection.detector.app.services import model_service as cow_services
+from src.algorithms.rice_detection.detector.app.main import app as rice_app
+from src.algorithms.rice_detection.detector.app.core.config import settings as rice_settings
+from src.algorithms.rice_detection.detector.app.services import model_service as rice_services
+
+
+# 统一入口端口
+UNIFIED_PORT = int(os.getenv("UNIFIED_DETECTOR_PORT", "8000"))
+# 是否同时监听原有的三个端口（兼容旧客户端）
+LEGACY_PORTS_ENABLED = os.getenv("UNIFIED_LEGACY_PORTS", "true").lower() in ("1", "true", "yes")
+HOST = os.getenv("UNIFIED_DETECTOR_HOST", "0.0.0.0")
+# 三个服务共享的解码/编码线程数
+SHARED_WORKER_THREADS = int(os.getenv("UNIFIED_WORKER_THREADS", "8"))
+
+# 服务名 -> (FastAPI 应用, 原端口, 结果图片目录)
+DETECTOR_APPS = {
+    "pest": (pest_app, 8001, pest_settings.RESULTS_DIR),
+    "rice": (rice_app, 8081, rice_settings.RESULTS_DIR),
+    "cow": (cow_app, 8002, cow_settings.RESULTS_DIR),
+}
+
+logger = logging.getLogger("unified_detector")
+
+
+class DetectorRegistry:
+    """
+    共享模型注册表
+
+    记录进程内每个检测模型的加载函数和加载状态，启动时统一在后台线程中加载。
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._status: Dict[str, Dict[str, Any]] = {}
+
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        """注册模型加载函数"""
+        self._loaders[name] = loader
+        self._status[name] = {"status": "pending"}
+
+    async def load_all(self, executor: ThreadPoolExecutor) -> None:
+        """在线程池中依次加载所有模型，单个模型失败不影响其他模型"""
+        loop = asyncio.get_running_loop()
+        for name, loader in self._loaders.items():
+            self._status[name] = {"status": "loading"}
+            started = time.perf_counter()
+            try:
+                await loop.run_in_executor(executor, loader)
+                self._status[name] = {
+                    "status": "loaded",
+                    "load_seconds": round(time.perf_counter() - started, 2),
+                }
+                logger.info(f"模型 {name} 加载完成")
+            except Exception as e:
+                self._status[name] = {"status": "error", "message": str(e)}
+                logger.error(f"模型 {name} 加载失败: {e}")
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """返回各模型的加载状态"""
+        return {name: dict(status) for name, status in self._status.items()}
+
+
+registry = DetectorRegistry()
+registry.register("pest", lambda: pest_services.model_service.model)
+registry.register("cow", lambda: cow_services.model_service.model)
+registry.register("rice", rice_services.get_rice_service)
+
+# 共享线程池：解码/编码线程池，以及串行执行所有模型推理的推理线程
+shared_worker_executor = ThreadPoolExecutor(max_workers=SHARED_WORKER_THREADS, thread_name_prefix="detector-worker")
+shared_inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="detector-inference")
+
+for services in (pest_services, cow_services, rice_services):
+    services.worker_pool.use_executor(shared_worker_executor)
+    services.inference_batcher.use_executor(shared_inference_executor)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 挂载的子应用不会收到 lifespan 事件，由统一入口依次进入各子应用的 lifespan（启动预热、关闭时停止重试）
+    async with AsyncExitStack() as stack:
+        for detector_app, _, _ in DETECTOR_APPS.values():
+            await stack.enter_async_context(detector_app.router.lifespan_context(detector_app))
+        # 后台加载模型，不阻塞服务启动；未加载完成的模型在首次请求时惰性加载
+        load_task = asyncio.create_task(registry.load_all(shared_worker_executor))
+        yield
+        load_task.cancel()
+
+
+app = FastAPI(
+    title="乡村振兴大脑 - 统一检测服务",
+    description="单进程承载害虫检测（/pest）、牛只检测（/cow）和大米识别（/rice）",
+    lifespan=lifespan,
+)
+
+
+@app.get("/health", summary="聚合健康检查", tags=["系统信息"])
+def health_check():
+    models = registry.snapshot()
+    return {
+        "status": "healthy" if all(m["status"] != "error" for m in models.values()) else "degraded",
+        "service": "统一检测服务",
+        "models": models,
+    }
+
+
+@app.get("/ready", summary="聚合就绪检查", tags=["系统信息"])
+def readiness_check():
+    """三个检测服务的模型都加载并预热完成后返回 200，之前返回 503"""
+    detectors = {
+        name: services.readiness.status()
+        for name, services in (("pest", pest_services), ("rice", rice_services), ("cow", cow_services))
+    }
+    ready = all(status["ready"] for status in detectors.values())
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "detectors": detectors})
+
+
+@app.get("/models", summary="模型注册表", tags=["系统信息"])
+def list_models():
+    return {"success": True, "models": registry.snapshot()}
+
+
+@app.get("/results/{filename}", summary="结果图片", tags=["系统信息"])
+def get_result_image(filename: str):
+    """
+    结果图片文件名为内容哈希，三个服务互不冲突；
+    子服务返回的 /results/... 路径在统一入口上同样可以访问
+    """
+    if os.path.basename(filename) != filename:
+        raise HTTPException(status_code=404)
+    for _, _, results_dir in DETECTOR_APPS.values():
+        file_path = os.path.join(results_dir, filename)
+        if os.path.isfile(file_path):
+            return FileResponse(file_path, media_type="image/jpeg")
+    raise HTTPException(status_code=404)
+
+
+for name, (detector_app, _, _) in DETECTOR_APPS.items():
+    app.mount(f"/{name}", detector_app, name=name)
+
+
+async def serve() -> None:
+    """在同一事件循环中运行统一入口和兼容端口"""
+    servers: List[uvicorn.Server] = [
+        uvicorn.Server(uvicorn.Config(app, host=HOST, port=UNIFIED_PORT))
+    ]
+    if LEGACY_PORTS_ENABLED:
+        # 启动事件和模型加载由统一入口的 lifespan 负责，兼容端口不重复执行
+        for detector_app, port, _ in DETECTOR_APPS.values():
+            servers.append(uvicorn.Server(uvicorn.Config(detector_app, host=HOST, port=port, lifespan="off")))
+
+    tasks = [asyncio.create_task(server.serve()) for server in servers]
+    _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+
+    # 任意一个服务退出（如收到停止信号）时，通知其余服务一起退出
+    for server in servers:
+        server.should_exit = True
+    await asyncio.gather(*pending, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve())
@@ -13,6 +13,9 @@ ModelProvider = Literal["deepseek", "glm"]
 DEFAULT_PROVIDER: ModelProvider = os.getenv("MODEL_PROVIDER", "deepseek")  # type: ignore
 DEFAULT_TEMPERATURE = float(os.getenv("MODEL_TEMPERATURE", "0"))
 
+# 同一轮对话中多个工具调用的最大并发数
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "4"))
+
 # 模型配置映射
 MODEL_CONFIGS = {
     "deepseek": {
@@ -0,0 +1,283 @@
+"""检测服务批量推理单元测试"""
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+pytest.importorskip("cv2")
+pytest.importorskip("ultralytics")
+torch = pytest.importorskip("torch")
+
+from src.algorithms.pest_detection.detector.app.services import model_service as service_module
+from src.algorithms.pest_detection.detector.app.services.model_service import ModelService
+from src.algorithms.rice_detection.detector.app.services import model_service as rice_service_module
+from src.algorithms.rice_detection.detector.app.services.model_service import RiceService
+from src.algorithms.detector_common.model_registry import ModelRegistry
+from src.algorithms.detector_common.micro_batch import MicroBatcher
+from src.algorithms.detector_common.result_cache import ResultCache
+
+
+class FakeBoxes:
+    """模拟 ultralytics 的检测框集合（count 个相同类别和置信度的框）"""
+
+    def __init__(self, class_id: int, confidence: float, count: int):
+        self.xyxy = torch.zeros((count, 4))
+        self.cls = torch.full((count,), float(class_id))
+        self.conf = torch.full((count,), confidence)
+
+    def __len__(self):
+        return len(self.cls)
+
+
+class FakeResult:
+    """模拟 ultralytics 单张图像的推理结果"""
+
+    def __init__(self, image: np.ndarray, boxes: FakeBoxes):
+        self.image = image
+        self.boxes = boxes
+        self.names = {0: "1", 1: "2"}
+
+    def plot(self):
+        return self.image + 1
+
+
+class FakeModel:
+    """按图像像素值生成检测框的模拟模型，记录每次调用的输入"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, images, **kwargs):
+        self.calls.append(images)
+        return [
+            FakeResult(image, FakeBoxes(int(image[0, 0, 0]) % 2, 0.9, int(image[0, 0, 0]) + 1))
+            for image in images
+        ]
+
+
+def make_images(count: int) -> list:
+    return [np.full((8, 8, 3), index, dtype=np.uint8) for index in range(count)]
+
+
+class TestPestPredictBatch:
+    """测试害虫检测服务的批量推理"""
+
+    @pytest.fixture
+    def service(self):
+        service = ModelService()
+        service.registry.add("test", "fake.pt", FakeModel(), ("瓜实蝇", "小菜蛾"), "test", activate=True)
+        service._initialized = True
+        return service
+
+    def test_single_forward_pass_in_order(self, service):
+        """测试多张图像只调用一次模型，结果按输入顺序返回"""
+        images = make_images(3)
+        outputs = service.predict_batch(images)
+
+        assert len(service.model.calls) == 1
+        assert len(service.model.calls[0]) == 3
+        assert [detections for detections, _ in outputs] == [
+            [{"name": "瓜实蝇", "count": 1}],
+            [{"name": "小菜蛾", "count": 2}],
+            [{"name": "瓜实蝇", "count": 3}],
+        ]
+        assert [int(image[0, 0, 0]) for _, image in outputs] == [1, 2, 3]
+
+    def test_predict_matches_batch(self, service):
+        """测试单张预测与批量预测结果一致"""
+        image = make_images(2)[1]
+        assert service.predict(image)[0] == service.predict_batch([image])[0][0]
+
+    def test_empty_batch(self, service):
+        """测试空列表不调用模型"""
+        assert service.predict_batch([]) == []
+        assert service.model.calls == []
+
+    def test_skip_annotation(self, service):
+        """测试 annotate=False 时不绘制标注图像，检测结果不变"""
+        images = make_images(2)
+        outputs = service.predict_batch(images, annotate=False)
+
+        assert [image for _, image in outputs] == [None, None]
+        assert [detections for detections, _ in outputs] == [
+            detections for detections, _ in service.predict_batch(images)
+        ]
+
+    def test_warm_up_model(self, service):
+        """测试预热按生产输入尺寸执行指定次数的推理"""
+        service.warm_up_model(2)
+
+        imgsz = service_module.settings.EXPORT_IMGSZ
+        assert [[image.shape for image in images] for images in service.model.calls] == [[(imgsz, imgsz, 3)]] * 2
+
+
+class FlakyModel(FakeModel):
+    """前 failures 次调用抛出异常的模拟模型"""
+
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    def __call__(self, images, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            self.calls.append(images)
+            raise RuntimeError("CUDA out of memory")
+        return super().__call__(images, **kwargs)
+
+
+class TestPestInferenceFailure:
+    """测试害虫检测推理失败时抛出异常，失败结果不写入结果缓存"""
+
+    @pytest.fixture
+    def service(self):
+        service = ModelService()
+        service.registry.add("test", "fake.pt", FlakyModel(failures=1), ("瓜实蝇", "小菜蛾"), "test", activate=True)
+        service._initialized = True
+        return service
+
+    def test_predict_batch_raises(self, service):
+        with pytest.raises(RuntimeError):
+            service.predict_batch(make_images(2))
+
+    def test_predict_tiled_raises(self, service):
+        with pytest.raises(RuntimeError):
+            service.predict_tiled(make_images(1)[0])
+
+    def test_failure_not_cached(self, service, monkeypatch):
+        """测试推理失败后重试会重新推理，而不是命中缓存返回空的检测结果"""
+        import cv2
+        from src.algorithms.pest_detection.detector.app.api import routes
+
+        monkeypatch.setattr(routes, "model_service", service)
+        monkeypatch.setattr(routes, "result_cache", ResultCache(max_mb=1))
+        monkeypatch.setattr(routes, "inference_batcher", MicroBatcher(service.predict_batch, window_ms=0))
+        image_data = cv2.imencode(".jpg", np.full((8, 8, 3), 2, dtype=np.uint8))[1].tobytes()
+
+        async def detect_twice():
+            with pytest.raises(RuntimeError):
+                await routes._detect_image_data(image_data, tiled=False)
+            return await routes._detect_image_data(image_data, tiled=False)
+
+        detections, _, _ = asyncio.run(detect_twice())
+
+        assert len(service.model.calls) == 2
+        assert detections == [{"name": "瓜实蝇", "count": 3}]
+
+
+class TestRicePredictBatch:
+    """测试大米识别服务的批量推理"""
+
+    @pytest.fixture
+    def service(self):
+        service = RiceService.__new__(RiceService)
+        service.registry = ModelRegistry(RiceService._load_weights)
+        service.registry.add("test", "fake.pt", FakeModel(), (), "test", activate=True)
+        service.name_map = {"1": "糯米", "2": "丝苗米"}
+        service._inference_lock = threading.Lock()
+        return service
+
+    def test_single_forward_pass_in_order(self, service):
+        """测试多张图片只调用一次模型，结果按输入顺序返回"""
+        outputs = service.predict_batch(make_images(2))
+
+        assert len(service.model.calls) == 1
+        assert [result["detections"] for result, _ in outputs] == [
+            [{"name": "糯米", "count": 1}],
+            [{"name": "丝苗米", "count": 2}],
+        ]
+
+    def test_warm_up_failure_raised(self, service):
+        """测试预热时推理失败会抛出异常（而不是返回失败结果）"""
+        def broken_model(images, **kwargs):
+            raise RuntimeError("boom")
+
+        service.registry.add("broken", "fake.pt", broken_model, (), "broken", activate=True)
+        with pytest.raises(RuntimeError):
+            service.warm_up_model(1)
+
+    def test_inference_failure_reported_per_image(self, service):
+        """测试推理失败时每张图片都返回错误信息"""
+        def broken_model(images, **kwargs):
+            raise RuntimeError("boom")
+
+        service.registry.add("broken", "fake.pt", broken_model, (), "broken", activate=True)
+        outputs = service.predict_batch(make_images(2))
+
+        assert [result["success"] for result, _ in outputs] == [False, False]
+        assert all(plot_img is None for _, plot_img in outputs)
+
+    def test_skip_annotation(self, service):
+        """测试 annotate=False 时不绘制标注图片"""
+        outputs = service.predict_batch(make_images(2), annotate=False)
+
+        assert [result["success"] for result, _ in outputs] == [True, True]
+        assert all(plot_img is None for _, plot_img in outputs)
+
+    def test_annotation_under_inference_lock(self, service, monkeypatch):
+        """测试标注图片与推理一样在推理锁内生成"""
+        lock_held = []
+        monkeypatch.setattr(FakeResult, "plot", lambda result: lock_held.append(service._inference_lock.locked()))
+
+        service.predict_batch(make_images(2))
+
+        assert lock_held == [True, True]
+
+
+class TestRiceServiceSingleton:
+    """测试大米识别服务单例的线程安全创建"""
+
+    @pytest.fixture(autouse=True)
+    def reset_instance(self, monkeypatch):
+        monkeypatch.setattr(rice_service_module, "_service_instance", None)
+
+    def test_concurrent_construction(self, monkeypatch):
+        """测试多个线程同时首次获取服务时只创建一个实例"""
+        created = []
+        barrier = threading.Barrier(8)
+
+        class SlowService:
+            def __init__(self, name_map):
+                created.append(self)
+                threading.Event().wait(0.05)
+
+        monkeypatch.setattr(rice_service_module, "RiceService", SlowService)
+        instances = []
+
+        def worker():
+            barrier.wait()
+            instances.append(rice_service_module.get_rice_service())
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        assert len(created) == 1
+        assert len(instances) == 8
+        assert all(instance is created[0] for instance in instances)
+
+    def test_failed_construction_retried(self, monkeypatch):
+        """测试模型加载失败时不缓存实例，下次调用重新加载"""
+        attempts = []
+
+        class FlakyService:
+            def __init__(self, name_map):
+                attempts.append(name_map)
+                if len(attempts) == 1:
+                    raise FileNotFoundError("模型文件不存在")
+
+        monkeypatch.setattr(rice_service_module, "RiceService", FlakyService)
+        with pytest.raises(FileNotFoundError):
+            rice_service_module.get_rice_service()
+
+        assert isinstance(rice_service_module.get_rice_service(), FlakyService)
+        assert len(attempts) == 2
@@ -0,0 +1,134 @@
+"""奶牛检测工具单元测试"""
+import importlib
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("ultralytics")
+pytest.importorskip("langchain_core")
+torch = pytest.importorskip("torch")
+
+# 工具包的 __init__ 导出了同名的工具对象，这里按模块路径导入
+tool_module = importlib.import_module("src.agents.tools.cow_detection_tool")
+
+
+class FakeBoxes:
+    """每帧的检测框数量等于帧像素值 / 8（类别 0 为 cow），第 k 个框的位置固定"""
+
+    def __init__(self, count: int):
+        self.cls = torch.zeros(count)
+        self.conf = torch.full((count,), 0.9)
+        self.xyxy = torch.tensor([[k * 10.0, 0.0, k * 10.0 + 8, 8.0] for k in range(count)]).reshape(-1, 4)
+
+    def __len__(self):
+        return len(self.cls)
+
+
+class FakeResult:
+    def __init__(self, image: np.ndarray):
+        self.boxes = FakeBoxes(round(int(image[0, 0, 0]) / 8))
+
+
+class FakeModel:
+    names = {0: "cow", 1: "person"}
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, images, **kwargs):
+        self.batch_sizes.append(len(images))
+        return [FakeResult(image) for image in images]
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    """10fps、30 帧的测试视频，第 i 帧的像素值为 i * 8"""
+    path = str(tmp_path / "farm.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (32, 32))
+    for index in range(30):
+        writer.write(np.full((32, 32, 3), index * 8, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+class TestProcessVideo:
+    """测试视频的时间采样和批量推理"""
+
+    def test_samples_by_time_interval(self, video_path):
+        result = tool_module.process_video(video_path, FakeModel(), sample_interval=0.5, batch_size=4)
+
+        frames = result["detection_results"]["frame_results"]
+        assert [frame["frame"] for frame in frames] == [0, 5, 10, 15, 20, 25]
+        assert [frame["time"] for frame in frames] == [0.0, 0.5, 1.0, 1.5, 2.0, 2.5]
+        assert result["video_info"]["frame_step"] == 5
+
+    def test_decodes_sampled_frames(self, video_path):
+        """采样到的是正确的帧：第 i 帧有 i 头奶牛"""
+        result = tool_module.process_video(video_path, FakeModel(), sample_interval=1.0)
+
+        frames = result["detection_results"]["frame_results"]
+        assert [frame["cow_count"] for frame in frames] == [0, 10, 20]
+        assert result["detection_results"]["max_cows"] == 20
+
+    def test_batches_sampled_frames(self, video_path):
+        model = FakeModel()
+        tool_module.process_video(video_path, model, sample_interval=0.5, batch_size=4)
+        assert model.batch_sizes == [4, 2]
+
+    def test_tracking_counts_unique_cows(self, video_path):
+        """同一位置的奶牛跨帧只计一次；只出现在一个采样帧中的检测不计入"""
+        result = tool_module.process_video(video_path, FakeModel(), sample_interval=0.5, track=True)
+
+        detection = result["detection_results"]
+        assert detection["max_cows"] == 25
+        assert detection["unique_cows"] == 20
+        first = detection["tracks"][0]
+        assert (first["first_time"], first["last_time"], first["dwell_time"]) == (0.5, 2.5, 2.0)
+        assert "trajectory" not in first
+
+    def test_tracking_disabled(self, video_path):
+        result = tool_module.process_video(video_path, FakeModel(), sample_interval=0.5, track=False)
+        assert "unique_cows" not in result["detection_results"]
+
+    def test_unreadable_video(self, tmp_path):
+        path = tmp_path / "broken.mp4"
+        path.write_bytes(b"not a video")
+        assert tool_module.process_video(str(path), FakeModel())["success"] is False
+
+
+class TestGetModel:
+    """测试进程级模型缓存"""
+
+    def test_loaded_once_across_threads(self, monkeypatch):
+        calls = []
+
+        def fake_load():
+            calls.append(1)
+            return FakeModel()
+
+        monkeypatch.setattr(tool_module, "_model", None)
+        monkeypatch.setattr(tool_module, "load_model", fake_load)
+
+        models = []
+        threads = [threading.Thread(target=lambda: models.append(tool_module.get_model())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert all(model is models[0] for model in models)
+
+    def test_missing_model_not_cached(self, monkeypatch):
+        monkeypatch.setattr(tool_module, "_model", None)
+        monkeypatch.setattr(tool_module, "load_model", lambda: None)
+        assert tool_module.get_model() is None
+        assert tool_module._model is None
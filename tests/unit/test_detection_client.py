@@ -0,0 +1,131 @@
+"""检测服务 HTTP 客户端单元测试"""
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.agents.tools import detection_client
+
+
+@pytest.fixture(autouse=True)
+def reset_clients():
+    """每个测试前后重置共享客户端"""
+    detection_client.close_clients()
+    yield
+    detection_client.close_clients()
+
+
+class TestSyncSession:
+    """测试同步连接池会话"""
+
+    def test_session_is_shared(self):
+        """测试会话在进程内复用"""
+        assert detection_client.get_session() is detection_client.get_session()
+
+    def test_adapter_configuration(self):
+        """测试连接池和重试配置"""
+        adapter = detection_client.get_session().get_adapter("http://127.0.0.1:8001/detect")
+        assert adapter._pool_maxsize == detection_client.POOL_MAXSIZE
+        assert adapter.max_retries.total == detection_client.MAX_RETRIES
+        assert "POST" in adapter.max_retries.allowed_methods
+        assert 503 in adapter.max_retries.status_forcelist
+        assert adapter.max_retries.read == 0
+
+    def test_close_recreates_session(self):
+        """测试关闭后重新创建会话"""
+        first = detection_client.get_session()
+        detection_client.close_clients()
+        assert detection_client.get_session() is not first
+
+
+class TestAsyncClient:
+    """测试异步客户端"""
+
+    def test_retry_on_unavailable(self, monkeypatch):
+        """测试 503 响应后重试并返回最终结果"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                return httpx.Response(503, headers={"Retry-After": "0"})
+            return httpx.Response(200, json={"success": True})
+
+        async def run():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            monkeypatch.setattr(detection_client, "get_async_client", lambda: client)
+            response = await detection_client.apost_json("http://detector/detect", {"a": 1})
+            await client.aclose()
+            return response
+
+        response = asyncio.run(run())
+        assert response.status_code == 200
+        assert len(calls) == 2
+
+    def test_retries_exhausted(self, monkeypatch):
+        """测试连接失败重试次数用尽后抛出异常"""
+        monkeypatch.setattr(detection_client, "BACKOFF_FACTOR", 0)
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            raise httpx.ConnectError("refused", request=request)
+
+        async def run():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            monkeypatch.setattr(detection_client, "get_async_client", lambda: client)
+            try:
+                await detection_client.apost_json("http://detector/detect", {})
+            finally:
+                await client.aclose()
+
+        with pytest.raises(httpx.ConnectError):
+            asyncio.run(run())
+        assert len(calls) == detection_client.MAX_RETRIES + 1
+
+    def test_client_reused_within_loop(self):
+        """测试同一事件循环内复用客户端"""
+        async def run():
+            first = detection_client.get_async_client()
+            second = detection_client.get_async_client()
+            await first.aclose()
+            return first is second
+
+        assert asyncio.run(run())
+
+    def test_replaced_client_closed(self):
+        """测试事件循环变化时关闭被替换的旧客户端"""
+        async def get_client():
+            return detection_client.get_async_client()
+
+        first = asyncio.run(get_client())
+
+        async def replace():
+            second = detection_client.get_async_client()
+            await detection_client.aclose_clients()
+            return second
+
+        second = asyncio.run(replace())
+
+        assert second is not first
+        assert first.is_closed and second.is_closed
+
+    def test_aclose_clients(self):
+        """测试关闭当前事件循环的异步客户端，之后重新创建"""
+        async def run():
+            first = detection_client.get_async_client()
+            await detection_client.aclose_clients()
+            second = detection_client.get_async_client()
+            await detection_client.aclose_clients()
+            return first, second
+
+        first, second = asyncio.run(run())
+
+        assert first.is_closed
+        assert second is not first
@@ -0,0 +1,141 @@
+"""检测快速通道单元测试"""
+import asyncio
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+pytest.importorskip("dotenv")
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import ToolMessage
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    # 服务模块导入时在工作目录下创建检测结果目录
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module("service.server")
+
+
+class FakeTool:
+    """记录调用参数的模拟检测工具"""
+
+    def __init__(self, success: bool = True):
+        self.calls = []
+        self.success = success
+
+    async def ainvoke(self, call):
+        self.calls.append(call)
+        return ToolMessage(
+            content=f"检测结果: {call['args']}" if self.success else "无法连接到检测服务，请确认服务已启动",
+            tool_call_id=call["id"],
+            artifact={"result_image_path": None, "success": self.success},
+        )
+
+
+class FakeAgent:
+    """记录输入消息的模拟 Agent（不产生任何事件）"""
+
+    def __init__(self):
+        self.messages = None
+
+    async def astream_events(self, inputs, config, version):
+        self.messages = inputs["messages"]
+        return
+        yield
+
+
+class TestRouteDetection:
+    """快速通道路由判断测试"""
+
+    @pytest.mark.parametrize("message,kind", [
+        ("这是什么虫?", "pest"),
+        ("识别一下这袋米", "rice"),
+        ("这是什么大米", "rice"),
+        ("稻谷品种识别", "rice"),
+        ("图里有几头牛", "cow"),
+    ])
+    def test_high_confidence(self, server, message, kind):
+        assert server.route_detection(message, ["a.jpg"]) == kind
+
+    @pytest.mark.parametrize("message,image_paths,mode", [
+        ("这是什么虫?", [], "auto"),
+        ("这是什么虫?", ["a.jpg"], "planning"),
+        ("帮我看看", ["a.jpg"], "auto"),
+        ("牛棚里的虫子怎么办", ["a.jpg"], "auto"),
+        ("这种虫对乡村旅游产业有什么影响", ["a.jpg"], "auto"),
+        ("这是什么虫" + "，" * 40, ["a.jpg"], "auto"),
+        ("玉米叶子上这是什么", ["a.jpg"], "auto"),
+        ("水稻叶片发黄是怎么回事", ["a.jpg"], "auto"),
+        ("玉米粒发霉了", ["a.jpg"], "auto"),
+        ("这只蜗牛是什么", ["a.jpg"], "auto"),
+    ])
+    def test_fallback_to_agent(self, server, message, image_paths, mode):
+        assert server.route_detection(message, image_paths, mode) is None
+
+    def test_disabled(self, server, monkeypatch):
+        monkeypatch.setattr(server, "DETECTION_FAST_PATH", False)
+        assert server.route_detection("这是什么虫?", ["a.jpg"]) is None
+
+
+class TestRunDetectionFastPath:
+    """快速通道直接调用检测工具测试"""
+
+    def test_tool_calls_in_order(self, server, monkeypatch):
+        tool = FakeTool()
+        monkeypatch.setattr(server, "_get_detection_tool", lambda name: tool)
+
+        detections = asyncio.run(server.run_detection_fast_path("cow", ["a.jpg", "b.jpg"]))
+
+        assert [call["args"] for call, _ in detections] == [{"file_path": "a.jpg"}, {"file_path": "b.jpg"}]
+        assert all(call["name"] == "cow_detection_tool" for call, _ in detections)
+        # 工具结果与注入的工具调用一一对应
+        assert [message.tool_call_id for _, message in detections] == [call["id"] for call, _ in detections]
+        assert len(tool.calls) == 2
+
+    def test_tool_failure_detected(self, server, monkeypatch):
+        monkeypatch.setattr(server, "_get_detection_tool", lambda name: FakeTool(success=False))
+
+        detections = asyncio.run(server.run_detection_fast_path("pest", ["a.jpg"]))
+
+        assert not server.detection_succeeded(detections[0][1])
+
+
+class TestChatStreamFastPath:
+    """对话接口中快速通道结果的注入测试"""
+
+    @pytest.fixture
+    def chat(self, server, monkeypatch):
+        from fastapi.testclient import TestClient
+
+        agent = FakeAgent()
+        monkeypatch.setattr(server, "get_agent", lambda: agent)
+        monkeypatch.setattr(server.storage, "attach", lambda thread_id, paths: 0)
+        client = TestClient(server.app)
+
+        def send(tool):
+            monkeypatch.setattr(server, "_get_detection_tool", lambda name: tool)
+            response = client.post("/chat/stream", json={"message": "这是什么虫?", "image_paths": ["a.jpg"]})
+            assert response.status_code == 200
+            return agent.messages
+
+        return send
+
+    def test_results_injected(self, chat):
+        messages = chat(FakeTool())
+
+        # 用户消息 + 工具调用 + 工具结果
+        assert len(messages) == 3
+        assert isinstance(messages[2], ToolMessage)
+
+    def test_tool_failure_falls_back_to_agent(self, chat):
+        """测试检测工具返回错误信息时不注入对话，由 Agent 按常规流程处理"""
+        messages = chat(FakeTool(success=False))
+
+        assert len(messages) == 1
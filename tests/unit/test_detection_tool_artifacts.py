@@ -0,0 +1,180 @@
+"""检测工具 artifact 单元测试"""
+import asyncio
+import importlib
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# 工具包的 __init__ 导出了同名的工具对象，这里按模块路径导入
+pest_module = importlib.import_module("src.agents.tools.pest_detection_tool")
+
+
+def tool_call(image_path: str) -> dict:
+    """构造 Agent 发起的工具调用（返回 ToolMessage，包含 artifact）"""
+    return {"name": "pest_detection_tool", "args": {"image_path": image_path}, "id": "call-1", "type": "tool_call"}
+
+
+@pytest.fixture
+def image_file(tmp_path):
+    """临时图片文件"""
+    path = tmp_path / "pest.jpg"
+    path.write_bytes(b"\xff\xd8\xff\xe0fake-jpeg")
+    return path
+
+
+class TestPestDetectionArtifact:
+    """测试检测工具通过 artifact 返回结果图片路径"""
+
+    def test_result_image_in_artifact(self, monkeypatch, tmp_path, image_file):
+        """测试结果图片路径只出现在 artifact 中，不发送给模型"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(
+            pest_module, "request_detection",
+            lambda url, path: ({"success": True, "detections": [{"name": "瓜实蝇", "count": 3}]}, b"jpeg"),
+        )
+
+        message = pest_module.pest_detection_tool.invoke(tool_call(str(image_file)))
+
+        assert message.content == "检测结果: 瓜实蝇(3只)"
+        saved = Path(message.artifact["result_image_path"])
+        assert saved.parent.name == "pest_detection_results"
+        assert saved.read_bytes() == b"jpeg"
+        assert message.artifact["success"] is True
+
+    def test_no_result_image_on_error(self, tmp_path):
+        """测试调用失败时 artifact 中没有结果图片"""
+        message = pest_module.pest_detection_tool.invoke(tool_call(str(tmp_path / "missing.jpg")))
+
+        assert message.content.startswith("文件错误")
+        assert message.artifact == {"result_image_path": None, "success": False}
+
+    def test_plain_invoke_returns_content(self, tmp_path):
+        """测试直接以参数调用时只返回文字摘要"""
+        result = pest_module.pest_detection_tool.invoke({"image_path": str(tmp_path / "missing.jpg")})
+
+        assert isinstance(result, str)
+
+
+class TestPestDetectionAsync:
+    """测试检测工具的异步实现（Agent 并发执行工具调用时使用）"""
+
+    def test_ainvoke_uses_async_request(self, monkeypatch, tmp_path, image_file):
+        """测试异步调用走异步请求，结果与同步调用一致"""
+        monkeypatch.chdir(tmp_path)
+
+        async def fake_arequest_detection(url, path):
+            return {"success": True, "detections": [{"name": "瓜实蝇", "count": 3}]}, b"jpeg"
+
+        def fail_request_detection(url, path):
+            raise AssertionError("异步调用不应使用同步请求")
+
+        monkeypatch.setattr(pest_module, "arequest_detection", fake_arequest_detection)
+        monkeypatch.setattr(pest_module, "request_detection", fail_request_detection)
+
+        message = asyncio.run(pest_module.pest_detection_tool.ainvoke(tool_call(str(image_file))))
+
+        assert message.content == "检测结果: 瓜实蝇(3只)"
+        assert Path(message.artifact["result_image_path"]).read_bytes() == b"jpeg"
+
+    def test_ainvoke_error(self, monkeypatch, image_file):
+        """测试异步请求失败时返回错误提示"""
+        async def fake_arequest_detection(url, path):
+            raise httpx.ConnectError("refused")
+
+        monkeypatch.setattr(pest_module, "arequest_detection", fake_arequest_detection)
+
+        message = asyncio.run(pest_module.pest_detection_tool.ainvoke(tool_call(str(image_file))))
+
+        assert message.content == pest_module.format_error(httpx.ConnectError("refused"))
+        assert message.artifact == {"result_image_path": None, "success": False}
+
+
+class ToolCallingModel(BaseChatModel):
+    """模拟模型：第一轮回复发起给定的工具调用，收到工具结果后回复文字"""
+
+    tool_calls: list
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-tool-calling"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if any(isinstance(message, ToolMessage) for message in messages):
+            reply = AIMessage(content="检测完成")
+        else:
+            reply = AIMessage(content="", tool_calls=self.tool_calls)
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+
+class TestOrchestratorToolConcurrency:
+    """测试编排 Agent 并发执行同一轮回复中的多个工具调用"""
+
+    def test_bounded_concurrency_in_call_order(self, monkeypatch, tmp_path):
+        """测试并发数不超过 TOOL_MAX_CONCURRENCY，工具结果按工具调用顺序写回"""
+        pytest.importorskip("langchain.agents")
+        from langchain.agents import create_agent
+        from langgraph.checkpoint.memory import InMemorySaver
+
+        from src.config import TOOL_MAX_CONCURRENCY
+
+        monkeypatch.chdir(tmp_path)
+        call_count = TOOL_MAX_CONCURRENCY * 2 + 1
+        paths = []
+        for index in range(call_count):
+            path = tmp_path / f"{index}.jpg"
+            path.write_bytes(b"\xff\xd8\xff\xe0fake-jpeg")
+            paths.append(path)
+
+        in_flight = 0
+        max_in_flight = 0
+
+        async def slow_arequest_detection(url, path):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            index = int(Path(path).stem)
+            # 越靠后的调用完成得越早，结果顺序不能依赖完成顺序
+            await asyncio.sleep(0.01 * (call_count - index))
+            in_flight -= 1
+            return {"success": True, "detections": [{"name": "瓜实蝇", "count": index + 1}]}, None
+
+        monkeypatch.setattr(pest_module, "arequest_detection", slow_arequest_detection)
+
+        tool_calls = [
+            {"name": "pest_detection_tool", "args": {"image_path": str(path)}, "id": f"call-{index}", "type": "tool_call"}
+            for index, path in enumerate(paths)
+        ]
+        # 与编排 Agent 相同的构造方式
+        agent = create_agent(
+            model=ToolCallingModel(tool_calls=tool_calls),
+            tools=[pest_module.pest_detection_tool],
+            checkpointer=InMemorySaver(),
+        ).with_config({"max_concurrency": TOOL_MAX_CONCURRENCY})
+
+        result = asyncio.run(agent.ainvoke(
+            {"messages": [HumanMessage(content="这些是什么虫？")]},
+            {"configurable": {"thread_id": "concurrency"}},
+        ))
+
+        tool_messages = [message for message in result["messages"] if isinstance(message, ToolMessage)]
+        assert [message.tool_call_id for message in tool_messages] == [call["id"] for call in tool_calls]
+        assert [message.content for message in tool_messages] == [
+            f"检测结果: 瓜实蝇({index + 1}只)" for index in range(call_count)
+        ]
+        # 确实并发执行，且不超过上限
+        assert 1 < max_in_flight <= TOOL_MAX_CONCURRENCY
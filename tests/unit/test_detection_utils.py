@@ -0,0 +1,81 @@
+"""检测工具共享模块单元测试"""
+import base64
+import json
+import sys
+from pathlib import Path
+
+import pytest
+import requests
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.agents.tools import detection_utils
+
+
+def make_response(status_code: int, content: bytes, headers: dict) -> requests.Response:
+    """构造模拟的检测服务响应"""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers)
+    return response
+
+
+@pytest.fixture
+def image_file(tmp_path):
+    """临时图片文件"""
+    path = tmp_path / "pest.jpg"
+    path.write_bytes(b"\xff\xd8\xff\xe0fake-jpeg")
+    return path
+
+
+class TestRequestDetection:
+    """测试原始字节方式调用检测服务"""
+
+    def test_binary_response(self, monkeypatch, image_file):
+        """测试二进制结果图片和响应头中的检测结果"""
+        sent = {}
+
+        def fake_post_bytes(url, data, params=None, timeout=None):
+            sent.update(url=url, data=data, params=params)
+            detections = [{"name": "瓜实蝇", "count": 2}]
+            return make_response(200, b"result-jpeg", {
+                "Content-Type": "image/jpeg",
+                "X-Detections": json.dumps(detections),
+            })
+
+        monkeypatch.setattr(detection_utils, "post_bytes", fake_post_bytes)
+        api_response, image = detection_utils.request_detection(
+            "http://detector/detect/upload", str(image_file), params={"task_type": "品种分类"}
+        )
+
+        assert sent["data"] == image_file.read_bytes()
+        assert sent["params"] == {"result_format": "binary", "task_type": "品种分类"}
+        assert api_response == {"success": True, "detections": [{"name": "瓜实蝇", "count": 2}]}
+        assert image == b"result-jpeg"
+
+    def test_json_response(self, monkeypatch, image_file):
+        """测试服务返回 JSON（失败或旧版服务）时的兼容处理"""
+        body = {"success": True, "detections": [], "result_image": base64.b64encode(b"jpeg").decode()}
+        monkeypatch.setattr(
+            detection_utils, "post_bytes",
+            lambda *args, **kwargs: make_response(
+                200, json.dumps(body).encode(), {"Content-Type": "application/json"}
+            ),
+        )
+
+        api_response, image = detection_utils.request_detection("http://detector/detect/upload", str(image_file))
+        assert api_response["success"] is True
+        assert image == b"jpeg"
+
+    def test_http_error(self, monkeypatch, image_file):
+        """测试非 2xx 状态码抛出 HTTPError"""
+        monkeypatch.setattr(
+            detection_utils, "post_bytes",
+            lambda *args, **kwargs: make_response(413, b"{}", {"Content-Type": "application/json"}),
+        )
+
+        with pytest.raises(requests.HTTPError):
+            detection_utils.request_detection("http://detector/detect/upload", str(image_file))
@@ -0,0 +1,108 @@
+"""检测服务上传文件保存单元测试"""
+import asyncio
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from starlette.requests import Request
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.algorithms.detector_common import upload as upload_module
+from src.algorithms.detector_common.upload import UploadTooLargeError, save_upload_to_file
+
+BOUNDARY = "test-boundary"
+
+
+def make_request(body: bytes, content_type: str) -> Request:
+    """构造只包含请求体的 FastAPI 请求"""
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/",
+        "headers": [(b"content-type", content_type.encode())],
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    return Request(scope, receive)
+
+
+def multipart_request(data: bytes) -> Request:
+    body = (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="clip.mp4"\r\n'
+        "Content-Type: video/mp4\r\n\r\n"
+    ).encode() + data + f"\r\n--{BOUNDARY}--\r\n".encode()
+    return make_request(body, f"multipart/form-data; boundary={BOUNDARY}")
+
+
+class TestSaveUploadToFile:
+    """测试上传文件边接收边写入临时文件"""
+
+    def test_multipart_copied_off_event_loop(self, tmp_path, monkeypatch):
+        """测试 multipart 文件的复制在线程池中执行"""
+        threads = []
+        copy_limited = upload_module.copy_limited
+
+        def record_thread(*args):
+            threads.append(threading.current_thread())
+            return copy_limited(*args)
+
+        monkeypatch.setattr(upload_module, "copy_limited", record_thread)
+        monkeypatch.setattr(upload_module, "COPY_CHUNK_SIZE", 16)
+        data = b"v" * 100
+
+        path = asyncio.run(save_upload_to_file(multipart_request(data), 1000, str(tmp_path), ".mp4"))
+
+        assert Path(path).read_bytes() == data
+        assert threads and threads[0] is not threading.main_thread()
+
+    def test_multipart_too_large_removed(self, tmp_path, monkeypatch):
+        """测试 multipart 文件超过大小限制时删除临时文件"""
+        monkeypatch.setattr(upload_module, "COPY_CHUNK_SIZE", 16)
+
+        with pytest.raises(UploadTooLargeError):
+            asyncio.run(save_upload_to_file(multipart_request(b"v" * 100), 50, str(tmp_path), ".mp4"))
+        assert os.listdir(tmp_path) == []
+
+    def test_raw_stream_written_off_event_loop(self, tmp_path, monkeypatch):
+        """测试原始字节上传的每块数据在线程池中写盘"""
+        threads = []
+        fdopen = os.fdopen
+
+        class RecordingFile:
+            def __init__(self, f):
+                self._f = f
+
+            def write(self, chunk):
+                threads.append(threading.current_thread())
+                return self._f.write(chunk)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                self._f.close()
+
+        monkeypatch.setattr(upload_module.os, "fdopen", lambda fd, mode: RecordingFile(fdopen(fd, mode)))
+        request = make_request(b"raw-video", "application/octet-stream")
+
+        path = asyncio.run(save_upload_to_file(request, 1000, str(tmp_path), ".mp4"))
+
+        assert Path(path).read_bytes() == b"raw-video"
+        assert threads and all(thread is not threading.main_thread() for thread in threads)
+
+    def test_raw_stream(self, tmp_path):
+        """测试原始字节上传"""
+        request = make_request(b"raw-video", "application/octet-stream")
+
+        path = asyncio.run(save_upload_to_file(request, 1000, str(tmp_path), ".mp4"))
+
+        assert Path(path).read_bytes() == b"raw-video"
@@ -0,0 +1,110 @@
+"""图片快速解码单元测试"""
+import io
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+cv2 = pytest.importorskip("cv2")
+Image = pytest.importorskip("PIL.Image")
+
+from src.algorithms.detector_common import image_decode
+from src.algorithms.detector_common.image_decode import (
+    ImagePixelsTooLargeError, decode_image, read_image_size, reduction_factor
+)
+
+
+def encode(image: np.ndarray, ext: str = ".jpg") -> bytes:
+    return cv2.imencode(ext, image)[1].tobytes()
+
+
+def jpeg_with_orientation(image: np.ndarray, orientation: int) -> bytes:
+    exif = Image.Exif()
+    exif[image_decode.EXIF_ORIENTATION_TAG] = orientation
+    buffer = io.BytesIO()
+    Image.fromarray(image[..., ::-1]).save(buffer, "JPEG", exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+class TestReductionFactor:
+    @pytest.mark.parametrize("size,target,expected", [
+        ((4000, 3000), 640, 4),
+        ((6000, 4000), 640, 8),
+        ((1280, 720), 640, 2),
+        ((1000, 800), 640, 1),
+        ((4000, 3000), 0, 1),
+    ])
+    def test_keeps_long_side_above_target(self, size, target, expected):
+        assert reduction_factor(*size, target) == expected
+
+
+class TestDecodeImage:
+    """测试缩小解码、EXIF 方向和解压炸弹检查"""
+
+    def test_jpeg_decoded_at_reduced_resolution(self):
+        data = encode(np.full((1600, 2400, 3), 128, dtype=np.uint8))
+        assert decode_image(data, target_size=640).shape == (800, 1200, 3)
+        assert decode_image(data).shape == (1600, 2400, 3)
+
+    def test_png_decoded_at_full_resolution(self):
+        data = encode(np.zeros((1600, 2400, 3), dtype=np.uint8), ".png")
+        assert decode_image(data, target_size=640).shape == (1600, 2400, 3)
+
+    def test_exif_orientation_applied(self):
+        image = np.zeros((400, 800, 3), dtype=np.uint8)
+        data = jpeg_with_orientation(image, 6)
+
+        assert read_image_size(data) == (400, 800)
+        assert decode_image(data).shape == (800, 400, 3)
+        assert decode_image(data, target_size=400).shape == (400, 200, 3)
+
+    def test_rejects_too_many_pixels_before_decoding(self, monkeypatch):
+        data = encode(np.zeros((200, 300, 3), dtype=np.uint8), ".png")
+        monkeypatch.setattr(image_decode.cv2, "imdecode", lambda *args: pytest.fail("不应解码像素"))
+        with pytest.raises(ImagePixelsTooLargeError):
+            decode_image(data, max_pixels=200 * 300 - 1)
+
+    def test_invalid_data(self):
+        assert read_image_size(b"not an image") is None
+        with pytest.raises(ValueError):
+            decode_image(b"not an image")
+
+
+class TestServiceDecoding:
+    """测试检测服务中的解码方式"""
+
+    def test_pest_tiled_images_decoded_at_full_resolution(self, monkeypatch):
+        pytest.importorskip("ultralytics")
+        from src.algorithms.pest_detection.detector.app.services import model_service as module
+        monkeypatch.setattr(module.settings, "TILED_AUTO_MIN_SIDE", 2000)
+        service = module.ModelService()
+        data = encode(np.zeros((1500, 2400, 3), dtype=np.uint8))
+
+        image, use_tiles = service.decode_for_detection(data)
+        assert use_tiles is True and image.shape == (1500, 2400, 3)
+        image, use_tiles = service.decode_for_detection(data, tiled=False)
+        assert use_tiles is False and image.shape == (750, 1200, 3)
+
+    def test_cow_detections_restored_to_original_coordinates(self):
+        pytest.importorskip("ultralytics")
+        from src.algorithms.cow_detection.detector.app.services.model_service import ModelService
+        detailed = [{
+            "class_name": "cow", "confidence": 0.9, "bbox": [10.0, 20.0, 30.0, 60.0], "center": [20.0, 40.0],
+            "size": {"width": 20.0, "height": 40.0, "area": 800.0}, "relative_position": {"x": 0.2, "y": 0.4},
+        }]
+        image_info = {"width": 100, "height": 100, "total_cows": 1}
+
+        scaled, info = ModelService.restore_original_scale(detailed, image_info, (400, 400))
+
+        assert scaled[0]["bbox"] == [40.0, 80.0, 120.0, 240.0]
+        assert scaled[0]["center"] == [80.0, 160.0]
+        assert scaled[0]["size"]["area"] == 80.0 * 160.0
+        assert scaled[0]["relative_position"] == {"x": 0.2, "y": 0.4}
+        assert (info["width"], info["height"], info["total_cows"]) == (400, 400, 1)
+        assert detailed[0]["bbox"] == [10.0, 20.0, 30.0, 60.0]
+        assert ModelService.restore_original_scale(detailed, image_info, None) == (detailed, image_info)
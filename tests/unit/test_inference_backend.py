@@ -0,0 +1,127 @@
+"""YOLO 推理后端单元测试（ONNX 导出缓存与结果一致性）"""
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+pytest.importorskip("ultralytics")
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+from ultralytics import YOLO
+
+from src.algorithms.detector_common.inference_backend import (
+    export_model,
+    exported_model_path,
+    load_yolo,
+    quantize_model,
+    quantized_model_path,
+)
+from src.algorithms.triple_detector.quantize import compare_models, match_boxes
+
+IMGSZ = 320
+CALIB_DIR = project_root / "tests" / "resources" / "pests"
+
+
+@pytest.fixture(scope="module")
+def weights_path(tmp_path_factory):
+    """随机初始化的 yolov8n 权重（无需下载）"""
+    path = tmp_path_factory.mktemp("weights") / "tiny.pt"
+    YOLO("yolov8n.yaml").save(str(path))
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def image():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 255, (IMGSZ, IMGSZ, 3), dtype=np.uint8)
+
+
+def _boxes(model, image):
+    result = model(image, conf=0.001, imgsz=IMGSZ, verbose=False)[0]
+    return result.boxes.xyxy.cpu().numpy(), result.boxes.cls.cpu().numpy()
+
+
+class TestInferenceBackend:
+    """推理后端测试"""
+
+    def test_onnx_matches_torch(self, weights_path, image):
+        torch_xyxy, torch_cls = _boxes(load_yolo(weights_path), image)
+        onnx_xyxy, onnx_cls = _boxes(load_yolo(weights_path, "onnx", IMGSZ), image)
+
+        assert len(torch_xyxy) == len(onnx_xyxy)
+        np.testing.assert_array_equal(torch_cls, onnx_cls)
+        np.testing.assert_allclose(torch_xyxy, onnx_xyxy, atol=1.0)
+
+    def test_export_is_cached_next_to_weights(self, weights_path):
+        exported = export_model(weights_path, "onnx", IMGSZ)
+        assert exported == exported_model_path(weights_path, "onnx")
+        mtime = os.path.getmtime(exported)
+
+        assert export_model(weights_path, "onnx", IMGSZ) == exported
+        assert os.path.getmtime(exported) == mtime
+
+    def test_reexport_when_weights_newer(self, weights_path):
+        exported = export_model(weights_path, "onnx", IMGSZ)
+        stale = os.path.getmtime(weights_path) - 10
+        os.utime(exported, (stale, stale))
+
+        export_model(weights_path, "onnx", IMGSZ)
+        assert os.path.getmtime(exported) >= os.path.getmtime(weights_path)
+
+    def test_readonly_weights_dir_uses_cache_dir(self, weights_path, tmp_path):
+        weights_dir = os.path.dirname(weights_path)
+        os.chmod(weights_dir, 0o555)
+        try:
+            if os.access(weights_dir, os.W_OK):
+                pytest.skip("当前用户可写只读目录（如 root）")
+            exported = export_model(weights_path, "onnx", IMGSZ, cache_dir=str(tmp_path))
+        finally:
+            os.chmod(weights_dir, 0o755)
+        assert os.path.dirname(exported) == str(tmp_path)
+
+    def test_unknown_backend_rejected(self, weights_path):
+        with pytest.raises(ValueError):
+            export_model(weights_path, "tensorrt")
+
+
+class TestInt8Quantization:
+    """INT8 量化测试"""
+
+    def test_int8_requires_quantized_model(self, tmp_path):
+        weights = tmp_path / "missing.pt"
+        weights.write_bytes(b"")
+        with pytest.raises(FileNotFoundError):
+            load_yolo(str(weights), precision="int8")
+
+    def test_unknown_precision_rejected(self, weights_path):
+        with pytest.raises(ValueError):
+            load_yolo(weights_path, precision="fp16")
+
+    def test_quantize_and_load_int8(self, weights_path, image):
+        int8_path = quantize_model(weights_path, str(CALIB_DIR), IMGSZ, max_images=4)
+        assert int8_path == quantized_model_path(weights_path)
+        assert os.path.getsize(int8_path) < os.path.getsize(exported_model_path(weights_path, "onnx"))
+
+        model = load_yolo(weights_path, imgsz=IMGSZ, precision="int8")
+        report = compare_models(load_yolo(weights_path, "onnx", IMGSZ), model, [image, image], IMGSZ)
+        assert report["images"] == 2
+        assert set(report["latency"]) == {"fp32", "int8", "speedup_p50"}
+
+    def test_compare_identical_models(self, weights_path, image):
+        model = load_yolo(weights_path, "onnx", IMGSZ)
+        report = compare_models(model, model, [image], IMGSZ, conf=0.001)
+        assert report["count_agreement"] == 1.0
+        assert report["box_recall"] == 1.0
+
+    def test_match_boxes_same_class_only(self):
+        ref = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=float)
+        other = np.array([[1, 1, 10, 10], [20, 20, 30, 30]], dtype=float)
+        assert match_boxes(ref, np.array([0, 1]), other, np.array([0, 1]), 0.5) == 2
+        assert match_boxes(ref, np.array([0, 1]), other, np.array([0, 0]), 0.5) == 1
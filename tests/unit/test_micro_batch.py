@@ -0,0 +1,92 @@
+"""动态微批处理调度器单元测试"""
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.algorithms.detector_common.micro_batch import MicroBatcher
+
+
+class RecordingBatchFn:
+    """记录每个批次输入的批量函数"""
+
+    def __init__(self):
+        self.batches = []
+        self.threads = set()
+
+    def __call__(self, items, scale=1):
+        self.batches.append((list(items), scale))
+        self.threads.add(threading.current_thread().name)
+        return [item * scale for item in items]
+
+
+async def submit_all(batcher, items, **options):
+    return await asyncio.gather(*(batcher.submit(item, **options) for item in items))
+
+
+class TestMicroBatcher:
+    """测试请求合并、参数分组和异常传递"""
+
+    def test_concurrent_requests_merged(self):
+        """测试窗口内的并发请求合并为一次调用，结果按调用方返回"""
+        batch_fn = RecordingBatchFn()
+        batcher = MicroBatcher(batch_fn, max_batch_size=8, window_ms=50, name="test-batch")
+
+        results = asyncio.run(submit_all(batcher, [1, 2, 3, 4]))
+
+        assert results == [1, 2, 3, 4]
+        assert len(batch_fn.batches) == 1
+        assert sorted(batch_fn.batches[0][0]) == [1, 2, 3, 4]
+        assert batch_fn.threads and all(name.startswith("test-batch") for name in batch_fn.threads)
+
+    def test_max_batch_size(self):
+        """测试批次不超过最大请求数"""
+        batch_fn = RecordingBatchFn()
+        batcher = MicroBatcher(batch_fn, max_batch_size=2, window_ms=50)
+
+        results = asyncio.run(submit_all(batcher, [1, 2, 3, 4, 5]))
+
+        assert results == [1, 2, 3, 4, 5]
+        assert all(len(items) <= 2 for items, _ in batch_fn.batches)
+        assert batcher.stats()["total_requests"] == 5
+
+    def test_options_grouped(self):
+        """测试参数不同的请求分到不同批次"""
+        batch_fn = RecordingBatchFn()
+        batcher = MicroBatcher(batch_fn, max_batch_size=8, window_ms=50)
+
+        async def run():
+            return await asyncio.gather(
+                batcher.submit(1, scale=10),
+                batcher.submit(2, scale=100),
+                batcher.submit(3, scale=10),
+            )
+
+        assert asyncio.run(run()) == [10, 200, 30]
+        assert sorted(scale for _, scale in batch_fn.batches) == [10, 100]
+
+    def test_exception_propagated(self):
+        """测试批量函数抛出的异常传递给批次内所有调用方"""
+        def broken(items):
+            raise RuntimeError("inference failed")
+
+        batcher = MicroBatcher(broken, window_ms=10)
+
+        async def run():
+            return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+        results = asyncio.run(run())
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    def test_restarts_on_new_event_loop(self):
+        """测试事件循环变化后调度器仍可使用"""
+        batcher = MicroBatcher(RecordingBatchFn(), window_ms=1)
+
+        assert asyncio.run(batcher.submit(1)) == 1
+        assert asyncio.run(batcher.submit(2)) == 2
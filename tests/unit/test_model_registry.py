@@ -0,0 +1,164 @@
+"""版本化模型注册表单元测试"""
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from fastapi import HTTPException
+
+from src.algorithms.detector_common.model_registry import (
+    WORKER_COUNT_ENV, ModelRegistry, ModelVersionNotFoundError, check_model_admin, resolve_weights_path
+)
+
+
+def fake_loader(path):
+    """按路径返回 (模型, 类别名称, 版本标识)"""
+    if "broken" in path:
+        raise FileNotFoundError(f"模型文件不存在: {path}")
+    return f"model:{path}", ("瓜实蝇",), f"version:{path}"
+
+
+@pytest.fixture
+def registry():
+    registry = ModelRegistry(fake_loader)
+    registry.load("default", "a.pt", activate=True)
+    return registry
+
+
+class TestModelRegistry:
+    """模型版本加载、切换和分流测试"""
+
+    def test_load_and_activate(self, registry):
+        assert registry.select().model == "model:a.pt"
+
+        registry.load("spring", "b.pt")
+        # 加载后不接收流量，可以按名称指定
+        assert registry.select().name == "default"
+        assert registry.resolve("spring").version == "version:b.pt"
+
+        registry.activate("spring")
+        assert registry.select().name == "spring"
+        assert registry.primary().name == "spring"
+
+    def test_warmup_before_traffic(self):
+        warmed = []
+        registry = ModelRegistry(fake_loader, warmup=warmed.append)
+        registry.load("default", "a.pt", activate=True)
+        assert warmed == ["model:a.pt"]
+
+    def test_traffic_split(self, registry, monkeypatch):
+        registry.load("spring", "b.pt")
+        registry.set_traffic({"default": 3, "spring": 1})
+
+        assert registry.status()["traffic"] == {"default": 0.75, "spring": 0.25}
+        assert registry.primary().name == "default"
+        monkeypatch.setattr("random.random", lambda: 0.8)
+        assert registry.select().name == "spring"
+        monkeypatch.setattr("random.random", lambda: 0.1)
+        assert registry.select().name == "default"
+
+    def test_invalid_traffic(self, registry):
+        with pytest.raises(ModelVersionNotFoundError):
+            registry.set_traffic({"missing": 1})
+        with pytest.raises(ValueError):
+            registry.set_traffic({"default": 0})
+        assert registry.select().name == "default"
+
+    def test_unload(self, registry):
+        registry.load("spring", "b.pt")
+        with pytest.raises(ValueError):
+            registry.unload("default")
+
+        registry.unload("spring")
+        assert len(registry) == 1
+        with pytest.raises(ModelVersionNotFoundError):
+            registry.get("spring")
+        with pytest.raises(ModelVersionNotFoundError):
+            registry.unload("spring")
+
+    def test_no_traffic(self):
+        registry = ModelRegistry(fake_loader)
+        assert not registry.has_traffic
+        with pytest.raises(ModelVersionNotFoundError):
+            registry.select()
+
+    def test_background_load(self, registry):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_warmup(model):
+            started.set()
+            release.wait(5)
+
+        registry._warmup = slow_warmup
+        thread = registry.load_in_background("spring", "b.pt", activate=True)
+        assert started.wait(5)
+        # 预热期间旧版本继续服务，重复提交同名加载被拒绝
+        assert registry.select().name == "default"
+        assert registry.status()["loading"] == {"spring": "b.pt"}
+        with pytest.raises(ValueError):
+            registry.load_in_background("spring", "b.pt")
+
+        release.set()
+        thread.join(5)
+        assert registry.select().name == "spring"
+        assert registry.status()["loading"] == {}
+
+    def test_background_load_failure(self, registry):
+        registry.load_in_background("bad", "broken.pt", activate=True).join(5)
+
+        status = registry.status()
+        assert "bad" in status["errors"]
+        assert [version["name"] for version in status["versions"]] == ["default"]
+        assert registry.select().name == "default"
+
+
+class TestResolveWeightsPath:
+    """运行时加载的权重路径校验测试"""
+
+    def test_relative_path(self, tmp_path):
+        weights = tmp_path / "spring" / "best.pt"
+        weights.parent.mkdir()
+        weights.write_bytes(b"weights")
+        assert resolve_weights_path("spring/best.pt", str(tmp_path)) == str(weights.resolve())
+
+    @pytest.mark.parametrize("path", ["../outside.pt", "/etc/passwd", "missing.pt"])
+    def test_rejected(self, tmp_path, path):
+        (tmp_path.parent / "outside.pt").write_bytes(b"weights")
+        with pytest.raises(ValueError):
+            resolve_weights_path(path, str(tmp_path))
+
+
+class TestCheckModelAdmin:
+    """测试模型管理接口的访问控制"""
+
+    def test_disabled_without_admin_token(self):
+        """测试未配置管理令牌时模型管理接口禁用"""
+        with pytest.raises(HTTPException) as exc_info:
+            check_model_admin(None, "")
+        assert exc_info.value.status_code == 403
+
+    @pytest.mark.parametrize("token", [None, "", "wrong"])
+    def test_invalid_token(self, token):
+        with pytest.raises(HTTPException) as exc_info:
+            check_model_admin(token, "secret")
+        assert exc_info.value.status_code == 401
+
+    def test_valid_token(self, monkeypatch):
+        monkeypatch.delenv(WORKER_COUNT_ENV, raising=False)
+        check_model_admin("secret", "secret", modify=True)
+
+    def test_modify_rejected_with_multiple_workers(self, monkeypatch, registry):
+        """测试多进程部署下只能查看、不能修改注册表"""
+        monkeypatch.setenv(WORKER_COUNT_ENV, "2")
+
+        check_model_admin("secret", "secret")
+        with pytest.raises(HTTPException) as exc_info:
+            check_model_admin("secret", "secret", modify=True)
+        assert exc_info.value.status_code == 409
+        assert registry.status()["workers"] == 2
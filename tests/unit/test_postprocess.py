@@ -0,0 +1,135 @@
+"""YOLO 检测结果向量化后处理单元测试"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+torch = pytest.importorskip("torch")
+
+from src.algorithms.detector_common.postprocess import (
+    result_arrays, filter_by_confidence, count_by_name, box_geometry
+)
+
+
+class FakeBoxes:
+    """模拟 ultralytics 的检测框集合"""
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = torch.tensor(xyxy, dtype=torch.float32).reshape(-1, 4)
+        self.conf = torch.tensor(conf, dtype=torch.float32)
+        self.cls = torch.tensor(cls, dtype=torch.float32)
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class FakeResult:
+    def __init__(self, xyxy, conf, cls, names=None):
+        self.boxes = FakeBoxes(xyxy, conf, cls)
+        self.names = names or {}
+
+
+@pytest.fixture
+def result():
+    return FakeResult(
+        [[0, 0, 10, 20], [10, 10, 30, 30], [50, 40, 100, 100], [0, 0, 4, 4]],
+        [0.9, 0.2, 0.6, 0.35],
+        [2, 0, 2, 1],
+        names={0: "1", 1: "2", 2: "3"},
+    )
+
+
+class TestResultArrays:
+    """测试推理结果转换为数组"""
+
+    def test_arrays(self, result):
+        xyxy, conf, cls = result_arrays(result)
+        assert xyxy.shape == (4, 4)
+        assert conf.shape == (4,)
+        assert cls.tolist() == [2, 0, 2, 1]
+        assert cls.dtype.kind == "i"
+
+    @pytest.mark.parametrize("boxes", [None, FakeBoxes([], [], [])])
+    def test_no_boxes(self, boxes):
+        empty = FakeResult([], [], [])
+        empty.boxes = boxes
+        xyxy, conf, cls = result_arrays(empty)
+        assert xyxy.shape == (0, 4) and len(conf) == 0 and len(cls) == 0
+        assert count_by_name(cls, str) == []
+
+    def test_filter_by_confidence(self, result):
+        xyxy, conf, cls = filter_by_confidence(*result_arrays(result), 0.3)
+        assert cls.tolist() == [2, 2, 1]
+        assert len(xyxy) == len(conf) == 3
+        assert conf.min() >= 0.3
+
+
+class TestCountByName:
+    """测试按类别计数"""
+
+    def test_counts_ordered_by_class_id(self, result):
+        _, _, cls = result_arrays(result)
+        counts = count_by_name(cls, lambda class_id: f"c{class_id}")
+        assert counts == [{"name": "c0", "count": 1}, {"name": "c1", "count": 1}, {"name": "c2", "count": 2}]
+
+    def test_same_display_name_merged(self, result):
+        _, _, cls = result_arrays(result)
+        counts = count_by_name(cls, lambda class_id: "稻飞虱" if class_id < 2 else "螟虫")
+        assert counts == [{"name": "稻飞虱", "count": 2}, {"name": "螟虫", "count": 2}]
+
+
+class TestBoxGeometry:
+    """测试检测框几何信息的批量计算"""
+
+    def test_geometry(self):
+        xyxy = np.array([[0, 0, 10, 20], [50, 40, 100, 100]], dtype=np.float32)
+        geometry = box_geometry(xyxy, 200, 100)
+        assert geometry["width"].tolist() == [10, 50]
+        assert geometry["height"].tolist() == [20, 60]
+        assert geometry["area"].tolist() == [200, 3000]
+        assert geometry["center"].tolist() == [[5, 10], [75, 70]]
+        assert np.allclose(geometry["relative_center"], [[0.025, 0.1], [0.375, 0.7]])
+
+
+class TestServiceParsing:
+    """测试各检测服务基于数组的结果解析"""
+
+    def test_cow_annotate_result(self, result):
+        pytest.importorskip("cv2")
+        pytest.importorskip("ultralytics")
+        from src.algorithms.cow_detection.detector.app.services.model_service import ModelService
+
+        service = ModelService()
+        image = np.zeros((100, 200, 3), dtype=np.uint8)
+
+        api_detections, annotated, detailed, image_info = service._annotate_result(
+            result, image, ("cow", "calf")
+        )
+
+        assert api_detections == [
+            {"name": "cow", "count": 1}, {"name": "calf", "count": 1}, {"name": "未知类别_2", "count": 2}
+        ]
+        assert image_info == {"width": 200, "height": 100, "total_cows": 4}
+        assert detailed[2]["bbox"] == [50.0, 40.0, 100.0, 100.0]
+        assert detailed[2]["center"] == [75.0, 70.0]
+        assert detailed[2]["size"] == {"width": 50.0, "height": 60.0, "area": 3000.0}
+        assert detailed[2]["relative_position"] == {"x": 0.375, "y": 0.7}
+        assert all(isinstance(d["confidence"], float) for d in detailed)
+        assert annotated.shape == image.shape and annotated.any() and not image.any()
+
+    def test_rice_parse_result(self, result):
+        pytest.importorskip("ultralytics")
+        from src.algorithms.rice_detection.detector.app.services.model_service import RiceService
+
+        service = RiceService.__new__(RiceService)
+        service.name_map = {"1": "糯米", "3": "泰国香米"}
+
+        assert service._parse_result(result) == [
+            {"name": "糯米", "count": 1}, {"name": "2", "count": 1}, {"name": "泰国香米", "count": 2}
+        ]
+        assert service._parse_result(None) == []
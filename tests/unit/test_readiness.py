@@ -0,0 +1,81 @@
+"""模型就绪状态单元测试"""
+import json
+import sys
+import threading
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.algorithms.detector_common.readiness import Readiness, readiness_response
+
+
+class TestReadiness:
+    """预热状态转换测试"""
+
+    def test_ready_after_warmup(self):
+        readiness = Readiness()
+        release = threading.Event()
+
+        assert readiness.status()["status"] == Readiness.PENDING
+        thread = readiness.start(lambda: release.wait(5))
+        assert not readiness.ready
+        assert readiness_response(readiness).status_code == 503
+
+        release.set()
+        thread.join(5)
+        assert readiness.ready
+        response = readiness_response(readiness, service="test")
+        assert response.status_code == 200
+        body = json.loads(response.body)
+        assert body["status"] == Readiness.READY and body["service"] == "test"
+        assert body["warmup_seconds"] is not None
+
+    def test_start_once(self):
+        readiness = Readiness()
+        calls = []
+        thread = readiness.start(lambda: calls.append(1))
+        assert readiness.start(lambda: calls.append(2)) is thread
+        thread.join(5)
+        assert calls == [1]
+
+    def test_failure(self):
+        def broken():
+            raise FileNotFoundError("模型文件不存在")
+
+        readiness = Readiness(max_attempts=1)
+        readiness.start(broken).join(5)
+
+        status = readiness.status()
+        assert status["status"] == Readiness.FAILED
+        assert "模型文件不存在" in status["error"]
+        assert readiness_response(readiness).status_code == 503
+
+    def test_retry_after_transient_failure(self):
+        """测试预热失败后退避重试，恢复后变为就绪"""
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OSError("权重文件暂时不可读")
+
+        readiness = Readiness(retry_delay=0.01)
+        readiness.start(flaky).join(5)
+
+        status = readiness.status()
+        assert readiness.ready
+        assert status["attempts"] == 3 and status["error"] is None
+
+    def test_stop_ends_retries(self):
+        def broken():
+            raise FileNotFoundError("模型文件不存在")
+
+        readiness = Readiness(retry_delay=60)
+        thread = readiness.start(broken)
+        readiness.stop()
+        thread.join(5)
+
+        assert not thread.is_alive()
+        assert readiness.status()["status"] == Readiness.FAILED
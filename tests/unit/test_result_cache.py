@@ -0,0 +1,83 @@
+"""检测结果缓存单元测试"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.algorithms.detector_common import result_cache as result_cache_module
+from src.algorithms.detector_common.result_cache import ResultCache
+
+MB = 1024 * 1024
+
+
+class TestResultCache:
+    """结果缓存测试"""
+
+    def test_hit_and_miss_counters(self):
+        cache = ResultCache(max_mb=1)
+        key = cache.make_key(b"image", "v1")
+
+        assert cache.get(key) is None
+        cache.put(key, ("detections", b"jpeg"), 4)
+        assert cache.get(key) == ("detections", b"jpeg")
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+        assert stats["hit_rate"] == 0.5
+
+    def test_key_depends_on_bytes_and_parts(self):
+        key = ResultCache.make_key(b"image", "v1", 0.5)
+        assert key == ResultCache.make_key(b"image", "v1", 0.5)
+        assert key != ResultCache.make_key(b"image", "v2", 0.5)
+        assert key != ResultCache.make_key(b"image", "v1", 0.6)
+        assert key != ResultCache.make_key(b"other", "v1", 0.5)
+
+    def test_evicts_least_recently_used_over_size_bound(self):
+        cache = ResultCache(max_mb=1)
+        cache.put("a", "A", MB // 2)
+        cache.put("b", "B", MB // 2)
+        cache.get("a")  # a 变为最近使用
+        cache.put("c", "C", MB // 2)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "A"
+        assert cache.get("c") == "C"
+        assert cache.size_bytes <= MB
+        assert cache.stats()["evictions"] == 1
+
+    def test_entry_larger_than_bound_not_cached(self):
+        cache = ResultCache(max_mb=1)
+        cache.put("big", "X", 2 * MB)
+        assert cache.get("big") is None
+        assert cache.size_bytes == 0
+
+    def test_expired_entry_is_dropped(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(result_cache_module.time, "monotonic", lambda: now[0])
+        cache = ResultCache(max_mb=1, ttl_seconds=10)
+        cache.put("a", "A", 10)
+
+        now[0] += 5
+        assert cache.get("a") == "A"
+        now[0] += 10
+        assert cache.get("a") is None
+        assert cache.stats()["entries"] == 0
+        assert cache.size_bytes == 0
+
+    def test_replacing_key_updates_size(self):
+        cache = ResultCache(max_mb=1)
+        cache.put("a", "A", 100)
+        cache.put("a", "A2", 300)
+        assert cache.size_bytes == 300
+        assert cache.get("a") == "A2"
+
+    @pytest.mark.parametrize("max_mb", [0, -1])
+    def test_disabled(self, max_mb):
+        cache = ResultCache(max_mb=max_mb)
+        cache.put("a", "A", 1)
+        assert cache.get("a") is None
+        assert cache.stats()["enabled"] is False
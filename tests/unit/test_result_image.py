@@ -0,0 +1,65 @@
+"""检测结果图片渲染和交付单元测试"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+cv2 = pytest.importorskip("cv2")
+
+from src.algorithms.detector_common.result_image import (
+    make_thumbnail, encode_result_image, deliver_result_jpeg,
+    RETURN_IMAGE_FULL, RETURN_IMAGE_THUMBNAIL, RETURN_IMAGE_NONE
+)
+
+
+@pytest.fixture
+def image():
+    """带噪声的 1280x960 测试图像（JPEG 大小随质量变化）"""
+    return np.random.default_rng(0).integers(0, 256, (960, 1280, 3), dtype=np.uint8)
+
+
+class TestMakeThumbnail:
+    """测试缩略图生成"""
+
+    def test_scales_long_side(self, image):
+        assert make_thumbnail(image, 320).shape == (240, 320, 3)
+
+    def test_small_image_unchanged(self, image):
+        assert make_thumbnail(image, 2000) is image
+        assert make_thumbnail(image, 0) is image
+
+
+class TestEncodeResultImage:
+    """测试按渲染方式编码标注图片"""
+
+    def test_full(self, image):
+        jpeg_bytes = encode_result_image(image, RETURN_IMAGE_FULL)
+        assert cv2.imdecode(np.frombuffer(jpeg_bytes, np.uint8), cv2.IMREAD_COLOR).shape == image.shape
+
+    def test_thumbnail(self, image):
+        jpeg_bytes = encode_result_image(image, RETURN_IMAGE_THUMBNAIL, thumbnail_size=320, thumbnail_quality=50)
+        decoded = cv2.imdecode(np.frombuffer(jpeg_bytes, np.uint8), cv2.IMREAD_COLOR)
+        assert decoded.shape == (240, 320, 3)
+        assert len(jpeg_bytes) < len(encode_result_image(make_thumbnail(image, 320)))
+
+    def test_none(self, image):
+        assert encode_result_image(image, RETURN_IMAGE_NONE) is None
+        assert encode_result_image(None, RETURN_IMAGE_FULL) is None
+
+    def test_invalid_mode(self, image):
+        with pytest.raises(ValueError):
+            encode_result_image(image, "inline")
+
+
+class TestDeliverResultJpeg:
+    """测试没有标注图片时的交付"""
+
+    @pytest.mark.parametrize("result_format", ["base64", "binary", "url"])
+    def test_no_image(self, tmp_path, result_format):
+        assert deliver_result_jpeg(None, result_format, str(tmp_path), "/results") == (None, None)
+        assert list(tmp_path.iterdir()) == []
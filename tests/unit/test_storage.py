@@ -0,0 +1,180 @@
+"""上传文件与检测结果存储单元测试"""
+import importlib
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from service.storage import FileStorage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return FileStorage(
+        {"uploads": tmp_path / "uploads", "pest": tmp_path / "pest"},
+        max_bytes=1000,
+        max_age_seconds=3600,
+    )
+
+
+def set_mtime(path: Path, mtime: float) -> None:
+    os.utime(path, (mtime, mtime))
+
+
+class TestFileStorage:
+    """内容寻址、保留策略和按对话清理测试"""
+
+    def test_content_addressed(self, storage):
+        first = storage.put("uploads", b"image", ".jpg")
+        second = storage.put("uploads", b"image", ".jpg")
+        other = storage.put("uploads", b"other", ".jpg")
+
+        assert first == second
+        assert first != other
+        assert first.read_bytes() == b"image"
+        assert storage.stats()["directories"]["uploads"] == {"files": 2, "bytes": 10}
+
+    def test_duplicate_refreshes_mtime(self, storage):
+        path = storage.put("uploads", b"image", ".jpg")
+        set_mtime(path, time.time() - 7200)
+
+        storage.put("uploads", b"image", ".jpg")
+        storage.sweep()
+        assert path.exists()
+
+    def test_sweep_expired(self, storage):
+        old = storage.put("uploads", b"old", ".jpg")
+        new = storage.put("pest", b"new", ".jpg")
+        set_mtime(old, time.time() - 7200)
+
+        result = storage.sweep()
+
+        assert not old.exists() and new.exists()
+        assert result["deleted_files"] == 1
+        assert storage.stats()["total_files"] == 1
+
+    def test_sweep_over_budget(self, storage):
+        now = time.time()
+        paths = [storage.put("uploads", bytes([index]) * 400, ".jpg") for index in range(3)]
+        for index, path in enumerate(paths):
+            set_mtime(path, now - 100 + index)
+
+        storage.sweep(now)
+
+        # 从最久未使用的文件开始删除，直到不超过 1000 字节
+        assert [path.exists() for path in paths] == [False, True, True]
+        assert storage.stats()["total_bytes"] == 800
+
+    def test_sweep_finds_unregistered_files(self, storage, tmp_path):
+        (tmp_path / "pest" / "result.jpg").write_bytes(b"result")
+
+        storage.sweep()
+        assert storage.stats()["directories"]["pest"] == {"files": 1, "bytes": 6}
+
+    def test_purge_thread(self, storage):
+        shared = storage.put("uploads", b"shared", ".jpg")
+        own = storage.put("pest", b"own", ".jpg")
+        storage.attach("a", [str(shared), str(own)])
+        storage.attach("b", [str(shared)])
+
+        assert storage.purge_thread("a") == (1, 3)
+        assert shared.exists() and not own.exists()
+        assert storage.purge_thread("b") == (1, 6)
+        assert storage.stats()["threads"] == 0
+
+    def test_attach_ignores_unmanaged_paths(self, storage, tmp_path):
+        outside = tmp_path / "outside.jpg"
+        outside.write_bytes(b"keep")
+
+        assert storage.attach("a", [str(outside), str(tmp_path / "uploads" / "missing.jpg")]) == 0
+        storage.purge_thread("a")
+        assert outside.exists()
+
+    def test_purge_keeps_pending_upload(self, storage):
+        """测试相同内容的上传尚未登记到对话时，清理其他对话不会删除该文件"""
+        path = storage.put("uploads", b"image", ".jpg")
+        storage.attach("a", [str(path)])
+        writer = storage.writer("uploads")
+        writer.write(b"image")
+        assert writer.commit(".jpg", hold=True) == path
+
+        assert storage.purge_thread("a") == (0, 0)
+        assert path.exists()
+
+        # 登记到对话后释放上传引用，随该对话一起清理
+        storage.attach("b", [str(path)])
+        assert storage.purge_thread("b") == (1, 5)
+        assert not path.exists()
+
+    def test_sweep_skips_pending_upload_over_budget(self, storage):
+        now = time.time()
+        writer = storage.writer("uploads")
+        writer.write(b"h" * 600)
+        held = writer.commit(".jpg", hold=True)
+        other = storage.put("pest", b"o" * 600, ".jpg")
+        set_mtime(held, now - 100)
+        set_mtime(other, now - 50)
+
+        storage.sweep(now)
+
+        assert held.exists() and not other.exists()
+
+    def test_sweep_keeps_file_refreshed_after_scan(self, storage, monkeypatch):
+        """测试扫描之后被重复上传刷新修改时间的文件不会被删除"""
+        path = storage.put("uploads", b"image", ".jpg")
+        set_mtime(path, time.time() - 7200)
+        scan = storage._scan
+
+        def scan_then_upload():
+            entries = scan()
+            storage.put("uploads", b"image", ".jpg")
+            return entries
+
+        monkeypatch.setattr(storage, "_scan", scan_then_upload)
+        result = storage.sweep()
+
+        assert path.exists()
+        assert result["deleted_files"] == 0
+        assert storage.stats()["directories"]["uploads"] == {"files": 1, "bytes": 5}
+
+
+class TestPurgeThreadEndpoint:
+    """按对话清理文件接口的鉴权测试"""
+
+    @pytest.fixture
+    def client(self, tmp_path, monkeypatch):
+        pytest.importorskip("dotenv")
+        pytest.importorskip("langchain_core")
+        from fastapi.testclient import TestClient
+
+        # 服务模块导入时在工作目录下创建检测结果目录
+        monkeypatch.chdir(tmp_path)
+        server = importlib.import_module("service.server")
+        monkeypatch.setattr(server, "STORAGE_ADMIN_TOKEN", "secret")
+        return server, TestClient(server.app)
+
+    def test_disabled_without_token(self, client, monkeypatch):
+        server, test_client = client
+        monkeypatch.setattr(server, "STORAGE_ADMIN_TOKEN", "")
+
+        response = test_client.delete("/threads/a/files", headers={"X-Admin-Token": ""})
+        assert response.status_code == 403
+
+    def test_invalid_token(self, client):
+        _, test_client = client
+
+        assert test_client.delete("/threads/a/files").status_code == 401
+        assert test_client.delete("/threads/a/files", headers={"X-Admin-Token": "wrong"}).status_code == 401
+
+    def test_valid_token(self, client):
+        _, test_client = client
+
+        response = test_client.delete("/threads/a/files", headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 200
+        assert response.json()["deleted_files"] == 0
@@ -0,0 +1,130 @@
+"""害虫检测切片推理单元测试"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.algorithms.detector_common.tiling import tile_grid, merge_detections
+
+
+class TestTileGrid:
+    """测试切片划分"""
+
+    def test_covers_image_with_overlap(self):
+        tiles = tile_grid(2000, 1000, tile_size=640, overlap=0.2, max_tiles=100)
+        assert (min(t[0] for t in tiles), min(t[1] for t in tiles)) == (0, 0)
+        assert (max(t[2] for t in tiles), max(t[3] for t in tiles)) == (2000, 1000)
+        xs = sorted({t[0] for t in tiles})
+        assert all(b - a <= 640 * 0.8 for a, b in zip(xs, xs[1:]))
+        assert all(t[2] - t[0] == 640 and t[3] - t[1] == 640 for t in tiles)
+
+    def test_tile_count_bounded(self):
+        tiles = tile_grid(4000, 3000, tile_size=640, overlap=0.2, max_tiles=16)
+        assert len(tiles) <= 16
+        assert max(t[2] for t in tiles) == 4000 and max(t[3] for t in tiles) == 3000
+
+    def test_small_image_single_tile(self):
+        assert tile_grid(300, 200, tile_size=640) == [(0, 0, 300, 200)]
+
+
+class TestMergeDetections:
+    """测试跨切片合并"""
+
+    def test_truncated_box_merged_into_full_box(self):
+        boxes = np.array([[100, 100, 200, 200], [100, 100, 140, 200]], dtype=float)
+        merged, scores, _ = merge_detections(boxes, np.array([0.6, 0.9]), np.array([0, 0]))
+        assert merged.tolist() == [[100, 100, 200, 200]]
+        assert scores.tolist() == [0.9]
+
+    def test_pieces_from_overlapping_tiles_joined(self):
+        """相邻两个切片各截到目标的一部分（在重叠区内相交），合并后恢复完整框"""
+        boxes = np.array([[90, 90, 120, 130], [100, 90, 130, 130]], dtype=float)
+        merged, _, _ = merge_detections(boxes, np.array([0.9, 0.9]), np.zeros(2, dtype=int))
+        assert merged.tolist() == [[90, 90, 130, 130]]
+
+    def test_different_classes_kept(self):
+        boxes = np.array([[100, 100, 200, 200], [100, 100, 200, 200]], dtype=float)
+        _, _, class_ids = merge_detections(boxes, np.array([0.9, 0.8]), np.array([0, 1]))
+        assert sorted(class_ids.tolist()) == [0, 1]
+
+    def test_separate_boxes_kept(self):
+        boxes = np.array([[0, 0, 10, 10], [50, 50, 60, 60]], dtype=float)
+        merged, _, _ = merge_detections(boxes, np.array([0.9, 0.8]), np.array([0, 0]))
+        assert len(merged) == 2
+
+    def test_empty(self):
+        merged, _, _ = merge_detections(np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=int))
+        assert merged.shape == (0, 4)
+
+
+class TestPredictTiled:
+    """测试切片推理结果（模拟模型把亮色方块检测为类别 0）"""
+
+    @pytest.fixture
+    def service(self, monkeypatch):
+        torch = pytest.importorskip("torch")
+        cv2 = pytest.importorskip("cv2")
+        pytest.importorskip("ultralytics")
+        from src.algorithms.pest_detection.detector.app.services import model_service as module
+
+        class FakeBoxes:
+            def __init__(self, rows):
+                data = torch.tensor(rows, dtype=torch.float32).reshape(-1, 6)
+                self.xyxy, self.conf, self.cls = data[:, :4], data[:, 4], data[:, 5]
+
+            def __len__(self):
+                return len(self.conf)
+
+        class FakeResult:
+            names = {0: "aphid"}
+
+            def __init__(self, crop):
+                # 每个连通的亮色区域为一个目标
+                count, _, stats, _ = cv2.connectedComponentsWithStats(np.ascontiguousarray(crop[..., 0]))
+                rows = [[x, y, x + w, y + h, 0.9, 0] for x, y, w, h, _ in stats[1:count]]
+                self.boxes = FakeBoxes(rows)
+
+        class FakeModel:
+            def __init__(self):
+                self.batch_sizes = []
+
+            def __call__(self, crops, **kwargs):
+                self.batch_sizes.append(len(crops))
+                return [FakeResult(crop) for crop in crops]
+
+        monkeypatch.setattr(module.settings, "TILE_SIZE", 100)
+        monkeypatch.setattr(module.settings, "TILE_OVERLAP", 0.2)
+        monkeypatch.setattr(module.settings, "TILE_MAX_COUNT", 16)
+        monkeypatch.setattr(module.settings, "TILE_INCLUDE_FULL_IMAGE", True)
+        service = module.ModelService()
+        service.registry.add("test", "fake.pt", FakeModel(), ("蚜虫",), "test", activate=True)
+        service._initialized = True
+        return service
+
+    def test_object_across_tile_seam_counted_once(self, service):
+        image = np.zeros((200, 200, 3), dtype=np.uint8)
+        image[90:110, 90:110] = 255  # 位于四个切片的交界处
+        image[10:20, 10:20] = 255
+
+        detections, annotated = service.predict_tiled(image)
+
+        assert detections == [{"name": "蚜虫", "count": 2}]
+        assert annotated.shape == image.shape
+        # 9 个切片 + 整图在一次前向推理中完成
+        assert service.model.batch_sizes == [10]
+
+    def test_no_detections(self, service):
+        detections, annotated = service.predict_tiled(np.zeros((200, 200, 3), dtype=np.uint8))
+        assert detections == []
+        assert annotated.shape == (200, 200, 3)
+
+    @pytest.mark.parametrize("tiled,side,expected", [(None, 4000, True), (None, 1000, False), (True, 100, True), (False, 4000, False)])
+    def test_should_tile(self, service, monkeypatch, tiled, side, expected):
+        from src.algorithms.pest_detection.detector.app.services import model_service as module
+        monkeypatch.setattr(module.settings, "TILED_AUTO_MIN_SIDE", 2000)
+        assert service.should_tile(side // 2, side, tiled) is expected
@@ -0,0 +1,86 @@
+"""多目标跟踪单元测试"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.algorithms.detector_common.tracking import IoUTracker, box_iou_matrix
+
+
+def moving_box(frame: int, start_x: float, speed: float, y: float = 0.0, size: float = 20.0):
+    x = start_x + speed * frame
+    return [x, y, x + size, y + size]
+
+
+class TestBoxIou:
+    def test_iou_matrix(self):
+        a = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=float)
+        b = np.array([[0, 0, 10, 10], [5, 0, 15, 10]], dtype=float)
+        iou = box_iou_matrix(a, b)
+        assert iou.shape == (2, 2)
+        assert iou[0, 0] == pytest.approx(1.0)
+        assert iou[0, 1] == pytest.approx(50 / 150)
+        assert iou[1].tolist() == [0.0, 0.0]
+
+    def test_empty(self):
+        assert box_iou_matrix(np.zeros((0, 4)), np.zeros((3, 4))).shape == (0, 3)
+
+
+class TestIoUTracker:
+    """测试轨迹关联、唯一个体数量和停留时长"""
+
+    def test_stable_ids_for_moving_objects(self):
+        tracker = IoUTracker()
+        ids_per_frame = []
+        for frame in range(0, 50, 5):
+            boxes = [moving_box(frame, 0, 1), moving_box(frame, 200, -1, y=100)]
+            ids_per_frame.append(tracker.update(frame, boxes, [0.9, 0.8]))
+
+        assert all(ids == ids_per_frame[0] for ids in ids_per_frame)
+        summary = tracker.summary(fps=10)
+        assert summary["unique_count"] == 2
+        assert summary["tracks"][0]["dwell_time"] == 4.5
+        assert len(summary["tracks"][0]["trajectory"]) == 10
+
+    def test_sparse_sampling_uses_motion_prediction(self):
+        """采样稀疏到相邻采样帧的框互不重叠时，按匀速外推和中心点距离仍能关联"""
+        tracker = IoUTracker(min_hits=1)
+        for frame in range(0, 100, 10):
+            tracker.update(frame, [moving_box(frame, 0, 2.5)], [0.9])
+        assert tracker.summary()["unique_count"] == 1
+
+    def test_low_confidence_only_extends_tracks(self):
+        tracker = IoUTracker(min_hits=1)
+        tracker.update(0, [[0, 0, 20, 20]], [0.9])
+        ids = tracker.update(1, [[1, 0, 21, 20], [100, 100, 120, 120]], [0.3, 0.3])
+        assert ids == [1, None]
+        assert tracker.summary()["unique_count"] == 1
+
+    def test_min_hits_filters_one_off_detections(self):
+        tracker = IoUTracker(min_hits=2)
+        tracker.update(0, [[0, 0, 20, 20]], [0.9])
+        tracker.update(1, [[0, 0, 20, 20], [100, 100, 120, 120]], [0.9, 0.9])
+        tracker.update(2, [[0, 0, 20, 20]], [0.9])
+        assert tracker.summary()["unique_count"] == 1
+
+    def test_lost_track_gets_new_id(self):
+        tracker = IoUTracker(max_missed=1, min_hits=1)
+        first = tracker.update(0, [[0, 0, 20, 20]], [0.9])
+        tracker.update(1, [], [])
+        tracker.update(2, [], [])
+        again = tracker.update(3, [[0, 0, 20, 20]], [0.9])
+        assert first != again
+        assert tracker.summary()["unique_count"] == 2
+
+    def test_classes_not_mixed(self):
+        tracker = IoUTracker(min_hits=1)
+        tracker.update(0, [[0, 0, 20, 20]], [0.9], [0])
+        ids = tracker.update(1, [[0, 0, 20, 20]], [0.9], [1])
+        assert ids == [2]
+        summary = tracker.summary(class_names=["cow", "person"])
+        assert summary["unique_count_by_class"] == {"cow": 1, "person": 1}
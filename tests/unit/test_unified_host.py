@@ -0,0 +1,67 @@
+"""统一检测服务主机单元测试"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+pytest.importorskip("ultralytics")
+
+# 模拟基于害虫服务镜像的容器：导入路径中有害虫服务的 app 包和顶层 detector_common 包
+PEST_IMAGE_PYTHONPATH = os.pathsep.join([
+    str(project_root / "src" / "algorithms" / "pest_detection" / "detector"),
+    str(project_root / "src" / "algorithms"),
+])
+
+# 在子进程中导入统一主机，输出各服务挂载的路由
+ROUTES_SCRIPT = """
+import json
+import src.algorithms.triple_detector.unified as unified
+
+routes = {}
+for name, (detector_app, _, _) in unified.DETECTOR_APPS.items():
+    paths = []
+    for route in detector_app.routes:
+        router = getattr(route, "original_router", None)
+        paths.extend(r.path for r in (router.routes if router else [route]) if hasattr(r, "path"))
+    routes[name] = paths
+print(json.dumps(routes))
+"""
+
+
+def run_unified(script: str) -> subprocess.CompletedProcess:
+    """在模拟的容器导入路径下运行脚本"""
+    env = dict(os.environ, PYTHONPATH=PEST_IMAGE_PYTHONPATH)
+    return subprocess.run(
+        [sys.executable, "-c", script], cwd=project_root, env=env,
+        capture_output=True, text=True, timeout=300,
+    )
+
+
+class TestServiceIsolation:
+    """测试三个服务按各自的完整路径导入"""
+
+    def test_each_service_serves_own_routes(self):
+        """测试导入路径中存在害虫服务的 app 包时，牛只和大米服务仍挂载自己的路由"""
+        result = run_unified(ROUTES_SCRIPT)
+        assert result.returncode == 0, result.stderr
+        routes = json.loads(result.stdout.strip().splitlines()[-1])
+
+        assert "/supported-pests" in routes["pest"]
+        assert "/supported-cows" in routes["cow"]
+        assert "/supported-pests" not in routes["cow"]
+        assert "/supported-rice-types" in routes["rice"]
+
+    def test_refuses_after_top_level_app_imported(self):
+        """测试顶层 app 包已被导入时拒绝启动"""
+        script = "import app\nimport src.algorithms.triple_detector.unified"
+        result = run_unified(script)
+
+        assert result.returncode != 0
+        assert "RuntimeError" in result.stderr
@@ -0,0 +1,135 @@
+"""图片上传流式保存单元测试"""
+import asyncio
+import io
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from fastapi import UploadFile
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from service import upload as upload_module
+from service.storage import ContentWriter, FileStorage
+from service.upload import (
+    UnsupportedImageError, UploadTooLargeError, save_image_uploads, sniff_image_type
+)
+
+JPEG = b"\xff\xd8\xff\xe0" + b"x" * 100
+PNG = b"\x89PNG\r\n\x1a\n" + b"y" * 100
+
+
+def make_upload(data: bytes, filename: str = "photo.jpg", size=None) -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename=filename, size=size)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return FileStorage({"uploads": tmp_path / "uploads"}, max_bytes=10 ** 6, max_age_seconds=3600)
+
+
+def leftover_files(storage):
+    return sorted(path.name for path in storage.directory("uploads").iterdir())
+
+
+class TestSniffImageType:
+    """按文件头识别图片格式测试"""
+
+    @pytest.mark.parametrize("head,extension", [
+        (JPEG, ".jpg"),
+        (PNG, ".png"),
+        (b"BM" + b"\x00" * 10, ".bmp"),
+        (b"RIFF\x00\x00\x00\x00WEBPVP8 ", ".webp"),
+        (b"RIFF\x00\x00\x00\x00AVI LIST", None),
+        (b"<html>", None),
+        (b"", None),
+    ])
+    def test_signatures(self, head, extension):
+        assert sniff_image_type(head) == extension
+
+
+class TestSaveImageUploads:
+    """流式保存、大小限制和内容去重测试"""
+
+    def test_saved_in_order_with_sniffed_extension(self, storage, monkeypatch):
+        monkeypatch.setattr(upload_module, "CHUNK_SIZE", 16)
+        uploads = [make_upload(PNG, "a.jpg"), make_upload(JPEG, "b.png")]
+
+        paths = asyncio.run(save_image_uploads(storage, uploads, max_size=1000))
+
+        # 扩展名按文件头识别，不使用上传文件名
+        assert [Path(path).suffix for path in paths] == [".png", ".jpg"]
+        assert Path(paths[0]).read_bytes() == PNG
+        assert storage.stats()["total_bytes"] == len(PNG) + len(JPEG)
+
+    def test_identical_uploads_deduplicated(self, storage):
+        uploads = [make_upload(JPEG), make_upload(JPEG, "copy.jpg")]
+
+        paths = asyncio.run(save_image_uploads(storage, uploads, max_size=1000))
+
+        assert paths[0] == paths[1]
+        assert leftover_files(storage) == [Path(paths[0]).name]
+
+    def test_too_large_aborted(self, storage, monkeypatch):
+        monkeypatch.setattr(upload_module, "CHUNK_SIZE", 16)
+
+        with pytest.raises(UploadTooLargeError):
+            asyncio.run(save_image_uploads(storage, [make_upload(JPEG)], max_size=50))
+        # 中止后不留下临时文件
+        assert leftover_files(storage) == []
+
+    def test_abort_off_event_loop(self, storage, monkeypatch):
+        """测试中止时在线程池中删除临时文件"""
+        monkeypatch.setattr(upload_module, "CHUNK_SIZE", 16)
+        threads = []
+        abort = ContentWriter.abort
+
+        def record_thread(writer):
+            threads.append(threading.current_thread())
+            abort(writer)
+
+        monkeypatch.setattr(ContentWriter, "abort", record_thread)
+        with pytest.raises(UploadTooLargeError):
+            asyncio.run(save_image_uploads(storage, [make_upload(JPEG)], max_size=50))
+
+        assert threads and threads[0] is not threading.main_thread()
+        assert leftover_files(storage) == []
+
+    def test_cancelled_upload_cleaned_up(self, storage, monkeypatch):
+        """测试请求被取消时仍等待临时文件删除完成"""
+        monkeypatch.setattr(upload_module, "CHUNK_SIZE", 16)
+        started = threading.Event()
+        write = ContentWriter.write
+
+        def slow_write(writer, chunk):
+            started.set()
+            write(writer, chunk)
+
+        monkeypatch.setattr(ContentWriter, "write", slow_write)
+
+        async def cancel_upload():
+            task = asyncio.create_task(save_image_uploads(storage, [make_upload(JPEG)], max_size=1000))
+            while not started.is_set():
+                await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_upload())
+        assert leftover_files(storage) == []
+
+    def test_known_size_rejected_before_reading(self, storage):
+        upload = make_upload(JPEG, size=10 ** 9)
+
+        with pytest.raises(UploadTooLargeError):
+            asyncio.run(save_image_uploads(storage, [upload], max_size=1000))
+        assert upload.file.tell() == 0
+
+    def test_unsupported_type(self, storage):
+        uploads = [make_upload(JPEG), make_upload(b"GIF89a" + b"z" * 10, "fake.jpg")]
+
+        with pytest.raises(UnsupportedImageError):
+            asyncio.run(save_image_uploads(storage, uploads, max_size=1000))
@@ -0,0 +1,120 @@
+"""牛只视频流式检测单元测试"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("ultralytics")
+torch = pytest.importorskip("torch")
+
+from src.algorithms.cow_detection.detector.app.services.model_service import ModelService
+
+
+class FakeBoxes:
+    """模拟 ultralytics 的检测框集合（每帧一个框，置信度为帧的像素值）"""
+
+    def __init__(self, value: int):
+        self.xyxy = torch.tensor([[1.0, 2.0, 3.0, 4.0]])
+        self.conf = torch.tensor([value / 255.0])
+        self.cls = torch.tensor([0.0])
+
+    def __len__(self):
+        return 1
+
+
+class FakeResult:
+    def __init__(self, image: np.ndarray):
+        self.boxes = FakeBoxes(int(image[0, 0, 0]))
+
+
+class FakeModel:
+    """记录每次调用的帧数"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, images, **kwargs):
+        self.batch_sizes.append(len(images))
+        return [FakeResult(image) for image in images]
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    """25 帧的测试视频，第 i 帧的像素值为 i * 10"""
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (32, 32))
+    for index in range(25):
+        writer.write(np.full((32, 32, 3), index * 10, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+@pytest.fixture
+def service():
+    service = ModelService()
+    service.registry.add("test", "fake.pt", FakeModel(), ("cow",), "test", activate=True)
+    service._initialized = True
+    return service
+
+
+class TestIterVideoDetections:
+    """测试视频采样帧的分批检测"""
+
+    def test_event_sequence(self, service, video_path):
+        events = list(service.iter_video_detections(video_path, sample_rate=5, batch_size=2))
+
+        assert events[0]["type"] == "meta"
+        assert events[0]["fps"] == 10.0
+        assert events[0]["video_size"] == [32, 32]
+        assert events[0]["model_version"] == "test"
+        assert events[-1]["type"] == "summary"
+        assert events[-1]["total_frames"] == 25
+        assert events[-1]["processed_frames"] == 5
+        assert events[-1]["total_detections"] == 5
+
+        frames = [event for event in events if event["type"] == "frame"]
+        assert [frame["frame_index"] for frame in frames] == [0, 5, 10, 15, 20]
+        assert [frame["timestamp"] for frame in frames] == [0.0, 0.5, 1.0, 1.5, 2.0]
+        assert frames[0]["detections"][0]["class_name"] == "cow"
+
+    def test_sampled_frames_batched(self, service, video_path):
+        list(service.iter_video_detections(video_path, sample_rate=5, batch_size=2))
+        assert service.model.batch_sizes == [2, 2, 1]
+
+    def test_only_sampled_frames_decoded(self, service, video_path):
+        """采样帧是正确的帧（第 i 帧像素值为 i * 10）"""
+        events = list(service.iter_video_detections(video_path, sample_rate=12, batch_size=8))
+        frames = [event for event in events if event["type"] == "frame"]
+        confidences = [round(frame["detections"][0]["confidence"] * 255) for frame in frames]
+        assert [frame["frame_index"] for frame in frames] == [0, 12, 24]
+        assert confidences == pytest.approx([0, 120, 240], abs=4)
+
+    def test_tracking_reports_unique_count(self, service, video_path):
+        """固定位置的框跨帧关联为同一轨迹；未延续轨迹的低分框被丢弃"""
+        events = list(service.iter_video_detections(
+            video_path, confidence_threshold=0.3, sample_rate=5, batch_size=2, track=True
+        ))
+        frames = [event for event in events if event["type"] == "frame"]
+        summary = events[-1]
+
+        # 第 0 帧置信度为 0，低于阈值且没有可延续的轨迹
+        assert frames[0]["count"] == 0
+        # 第 5 帧置信度约 0.2，低于检测阈值，第 10 帧起开始轨迹
+        assert [frame["count"] for frame in frames[1:]] == [0, 1, 1, 1]
+        assert {frame["detections"][0]["track_id"] for frame in frames[2:]} == {1}
+        assert summary["unique_count"] == 1
+        assert summary["unique_count_by_class"] == {"cow": 1}
+        assert summary["tracks"][0]["dwell_time"] == 1.0
+        assert summary["total_detections"] == 3
+
+    def test_unreadable_video(self, service, tmp_path):
+        path = tmp_path / "broken.mp4"
+        path.write_bytes(b"not a video")
+        with pytest.raises(ValueError):
+            next(service.iter_video_detections(str(path)))
@@ -0,0 +1,67 @@
+"""有界工作线程池单元测试"""
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.algorithms.detector_common.worker_pool import (
+    ServiceBusyError,
+    WorkerPool,
+    busy_response,
+)
+
+
+class TestWorkerPool:
+    """测试线程池执行和过载保护"""
+
+    def test_run_off_event_loop(self):
+        """测试阻塞函数在工作线程中执行"""
+        pool = WorkerPool(max_concurrency=2, name="test-worker")
+
+        async def run():
+            async with pool.slot():
+                return await pool.run(lambda: threading.current_thread().name)
+
+        assert asyncio.run(run()).startswith("test-worker")
+        assert pool.active == 0
+
+    def test_rejects_when_saturated(self):
+        """测试执行槽位和等待队列都占满时立即拒绝"""
+        pool = WorkerPool(max_concurrency=1, max_queue=1, retry_after=3)
+        release = threading.Event()
+
+        async def hold():
+            async with pool.slot():
+                await pool.run(release.wait)
+
+        async def run():
+            running = asyncio.create_task(hold())
+            queued = asyncio.create_task(hold())
+            while pool.active < 1 or pool.waiting < 1:
+                await asyncio.sleep(0.01)
+
+            with pytest.raises(ServiceBusyError) as exc_info:
+                async with pool.slot():
+                    pass
+
+            release.set()
+            await asyncio.gather(running, queued)
+            return exc_info.value
+
+        error = asyncio.run(run())
+        assert error.retry_after == 3
+        assert pool.stats()["rejected"] == 1
+        assert pool.active == 0 and pool.waiting == 0
+
+    def test_busy_response(self):
+        """测试繁忙响应的状态码和 Retry-After 响应头"""
+        response = busy_response(ServiceBusyError(2), detections=[])
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "2"
+        assert b'"detections":[]' in response.body